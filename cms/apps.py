@@ -6,8 +6,15 @@ class CmsConfig(AppConfig):
     name = "cms"
     
     def ready(self):
+        from django.conf import settings
+
         # Importar site_settings para registrar los modelos
         import cms.site_settings  # noqa
 
+        # Mantener el mirror estático al publicar (solo si está configurado)
+        if getattr(settings, "STATIC_MIRROR_ROOT", None):
+            from cms.signals import connect_static_mirror_signals
+            connect_static_mirror_signals()
+
 
 
@@ -3,36 +3,193 @@ Azure Blob Storage uploader for static site backups.
 
 This module handles uploading ZIP archives to Azure Blob Storage
 for long-term backup storage.
+
+Archives are uploaded as block blobs: the file is split into fixed-size
+blocks that are staged in parallel (each with its own MD5) and then
+committed. Staged blocks survive a dropped connection for about a week,
+so re-running an interrupted upload only sends the missing blocks.
+
+upload_stream() stages the blocks while the archive is still being
+written (BlockBlobWriter), so no local ZIP is needed.
 """
 
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from django.conf import settings
 
 from cms.export import ExportError
+from cms.export.blob_clients import get_async_blob_service, get_blob_service
+from cms.export.catalog import BACKUP_PREFIX, backup_kind
+from cms.export.storage import BackupStorage, RangedReader
+
+
+def _block_id(index, data):
+    """
+    Build the ID of a block from its position and MD5.
+    
+    All IDs of a blob must have the same length.
+    """
+    return f'{index:06d}-{hashlib.md5(data).hexdigest()}'
+
+
+class BlockBlobWriter(io.RawIOBase):
+    """
+    Writable, non-seekable file object that stages a block blob as it is written.
+    
+    Data is buffered until ``block_size`` bytes are available, then staged
+    in a background thread. At most ``max_concurrency`` blocks are in
+    flight; further writes wait for a slot (backpressure). Nothing is
+    visible in the container until ``commit()``.
+    """
+    
+    def __init__(self, uploader, blob_client, local_copy=None):
+        """
+        Initialize the writer.
+        
+        Args:
+            uploader: AzureBackupUploader providing block size, concurrency and retries
+            blob_client: BlobClient of the destination blob
+            local_copy: Optional path where the written data is also saved
+        """
+        super().__init__()
+        self.uploader = uploader
+        self.blob_client = blob_client
+        self.block_size = uploader.block_size
+        self.block_ids = []
+        self.blocks_staged = 0
+        self.checksum = None
+        self._md5 = hashlib.md5()
+        self.local_copy = Path(local_copy) if local_copy else None
+        self._local_file = open(self.local_copy, 'wb') if self.local_copy else None
+        self._buffer = bytearray()
+        self._position = 0
+        self._slots = threading.BoundedSemaphore(uploader.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=uploader.max_concurrency)
+        self._futures = []
+    
+    def writable(self):
+        return True
+    
+    def tell(self):
+        return self._position
+    
+    def write(self, data):
+        self._raise_failed()
+        data = memoryview(data).cast('B')
+        if self._local_file:
+            self._local_file.write(data)
+        self._md5.update(data)
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+    
+    def _submit(self, data):
+        """Stage a block in the background, waiting for a free slot first."""
+        block_id = _block_id(len(self.block_ids), data)
+        self.block_ids.append(block_id)
+        self._slots.acquire()
+        future = self._executor.submit(self.uploader._stage_block, self.blob_client, block_id, data)
+        future.add_done_callback(lambda _future: self._slots.release())
+        self._futures.append(future)
+    
+    def _raise_failed(self):
+        """Re-raise the error of the first failed block, if any."""
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+    
+    def commit(self):
+        """
+        Stage the remaining data and commit the block list.
+        
+        Raises:
+            ExportError: If any block failed to upload
+        """
+        from azure.storage.blob import BlobBlock, ContentSettings
+        
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+        self.blocks_staged = len(self._futures)
+        self._futures = []
+        
+        self.checksum = self._md5.hexdigest()
+        self.blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in self.block_ids],
+            content_settings=ContentSettings(
+                content_type='application/zip',
+                content_md5=bytearray(self._md5.digest())
+            )
+        )
+        if self._local_file:
+            self._local_file.close()
+        super().close()
+    
+    def abort(self):
+        """Stop uploading and discard the local copy; staged blocks expire unused."""
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._futures = []
+        if self._local_file:
+            self._local_file.close()
+            self.local_copy.unlink(missing_ok=True)
+        super().close()
 
 
-class AzureBackupUploader:
+class AzureBackupUploader(BackupStorage):
     """
     Upload backup ZIP to Azure Blob Storage.
     
     Uploads backups to a container in Azure Blob Storage and maintains
     a "latest.zip" file for easy access to the most recent backup.
+    Implements the BackupStorage interface (cms.export.storage).
     """
     
-    def __init__(self, container_name='backups'):
+    # Attempts per block before giving up on the upload
+    BLOCK_RETRIES = 3
+    
+    # Sub-requests per Blob Batch call (service limit)
+    DELETE_BATCH_SIZE = 256
+    
+    def __init__(self, container_name='backups', block_size=None, max_concurrency=None):
         """
         Initialize the uploader.
         
         Args:
             container_name: Name of Azure container to upload to
+            block_size: Size of each uploaded block in bytes
+                (default: AZURE_BACKUP_BLOCK_SIZE or 8 MiB)
+            max_concurrency: Number of blocks uploaded in parallel
+                (default: AZURE_BACKUP_MAX_CONCURRENCY or 4)
         """
-        self.container_name = container_name
+        if block_size is None:
+            block_size = getattr(settings, 'AZURE_BACKUP_BLOCK_SIZE', 8 * 1024 * 1024)
+        if max_concurrency is None:
+            max_concurrency = getattr(settings, 'AZURE_BACKUP_MAX_CONCURRENCY', 4)
+        
+        super().__init__(container_name)
+        self.block_size = max(1, int(block_size))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.blocks_uploaded = 0
+        self.blocks_skipped = 0
         self.blob_service = self._get_blob_service()
     
     def _get_blob_service(self):
         """
-        Create and return BlobServiceClient.
+        Get the process-wide pooled BlobServiceClient.
         
         Returns:
             BlobServiceClient instance
@@ -40,33 +197,16 @@ class AzureBackupUploader:
         Raises:
             ExportError: If Azure credentials not configured or library not available
         """
-        try:
-            from azure.storage.blob import BlobServiceClient
-        except ImportError:
-            raise ExportError(
-                'Azure storage not available. Install: pip install azure-storage-blob'
-            )
-        
-        # Check for required settings
-        if not hasattr(settings, 'AZURE_ACCOUNT_NAME'):
-            raise ExportError('AZURE_ACCOUNT_NAME not configured in settings')
-        if not hasattr(settings, 'AZURE_ACCOUNT_KEY'):
-            raise ExportError('AZURE_ACCOUNT_KEY not configured in settings')
-        
-        # Create connection string
-        connection_string = (
-            f"DefaultEndpointsProtocol=https;"
-            f"AccountName={settings.AZURE_ACCOUNT_NAME};"
-            f"AccountKey={settings.AZURE_ACCOUNT_KEY};"
-            f"EndpointSuffix=core.windows.net"
-        )
-        
-        return BlobServiceClient.from_connection_string(connection_string)
+        return get_blob_service()
     
     def upload(self, zip_path):
         """
         Upload ZIP to Azure.
         
+        The archive is uploaded in parallel blocks; blocks already staged
+        by a previous interrupted attempt are not sent again. "latest.zip"
+        is then created with a server-side copy of the uploaded blob.
+        
         Args:
             zip_path: Path to ZIP file to upload
             
@@ -94,59 +234,311 @@ class AzureBackupUploader:
             blob_name = zip_path.name
             blob_client = container_client.get_blob_client(blob_name)
             
-            with open(zip_path, 'rb') as data:
-                blob_client.upload_blob(data, overwrite=True)
+            checksum = self._upload_blocks(blob_client, zip_path)
             
-            # Also upload as "latest.zip" for easy access
-            latest_blob = container_client.get_blob_client('latest.zip')
-            with open(zip_path, 'rb') as data:
-                latest_blob.upload_blob(data, overwrite=True)
+            # Also publish full backups as "latest.zip" for easy access (copied server-side)
+            if backup_kind(blob_name) == 'full':
+                latest_blob = container_client.get_blob_client('latest.zip')
+                self._copy_blob(latest_blob, blob_name)
             
+            self._record(blob_name, zip_path.stat().st_size, checksum)
             return blob_client.url
         
+        except ExportError:
+            raise
         except Exception as e:
             raise ExportError(f'Failed to upload to Azure: {e}')
     
-    def list_backups(self):
+    def _plan_blocks(self, zip_path):
+        """
+        Split a file into blocks and compute their IDs.
+        
+        The block ID contains the block index and the MD5 of its content,
+        so a block staged by a previous attempt is only reused if the data
+        is identical.
+        
+        Args:
+            zip_path: Path to the file
+            
+        Returns:
+            tuple: (block_id, offset, length) tuples in file order, and the
+                MD5 digest of the whole file
+        """
+        blocks = []
+        offset = 0
+        index = 0
+        file_md5 = hashlib.md5()
+        with open(zip_path, 'rb') as f:
+            while True:
+                data = f.read(self.block_size)
+                if not data:
+                    break
+                file_md5.update(data)
+                block_id = _block_id(index, data)
+                blocks.append((block_id, offset, len(data)))
+                offset += len(data)
+                index += 1
+        return blocks, file_md5.digest()
+    
+    def _staged_block_ids(self, blob_client):
         """
-        List all backup files in the container.
+        Get the IDs of the uncommitted blocks already staged for a blob.
         
         Returns:
-            list: List of blob names
+            set: Block IDs (empty if the blob does not exist yet)
         """
         try:
-            container_client = self.blob_service.get_container_client(self.container_name)
-            blobs = container_client.list_blobs()
-            return [blob.name for blob in blobs if blob.name.startswith('offline-backup-')]
-        except Exception as e:
-            raise ExportError(f'Failed to list backups: {e}')
+            from azure.core.exceptions import ResourceNotFoundError
+        except ImportError:
+            raise ExportError('Azure storage not available')
+        
+        try:
+            _committed, uncommitted = blob_client.get_block_list('uncommitted')
+        except ResourceNotFoundError:
+            return set()
+        return {block.id for block in uncommitted}
+    
+    def _upload_blocks(self, blob_client, zip_path):
+        """
+        Stage the missing blocks of a file in parallel and commit them.
+        
+        Args:
+            blob_client: BlobClient of the destination blob
+            zip_path: Path to the file to upload
+            
+        Returns:
+            str: MD5 hex digest of the file (also stored as the blob Content-MD5)
+        """
+        from azure.storage.blob import BlobBlock, ContentSettings
+        
+        blocks, digest = self._plan_blocks(zip_path)
+        staged = self._staged_block_ids(blob_client)
+        pending = [block for block in blocks if block[0] not in staged]
+        
+        self.blocks_skipped = len(blocks) - len(pending)
+        self.blocks_uploaded = 0
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                futures = [
+                    executor.submit(self._stage_file_block, blob_client, zip_path, *block)
+                    for block in pending
+                ]
+                for future in futures:
+                    future.result()
+                    self.blocks_uploaded += 1
+        
+        blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id, _offset, _length in blocks],
+            content_settings=ContentSettings(content_type='application/zip', content_md5=bytearray(digest))
+        )
+        return digest.hex()
+    
+    def _stage_file_block(self, blob_client, zip_path, block_id, offset, length):
+        """Read one block from disk and stage it."""
+        with open(zip_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        self._stage_block(blob_client, block_id, data)
+    
+    def _stage_block(self, blob_client, block_id, data):
+        """
+        Stage one block, retrying transient errors.
+        
+        The block is sent with its MD5 so the service rejects corrupted data.
+        """
+        for attempt in range(1, self.BLOCK_RETRIES + 1):
+            try:
+                blob_client.stage_block(block_id, data, length=len(data), validate_content=True)
+                return
+            except Exception as e:
+                if attempt == self.BLOCK_RETRIES:
+                    raise ExportError(f'Failed to upload block {block_id}: {e}')
+                time.sleep(2 ** (attempt - 1))
     
-    def delete_old_backups(self, keep_count=10):
+    def upload_stream(self, blob_name, write_archive, local_copy=None):
         """
-        Delete old backups, keeping only the most recent ones.
+        Upload an archive while it is being produced, without a local ZIP.
+        
+        ``write_archive`` receives a writable binary file object (see
+        BlockBlobWriter) and writes the archive into it; each full block is
+        staged while the next one is produced. Writes block when
+        ``max_concurrency`` blocks are in flight, so memory stays bounded to
+        about ``(max_concurrency + 1) * block_size`` bytes. The blob is only
+        committed if ``write_archive`` returns without error.
         
         Args:
-            keep_count: Number of recent backups to keep
+            blob_name: Name of the blob to create
+            write_archive: Callable taking a writable file object
+            local_copy: Optional path where a copy of the archive is also written
+            
+        Returns:
+            str: URL of uploaded blob
+            
+        Raises:
+            ExportError: If upload fails
         """
         try:
             container_client = self.blob_service.get_container_client(self.container_name)
             
-            # Get all backup blobs sorted by last modified
-            blobs = []
-            for blob in container_client.list_blobs():
-                if blob.name.startswith('offline-backup-') and blob.name != 'latest.zip':
-                    blobs.append(blob)
+            # Create container if it doesn't exist
+            try:
+                container_client.create_container()
+            except Exception:
+                # Container probably already exists
+                pass
+            
+            blob_client = container_client.get_blob_client(blob_name)
+            writer = BlockBlobWriter(self, blob_client, local_copy=local_copy)
+            try:
+                write_archive(writer)
+                writer.commit()
+            except BaseException:
+                writer.abort()
+                raise
+            
+            self.blocks_uploaded = writer.blocks_staged
+            self.blocks_skipped = 0
             
-            # Sort by last modified (newest first)
-            blobs.sort(key=lambda b: b.last_modified, reverse=True)
+            # Also publish full backups as "latest.zip" for easy access (copied server-side)
+            if backup_kind(blob_name) == 'full':
+                latest_blob = container_client.get_blob_client('latest.zip')
+                self._copy_blob(latest_blob, blob_name)
             
-            # Delete old ones
-            for blob in blobs[keep_count:]:
-                blob_client = container_client.get_blob_client(blob.name)
-                blob_client.delete_blob()
+            self._record(blob_name, writer.tell(), writer.checksum, local_copy)
+            return blob_client.url
         
+        except ExportError:
+            raise
         except Exception as e:
-            raise ExportError(f'Failed to delete old backups: {e}')
+            raise ExportError(f'Failed to upload to Azure: {e}')
+    
+    def _copy_blob(self, target_client, source_blob_name, timeout=300):
+        """
+        Copy a blob of the container server-side and wait for completion.
+        
+        Args:
+            target_client: BlobClient of the destination blob
+            source_blob_name: Name of the source blob in this container
+            timeout: Maximum seconds to wait for the copy
+        """
+        copy = target_client.start_copy_from_url(self.generate_sas_url(source_blob_name))
+        status = copy.get('copy_status')
+        
+        # Copies inside the same account usually finish synchronously
+        deadline = time.monotonic() + timeout
+        while status == 'pending':
+            if time.monotonic() > deadline:
+                target_client.abort_copy(copy['copy_id'])
+                raise ExportError(f'Timed out copying {source_blob_name}')
+            time.sleep(1)
+            status = target_client.get_blob_properties().copy.status
+        
+        if status != 'success':
+            raise ExportError(f'Failed to copy {source_blob_name}: {status}')
+    
+    def list_backup_blobs(self):
+        """
+        List the backup blobs in the container (filtered server-side by prefix).
+        
+        Returns:
+            list: BlobProperties of each backup
+        """
+        try:
+            container_client = self.blob_service.get_container_client(self.container_name)
+            return list(container_client.list_blobs(name_starts_with=BACKUP_PREFIX))
+        except Exception as e:
+            raise ExportError(f'Failed to list backups: {e}')
+    
+    def list_backup_entries(self):
+        """
+        List the backups with their size, creation time and Content-MD5.
+        
+        Returns:
+            list: Entry dicts (see BackupStorage.list_backup_entries)
+        """
+        return [self._blob_entry(blob) for blob in self.list_backup_blobs()]
+    
+    async def alist_backup_entries(self):
+        """
+        List the backups with the async SDK, without blocking the event loop.
+        
+        Returns:
+            list: Entry dicts (see BackupStorage.list_backup_entries)
+        """
+        try:
+            container_client = get_async_blob_service().get_container_client(self.container_name)
+            return [
+                self._blob_entry(blob)
+                async for blob in container_client.list_blobs(name_starts_with=BACKUP_PREFIX)
+            ]
+        except ExportError:
+            raise
+        except Exception as e:
+            raise ExportError(f'Failed to list backups: {e}')
+    
+    @staticmethod
+    def _blob_entry(blob):
+        """Convert BlobProperties to a backup entry."""
+        content_md5 = blob.content_settings.content_md5 if blob.content_settings else None
+        return {
+            'name': blob.name,
+            'size': blob.size,
+            'created': blob.creation_time or blob.last_modified,
+            'checksum': bytes(content_md5).hex() if content_md5 else None,
+        }
+    
+    def delete_backup(self, blob_name):
+        """Delete one backup blob."""
+        container_client = self.blob_service.get_container_client(self.container_name)
+        container_client.get_blob_client(blob_name).delete_blob()
+    
+    def delete_backups(self, blob_names):
+        """
+        Delete backup blobs with Blob Batch requests.
+        
+        Up to DELETE_BATCH_SIZE deletions are sent per request. Blobs that
+        are already gone are not an error.
+        
+        Raises:
+            ExportError: If some deletions fail
+        """
+        container_client = self.blob_service.get_container_client(self.container_name)
+        blob_names = list(blob_names)
+        failed = []
+        for start in range(0, len(blob_names), self.DELETE_BATCH_SIZE):
+            batch = blob_names[start:start + self.DELETE_BATCH_SIZE]
+            responses = container_client.delete_blobs(*batch, raise_on_any_failure=False)
+            for blob_name, response in zip(batch, responses):
+                if response.status_code >= 300 and response.status_code != 404:
+                    failed.append(f'{blob_name} ({response.status_code})')
+        if failed:
+            raise ExportError(f'Failed to delete backups: {", ".join(failed)}')
+    
+    def open_backup(self, blob_name, read_size=None):
+        """
+        Open a backup blob as a seekable file backed by ranged downloads.
+        
+        Args:
+            blob_name: Name of the blob
+            read_size: Bytes fetched per request (default: BACKUP_VERIFY_READ_SIZE or 4 MiB)
+        
+        Returns:
+            io.BufferedReader over a RangedReader
+        """
+        if read_size is None:
+            read_size = getattr(settings, 'BACKUP_VERIFY_READ_SIZE', 4 * 1024 * 1024)
+        container_client = self.blob_service.get_container_client(self.container_name)
+        blob_client = container_client.get_blob_client(blob_name)
+        try:
+            size = blob_client.get_blob_properties().size
+        except Exception as e:
+            raise ExportError(f'Backup not found: {blob_name} ({e})')
+        
+        def read_range(offset, length):
+            return blob_client.download_blob(offset=offset, length=length).readall()
+        
+        return io.BufferedReader(RangedReader(size, read_range), buffer_size=read_size)
     
     def generate_sas_url(self, blob_name, expiry_hours=1):
         """
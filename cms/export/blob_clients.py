@@ -0,0 +1,274 @@
+"""
+Process-wide pool of Azure BlobServiceClient instances.
+
+Creating a BlobServiceClient per upload or per request means a new HTTP
+session, and therefore a new TCP + TLS handshake, for every call. This
+module keeps one client per storage account and process, backed by a
+requests session with a sized connection pool, so the backup views,
+the uploader and the exporter reuse warm connections.
+
+The registry is fork-safe: a child process (e.g. a gunicorn worker forked
+after the app was loaded) never reuses the parent's sockets and builds its
+own clients on first use.
+
+Async views (ASGI profile) use get_async_blob_service(), which keeps one
+azure.storage.blob.aio client per storage account and event loop.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+from cms.export import ExportError
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+_stats = {'clients_created': 0, 'hits': 0, 'recycles': 0, 'async_clients_created': 0}
+
+# Event loop -> {connection string: (async client, aiohttp session)}
+_async_registry = weakref.WeakKeyDictionary()
+
+
+class _PooledClient:
+    """A BlobServiceClient together with the session that backs it."""
+
+    def __init__(self, client, session):
+        self.client = client
+        self.session = session
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+
+
+def azure_connection_string():
+    """
+    Build the storage connection string from settings.
+
+    Returns:
+        str: Connection string for AZURE_ACCOUNT_NAME/AZURE_ACCOUNT_KEY
+
+    Raises:
+        ExportError: If Azure credentials are not configured
+    """
+    if not hasattr(settings, 'AZURE_ACCOUNT_NAME'):
+        raise ExportError('AZURE_ACCOUNT_NAME not configured in settings')
+    if not hasattr(settings, 'AZURE_ACCOUNT_KEY'):
+        raise ExportError('AZURE_ACCOUNT_KEY not configured in settings')
+
+    return (
+        f"DefaultEndpointsProtocol=https;"
+        f"AccountName={settings.AZURE_ACCOUNT_NAME};"
+        f"AccountKey={settings.AZURE_ACCOUNT_KEY};"
+        f"EndpointSuffix=core.windows.net"
+    )
+
+
+def get_blob_service(connection_string=None):
+    """
+    Get the shared BlobServiceClient for a storage account.
+
+    Connections idle for longer than AZURE_POOL_KEEPALIVE seconds are
+    dropped before the client is handed out, so callers never hit a
+    connection the Azure load balancer already closed.
+
+    Args:
+        connection_string: Storage connection string (default: built from settings)
+
+    Returns:
+        BlobServiceClient instance
+
+    Raises:
+        ExportError: If Azure credentials not configured or library not available
+    """
+    if connection_string is None:
+        connection_string = azure_connection_string()
+
+    keepalive = getattr(settings, 'AZURE_POOL_KEEPALIVE', 120)
+
+    with _registry_lock:
+        _check_pid()
+        entry = _registry.get(connection_string)
+        if entry is None:
+            entry = _create_client(connection_string)
+            _registry[connection_string] = entry
+            _stats['clients_created'] += 1
+        else:
+            _stats['hits'] += 1
+            if keepalive is not None and time.monotonic() - entry.last_used > keepalive:
+                entry.session.close()
+                _stats['recycles'] += 1
+        entry.last_used = time.monotonic()
+        return entry.client
+
+
+def _create_client(connection_string):
+    """Create a BlobServiceClient using a pooled requests session."""
+    try:
+        from azure.core.pipeline.transport import RequestsTransport
+        from azure.storage.blob import BlobServiceClient
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+    except ImportError:
+        raise ExportError(
+            'Azure storage not available. Install: pip install azure-storage-blob'
+        )
+
+    pool_maxsize = getattr(settings, 'AZURE_POOL_MAXSIZE', 16)
+
+    # Retries are handled by the Azure pipeline, not by urllib3
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False)
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    transport = RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=getattr(settings, 'AZURE_CONNECTION_TIMEOUT', 10),
+        read_timeout=getattr(settings, 'AZURE_READ_TIMEOUT', 60)
+    )
+    client = BlobServiceClient.from_connection_string(connection_string, transport=transport)
+    return _PooledClient(client, session)
+
+
+def get_async_blob_service(connection_string=None):
+    """
+    Get the shared async BlobServiceClient for a storage account.
+
+    aiohttp sessions belong to the event loop that created them, so clients
+    are kept per running loop (one per worker process under uvicorn). Must
+    be called from a coroutine.
+
+    Args:
+        connection_string: Storage connection string (default: built from settings)
+
+    Returns:
+        azure.storage.blob.aio.BlobServiceClient instance
+
+    Raises:
+        ExportError: If Azure credentials not configured or aiohttp not available
+    """
+    if connection_string is None:
+        connection_string = azure_connection_string()
+
+    loop = asyncio.get_running_loop()
+    clients = _async_registry.setdefault(loop, {})
+    if connection_string not in clients:
+        clients[connection_string] = _create_async_client(connection_string)
+        _stats['async_clients_created'] += 1
+    return clients[connection_string][0]
+
+
+def _create_async_client(connection_string):
+    """Create an async BlobServiceClient with a sized aiohttp connection pool."""
+    try:
+        import aiohttp
+        from azure.core.pipeline.transport import AioHttpTransport
+        from azure.storage.blob.aio import BlobServiceClient
+    except ImportError:
+        raise ExportError(
+            'Async Azure storage not available. Install: pip install azure-storage-blob aiohttp'
+        )
+
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=getattr(settings, 'AZURE_POOL_MAXSIZE', 16),
+            keepalive_timeout=getattr(settings, 'AZURE_POOL_KEEPALIVE', 120)
+        )
+    )
+    transport = AioHttpTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=getattr(settings, 'AZURE_CONNECTION_TIMEOUT', 10),
+        read_timeout=getattr(settings, 'AZURE_READ_TIMEOUT', 60)
+    )
+    client = BlobServiceClient.from_connection_string(connection_string, transport=transport)
+    return client, session
+
+
+async def close_async_blob_services():
+    """Close the async clients of the running event loop (e.g. on ASGI shutdown)."""
+    clients = _async_registry.pop(asyncio.get_running_loop(), {})
+    for client, session in clients.values():
+        await client.close()
+        await session.close()
+
+
+def _check_pid():
+    """Forget clients inherited from a parent process (caller holds the lock)."""
+    global _registry_pid
+    if _registry_pid != os.getpid():
+        _registry.clear()
+        _registry_pid = os.getpid()
+
+
+def _reset_after_fork():
+    """Start the child with an empty registry and a fresh lock."""
+    global _registry_lock, _registry_pid
+    _registry_lock = threading.Lock()
+    _registry.clear()
+    _async_registry.clear()
+    _registry_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def close_blob_services():
+    """Close every pooled client of this process (e.g. on shutdown or in tests)."""
+    with _registry_lock:
+        for entry in _registry.values():
+            entry.session.close()
+        _registry.clear()
+
+
+def pool_stats():
+    """
+    Get connection pool metrics for this process.
+
+    Returns:
+        dict: Registry counters and, per pooled account, the number of
+            connections opened, requests sent and idle connections
+    """
+    with _registry_lock:
+        _check_pid()
+        clients = []
+        for entry in _registry.values():
+            pools = []
+            for adapter in set(entry.session.adapters.values()):
+                for key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is None:
+                        continue
+                    pools.append({
+                        'host': pool.host,
+                        'connections_opened': pool.num_connections,
+                        'requests': pool.num_requests,
+                        'idle_connections': pool.pool.qsize() if pool.pool else 0,
+                    })
+            clients.append({
+                'account': entry.client.account_name,
+                'created_at': entry.created_at,
+                'idle_seconds': time.monotonic() - entry.last_used,
+                'pools': pools,
+            })
+
+        return {
+            'pid': _registry_pid,
+            'clients_created': _stats['clients_created'],
+            'hits': _stats['hits'],
+            'recycles': _stats['recycles'],
+            'async_clients_created': _stats['async_clients_created'],
+            'clients': clients,
+        }
@@ -0,0 +1,396 @@
+"""
+In-memory catalog of backup archives.
+
+This module contains the BackupCatalog class that keeps the list of
+backups (local directory and backup storage, Azure by default) in
+memory, so the backup views do not stat every file or list the
+container on each request.
+
+The catalog is refreshed when its TTL expires (BACKUP_CATALOG_TTL) or when
+the local backup directory changes, and it is updated in place by the
+exporter and the uploader when they create or delete a backup.
+"""
+
+import hashlib
+import io
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+BACKUP_PREFIX = 'offline-backup-'
+DELTA_SUFFIX = '-delta.zip'
+BACKUP_NAME_RE = re.compile(r'^offline-backup-(?P<site>.+)-\d{8}-\d{4}(?P<delta>-delta)?\.zip$')
+
+
+def backup_site(name):
+    """
+    Get the site hostname encoded in a backup file name.
+
+    Example:
+        offline-backup-madmusic.iccmu.es-20250101-0300.zip -> madmusic.iccmu.es
+
+    Returns:
+        str or None: Hostname, or None if the name has another format
+    """
+    match = BACKUP_NAME_RE.match(name)
+    return match.group('site') if match else None
+
+
+def backup_kind(name):
+    """
+    Get whether a backup is a full archive or a delta (see cms.export.delta).
+
+    Example:
+        offline-backup-madmusic.iccmu.es-20250102-0300-delta.zip -> delta
+
+    Returns:
+        str: "delta" or "full"
+    """
+    return 'delta' if name.endswith(DELTA_SUFFIX) else 'full'
+
+
+def file_md5(path, chunk_size=1024 * 1024):
+    """Compute the MD5 hex digest of a file."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashingWriter(io.RawIOBase):
+    """
+    Write-through file object that computes the MD5 and size of the data.
+
+    It is not seekable, so a ZipFile written through it streams the archive
+    and the digest matches file_md5() of the result without reading it back.
+    """
+
+    def __init__(self, *targets):
+        super().__init__()
+        self.targets = targets
+        self.md5 = hashlib.md5()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.size
+
+    def write(self, data):
+        for target in self.targets:
+            target.write(data)
+        self.md5.update(data)
+        self.size += len(data)
+        return len(data)
+
+
+def write_checksum_file(path, checksum):
+    """
+    Store the checksum of a backup next to it (md5sum format).
+
+    The catalog reads these files instead of hashing large archives.
+    """
+    path = Path(path)
+    path.with_name(path.name + '.md5').write_text(f'{checksum}  {path.name}\n')
+
+
+def read_checksum_file(path):
+    """Read the checksum stored next to a backup, or None."""
+    path = Path(path)
+    try:
+        return path.with_name(path.name + '.md5').read_text().split()[0]
+    except (OSError, IndexError):
+        return None
+
+
+class BackupCatalog:
+    """
+    Cached list of local and Azure backups.
+
+    Each entry is a dict with ``name``, ``site``, ``kind`` ("full" or
+    "delta"), ``location`` ("local" for BACKUP_DIR, "azure" for the backup
+    storage backend), ``size`` (bytes),
+    ``created`` (datetime), ``checksum`` (MD5 hex digest, or None if
+    unknown) and, for local backups, ``path``.
+    """
+
+    LOCATIONS = ('local', 'azure')
+
+    def __init__(self, backup_dir=None, ttl=None, clock=time.monotonic):
+        """
+        Initialize the catalog.
+
+        Args:
+            backup_dir: Local backup directory (default: BACKUP_DIR or BASE_DIR/backups)
+            ttl: Seconds a listing is reused before refreshing (default: BACKUP_CATALOG_TTL or 60)
+            clock: Monotonic clock function
+        """
+        if backup_dir is None:
+            backup_dir = getattr(settings, 'BACKUP_DIR', Path(settings.BASE_DIR) / 'backups')
+        if ttl is None:
+            ttl = getattr(settings, 'BACKUP_CATALOG_TTL', 60)
+
+        self.backup_dir = Path(backup_dir)
+        self.ttl = ttl
+        self.clock = clock
+        self.azure_error = None
+        self._entries = {location: {} for location in self.LOCATIONS}
+        self._loaded_at = {location: None for location in self.LOCATIONS}
+        self._local_mtime = None
+        self._lock = threading.Lock()
+
+    def list(self, site=None, location=None, page=1, per_page=50):
+        """
+        List backups, newest first.
+
+        Args:
+            site: Only backups of this hostname
+            location: Only "local" or "azure" backups
+            page: 1-based page number
+            per_page: Entries per page, or None for every match in one page
+
+        Returns:
+            dict: ``count`` (total matches), ``page``, ``per_page``, ``pages``
+                and ``results`` (list of entries)
+        """
+        entries = self.entries(location)
+        if site:
+            entries = [entry for entry in entries if entry['site'] == site]
+
+        if per_page is None:
+            return {'count': len(entries), 'page': 1, 'per_page': None, 'pages': 1, 'results': entries}
+
+        per_page = max(1, int(per_page))
+        pages = max(1, -(-len(entries) // per_page))
+        page = min(max(1, int(page)), pages)
+        start = (page - 1) * per_page
+        return {
+            'count': len(entries),
+            'page': page,
+            'per_page': per_page,
+            'pages': pages,
+            'results': entries[start:start + per_page],
+        }
+
+    async def alist(self, site=None, location=None, page=1, per_page=50):
+        """
+        Async version of list() for async views.
+
+        A stale storage listing is refreshed with the backend's async API
+        (see BackupStorage.alist_backup_entries) instead of blocking the
+        event loop; the rest runs in a worker thread.
+        """
+        if location in (None, 'azure'):
+            await self._arefresh_azure()
+        return await sync_to_async(self.list, thread_sensitive=False)(site, location, page, per_page)
+
+    async def _arefresh_azure(self):
+        """Reload the storage listing asynchronously if its TTL expired."""
+        from cms.export.storage import backup_storage_configured, get_backup_storage
+
+        with self._lock:
+            loaded_at = self._loaded_at['azure']
+            if loaded_at is not None and self.clock() - loaded_at <= self.ttl:
+                return
+
+        backups = None
+        if backup_storage_configured():
+            try:
+                backups = await get_backup_storage().alist_backup_entries()
+            except Exception as e:
+                with self._lock:
+                    self.azure_error = str(e)
+                    self._loaded_at['azure'] = self.clock()
+                return
+
+        with self._lock:
+            self._store_azure(backups or [])
+            self._loaded_at['azure'] = self.clock()
+
+    def entries(self, location=None):
+        """
+        Get all backups, newest first.
+
+        Args:
+            location: Only "local" or "azure" backups (default: both)
+
+        Returns:
+            list: Entry dicts
+        """
+        locations = [location] if location else self.LOCATIONS
+        with self._lock:
+            entries = []
+            for name in locations:
+                self._refresh_if_stale(name)
+                entries.extend(self._entries[name].values())
+        return sorted(entries, key=lambda entry: (entry['created'], entry['name']), reverse=True)
+
+    def latest(self, location='local', site=None, kind=None):
+        """
+        Get the most recent backup.
+
+        Args:
+            location: "local" or "azure"
+            site: Only backups of this hostname
+            kind: Only "full" or "delta" backups
+
+        Returns:
+            dict or None: Entry, or None if there are no backups
+        """
+        for entry in self.entries(location):
+            if (site is None or entry['site'] == site) and (kind is None or entry['kind'] == kind):
+                return entry
+        return None
+
+    def record_local(self, path, checksum=None):
+        """
+        Add or update a local backup.
+
+        The checksum is stored next to the archive so later listings (in
+        this or other processes) do not need to hash it.
+
+        Args:
+            path: Path to the backup ZIP
+            checksum: MD5 hex digest (computed if not given)
+        """
+        path = Path(path)
+        if checksum is None:
+            checksum = file_md5(path)
+        write_checksum_file(path, checksum)
+
+        if path.parent.resolve() != self.backup_dir.resolve():
+            return
+        with self._lock:
+            self._entries['local'][path.name] = self._local_entry(path, checksum)
+
+    def record_azure(self, name, size, checksum=None, created=None):
+        """Add or update an Azure backup."""
+        with self._lock:
+            self._entries['azure'][name] = {
+                'name': name,
+                'site': backup_site(name),
+                'kind': backup_kind(name),
+                'location': 'azure',
+                'size': size,
+                'created': created or datetime.now(timezone.utc),
+                'checksum': checksum,
+            }
+
+    def remove(self, name, location):
+        """Remove a backup from the catalog."""
+        with self._lock:
+            self._entries[location].pop(name, None)
+
+    def invalidate(self, location=None):
+        """Force a refresh on the next read."""
+        with self._lock:
+            for name in ([location] if location else self.LOCATIONS):
+                self._loaded_at[name] = None
+
+    def _refresh_if_stale(self, location):
+        """Reload a location if its TTL expired (caller holds the lock)."""
+        loaded_at = self._loaded_at[location]
+        stale = loaded_at is None or self.clock() - loaded_at > self.ttl
+
+        # A new or deleted file changes the directory mtime: cheap to check
+        if location == 'local' and not stale:
+            stale = self._local_dir_mtime() != self._local_mtime
+
+        if stale:
+            if location == 'local':
+                self._load_local()
+            else:
+                self._load_azure()
+            self._loaded_at[location] = self.clock()
+
+    def _local_dir_mtime(self):
+        try:
+            return self.backup_dir.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_local(self):
+        """Scan the local backup directory."""
+        self._local_mtime = self._local_dir_mtime()
+        entries = {}
+        if self.backup_dir.is_dir():
+            for path in self.backup_dir.glob(f'{BACKUP_PREFIX}*.zip'):
+                try:
+                    entries[path.name] = self._local_entry(path, read_checksum_file(path))
+                except OSError:
+                    # Deleted while scanning
+                    continue
+        self._entries['local'] = entries
+
+    def _local_entry(self, path, checksum):
+        stat = path.stat()
+        return {
+            'name': path.name,
+            'site': backup_site(path.name),
+            'kind': backup_kind(path.name),
+            'location': 'local',
+            'size': stat.st_size,
+            'created': datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            'checksum': checksum,
+            'path': path,
+        }
+
+    def _load_azure(self):
+        """List the backups in the backup storage (Azure unless BACKUP_STORAGE_BACKEND says otherwise)."""
+        from cms.export.storage import backup_storage_configured, get_backup_storage
+
+        if not backup_storage_configured():
+            self._entries['azure'] = {}
+            return
+
+        try:
+            backups = get_backup_storage().list_backup_entries()
+        except Exception as e:
+            # Keep serving the previous listing
+            self.azure_error = str(e)
+            return
+
+        self._store_azure(backups)
+
+    def _store_azure(self, backups):
+        """Replace the storage listing (caller holds the lock)."""
+        self.azure_error = None
+        entries = {}
+        for backup in backups:
+            entries[backup['name']] = dict(
+                backup, site=backup_site(backup['name']), kind=backup_kind(backup['name']), location='azure'
+            )
+        self._entries['azure'] = entries
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_backup_catalog():
+    """
+    Get the process-wide backup catalog.
+
+    Returns:
+        BackupCatalog instance
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = BackupCatalog()
+        return _catalog
+
+
+def reset_backup_catalog():
+    """Drop the process-wide catalog (e.g. after changing settings in tests)."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
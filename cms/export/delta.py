@@ -0,0 +1,281 @@
+"""
+Incremental (delta) backups.
+
+Every backup archive embeds a manifest (backup-manifest.json) listing the
+SHA-256 and size of each exported file. A delta backup compares the new
+export against the manifest of the previous backup of the same site and
+only contains the files that were added or changed, plus the list of
+files that were deleted.
+
+Backups form linear chains per site: a full backup followed by the deltas
+built on top of it, each delta based on the backup right before it. A full
+backup is produced again every ``full_every`` backups so chains stay short.
+restore_backup_chain() replays a chain into a directory, and
+backup_dependencies() tells retention which older backups a delta needs.
+"""
+
+import hashlib
+import json
+import shutil
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+from cms.export import ExportError
+from cms.export.catalog import DELTA_SUFFIX, backup_kind, backup_site
+
+
+MANIFEST_NAME = 'backup-manifest.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Compute the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_files(directory):
+    """
+    Fingerprint every file of an export directory.
+
+    Returns:
+        dict: Relative POSIX path -> {"size": bytes, "sha256": hex digest}
+    """
+    directory = Path(directory)
+    files = {}
+    for path in sorted(directory.rglob('*')):
+        if path.is_file():
+            files[path.relative_to(directory).as_posix()] = {
+                'size': path.stat().st_size,
+                'sha256': file_sha256(path),
+            }
+    return files
+
+
+def read_manifest(zip_path):
+    """
+    Read the manifest embedded in a backup archive.
+
+    Returns:
+        dict or None: Manifest, or None for archives created before manifests
+    """
+    try:
+        with zipfile.ZipFile(zip_path) as zipf:
+            return json.loads(zipf.read(MANIFEST_NAME))
+    except KeyError:
+        return None
+    except (OSError, zipfile.BadZipFile, ValueError) as e:
+        raise ExportError(f'Cannot read backup manifest of {zip_path}: {e}')
+
+
+def previous_backup(backup_dir, site):
+    """
+    Find the newest local backup of a site that has a manifest.
+
+    Args:
+        backup_dir: Directory holding the archives
+        site: Site hostname
+
+    Returns:
+        tuple: (path, manifest), or (None, None) if there is none
+    """
+    backup_dir = Path(backup_dir)
+    candidates = [
+        path for path in backup_dir.glob(f'offline-backup-{site}-*.zip')
+        if backup_site(path.name) == site
+    ]
+    for path in sorted(candidates, key=lambda p: (p.stat().st_mtime, p.name), reverse=True):
+        manifest = read_manifest(path)
+        if manifest is not None:
+            return path, manifest
+    return None, None
+
+
+def plan_backup(name, site, files, previous=None, full_every=None):
+    """
+    Decide what goes into the next backup of a site.
+
+    A full backup is planned when there is no previous manifest or the
+    current chain already has ``full_every`` backups. Delta archives are
+    named like full ones with a "-delta" suffix, so their kind is visible
+    in any storage listing.
+
+    Args:
+        name: File name of the new archive as a full backup
+        site: Site hostname
+        files: Output of scan_files() for the new export
+        previous: Manifest of the previous backup, or None
+        full_every: Backups per chain, including the full one
+            (default: BACKUP_FULL_EVERY or 7)
+
+    Returns:
+        tuple: (manifest, paths) where paths are the files to archive
+    """
+    if full_every is None:
+        full_every = getattr(settings, 'BACKUP_FULL_EVERY', 7)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'site': site,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'files': files,
+    }
+
+    if previous is None or previous.get('sequence', 0) + 1 >= max(1, full_every):
+        manifest.update(name=name, kind='full', base=None, full=name, sequence=0, deleted=[])
+        return manifest, sorted(files)
+
+    name = name[:-len('.zip')] + DELTA_SUFFIX
+    previous_files = previous['files']
+    changed = [path for path, info in files.items() if previous_files.get(path) != info]
+    deleted = [path for path in previous_files if path not in files]
+    manifest.update(
+        name=name,
+        kind='delta',
+        base=previous['name'],
+        full=previous['full'],
+        sequence=previous.get('sequence', 0) + 1,
+        deleted=sorted(deleted),
+    )
+    return manifest, sorted(changed)
+
+
+def write_backup_archive(zip_path, directory, manifest, paths):
+    """
+    Write a backup archive with the given files and its manifest.
+
+    Args:
+        zip_path: Archive to create, or a writable file object
+        directory: Export directory the paths are relative to
+        manifest: Manifest from plan_backup()
+        paths: Relative paths to include
+    """
+    directory = Path(directory)
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for path in paths:
+            zipf.write(directory / path, path)
+        zipf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True))
+
+
+def backup_chain(zip_path):
+    """
+    Resolve the archives needed to restore a backup, oldest first.
+
+    The bases of a delta are looked up in the same directory.
+
+    Returns:
+        list: Paths, starting with the full backup and ending with zip_path
+
+    Raises:
+        ExportError: If an archive of the chain is missing or has no manifest
+    """
+    zip_path = Path(zip_path)
+    chain = []
+    path = zip_path
+    while True:
+        if not path.exists():
+            raise ExportError(f'Backup chain of {zip_path.name} is broken: {path.name} not found')
+        manifest = read_manifest(path)
+        if manifest is None:
+            if path == zip_path:
+                # Archive from before manifests: always a full backup
+                return [path]
+            raise ExportError(f'Backup chain of {zip_path.name} is broken: {path.name} has no manifest')
+        if path in chain:
+            raise ExportError(f'Backup chain of {zip_path.name} loops at {path.name}')
+        chain.append(path)
+        if manifest['kind'] == 'full':
+            break
+        path = zip_path.with_name(manifest['base'])
+    chain.reverse()
+    return chain
+
+
+def restore_backup_chain(zip_path, target_dir, verify=True):
+    """
+    Rebuild an export directory from a backup and the chain it depends on.
+
+    The full backup is extracted first; each delta then removes its deleted
+    files and overwrites the changed ones.
+
+    Args:
+        zip_path: Backup to restore (full or delta)
+        target_dir: Directory to restore into (created if needed)
+        verify: Check every file against the final manifest
+
+    Returns:
+        list: Archives replayed, oldest first
+
+    Raises:
+        ExportError: If the chain is broken or verification fails
+    """
+    target_dir = Path(target_dir).resolve()
+    target_dir.mkdir(parents=True, exist_ok=True)
+    chain = backup_chain(zip_path)
+
+    manifest = None
+    for path in chain:
+        with zipfile.ZipFile(path) as zipf:
+            manifest = json.loads(zipf.read(MANIFEST_NAME)) if MANIFEST_NAME in zipf.NameToInfo else None
+            for deleted in (manifest or {}).get('deleted', []):
+                _safe_target(target_dir, deleted).unlink(missing_ok=True)
+            for info in zipf.infolist():
+                if info.is_dir() or info.filename == MANIFEST_NAME:
+                    continue
+                target = _safe_target(target_dir, info.filename)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with zipf.open(info) as source, open(target, 'wb') as out:
+                    shutil.copyfileobj(source, out, 1024 * 1024)
+
+    if verify and manifest is not None:
+        for relative, info in manifest['files'].items():
+            path = target_dir / relative
+            if not path.is_file() or file_sha256(path) != info['sha256']:
+                raise ExportError(f'Restored file does not match manifest: {relative}')
+    return chain
+
+
+def _safe_target(target_dir, relative):
+    """Resolve an archive member inside target_dir, refusing path traversal."""
+    target = (target_dir / relative).resolve()
+    if target_dir not in target.parents:
+        raise ExportError(f'Unsafe path in backup: {relative}')
+    return target
+
+
+def backup_dependencies(entries, names):
+    """
+    Find the backups that some backups need in order to be restored.
+
+    Chains are linear per site, so a delta depends on every backup of its
+    site between the preceding full backup and itself. Only names are used
+    (see catalog.backup_kind), so this works on any storage listing.
+
+    Args:
+        entries: Dicts with ``name`` and ``created`` (e.g. list_backup_entries())
+        names: Names of the backups that are kept
+
+    Returns:
+        set: Names of the backups ``names`` depend on (not including ``names``)
+    """
+    by_site = {}
+    for entry in entries:
+        by_site.setdefault(backup_site(entry['name']), []).append(entry)
+
+    needed = set()
+    for site_entries in by_site.values():
+        site_entries.sort(key=lambda entry: (entry['created'], entry['name']))
+        for index, entry in enumerate(site_entries):
+            if entry['name'] not in names or backup_kind(entry['name']) != 'delta':
+                continue
+            for base in reversed(site_entries[:index]):
+                needed.add(base['name'])
+                if backup_kind(base['name']) == 'full':
+                    break
+    return needed - set(names)
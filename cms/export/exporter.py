@@ -5,17 +5,38 @@ This module contains the main StaticSiteExporter class that orchestrates
 the export of a Wagtail site to standalone HTML.
 """
 
+import io
+import os
+import re
 import shutil
+import threading
 import zipfile
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 from django.conf import settings
+from django.db import connection
 from django.test import Client
-from wagtail.models import Site
+from wagtail.models import Page, Site
 
 from cms.export import ExportError
+from cms.export.blob_clients import get_blob_service
+from cms.export.catalog import HashingWriter, get_backup_catalog
+from cms.export.delta import plan_backup, previous_backup, scan_files, write_backup_archive
 from cms.export.html_rewriter import HTMLRewriter
+from cms.export.spill import SpillableSet
+
+
+# Sent with every render so StaticMirrorMiddleware never answers the
+# exporter with an already mirrored (possibly stale) file
+EXPORT_REQUEST_HEADER = 'X-Static-Export'
+EXPORT_REQUEST_META = 'HTTP_X_STATIC_EXPORT'
+
+
+def export_client():
+    """Test client used to render pages, marked so it bypasses the static mirror."""
+    return Client(**{EXPORT_REQUEST_META: '1'})
 
 
 class StaticSiteExporter:
@@ -30,7 +51,9 @@ class StaticSiteExporter:
     5. Optionally creates a ZIP archive
     """
     
-    def __init__(self, site_id_or_hostname, output_dir, exclude_media=False, verbose=False):
+    def __init__(self, site_id_or_hostname, output_dir, exclude_media=False, verbose=False,
+                 throttle=None, root_page=None, page_selectors=None, merge=False,
+                 low_memory=False, chunk_size=200, spill_threshold=10000, live_urls=False):
         """
         Initialize the exporter.
         
@@ -39,15 +62,47 @@ class StaticSiteExporter:
             output_dir: Path to output directory
             exclude_media: If True, skip copying media files
             verbose: If True, print detailed progress information
+            throttle: Optional ExportThrottle limiting render rate and concurrency
+            root_page: Page ID or site-relative URL path; export only this subtree
+            page_selectors: List of page IDs or site-relative URL paths to export
+            merge: If True, update an existing export in place instead of
+                replacing its static directory (implied by root_page/page_selectors)
+            low_memory: If True, keep memory bounded regardless of site size:
+                pages are streamed from the database in chunks, media references
+                spill to a temporary SQLite file and HTML is written straight to disk
+            chunk_size: Pages fetched per database round trip in low_memory mode
+            spill_threshold: Media references kept in memory before spilling to
+                disk in low_memory mode
+            live_urls: If True, keep absolute URLs so the output can be served
+                at the live URLs (static mirror) instead of browsed offline
         """
         self.site = self._resolve_site(site_id_or_hostname)
         self.output_dir = Path(output_dir)
         self.exclude_media = exclude_media
         self.verbose = verbose
-        self.client = Client()
-        self.collected_media = set()
+        self.throttle = throttle
+        self.root_page = self._resolve_page(root_page) if root_page else None
+        self.selected_pages = [self._resolve_page(selector) for selector in page_selectors or []]
+        self.is_selective = bool(self.root_page or self.selected_pages)
+        self.merge = merge or self.is_selective
+        self.low_memory = low_memory
+        self.chunk_size = chunk_size
+        self.live_urls = live_urls
+        self.client = export_client()
+        if low_memory:
+            self.collected_media = SpillableSet(threshold=spill_threshold)
+            self.collected_links = SpillableSet(threshold=spill_threshold)
+        else:
+            self.collected_media = set()
+            self.collected_links = set()
+        self.collected_static = set()
+        self.exported_page_ids = set()
         self.pages_exported = 0
         self.pages_failed = 0
+        self.backup_manifest = None
+        self._lock = threading.Lock()
+        self._archive = None
+        self._archive_lock = threading.Lock()
     
     def _resolve_site(self, site_id_or_hostname):
         """
@@ -76,12 +131,104 @@ class StaticSiteExporter:
                     f'Available sites: {", ".join(Site.objects.values_list("hostname", flat=True))}'
                 )
     
+    def _resolve_page(self, selector):
+        """
+        Resolve a live page of this site from an ID or a URL path.
+        
+        URL paths are relative to the site root, e.g. "noticias" or
+        "/servicios-e-infraestructura/".
+        
+        Args:
+            selector: Page ID (int/str) or site-relative URL path (str)
+            
+        Returns:
+            Page instance
+            
+        Raises:
+            ExportError: If the page is not found in this site
+        """
+        site_pages = Page.objects.live().descendant_of(self.site.root_page, inclusive=True)
+        try:
+            return site_pages.get(id=int(selector))
+        except (ValueError, Page.DoesNotExist):
+            page = self._find_page_by_path(str(selector), site_pages)
+            if page is None:
+                raise ExportError(f'Page not found in site {self.site.hostname}: {selector}')
+            return page
+    
+    def _find_page_by_path(self, path, queryset=None):
+        """
+        Find a live page by its URL path relative to the site root.
+        
+        Args:
+            path: Site-relative URL path (e.g. "/noticias/evento/")
+            queryset: Optional Page queryset to search in
+            
+        Returns:
+            Page instance or None
+        """
+        if queryset is None:
+            queryset = Page.objects.live()
+        path = path.strip('/')
+        url_path = self.site.root_page.url_path + (f'{path}/' if path else '')
+        return queryset.filter(url_path=url_path).first()
+    
     def export(self):
         """
         Main export orchestration method.
         
-        Exports all live pages and assets from the site.
+        Exports all live pages and assets from the site. In selective mode
+        (root_page/page_selectors) only the selected pages are exported,
+        plus the pages they link to that are missing from the output
+        directory, and the static and media files they reference.
+        
+        In low_memory mode the temporary media/link sets are released when
+        the export finishes.
+        """
+        try:
+            self._export()
+        finally:
+            if self.low_memory:
+                self.collected_media.close()
+                self.collected_links.close()
+    
+    def export_to_archive(self, fileobj):
+        """
+        Export the site straight into a ZIP archive.
+        
+        Pages, static and media files are written into the archive as they
+        are produced instead of into output_dir, so nothing is stored on
+        disk. ``fileobj`` may be non-seekable (e.g. a BlockBlobWriter
+        streaming to Azure).
+        
+        Args:
+            fileobj: Writable binary file object
+            
+        Raises:
+            ExportError: In selective mode, which needs an existing export
+        """
+        if self.is_selective:
+            raise ExportError('Selective exports update an existing directory and cannot be archived')
+        
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+            self._archive = archive
+            try:
+                self.export()
+            finally:
+                self._archive = None
+    
+    def archive_filename(self):
+        """
+        Get the file name for a backup archive of this site.
+        
+        Returns:
+            str: e.g. "offline-backup-madmusic.iccmu.es-20250101-0300.zip"
         """
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M')
+        return f'offline-backup-{self.site.hostname}-{timestamp}.zip'
+    
+    def _export(self):
+        """Run the export steps (see export())."""
         if self.verbose:
             print(f'Exporting site: {self.site.hostname} (ID: {self.site.id})')
             print(f'Root page: {self.site.root_page}')
@@ -94,15 +241,20 @@ class StaticSiteExporter:
         if self.verbose:
             print(f'Found {pages.count()} pages to export')
         
+        # Stream pages instead of caching every instance in the queryset
+        if self.low_memory:
+            pages = pages.iterator(chunk_size=self.chunk_size)
+        
         # Export each page
-        for page in pages:
-            try:
-                self._export_page(page)
-                self.pages_exported += 1
-            except Exception as e:
-                self.pages_failed += 1
-                if self.verbose:
-                    print(f'ERROR exporting {page.url}: {e}')
+        if self.throttle and self.throttle.max_concurrency > 1:
+            self._export_pages_concurrently(pages)
+        else:
+            for page in pages:
+                self._export_page_safely(page, self.client)
+        
+        # Add linked pages missing from the existing export
+        if self.is_selective:
+            self._export_dependency_closure()
         
         if self.verbose:
             print(f'Exported {self.pages_exported} pages ({self.pages_failed} failed)')
@@ -124,6 +276,8 @@ class StaticSiteExporter:
     
     def _setup_output_directory(self):
         """Create output directory if it doesn't exist."""
+        if self._archive is not None:
+            return
         self.output_dir.mkdir(parents=True, exist_ok=True)
         if self.verbose:
             print(f'Output directory: {self.output_dir}')
@@ -132,48 +286,125 @@ class StaticSiteExporter:
         """
         Get all live pages for this site.
         
+        In selective mode, only the root_page subtree and the explicitly
+        selected pages are returned.
+        
         Returns:
             QuerySet of Page instances
         """
         root_page = self.site.root_page
-        pages = (
-            root_page.get_descendants(inclusive=True)
-            .live()
-            .specific()
-            .order_by('path')
-        )
-        return pages
+        pages = root_page.get_descendants(inclusive=True).live()
+        
+        if self.is_selective:
+            selection = Page.objects.filter(id__in=[page.id for page in self.selected_pages])
+            if self.root_page:
+                selection = selection | Page.objects.descendant_of(self.root_page, inclusive=True)
+            pages = pages & selection
+        
+        return pages.specific().order_by('path')
+    
+    def _export_dependency_closure(self):
+        """
+        Export the pages linked from the selection that are not yet exported.
+        
+        A linked page is considered exported if it was rendered in this run
+        or its file already exists in the output directory. Links of these
+        extra pages are not followed further.
+        """
+        missing = []
+        for link in sorted(self.collected_links):
+            page = self._find_page_by_path(link)
+            if page is None or page.id in self.exported_page_ids:
+                continue
+            page = page.specific
+            if self._page_to_filepath(page, create_dirs=False).exists():
+                continue
+            missing.append(page)
+        
+        if self.verbose:
+            print(f'Dependency closure: {len(missing)} linked page(s) missing from export')
+        
+        for page in missing:
+            self._export_page_safely(page, self.client)
+    
+    def _export_page_safely(self, page, client):
+        """
+        Export a single page, recording success or failure.
+        
+        Waits on the throttle (if any) before rendering.
+        
+        Args:
+            page: Wagtail Page instance
+            client: Django test Client used to render the page
+        """
+        if self.throttle:
+            self.throttle.wait()
+        
+        try:
+            self._export_page(page, client)
+            with self._lock:
+                self.pages_exported += 1
+        except Exception as e:
+            with self._lock:
+                self.pages_failed += 1
+            if self.verbose:
+                print(f'ERROR exporting {page.url}: {e}')
     
-    def _export_page(self, page):
+    def _export_pages_concurrently(self, pages):
+        """
+        Export pages from a fixed number of render threads.
+        
+        The number of threads is the throttle's concurrency cap. Each thread
+        uses its own test client and database connection, and closes the
+        connection when it finishes.
+        
+        Args:
+            pages: Iterable of Wagtail Page instances
+        """
+        page_iter = iter(pages)
+        iter_lock = threading.Lock()
+        
+        def worker():
+            client = export_client()
+            try:
+                while True:
+                    with iter_lock:
+                        page = next(page_iter, None)
+                    if page is None:
+                        return
+                    self._export_page_safely(page, client)
+            finally:
+                connection.close()
+        
+        threads = [
+            threading.Thread(target=worker, name=f'export-render-{i}')
+            for i in range(self.throttle.max_concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    def _export_page(self, page, client=None):
         """
         Export a single page.
         
         Args:
             page: Wagtail Page instance
+            client: Django test Client (default: the exporter's client)
         """
         if self.verbose:
             print(f'Exporting: {page.url} ({page.title})')
         
         # Calculate output path
-        output_path = self._page_to_filepath(page)
+        output_path = self._page_to_filepath(page, create_dirs=self._archive is None)
         
-        # Render HTML
-        html = self._render_page(page)
+        # Render HTML (undecoded bytes in low_memory mode)
+        html = self._render_page(page, client, raw=self.low_memory)
         
         # Calculate page URL relative to site root for rewriter
         # This is needed for correct depth calculation in multi-site setups
-        page_url = page.url
-        site_root_url = self.site.root_page.url
-        
-        # Remove site root prefix if present
-        if site_root_url != '/' and page_url.startswith(site_root_url):
-            page_url_relative = '/' + page_url[len(site_root_url):].lstrip('/')
-        else:
-            page_url_relative = page_url
-        
-        # For root page, use just '/'
-        if page.id == self.site.root_page.id:
-            page_url_relative = '/'
+        page_url_relative = self._page_relative_url(page)
         
         # Rewrite URLs
         rewriter = HTMLRewriter(
@@ -181,41 +412,46 @@ class StaticSiteExporter:
             current_page_url=page_url_relative,
             site_root_url='/',  # Always use '/' as site root for rewriter
             output_dir=self.output_dir,
-            verbose=self.verbose
+            verbose=self.verbose,
+            live_urls=self.live_urls
         )
-        rewritten_html = rewriter.rewrite()
-        
-        # Track media files
-        self.collected_media.update(rewriter.collected_media_files)
+        del html
         
         # Write to disk
-        self._write_html(output_path, rewritten_html)
+        if self.low_memory:
+            with self._open_html(output_path) as f:
+                rewriter.rewrite_to(f)
+        else:
+            self._write_html(output_path, rewriter.rewrite())
+        
+        # Track media files, static files and links
+        with self._lock:
+            self.collected_media.update(rewriter.collected_media_files)
+            self.collected_static.update(rewriter.collected_static_files)
+            self.collected_links.update(rewriter.collected_page_links)
+            self.exported_page_ids.add(page.id)
     
-    def _render_page(self, page):
+    def _render_page(self, page, client=None, raw=False):
         """
         Render page using Django test client.
         
         Args:
             page: Wagtail Page instance
+            client: Django test Client (default: the exporter's client)
+            raw: If True, return the undecoded response body
             
         Returns:
-            str: Rendered HTML
+            str: Rendered HTML (bytes if raw)
             
         Raises:
             ExportError: If rendering fails
         """
         # Get the page URL relative to site root
-        # For multi-site setups, page.url may include a site prefix
-        # We need to get the URL relative to the site root
-        page_url = page.url
-        site_root_url = page.get_site().root_page.url
-        
-        # If page URL starts with site root URL, make it relative
-        if site_root_url != '/' and page_url.startswith(site_root_url):
-            page_url = '/' + page_url[len(site_root_url):].lstrip('/')
+        page_url = self._page_relative_url(page)
         
         # Set correct HTTP_HOST for multi-domain setup
-        response = self.client.get(
+        client = client or self.client
+        response = client.get(
             page_url,
             HTTP_HOST=self.site.hostname,
             follow=False
@@ -226,9 +462,35 @@ class StaticSiteExporter:
                 f'Failed to render {page_url} (original: {page.url}): HTTP {response.status_code}'
             )
         
+        if raw:
+            return response.content
         return response.content.decode('utf-8')
     
-    def _page_to_filepath(self, page):
+    def _page_relative_url(self, page):
+        """
+        Get the URL of a page relative to the site root.
+        
+        Computed from the tree url_path, so it is also correct when several
+        sites are configured (where page.url is an absolute URL).
+        
+        Examples:
+            site root -> /
+            /home/noticias/evento/ -> /noticias/evento/
+        
+        Args:
+            page: Wagtail Page instance
+            
+        Returns:
+            str: Site-relative URL path
+        """
+        root_url_path = self.site.root_page.url_path
+        if page.id == self.site.root_page.id:
+            return '/'
+        if page.url_path.startswith(root_url_path):
+            return '/' + page.url_path[len(root_url_path):]
+        return page.url_path
+    
+    def _page_to_filepath(self, page, create_dirs=True):
         """
         Convert Wagtail page URL to filesystem path.
         
@@ -239,30 +501,22 @@ class StaticSiteExporter:
         
         Args:
             page: Wagtail Page instance
+            create_dirs: If True, create the page directory
             
         Returns:
             Path: Output file path
         """
-        # Check if this is the root page of the site
-        if page.id == self.site.root_page.id:
-            # Root page goes to index.html
-            return self.output_dir / 'index.html'
-        
         # Get URL relative to site root
-        url_path = page.url.strip('/')
-        site_root_url = self.site.root_page.url.strip('/')
-        
-        # Remove site root prefix if present
-        if site_root_url and url_path.startswith(site_root_url):
-            url_path = url_path[len(site_root_url):].lstrip('/')
+        url_path = self._page_relative_url(page).strip('/')
         
         if not url_path:
-            # Fallback to root
+            # Root page goes to index.html
             return self.output_dir / 'index.html'
         
         # Create directory structure
         page_dir = self.output_dir / url_path
-        page_dir.mkdir(parents=True, exist_ok=True)
+        if create_dirs:
+            page_dir.mkdir(parents=True, exist_ok=True)
         
         return page_dir / 'index.html'
     
@@ -274,9 +528,41 @@ class StaticSiteExporter:
             output_path: Path to output file
             html: HTML content string
         """
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with self._open_html(output_path) as f:
             f.write(html)
     
+    @contextmanager
+    def _open_html(self, output_path):
+        """
+        Open an HTML file for writing, replacing it atomically on close.
+        
+        Readers (e.g. a server using the export as a static mirror) never
+        see a partially written file. When exporting to an archive, the
+        file is written into the archive instead.
+        
+        Args:
+            output_path: Path to output file
+            
+        Yields:
+            Writable text file object
+        """
+        output_path = Path(output_path)
+        if self._archive is not None:
+            arcname = output_path.relative_to(self.output_dir).as_posix()
+            with self._archive_lock, self._archive.open(arcname, 'w') as raw:
+                with io.TextIOWrapper(raw, encoding='utf-8') as f:
+                    yield f
+            return
+        
+        temp_path = output_path.with_name(f'.{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                yield f
+            os.replace(temp_path, output_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+    
     def _copy_static_files(self):
         """Copy staticfiles to export/static/"""
         static_root = Path(settings.STATIC_ROOT)
@@ -285,8 +571,17 @@ class StaticSiteExporter:
                 'STATIC_ROOT not found. Run "python manage.py collectstatic" first.'
             )
         
+        if self._archive is not None:
+            for source_file in sorted(static_root.rglob('*')):
+                if source_file.is_file():
+                    self._add_to_archive(source_file, f'static/{source_file.relative_to(static_root).as_posix()}')
+            return
+        
         target_dir = self.output_dir / 'static'
         
+        if self.merge:
+            return self._copy_referenced_static_files(static_root, target_dir)
+        
         if self.verbose:
             print(f'Copying static files from {static_root}...')
         
@@ -299,6 +594,79 @@ class StaticSiteExporter:
         if self.verbose:
             print(f'Static files copied to {target_dir}')
     
+    def _copy_referenced_static_files(self, static_root, target_dir):
+        """
+        Copy only the static files referenced by the exported pages.
+        
+        Stylesheets are scanned for url(...) references (fonts, images) so
+        their dependencies are copied too. Files already present with the
+        same size are left untouched.
+        
+        Args:
+            static_root: Path to STATIC_ROOT
+            target_dir: Path to export/static/
+        """
+        static_url = getattr(settings, 'STATIC_URL', '/static/')
+        pending = []
+        for url in self.collected_static:
+            path = url.split('?')[0].split('#')[0]
+            for prefix in ('/' + static_url.lstrip('/'), '/static/'):
+                if path.startswith(prefix):
+                    path = path[len(prefix):]
+                    break
+            pending.append(path.lstrip('/'))
+        
+        seen = set()
+        copied = 0
+        while pending:
+            rel_path = pending.pop()
+            if rel_path in seen:
+                continue
+            seen.add(rel_path)
+            
+            source_file = static_root / rel_path
+            if not source_file.is_file():
+                if self.verbose:
+                    print(f'Warning: Static file not found: {source_file}')
+                continue
+            
+            if source_file.suffix == '.css':
+                pending.extend(self._css_dependencies(source_file, static_root))
+            
+            target_file = target_dir / rel_path
+            if target_file.exists() and target_file.stat().st_size == source_file.stat().st_size:
+                continue
+            target_file.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source_file, target_file)
+            copied += 1
+        
+        if self.verbose:
+            print(f'Copied {copied}/{len(seen)} referenced static files')
+    
+    def _css_dependencies(self, css_file, static_root):
+        """
+        List static files referenced with url(...) from a stylesheet.
+        
+        Args:
+            css_file: Path to the stylesheet
+            static_root: Path to STATIC_ROOT
+            
+        Returns:
+            list: Paths relative to STATIC_ROOT
+        """
+        css = css_file.read_text(encoding='utf-8', errors='ignore')
+        dependencies = []
+        for match in re.finditer(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)', css):
+            url = match.group(1).split('?')[0].split('#')[0]
+            if not url or url.startswith(('data:', 'http://', 'https://', '//', '/')):
+                continue
+            dependency = (css_file.parent / url).resolve()
+            try:
+                dependencies.append(str(dependency.relative_to(static_root.resolve())))
+            except ValueError:
+                continue
+        return dependencies
+    
     def _copy_media_files(self):
         """Copy media files referenced in pages"""
         if not hasattr(settings, 'MEDIA_ROOT'):
@@ -324,7 +692,12 @@ class StaticSiteExporter:
             source_file = media_root / rel_path
             target_file = target_dir / rel_path
             
-            if source_file.exists():
+            if source_file.exists() and self._archive is not None:
+                self._add_to_archive(source_file, f'media/{rel_path}')
+                copied += 1
+            elif source_file.exists():
+                if self.merge and target_file.exists() and target_file.stat().st_size == source_file.stat().st_size:
+                    continue
                 target_file.parent.mkdir(parents=True, exist_ok=True)
                 shutil.copy2(source_file, target_file)
                 copied += 1
@@ -336,28 +709,15 @@ class StaticSiteExporter:
     
     def _download_azure_media(self):
         """Download media from Azure Blob Storage"""
-        try:
-            from azure.storage.blob import BlobServiceClient
-        except ImportError:
-            raise ExportError(
-                'Azure storage not available. Install: pip install azure-storage-blob'
-            )
-        
         if self.verbose:
             print('Downloading media from Azure Blob Storage...')
         
-        connection_string = (
-            f"DefaultEndpointsProtocol=https;"
-            f"AccountName={settings.AZURE_ACCOUNT_NAME};"
-            f"AccountKey={settings.AZURE_ACCOUNT_KEY};"
-            f"EndpointSuffix=core.windows.net"
-        )
-        
-        blob_service = BlobServiceClient.from_connection_string(connection_string)
+        blob_service = get_blob_service()
         container_client = blob_service.get_container_client(settings.AZURE_CONTAINER)
         
         target_dir = self.output_dir / 'media'
-        target_dir.mkdir(exist_ok=True)
+        if self._archive is None:
+            target_dir.mkdir(exist_ok=True)
         
         downloaded = 0
         for media_url in self.collected_media:
@@ -365,7 +725,15 @@ class StaticSiteExporter:
             
             try:
                 blob_client = container_client.get_blob_client(blob_name)
+                if self._archive is not None:
+                    with self._archive_lock, self._archive.open(f'media/{blob_name}', 'w') as f:
+                        blob_client.download_blob().readinto(f)
+                    downloaded += 1
+                    continue
+                
                 target_file = target_dir / blob_name
+                if self.merge and target_file.exists():
+                    continue
                 target_file.parent.mkdir(parents=True, exist_ok=True)
                 
                 with open(target_file, 'wb') as f:
@@ -388,7 +756,11 @@ class StaticSiteExporter:
         but we include it as a safety measure.
         """
         index_path = self.output_dir / 'index.html'
-        if not index_path.exists():
+        if self._archive is not None:
+            exists = 'index.html' in self._archive.NameToInfo
+        else:
+            exists = index_path.exists()
+        if not exists:
             if self.verbose:
                 print('Warning: No index.html found, creating placeholder')
             
@@ -405,25 +777,59 @@ class StaticSiteExporter:
 </html>'''
             self._write_html(index_path, html)
     
-    def create_zip(self):
+    def _add_to_archive(self, source_file, arcname):
+        """Add a file from disk to the archive being exported."""
+        with self._archive_lock:
+            self._archive.write(source_file, arcname)
+    
+    def create_zip(self, delta=False, full_every=None):
         """
         Create ZIP archive of exported site.
         
+        Every archive embeds a manifest of its files (see cms.export.delta).
+        In delta mode only the files added or changed since the previous
+        backup of this site are archived, together with the list of deleted
+        files; a full archive is still created when there is no previous
+        backup or the chain already holds ``full_every`` backups.
+        
+        Args:
+            delta: Create an incremental backup when possible
+            full_every: Backups per chain, including the full one
+                (default: BACKUP_FULL_EVERY or 7)
+        
         Returns:
             Path: Path to created ZIP file
         """
-        timestamp = datetime.now().strftime('%Y%m%d-%H%M')
-        zip_filename = f'offline-backup-{self.site.hostname}-{timestamp}.zip'
-        zip_path = self.output_dir.parent / zip_filename
+        zip_dir = self.output_dir.parent
+        previous = None
+        if delta:
+            _, previous = previous_backup(zip_dir, self.site.hostname)
+        
+        self.backup_manifest, paths = plan_backup(
+            self.archive_filename(),
+            self.site.hostname,
+            scan_files(self.output_dir),
+            previous=previous,
+            full_every=full_every
+        )
+        zip_path = zip_dir / self.backup_manifest['name']
         
         if self.verbose:
-            print(f'Creating ZIP archive: {zip_filename}')
+            print(f'Creating ZIP archive: {zip_path.name}')
+            if self.backup_manifest['kind'] == 'delta':
+                print(
+                    f'Delta on {self.backup_manifest["base"]}: {len(paths)} changed, '
+                    f'{len(self.backup_manifest["deleted"])} deleted'
+                )
+        
+        # The manifest reuses the scan_files() hashes and the MD5 is computed
+        # while the archive is written, so the export is read once more only
+        with open(zip_path, 'wb') as f:
+            writer = HashingWriter(f)
+            write_backup_archive(writer, self.output_dir, self.backup_manifest, paths)
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in self.output_dir.rglob('*'):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(self.output_dir)
-                    zipf.write(file_path, arcname)
+        # Store the checksum and make the backup visible to the download views
+        get_backup_catalog().record_local(zip_path, checksum=writer.md5.hexdigest())
         
         if self.verbose:
             size_mb = zip_path.stat().st_size / (1024 * 1024)
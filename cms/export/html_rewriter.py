@@ -10,10 +10,14 @@ import re
 from pathlib import Path
 from urllib.parse import urlparse, urljoin
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from django.conf import settings
 
 
+# Elements whose children are serialized one by one by rewrite_to()
+STREAMED_CONTAINERS = ('html', 'head', 'body')
+
+
 class HTMLRewriter:
     """
     Reescribe HTML para usar rutas relativas en lugar de absolutas.
@@ -22,25 +26,34 @@ class HTMLRewriter:
         - <a href="/proyectos/madmusic/"> → <a href="../../proyectos/madmusic/index.html">
         - <img src="/media/images/logo.jpg"> → <img src="../../media/images/logo.jpg">
         - <link href="/static/css/style.css"> → <link href="../../static/css/style.css">
+    
+    En modo live_urls (mirror estático servido en las URLs reales) las rutas
+    absolutas se conservan y solo se eliminan los orígenes de desarrollo
+    (http://127.0.0.1:8000/...), sin aviso offline ni quitar canonical.
     """
     
-    def __init__(self, html, current_page_url, site_root_url, output_dir, verbose=False):
+    def __init__(self, html, current_page_url, site_root_url, output_dir, verbose=False,
+                 live_urls=False):
         """
         Initialize the rewriter.
         
         Args:
-            html: HTML content to rewrite
+            html: HTML content to rewrite (str or bytes)
             current_page_url: URL of the current page (e.g., "/proyectos/madmusic/")
             site_root_url: URL of the site root (e.g., "/")
             output_dir: Path to output directory
             verbose: If True, print detailed information
+            live_urls: If True, keep absolute URLs for serving at the live URLs
         """
         self.soup = BeautifulSoup(html, 'html.parser')
+        self.live_urls = live_urls
         self.current_page_url = current_page_url
         self.site_root_url = site_root_url
         self.output_dir = Path(output_dir)
         self.verbose = verbose
         self.collected_media_files = set()
+        self.collected_static_files = set()
+        self.collected_page_links = set()
     
     def rewrite(self):
         """
@@ -49,6 +62,35 @@ class HTMLRewriter:
         Returns:
             str: Rewritten HTML
         """
+        self._apply_rewrites()
+        
+        return str(self.soup)
+    
+    def rewrite_to(self, fileobj):
+        """
+        Rewrite and write the HTML straight to a text file object.
+        
+        Produces the same output as rewrite() without building the whole
+        document as one string: the children of <html>, <head> and <body>
+        are serialized and written one at a time. The parse tree is
+        released afterwards, so the rewriter cannot be reused.
+        
+        Args:
+            fileobj: Writable text file object
+        """
+        self._apply_rewrites()
+        
+        for chunk in self._iter_chunks(self.soup.contents):
+            fileobj.write(chunk)
+        
+        self.soup.decompose()
+    
+    def _apply_rewrites(self):
+        """Apply all rewrites to the parsed document in place."""
+        if self.live_urls:
+            self._strip_local_origins()
+            return
+        
         self._rewrite_internal_links()
         self._rewrite_data_urls()
         self._rewrite_media_urls()
@@ -56,8 +98,38 @@ class HTMLRewriter:
         self._rewrite_document_urls()
         self._remove_canonical_links()
         self._add_offline_notice()
+    
+    def _iter_chunks(self, nodes):
+        """
+        Serialize nodes lazily, descending into the top-level containers.
         
-        return str(self.soup)
+        Args:
+            nodes: List of BeautifulSoup nodes
+            
+        Yields:
+            str: Serialized HTML fragments
+        """
+        for node in list(nodes):
+            if isinstance(node, Tag) and node.name in STREAMED_CONTAINERS:
+                closing_tag = f'</{node.name}>'
+                empty_tag = str(self.soup.new_tag(node.name, attrs=dict(node.attrs)))
+                yield empty_tag[:-len(closing_tag)]
+                yield from self._iter_chunks(node.contents)
+                yield closing_tag
+            elif isinstance(node, Tag):
+                yield node.decode()
+            else:
+                yield node.output_ready()
+    
+    def _strip_local_origins(self):
+        """Turn development absolute URLs into root-relative URLs (live mode)"""
+        for attr in ('href', 'src', 'data-url'):
+            for elem in self.soup.find_all(attrs={attr: True}):
+                value = elem[attr]
+                for origin in ('http://127.0.0.1:8000/', 'http://localhost:8000/'):
+                    if value.startswith(origin):
+                        elem[attr] = '/' + value[len(origin):]
+                        break
     
     def _rewrite_internal_links(self):
         """Rewrite <a href> for internal navigation"""
@@ -84,6 +156,7 @@ class HTMLRewriter:
             relative_path = self._make_relative_page_link(href)
             if relative_path:
                 link['href'] = relative_path
+                self._collect_page_link(href)
     
     def _rewrite_data_urls(self):
         """Rewrite data-url attributes in menu items"""
@@ -106,6 +179,7 @@ class HTMLRewriter:
             relative_path = self._make_relative_page_link(data_url)
             if relative_path:
                 elem['data-url'] = relative_path
+                self._collect_page_link(data_url)
     
     def _rewrite_media_urls(self):
         """Rewrite <img src> and other media references"""
@@ -119,27 +193,68 @@ class HTMLRewriter:
                 img['src'] = relative_src
                 self.collected_media_files.add(src)
         
-        # Background images in style attributes
+        # Background images in style attributes (media and static)
         for elem in self.soup.find_all(style=True):
             style = elem['style']
-            if 'url(' in style and '/media/' in style:
+            if 'url(' in style and ('/media/' in style or '/static/' in style):
                 elem['style'] = self._rewrite_style_urls(style)
     
     def _rewrite_static_urls(self):
-        """Rewrite CSS and JS references"""
-        static_url = getattr(settings, 'STATIC_URL', '/static/')
-        
-        # Stylesheets
-        for link in self.soup.find_all('link', rel='stylesheet', href=True):
+        """Rewrite static references: CSS, JS, images, icons, preloads and srcset"""
+        # Links of any rel: stylesheet, icon, apple-touch-icon, preload, manifest...
+        for link in self.soup.find_all('link', href=True):
             href = link['href']
-            if href.startswith('/static/') or href.startswith(static_url):
+            if self._is_static_url(href):
                 link['href'] = self._make_relative_static_path(href)
+                self.collected_static_files.add(href)
+        
+        # Scripts, images, <source>, <iframe>...
+        for elem in self.soup.find_all(src=True):
+            src = elem['src']
+            if self._is_static_url(src):
+                elem['src'] = self._make_relative_static_path(src)
+                self.collected_static_files.add(src)
+        
+        # Responsive images
+        for elem in self.soup.find_all(srcset=True):
+            elem['srcset'] = self._rewrite_srcset(elem['srcset'])
+    
+    def _rewrite_srcset(self, srcset):
+        """
+        Rewrite the static and media URLs of a srcset attribute.
         
-        # Scripts
-        for script in self.soup.find_all('script', src=True):
-            src = script['src']
-            if src.startswith('/static/') or src.startswith(static_url):
-                script['src'] = self._make_relative_static_path(src)
+        Example:
+            /static/img/logo.png 1x, /static/img/logo@2x.png 2x
+            becomes (from /noticias/):
+            ../static/img/logo.png 1x, ../static/img/logo@2x.png 2x
+        
+        Args:
+            srcset: srcset attribute value
+            
+        Returns:
+            str: Rewritten srcset (unchanged if it has no local URLs)
+        """
+        candidates = []
+        changed = False
+        for candidate in srcset.split(','):
+            parts = candidate.split()
+            if not parts:
+                continue
+            url = parts[0]
+            if self._is_static_url(url):
+                parts[0] = self._make_relative_static_path(url)
+                self.collected_static_files.add(url)
+                changed = True
+            elif url.startswith('/media/') or url.startswith(getattr(settings, 'MEDIA_URL', '/media/')):
+                parts[0] = self._make_relative_media_path(url)
+                self.collected_media_files.add(url)
+                changed = True
+            candidates.append(' '.join(parts))
+        return ', '.join(candidates) if changed else srcset
+    
+    def _is_static_url(self, url):
+        """Check whether a URL points to a static file"""
+        return url.startswith('/static/') or url.startswith(getattr(settings, 'STATIC_URL', '/static/'))
     
     def _rewrite_document_urls(self):
         """Rewrite Wagtail document URLs to direct media paths"""
@@ -191,6 +306,19 @@ class HTMLRewriter:
         if self.soup.body:
             self.soup.body.insert(0, notice)
     
+    def _collect_page_link(self, target_url):
+        """
+        Record an internal page link as a normalized site-relative path.
+        
+        Example:
+            /noticias/evento?x=1#top -> /noticias/evento/
+        
+        Args:
+            target_url: Target URL (absolute path)
+        """
+        path = urlparse(target_url).path.strip('/')
+        self.collected_page_links.add(f'/{path}/' if path else '/')
+    
     def _make_relative_page_link(self, target_url):
         """
         Convert absolute page URL to relative path.
@@ -309,6 +437,7 @@ class HTMLRewriter:
                 return f'url({relative_url})'
             elif url.startswith('/static/'):
                 relative_url = self._make_relative_static_path(url)
+                self.collected_static_files.add(url)
                 return f'url({relative_url})'
             return match.group(0)
         
@@ -0,0 +1,257 @@
+"""
+Static mirror of published pages.
+
+This module contains the StaticMirror class that renders published pages
+into an on-disk mirror, reusing StaticSiteExporter in live-URL mode. The
+mirror is served to anonymous visitors by StaticMirrorMiddleware (or
+directly by the front server), falling back to Wagtail on a miss.
+
+Layout:
+    <STATIC_MIRROR_ROOT>/<hostname>/index.html
+    <STATIC_MIRROR_ROOT>/<hostname>/noticias/evento/index.html
+"""
+
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from wagtail.models import Page, Site
+
+from cms.export import ExportError
+from cms.export.exporter import StaticSiteExporter
+
+
+# Pages this many levels below the site root appear in the menus
+# (see cms.context_processors.wagtail_menu_context, max_depth=2)
+MENU_DEPTH = 2
+
+
+class StaticMirror:
+    """
+    Keeps an on-disk static copy of the live pages of each site.
+
+    Publishing a page re-renders it and the pages whose output depends on
+    it: its ancestors (listings, featured news on the home page) and, when
+    the page is part of the menus, every page already in the mirror. The
+    publish signals render only the page itself and leave the dependents
+    to the ``mirror_dependents`` background job (see cms.jobs).
+    """
+
+    def __init__(self, root=None, verbose=False):
+        """
+        Initialize the mirror.
+
+        Args:
+            root: Mirror directory (default: settings.STATIC_MIRROR_ROOT)
+            verbose: If True, print detailed progress information
+
+        Raises:
+            ExportError: If no mirror directory is configured
+        """
+        root = root or getattr(settings, 'STATIC_MIRROR_ROOT', None)
+        if not root:
+            raise ExportError('STATIC_MIRROR_ROOT not configured in settings')
+        self.root = Path(root)
+        self.verbose = verbose
+
+    def file_for_path(self, hostname, path):
+        """
+        Get the mirror file for a request.
+
+        Args:
+            hostname: Request hostname (without port)
+            path: Request path (e.g. "/noticias/evento/")
+
+        Returns:
+            Path or None: Mirror file, or None if the path is not mirrorable
+        """
+        parts = [part for part in path.split('/') if part]
+        if any(part.startswith('.') for part in parts):
+            return None
+        return self.root.joinpath(hostname, *parts, 'index.html')
+
+    def publish(self, page, dependents=True):
+        """
+        Render a published page and its dependents into the mirror.
+
+        Args:
+            page: Wagtail Page instance
+            dependents: If False, render only the page itself
+
+        Returns:
+            list: Pages rendered
+        """
+        site = page.get_site()
+        if site is None:
+            return []
+
+        exporter = self._get_exporter(site)
+        if dependents:
+            pages = self._dependent_pages(page, site, exporter)
+        else:
+            pages = [page.specific] if page.live else []
+        for dependent in pages:
+            exporter._export_page_safely(dependent, exporter.client)
+
+        if self.verbose:
+            print(f'Mirror: rendered {exporter.pages_exported} page(s) for {page.url_path}')
+        return pages
+
+    def unpublish(self, page, dependents=True):
+        """
+        Remove a page (and its subtree) from the mirror.
+
+        Pages that listed it are re-rendered.
+
+        Args:
+            page: Wagtail Page instance
+            dependents: If False, only remove the page's files
+        """
+        site = page.get_site()
+        if site is None:
+            return
+
+        exporter = self._get_exporter(site)
+        output_path = exporter._page_to_filepath(page, create_dirs=False)
+        if page.id == site.root_page.id:
+            shutil.rmtree(exporter.output_dir, ignore_errors=True)
+            return
+        shutil.rmtree(output_path.parent, ignore_errors=True)
+
+        if dependents:
+            self._render_dependents(page, site, exporter)
+
+    def move(self, page, url_path_before, dependents=True):
+        """
+        Move a page to its new URL after a slug change or a page move.
+
+        The files under the previous url_path (the page and its subtree) are
+        removed, so they are no longer served, and the live pages of the
+        subtree are rendered at their new location.
+
+        Args:
+            page: Wagtail Page instance, with its new url_path
+            url_path_before: Tree url_path the page had before (e.g. "/home/old-slug/")
+            dependents: If False, do not re-render the pages that depend on it
+
+        Returns:
+            list: Pages rendered
+        """
+        old_dir = self._dir_for_url_path(url_path_before)
+        if old_dir is not None and url_path_before != page.url_path:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        site = page.get_site()
+        if site is None:
+            return []
+
+        exporter = self._get_exporter(site)
+        pages = list(page.get_descendants(inclusive=True).live().specific().order_by('path'))
+        for moved in pages:
+            exporter._export_page_safely(moved, exporter.client)
+        if dependents:
+            pages += self._render_dependents(page, site, exporter)
+        return pages
+
+    def _dir_for_url_path(self, url_path):
+        """
+        Get the mirror directory of a tree url_path, looking up the site it belongs to.
+
+        Args:
+            url_path: Wagtail url_path (e.g. "/home/noticias/evento/")
+
+        Returns:
+            Path or None: Page directory, or None for a site root or a path
+                outside every site
+        """
+        sites = sorted(Site.objects.select_related('root_page'),
+                       key=lambda site: len(site.root_page.url_path), reverse=True)
+        for site in sites:
+            root_url_path = site.root_page.url_path
+            if url_path.startswith(root_url_path):
+                relative = url_path[len(root_url_path):].strip('/')
+                if not relative:
+                    return None
+                return self.root / site.hostname / relative
+        return None
+
+    def publish_dependents(self, page):
+        """
+        Re-render the pages that depend on a page, but not the page itself.
+
+        Used by the ``mirror_dependents`` job after the publish signals have
+        rendered (or removed) the page.
+
+        Args:
+            page: Wagtail Page instance
+
+        Returns:
+            list: Pages rendered
+        """
+        site = page.get_site()
+        if site is None:
+            return []
+        return self._render_dependents(page, site, self._get_exporter(site))
+
+    def _render_dependents(self, page, site, exporter):
+        """Render the dependents of a page other than the page itself."""
+        pages = [dependent for dependent in self._dependent_pages(page, site, exporter)
+                 if dependent.id != page.id]
+        for dependent in pages:
+            exporter._export_page_safely(dependent, exporter.client)
+        return pages
+
+    def publish_site(self, site):
+        """
+        Render every live page of a site into the mirror.
+
+        Args:
+            site: Wagtail Site instance
+
+        Returns:
+            StaticSiteExporter: Exporter with pages_exported/pages_failed counts
+        """
+        exporter = self._get_exporter(site)
+        pages = site.root_page.get_descendants(inclusive=True).live().specific().order_by('path')
+        for page in pages.iterator(chunk_size=200):
+            exporter._export_page_safely(page, exporter.client)
+        return exporter
+
+    def _get_exporter(self, site):
+        """Create an exporter writing live-URL pages into the site's mirror directory."""
+        return StaticSiteExporter(
+            site_id_or_hostname=site.id,
+            output_dir=self.root / site.hostname,
+            verbose=self.verbose,
+            live_urls=True
+        )
+
+    def _dependent_pages(self, page, site, exporter):
+        """
+        Get the pages whose rendered output depends on a page.
+
+        Args:
+            page: Wagtail Page instance
+            site: Site the page belongs to
+            exporter: Exporter for the site's mirror directory
+
+        Returns:
+            list: Live specific pages, the page itself first (if live)
+        """
+        root = site.root_page
+        pages = [page.specific] if page.live else []
+        seen = {page.id}
+
+        ancestors = Page.objects.ancestor_of(page).descendant_of(root, inclusive=True).live().specific()
+        for ancestor in ancestors:
+            pages.append(ancestor)
+            seen.add(ancestor.id)
+
+        # Pages in the menu levels change the navigation on every page
+        if page.depth - root.depth <= MENU_DEPTH:
+            mirrored = root.get_descendants(inclusive=True).live().exclude(id__in=seen).specific()
+            for other in mirrored.iterator(chunk_size=200):
+                if exporter._page_to_filepath(other, create_dirs=False).exists():
+                    pages.append(other)
+
+        return pages
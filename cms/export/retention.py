@@ -0,0 +1,97 @@
+"""
+Retention policies for backup archives.
+
+A RetentionPolicy keeps, for each site, the most recent backups plus the
+newest backup of each of the last N days, ISO weeks and months
+(grandfather-father-son rotation). BackupStorage.apply_retention() adds
+the backups kept deltas depend on (see cms.export.delta) and deletes the
+rest in batches.
+"""
+
+from django.conf import settings
+
+from cms.export.catalog import backup_site
+
+
+class RetentionPolicy:
+    """
+    Keep the last backups and one backup per day, week and month.
+
+    Each rule keeps the newest backup of its period, so with daily=7,
+    weekly=4, monthly=12 a site keeps at most 23 backups (fewer when the
+    periods overlap).
+    """
+
+    def __init__(self, last=0, daily=0, weekly=0, monthly=0):
+        """
+        Initialize the policy.
+
+        Args:
+            last: Number of most recent backups always kept
+            daily: Number of days with one backup kept
+            weekly: Number of ISO weeks with one backup kept
+            monthly: Number of months with one backup kept
+        """
+        self.last = last
+        self.daily = daily
+        self.weekly = weekly
+        self.monthly = monthly
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        """
+        Build the policy from BACKUP_RETENTION.
+
+        Default: {"last": 1, "daily": 7, "weekly": 4, "monthly": 12}.
+        Keyword arguments that are not None override the setting.
+        """
+        options = {'last': 1, 'daily': 7, 'weekly': 4, 'monthly': 12}
+        options.update(getattr(settings, 'BACKUP_RETENTION', {}))
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def __repr__(self):
+        return (
+            f'RetentionPolicy(last={self.last}, daily={self.daily}, '
+            f'weekly={self.weekly}, monthly={self.monthly})'
+        )
+
+    def select(self, entries):
+        """
+        Choose the backups to keep.
+
+        Args:
+            entries: Dicts with ``name`` and ``created`` (e.g. list_backup_entries())
+
+        Returns:
+            set: Names of the backups kept by the policy
+        """
+        by_site = {}
+        for entry in entries:
+            by_site.setdefault(backup_site(entry['name']), []).append(entry)
+
+        keep = set()
+        for site_entries in by_site.values():
+            site_entries.sort(key=lambda entry: (entry['created'], entry['name']), reverse=True)
+            keep.update(entry['name'] for entry in site_entries[:self.last])
+            for count, period in (
+                (self.daily, lambda created: created.date()),
+                (self.weekly, lambda created: tuple(created.isocalendar())[:2]),
+                (self.monthly, lambda created: (created.year, created.month)),
+            ):
+                keep.update(self._newest_per_period(site_entries, count, period))
+        return keep
+
+    @staticmethod
+    def _newest_per_period(entries, count, period):
+        """Names of the newest entry of each of the ``count`` latest periods (entries newest first)."""
+        seen = []
+        names = []
+        for entry in entries:
+            if len(seen) >= count:
+                break
+            key = period(entry['created'])
+            if key not in seen:
+                seen.append(key)
+                names.append(entry['name'])
+        return names
@@ -0,0 +1,104 @@
+"""
+Disk-spilling set for bounded-memory exports.
+
+This module contains the SpillableSet class, a set of strings that lives
+in memory until it grows past a threshold and then moves to a temporary
+SQLite database.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+
+class SpillableSet:
+    """
+    Set of strings with a bounded in-memory footprint.
+
+    Up to ``threshold`` items are kept in a regular set. When the threshold
+    is passed, all items are moved to a temporary on-disk SQLite table and
+    every further operation goes to disk. The temporary file is removed by
+    ``close()``.
+    """
+
+    def __init__(self, threshold=10000, temp_dir=None):
+        """
+        Initialize the set.
+
+        Args:
+            threshold: Maximum number of items kept in memory
+            temp_dir: Directory for the temporary SQLite file (default: system temp)
+        """
+        self.threshold = threshold
+        self.temp_dir = temp_dir
+        self._memory = set()
+        self._db = None
+        self._db_path = None
+
+    @property
+    def spilled(self):
+        """bool: True if the items have been moved to disk."""
+        return self._db is not None
+
+    def add(self, item):
+        """Add an item to the set."""
+        if self._db is not None:
+            self._db.execute('INSERT OR IGNORE INTO items (value) VALUES (?)', (item,))
+            return
+
+        self._memory.add(item)
+        if len(self._memory) > self.threshold:
+            self._spill()
+
+    def update(self, items):
+        """Add several items to the set."""
+        if self._db is not None:
+            self._db.executemany(
+                'INSERT OR IGNORE INTO items (value) VALUES (?)', ((item,) for item in items)
+            )
+            return
+
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        if self._db is not None:
+            row = self._db.execute('SELECT 1 FROM items WHERE value = ?', (item,)).fetchone()
+            return row is not None
+        return item in self._memory
+
+    def __len__(self):
+        if self._db is not None:
+            return self._db.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+        return len(self._memory)
+
+    def __iter__(self):
+        if self._db is not None:
+            # Separate cursor so adding items while iterating is safe
+            cursor = self._db.execute('SELECT value FROM items ORDER BY value')
+            for (value,) in cursor:
+                yield value
+        else:
+            yield from self._memory
+
+    def _spill(self):
+        """Move the in-memory items to a temporary SQLite database."""
+        fd, self._db_path = tempfile.mkstemp(prefix='export-spill-', suffix='.sqlite3', dir=self.temp_dir)
+        os.close(fd)
+
+        self._db = sqlite3.connect(self._db_path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode = OFF')
+        self._db.execute('PRAGMA synchronous = OFF')
+        self._db.execute('CREATE TABLE items (value TEXT PRIMARY KEY) WITHOUT ROWID')
+        self._db.executemany('INSERT OR IGNORE INTO items (value) VALUES (?)', ((item,) for item in self._memory))
+        self._memory = set()
+
+    def close(self):
+        """Release the temporary database, if any."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        if self._db_path and os.path.exists(self._db_path):
+            os.remove(self._db_path)
+        self._db_path = None
+        self._memory = set()
@@ -0,0 +1,530 @@
+"""
+Storage backends for backup archives.
+
+This module defines the BackupStorage interface shared by every place
+backups are kept, plus two backends that need no cloud account:
+
+- LocalBackupStorage: a directory on disk, with signed download URLs
+  served by cms.views.download_stored_backup
+- MemoryBackupStorage: process-wide in-memory containers, for tests and
+  offline benchmarks
+
+AzureBackupUploader (cms.export.azure_uploader) implements the same
+interface on top of Azure Blob Storage. get_backup_storage() returns the
+backend selected with the BACKUP_STORAGE_BACKEND setting.
+"""
+
+import io
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signing import BadSignature, Signer
+from django.utils.module_loading import import_string
+
+from cms.export import ExportError
+from cms.export.catalog import BACKUP_PREFIX, HashingWriter, backup_kind, get_backup_catalog
+from cms.export.delta import backup_dependencies
+from cms.export.retention import RetentionPolicy
+
+
+SIGNED_URL_SALT = 'cms.export.storage'
+
+
+def sign_backup_url(container_name, blob_name, expiry_hours=1):
+    """
+    Build a time-limited signed URL for a backup kept in local storage.
+
+    Args:
+        container_name: Storage container
+        blob_name: Backup name
+        expiry_hours: Number of hours until URL expires
+
+    Returns:
+        str: URL of cms.views.download_stored_backup with a signed token,
+            relative unless BACKUP_STORAGE_BASE_URL is set
+    """
+    token = Signer(salt=SIGNED_URL_SALT).sign_object({
+        'container': container_name,
+        'name': blob_name,
+        'expires': int(time.time() + expiry_hours * 3600),
+    })
+    path = f'/backup-storage/{quote(container_name)}/{quote(blob_name)}'
+    base_url = getattr(settings, 'BACKUP_STORAGE_BASE_URL', '').rstrip('/')
+    return f'{base_url}{path}?token={token}'
+
+
+def verify_backup_token(token, container_name, blob_name):
+    """
+    Check a token produced by sign_backup_url.
+
+    Returns:
+        bool: True if the token is valid, unexpired and for this backup
+    """
+    try:
+        payload = Signer(salt=SIGNED_URL_SALT).unsign_object(token)
+    except (BadSignature, TypeError, ValueError):
+        return False
+    return (
+        payload.get('container') == container_name
+        and payload.get('name') == blob_name
+        and payload.get('expires', 0) > time.time()
+    )
+
+
+class BackupStorage:
+    """
+    Interface of a backup storage backend.
+
+    Backends store archives under a name in a container and keep a
+    "latest.zip" alias to the most recent full backup (deltas, see
+    cms.export.delta, are never aliased). Subclasses implement
+    upload(), upload_stream(), list_backup_entries(), delete_backup(),
+    open_backup() and generate_sas_url(); listing and retention are shared.
+    Backends with a batch API also override delete_backups().
+    """
+
+    def __init__(self, container_name='backups'):
+        """
+        Initialize the storage.
+
+        Args:
+            container_name: Name of the container holding the backups
+        """
+        self.container_name = container_name
+
+    def upload(self, zip_path):
+        """
+        Store a ZIP under its file name and update "latest.zip" (full backups only).
+
+        Returns:
+            str: URL of the stored backup
+        """
+        raise NotImplementedError
+
+    def upload_stream(self, blob_name, write_archive, local_copy=None):
+        """
+        Store an archive while ``write_archive(fileobj)`` produces it.
+
+        Returns:
+            str: URL of the stored backup
+        """
+        raise NotImplementedError
+
+    def list_backup_entries(self):
+        """
+        List the stored backups.
+
+        Returns:
+            list: Dicts with ``name``, ``size``, ``created`` (datetime) and
+                ``checksum`` (MD5 hex digest or None)
+        """
+        raise NotImplementedError
+
+    async def alist_backup_entries(self):
+        """
+        Async version of list_backup_entries() for async views.
+
+        The default runs the listing in a worker thread; backends with an
+        async client override it.
+        """
+        return await sync_to_async(self.list_backup_entries, thread_sensitive=False)()
+
+    def delete_backup(self, blob_name):
+        """Delete one backup."""
+        raise NotImplementedError
+
+    def delete_backups(self, blob_names):
+        """
+        Delete several backups.
+
+        Args:
+            blob_names: Names of the backups to delete
+        """
+        for blob_name in blob_names:
+            self.delete_backup(blob_name)
+
+    def open_backup(self, blob_name):
+        """
+        Open a stored backup for reading without downloading it to disk.
+
+        Returns:
+            Seekable binary file object
+        """
+        raise NotImplementedError
+
+    def generate_sas_url(self, blob_name, expiry_hours=1):
+        """
+        Generate a time-limited URL for download.
+
+        Returns:
+            str: Signed URL
+        """
+        raise NotImplementedError
+
+    def list_backups(self):
+        """
+        List all backup files in the container.
+
+        Returns:
+            list: List of backup names
+        """
+        return [entry['name'] for entry in self.list_backup_entries()]
+
+    def delete_old_backups(self, keep_count=10):
+        """
+        Delete old backups, keeping only the most recent ones.
+
+        Older backups that a kept delta depends on (its full backup and the
+        deltas in between) are kept too, so every kept backup can still be
+        restored.
+
+        Args:
+            keep_count: Number of recent backups to keep
+        """
+        try:
+            entries = sorted(self.list_backup_entries(), key=lambda entry: entry['created'], reverse=True)
+            self._prune(entries, {entry['name'] for entry in entries[:keep_count]})
+        except ExportError:
+            raise
+        except Exception as e:
+            raise ExportError(f'Failed to delete old backups: {e}')
+
+    def apply_retention(self, policy=None, dry_run=False):
+        """
+        Delete the backups a retention policy does not keep.
+
+        As in delete_old_backups(), backups needed by a kept delta are kept.
+
+        Args:
+            policy: RetentionPolicy (default: from BACKUP_RETENTION)
+            dry_run: Only report what would be deleted
+
+        Returns:
+            list: Names of the deleted (or, with dry_run, deletable) backups, oldest first
+        """
+        if policy is None:
+            policy = RetentionPolicy.from_settings()
+        try:
+            entries = self.list_backup_entries()
+            return self._prune(entries, policy.select(entries), dry_run=dry_run)
+        except ExportError:
+            raise
+        except Exception as e:
+            raise ExportError(f'Failed to apply retention: {e}')
+
+    def _prune(self, entries, keep, dry_run=False):
+        """Delete every entry not in ``keep`` nor needed by it, and drop it from the catalog."""
+        keep = set(keep) | backup_dependencies(entries, keep)
+        doomed = [
+            entry['name']
+            for entry in sorted(entries, key=lambda entry: (entry['created'], entry['name']))
+            if entry['name'] not in keep
+        ]
+        if doomed and not dry_run:
+            self.delete_backups(doomed)
+            catalog = get_backup_catalog()
+            for name in doomed:
+                catalog.remove(name, 'azure')
+        return doomed
+
+    def _record(self, blob_name, size, checksum, local_copy=None):
+        """Make a new backup visible in the backup catalog."""
+        catalog = get_backup_catalog()
+        catalog.record_azure(blob_name, size, checksum)
+        if local_copy:
+            catalog.record_local(local_copy, checksum)
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Seekable read-only file over ranged reads (e.g. HTTP Range requests).
+
+    Wrap it in io.BufferedReader so small reads are served from one larger
+    request. ``requests`` and ``bytes_fetched`` count the ranged reads.
+    """
+
+    def __init__(self, size, read_range):
+        """
+        Args:
+            size: Total size in bytes
+            read_range: Callable ``(offset, length) -> bytes``
+        """
+        super().__init__()
+        self.size = size
+        self.read_range = read_range
+        self.position = 0
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError('negative seek position')
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = self.read_range(self.position, length)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        return len(data)
+
+
+class LocalBackupStorage(BackupStorage):
+    """
+    Backups kept in a local directory.
+
+    Layout: <root>/<container>/<name>. "latest.zip" is a hard link to the
+    newest backup (a copy on filesystems without hard links). Files are
+    written to a temporary name and renamed, so a partial upload is never
+    listed.
+    """
+
+    def __init__(self, container_name='backups', root=None):
+        """
+        Initialize the storage.
+
+        Args:
+            container_name: Subdirectory holding the backups
+            root: Storage directory (default: BACKUP_STORAGE_ROOT or BASE_DIR/backup-storage)
+        """
+        super().__init__(container_name)
+        if root is None:
+            root = getattr(settings, 'BACKUP_STORAGE_ROOT', Path(settings.BASE_DIR) / 'backup-storage')
+        self.root = Path(root)
+        self.container_dir = self.root / container_name
+
+    def local_path(self, blob_name):
+        """
+        Get the file of a stored backup.
+
+        Returns:
+            Path or None: File path, or None if the name is not valid
+        """
+        if not blob_name or '/' in blob_name or '\\' in blob_name or blob_name.startswith('.'):
+            return None
+        return self.container_dir / blob_name
+
+    def upload(self, zip_path):
+        zip_path = Path(zip_path)
+        if not zip_path.exists():
+            raise ExportError(f'ZIP file not found: {zip_path}')
+
+        with open(zip_path, 'rb') as source:
+            return self.upload_stream(zip_path.name, lambda fileobj: shutil.copyfileobj(source, fileobj, 1024 * 1024))
+
+    def upload_stream(self, blob_name, write_archive, local_copy=None):
+        target = self.local_path(blob_name)
+        if target is None:
+            raise ExportError(f'Invalid backup name: {blob_name}')
+        self.container_dir.mkdir(parents=True, exist_ok=True)
+
+        temp_path = target.with_name(f'.{blob_name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                local_file = open(local_copy, 'wb') if local_copy else None
+                try:
+                    writer = HashingWriter(*[t for t in (f, local_file) if t])
+                    write_archive(writer)
+                finally:
+                    if local_file:
+                        local_file.close()
+            os.replace(temp_path, target)
+        except BaseException:
+            if local_copy:
+                Path(local_copy).unlink(missing_ok=True)
+            raise
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+        if backup_kind(blob_name) == 'full':
+            self._update_latest(target)
+        checksum = writer.md5.hexdigest()
+        self._record(blob_name, writer.size, checksum, local_copy)
+        return self.generate_sas_url(blob_name)
+
+    def _update_latest(self, target):
+        """Point latest.zip at a backup without copying it when possible."""
+        latest = self.container_dir / 'latest.zip'
+        temp_latest = latest.with_name(f'.latest.zip.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            os.link(target, temp_latest)
+        except OSError:
+            shutil.copy2(target, temp_latest)
+        os.replace(temp_latest, latest)
+
+    def list_backup_entries(self):
+        entries = []
+        if not self.container_dir.is_dir():
+            return entries
+        for path in self.container_dir.glob(f'{BACKUP_PREFIX}*.zip'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append({
+                'name': path.name,
+                'size': stat.st_size,
+                'created': datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                'checksum': None,
+            })
+        return entries
+
+    def delete_backup(self, blob_name):
+        path = self.local_path(blob_name)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def open_backup(self, blob_name):
+        path = self.local_path(blob_name)
+        if path is None or not path.is_file():
+            raise ExportError(f'Backup not found: {blob_name}')
+        return open(path, 'rb')
+
+    def generate_sas_url(self, blob_name, expiry_hours=1):
+        return sign_backup_url(self.container_name, blob_name, expiry_hours)
+
+
+class MemoryBackupStorage(BackupStorage):
+    """
+    Backups kept in memory, shared by every instance in the process.
+
+    Intended for tests and offline benchmarks.
+    """
+
+    _containers = {}
+    _containers_lock = threading.Lock()
+
+    def __init__(self, container_name='backups'):
+        super().__init__(container_name)
+        with self._containers_lock:
+            self.blobs = self._containers.setdefault(container_name, {})
+
+    @classmethod
+    def reset(cls):
+        """Drop every in-memory container."""
+        with cls._containers_lock:
+            cls._containers.clear()
+
+    def read_backup(self, blob_name):
+        """
+        Get the content of a stored backup.
+
+        Returns:
+            bytes or None
+        """
+        blob = self.blobs.get(blob_name)
+        return blob['data'] if blob else None
+
+    def upload(self, zip_path):
+        zip_path = Path(zip_path)
+        if not zip_path.exists():
+            raise ExportError(f'ZIP file not found: {zip_path}')
+
+        with open(zip_path, 'rb') as source:
+            return self.upload_stream(zip_path.name, lambda fileobj: shutil.copyfileobj(source, fileobj, 1024 * 1024))
+
+    def upload_stream(self, blob_name, write_archive, local_copy=None):
+        buffer = io.BytesIO()
+        local_file = open(local_copy, 'wb') if local_copy else None
+        try:
+            writer = HashingWriter(*[t for t in (buffer, local_file) if t])
+            write_archive(writer)
+        except BaseException:
+            if local_file:
+                local_file.close()
+                Path(local_copy).unlink(missing_ok=True)
+            raise
+        if local_file:
+            local_file.close()
+
+        blob = {
+            'data': buffer.getvalue(),
+            'created': datetime.now(timezone.utc),
+            'checksum': writer.md5.hexdigest(),
+        }
+        self.blobs[blob_name] = blob
+        if backup_kind(blob_name) == 'full':
+            self.blobs['latest.zip'] = blob
+        self._record(blob_name, writer.size, blob['checksum'], local_copy)
+        return self.generate_sas_url(blob_name)
+
+    def list_backup_entries(self):
+        return [
+            {'name': name, 'size': len(blob['data']), 'created': blob['created'], 'checksum': blob['checksum']}
+            for name, blob in list(self.blobs.items())
+            if name.startswith(BACKUP_PREFIX)
+        ]
+
+    def delete_backup(self, blob_name):
+        self.blobs.pop(blob_name, None)
+
+    def open_backup(self, blob_name):
+        data = self.read_backup(blob_name)
+        if data is None:
+            raise ExportError(f'Backup not found: {blob_name}')
+        return io.BytesIO(data)
+
+    def generate_sas_url(self, blob_name, expiry_hours=1):
+        return sign_backup_url(self.container_name, blob_name, expiry_hours)
+
+
+BACKENDS = {
+    'azure': 'cms.export.azure_uploader.AzureBackupUploader',
+    'local': 'cms.export.storage.LocalBackupStorage',
+    'memory': 'cms.export.storage.MemoryBackupStorage',
+}
+
+
+def get_backup_storage(backend=None, **kwargs):
+    """
+    Create the configured backup storage.
+
+    Args:
+        backend: "azure", "local", "memory" or a dotted path to a
+            BackupStorage subclass (default: BACKUP_STORAGE_BACKEND or "azure")
+        **kwargs: Passed to the backend constructor
+
+    Returns:
+        BackupStorage instance
+    """
+    if backend is None:
+        backend = getattr(settings, 'BACKUP_STORAGE_BACKEND', 'azure')
+    storage_class = import_string(BACKENDS.get(backend, backend))
+    return storage_class(**kwargs)
+
+
+def backup_storage_configured():
+    """
+    Check whether the configured backup storage can be used.
+
+    Azure needs credentials; the local and in-memory backends are always
+    available.
+    """
+    if getattr(settings, 'BACKUP_STORAGE_BACKEND', 'azure') != 'azure':
+        return True
+    return bool(getattr(settings, 'AZURE_ACCOUNT_NAME', None) and getattr(settings, 'AZURE_ACCOUNT_KEY', None))
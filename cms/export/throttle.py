@@ -0,0 +1,207 @@
+"""
+Throttling for low-impact static exports.
+
+This module contains the ExportThrottle class that limits how fast the
+exporter renders pages, so an export can run on the same host that serves
+live traffic without hurting response times.
+"""
+
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+
+def db_latency_probe():
+    """
+    Default metrics hook: measure the round-trip time of a trivial query.
+
+    A slow ``SELECT 1`` is a cheap and backend-agnostic signal that the
+    database is busy.
+
+    Returns:
+        dict: Metrics with a ``db_latency_ms`` key
+    """
+    start = time.monotonic()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    return {'db_latency_ms': (time.monotonic() - start) * 1000}
+
+
+def lower_process_priority(verbose=False):
+    """
+    Lower the CPU and IO priority of the current process.
+
+    CPU priority uses ``os.nice``. IO priority uses psutil when it is
+    installed (idle class on Linux); otherwise it is left untouched.
+
+    Args:
+        verbose: If True, print what was changed
+    """
+    try:
+        os.nice(10)
+        if verbose:
+            print('CPU priority lowered (nice +10)')
+    except (AttributeError, OSError) as e:
+        if verbose:
+            print(f'Warning: Could not lower CPU priority: {e}')
+
+    try:
+        import psutil
+    except ImportError:
+        if verbose:
+            print('psutil not installed, IO priority unchanged')
+        return
+
+    try:
+        process = psutil.Process()
+        if hasattr(psutil, 'IOPRIO_CLASS_IDLE'):
+            process.ionice(psutil.IOPRIO_CLASS_IDLE)
+        else:
+            process.ionice(psutil.IOPRIO_VERYLOW)
+        if verbose:
+            print('IO priority lowered')
+    except (AttributeError, OSError, psutil.Error) as e:
+        if verbose:
+            print(f'Warning: Could not lower IO priority: {e}')
+
+
+class ExportThrottle:
+    """
+    Rate limiter with adaptive backoff for page rendering.
+
+    The throttle:
+    1. Spaces page renders so they never exceed ``rate_limit`` pages/second
+    2. Caps the number of pages rendered at the same time
+    3. Periodically polls a metrics hook and halves the rate when request
+       latency or DB latency exceed their targets (multiplicative decrease)
+    4. Recovers the rate step by step while the host is healthy
+       (additive increase)
+    """
+
+    def __init__(self, rate_limit=None, max_concurrency=None, metrics_hook=None,
+                 latency_target_ms=None, db_latency_target_ms=None, check_interval=10,
+                 min_rate=0.2, verbose=False, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the throttle.
+
+        Args:
+            rate_limit: Maximum pages per second (default: STATIC_EXPORT_RATE_LIMIT or 5)
+            max_concurrency: Maximum pages rendered at once (default: STATIC_EXPORT_MAX_CONCURRENCY or 1)
+            metrics_hook: Callable or dotted path returning a dict with ``latency_ms``
+                and/or ``db_latency_ms`` (default: STATIC_EXPORT_METRICS_HOOK or db_latency_probe)
+            latency_target_ms: Request latency (p95) above which the export backs off
+            db_latency_target_ms: DB latency above which the export backs off
+            check_interval: Number of pages between metrics checks
+            min_rate: Lower bound for the adaptive rate (pages per second)
+            verbose: If True, print rate adjustments
+            clock: Monotonic clock function
+            sleep: Sleep function
+
+        Raises:
+            ValueError: If ``rate_limit`` or ``min_rate`` is not positive
+        """
+        if rate_limit is None:
+            rate_limit = getattr(settings, 'STATIC_EXPORT_RATE_LIMIT', 5)
+        if max_concurrency is None:
+            max_concurrency = getattr(settings, 'STATIC_EXPORT_MAX_CONCURRENCY', 1)
+        if metrics_hook is None:
+            metrics_hook = getattr(settings, 'STATIC_EXPORT_METRICS_HOOK', db_latency_probe)
+        if isinstance(metrics_hook, str):
+            metrics_hook = import_string(metrics_hook)
+        if latency_target_ms is None:
+            latency_target_ms = getattr(settings, 'STATIC_EXPORT_LATENCY_TARGET_MS', 500)
+        if db_latency_target_ms is None:
+            db_latency_target_ms = getattr(settings, 'STATIC_EXPORT_DB_LATENCY_TARGET_MS', 50)
+
+        if float(rate_limit) <= 0:
+            raise ValueError(f'rate_limit must be greater than 0, got {rate_limit}')
+        if float(min_rate) <= 0:
+            raise ValueError(f'min_rate must be greater than 0, got {min_rate}')
+
+        self.rate_limit = float(rate_limit)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.metrics_hook = metrics_hook
+        self.latency_target_ms = latency_target_ms
+        self.db_latency_target_ms = db_latency_target_ms
+        self.check_interval = max(1, int(check_interval))
+        self.min_rate = min(float(min_rate), self.rate_limit)
+        self.verbose = verbose
+        self.clock = clock
+        self.sleep = sleep
+
+        self.current_rate = self.rate_limit
+        self.backoffs = 0
+        self._lock = threading.Lock()
+        self._next_slot = None
+        self._pages_since_check = 0
+
+    def wait(self):
+        """
+        Block until the next page may be rendered.
+
+        Safe to call from several render threads; each call reserves the
+        next free time slot.
+        """
+        with self._lock:
+            self._pages_since_check += 1
+            if self._pages_since_check >= self.check_interval:
+                self._pages_since_check = 0
+                self._adjust_rate()
+
+            now = self.clock()
+            if self._next_slot is None or self._next_slot < now:
+                self._next_slot = now
+            delay = self._next_slot - now
+            self._next_slot += 1.0 / self.current_rate
+
+        if delay > 0:
+            self.sleep(delay)
+
+    def _adjust_rate(self):
+        """Poll the metrics hook and adapt the current rate."""
+        if self.metrics_hook is None:
+            return
+
+        try:
+            metrics = self.metrics_hook() or {}
+        except Exception as e:
+            if self.verbose:
+                print(f'Warning: Metrics hook failed: {e}')
+            return
+
+        if self._is_overloaded(metrics):
+            new_rate = max(self.min_rate, self.current_rate / 2)
+            if new_rate < self.current_rate:
+                self.backoffs += 1
+                if self.verbose:
+                    print(f'Host under load {metrics}, backing off to {new_rate:.2f} pages/s')
+            self.current_rate = new_rate
+        elif self.current_rate < self.rate_limit:
+            self.current_rate = min(self.rate_limit, self.current_rate + max(self.rate_limit / 10, 0.1))
+            if self.verbose:
+                print(f'Host healthy, rate raised to {self.current_rate:.2f} pages/s')
+
+    def _is_overloaded(self, metrics):
+        """
+        Check metrics against the configured targets.
+
+        Args:
+            metrics: Dict returned by the metrics hook
+
+        Returns:
+            bool: True if any metric exceeds its target
+        """
+        latency = metrics.get('latency_ms')
+        if latency is not None and self.latency_target_ms and latency > self.latency_target_ms:
+            return True
+
+        db_latency = metrics.get('db_latency_ms')
+        if db_latency is not None and self.db_latency_target_ms and db_latency > self.db_latency_target_ms:
+            return True
+
+        return False
@@ -0,0 +1,388 @@
+"""
+Cola de tareas en segundo plano sobre la base de datos (sin broker externo).
+
+Las tareas se registran con ``@job_task("nombre")`` y se encolan con
+``enqueue("nombre", **kwargs)``; los workers (``manage.py run_jobs``) las
+ejecutan por prioridad. Cada tarea recibe el Job como primer argumento para
+informar del progreso con ``job.set_progress(fracción, mensaje)``.
+
+- Prioridades: mayor ``priority`` se ejecuta antes; a igualdad, la más antigua.
+- Reintentos: un fallo se reintenta hasta ``max_attempts`` veces con espera
+  exponencial (JOBS_RETRY_DELAY segundos, duplicándose en cada intento).
+- Deduplicación: encolar una tarea idéntica (mismo nombre y argumentos) a una
+  pendiente devuelve la existente, subiéndole la prioridad si hace falta.
+- Tareas colgadas: una tarea "running" sin terminar tras JOBS_TIMEOUT
+  segundos (p. ej. por un worker muerto) vuelve a la cola.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# Intentos de enqueue() cuando la tarea duplicada desaparece mientras se busca
+ENQUEUE_ATTEMPTS = 5
+
+
+def job_task(name):
+    """
+    Registra una función como tarea de la cola.
+
+    La función recibe el Job y los argumentos con los que se encoló
+    (serializables en JSON); lo que devuelva se guarda en ``Job.result``.
+    """
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def dedupe_key(task, kwargs):
+    """Clave de deduplicación: hash del nombre de la tarea y sus argumentos."""
+    payload = json.dumps([task, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def enqueue(task, priority=0, max_attempts=3, delay=0, dedupe=True, **kwargs):
+    """
+    Encola una tarea.
+
+    Args:
+        task: Nombre de una tarea registrada con @job_task
+        priority: Mayor valor = se ejecuta antes
+        max_attempts: Intentos antes de marcarla como fallida
+        delay: Segundos hasta que pueda ejecutarse (agrupa publicaciones seguidas)
+        dedupe: Si True, reutiliza una tarea idéntica pendiente
+        **kwargs: Argumentos de la tarea
+
+    Returns:
+        Job: La tarea creada o la pendiente que ya existía
+    """
+    from cms.models import Job
+
+    if task not in TASKS:
+        raise ValueError(f"Tarea no registrada: {task}")
+
+    key = dedupe_key(task, kwargs) if dedupe else ""
+    run_after = timezone.now() + timedelta(seconds=delay)
+    for attempt in range(ENQUEUE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return Job.objects.create(
+                    task=task,
+                    kwargs=kwargs,
+                    priority=priority,
+                    max_attempts=max_attempts,
+                    run_after=run_after,
+                    dedupe_key=key,
+                )
+        except IntegrityError:
+            if attempt == ENQUEUE_ATTEMPTS - 1:
+                raise
+        try:
+            job = Job.objects.get(dedupe_key=key, status=Job.STATUS_PENDING)
+        except Job.DoesNotExist:
+            # Un worker ha reservado la pendiente entre el INSERT y el SELECT:
+            # ya no hay duplicado, así que se vuelve a intentar crearla
+            continue
+        if priority > job.priority:
+            Job.objects.filter(pk=job.pk).update(priority=priority)
+            job.priority = priority
+        return job
+
+
+def claim_next_job(worker):
+    """
+    Reserva la siguiente tarea ejecutable para un worker.
+
+    La reserva es un UPDATE condicionado al estado "pending", así que dos
+    workers nunca ejecutan la misma tarea, también en SQLite.
+
+    Returns:
+        Job or None
+    """
+    from cms.models import Job
+
+    while True:
+        candidate = (
+            Job.objects.filter(status=Job.STATUS_PENDING, run_after__lte=timezone.now())
+            .order_by("-priority", "run_after", "id")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if candidate is None:
+            return None
+        claimed = Job.objects.filter(pk=candidate, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=candidate)
+
+
+def run_job(job):
+    """
+    Ejecuta una tarea reservada y guarda el resultado.
+
+    Los fallos se reintentan con espera exponencial hasta ``max_attempts``.
+    Si al reintentar ya hay otra tarea idéntica pendiente, esta se da por
+    fallida (la pendiente hará el trabajo).
+    """
+    from cms.models import Job
+
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"Tarea no registrada: {job.task}")
+        result = func(job, **job.kwargs)
+    except Exception as e:
+        logger.exception("Error en la tarea %s", job)
+        error = f"{type(e).__name__}: {e}"
+        update = {"error": error, "finished_at": timezone.now()}
+        if job.attempts < job.max_attempts:
+            retry_delay = getattr(settings, "JOBS_RETRY_DELAY", 30) * 2 ** (job.attempts - 1)
+            update.update(status=Job.STATUS_PENDING, run_after=timezone.now() + timedelta(seconds=retry_delay))
+        else:
+            update.update(status=Job.STATUS_FAILED)
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(**update)
+        except IntegrityError:
+            update.update(status=Job.STATUS_FAILED, error=error + " (reemplazada por una tarea idéntica pendiente)")
+            Job.objects.filter(pk=job.pk).update(**update)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.STATUS_SUCCEEDED,
+        result=result,
+        error="",
+        progress=1,
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Devuelve a la cola las tareas "running" que llevan demasiado tiempo.
+
+    Returns:
+        int: Número de tareas reencoladas (o marcadas como fallidas si ya
+            agotaron sus intentos)
+    """
+    from cms.models import Job
+
+    if timeout is None:
+        timeout = getattr(settings, "JOBS_TIMEOUT", 3600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, started_at__lt=cutoff)
+
+    count = 0
+    for job in stale:
+        status = Job.STATUS_PENDING if job.attempts < job.max_attempts else Job.STATUS_FAILED
+        try:
+            with transaction.atomic():
+                count += Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING).update(
+                    status=status, error=f"Tiempo agotado en el worker {job.worker}"
+                )
+        except IntegrityError:
+            count += Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_FAILED, error="Tiempo agotado (reemplazada por una tarea idéntica pendiente)"
+            )
+    return count
+
+
+def run_worker(name=None, poll_interval=None, burst=False, max_jobs=None):
+    """
+    Bucle de un worker: ejecuta tareas hasta recibir SIGTERM/SIGINT.
+
+    Args:
+        name: Identificador del worker (por defecto host:pid)
+        poll_interval: Segundos de espera cuando no hay tareas (JOBS_POLL_INTERVAL o 2)
+        burst: Si True, termina cuando la cola está vacía
+        max_jobs: Termina tras ejecutar este número de tareas
+
+    Returns:
+        int: Número de tareas ejecutadas
+    """
+    if name is None:
+        name = f"{socket.gethostname()}:{os.getpid()}"
+    if poll_interval is None:
+        poll_interval = getattr(settings, "JOBS_POLL_INTERVAL", 2)
+
+    stopping = []
+
+    def stop(signum, frame):
+        # Termina la tarea en curso antes de salir
+        stopping.append(signum)
+
+    previous_handlers = {}
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            previous_handlers[signum] = signal.signal(signum, stop)
+        except ValueError:
+            # No estamos en el hilo principal
+            pass
+
+    processed = 0
+    last_stale_check = 0
+    try:
+        while not stopping and (max_jobs is None or processed < max_jobs):
+            close_old_connections()
+            if time.monotonic() - last_stale_check > 60:
+                requeue_stale_jobs()
+                last_stale_check = time.monotonic()
+
+            job = claim_next_job(name)
+            if job is None:
+                if burst:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            run_job(job)
+            processed += 1
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        close_old_connections()
+    return processed
+
+
+# ---------------------------------------------------------------------------
+# Tareas del CMS
+# ---------------------------------------------------------------------------
+
+@job_task("export_site")
+def export_site_task(job, site, output_dir=None, zip=True, upload=False, delta=False,
+                     full_every=None, exclude_media=False):
+    """
+    Exporta un site a HTML estático (como ``export_static_site``).
+
+    Por defecto crea el ZIP; ``upload`` lo sube además a Azure.
+    """
+    from cms.export.azure_uploader import AzureBackupUploader
+    from cms.export.exporter import StaticSiteExporter
+
+    if output_dir is None:
+        output_dir = os.path.join(getattr(settings, "JOBS_EXPORT_DIR", "/tmp/export"), str(site))
+
+    exporter = StaticSiteExporter(
+        site_id_or_hostname=site,
+        output_dir=output_dir,
+        exclude_media=exclude_media,
+    )
+    job.set_progress(0.05, f"Exportando {exporter.site.hostname}")
+    exporter.export()
+
+    result = {
+        "site": exporter.site.hostname,
+        "output_dir": str(output_dir),
+        "pages_exported": exporter.pages_exported,
+        "pages_failed": exporter.pages_failed,
+    }
+    if zip:
+        job.set_progress(0.7, "Creando ZIP")
+        zip_path = exporter.create_zip(delta=delta, full_every=full_every)
+        result["zip_path"] = str(zip_path)
+        if upload:
+            job.set_progress(0.85, "Subiendo a Azure")
+            result["url"] = AzureBackupUploader().upload(zip_path)
+    return result
+
+
+@job_task("upload_backup")
+def upload_backup_task(job, zip_path):
+    """Sube a Azure un ZIP ya creado."""
+    from cms.export.azure_uploader import AzureBackupUploader
+
+    job.set_progress(0.1, f"Subiendo {zip_path}")
+    return {"url": AzureBackupUploader().upload(zip_path)}
+
+
+@job_task("generate_renditions")
+def generate_renditions_task(job, image_ids, filters=None):
+    """Genera de antemano las renditions de unas imágenes (JOBS_RENDITION_FILTERS)."""
+    from wagtail.images import get_image_model
+
+    if filters is None:
+        filters = getattr(settings, "JOBS_RENDITION_FILTERS", ["width-400", "width-800"])
+
+    images = list(get_image_model().objects.filter(pk__in=image_ids))
+    generated = 0
+    for index, image in enumerate(images):
+        for filter_spec in filters:
+            image.get_rendition(filter_spec)
+            generated += 1
+        job.set_progress((index + 1) / len(images), f"{index + 1}/{len(images)} imágenes")
+    return {"images": len(images), "renditions": generated}
+
+
+@job_task("mirror_dependents")
+def mirror_dependents_task(job, page_id):
+    """
+    Renderiza en el mirror estático las páginas que dependen de una página.
+
+    La encolan las señales de publicación (cms.signals), que solo renderizan
+    la página editada; aquí se renderizan sus ancestros y, si la página está
+    en el menú, el resto de páginas del mirror.
+    """
+    from wagtail.models import Page
+
+    from cms.export.mirror import StaticMirror
+
+    page = Page.objects.filter(pk=page_id).first()
+    if page is None:
+        return {"rendered": 0}
+
+    job.set_progress(0.1, f"Renderizando dependientes de {page.url_path}")
+    return {"rendered": len(StaticMirror().publish_dependents(page))}
+
+
+@job_task("warm_cache")
+def warm_cache_task(job, page_id):
+    """
+    Renderiza una página publicada y sus ancestros para calentar cachés.
+
+    Las peticiones se hacen con el cliente de pruebas de Django contra el
+    hostname del site, como el exporter, sin pasar por la red. Llevan la
+    cabecera del exporter para que el mirror estático no las responda desde
+    disco sin renderizar nada.
+    """
+    from wagtail.models import Page
+
+    from cms.export.exporter import export_client
+
+    page = Page.objects.live().filter(pk=page_id).first()
+    if page is None:
+        return {"warmed": 0}
+
+    client = export_client()
+    pages = list(page.get_ancestors(inclusive=True).live().filter(depth__gt=1))
+    warmed = 0
+    for index, target in enumerate(pages):
+        url_parts = target.get_url_parts()
+        if url_parts is None:
+            continue
+        _site_id, root_url, path = url_parts
+        host = root_url.split("://", 1)[-1].split("/", 1)[0] if root_url else "localhost"
+        response = client.get(path, HTTP_HOST=host)
+        if response.status_code == 200:
+            warmed += 1
+        job.set_progress((index + 1) / len(pages), path)
+    return {"warmed": warmed}
@@ -0,0 +1,144 @@
+"""
+Management command to benchmark the backup storage backends.
+
+Runs the same workload (upload, list, retention, signed URLs) against each
+backend so the numbers are comparable. The local and in-memory backends
+need no cloud account; Azure is only measured when requested.
+
+Usage:
+    python manage.py benchmark_backup_storage
+    python manage.py benchmark_backup_storage --backend=local --size-mb=256 --runs=5
+    python manage.py benchmark_backup_storage --backend=memory --backend=local --backend=azure
+"""
+
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cms.export import ExportError
+from cms.export.storage import get_backup_storage
+
+
+def run_storage_benchmark(storage, zip_path, runs=3, count=20):
+    """
+    Measure one storage backend.
+
+    Args:
+        storage: BackupStorage instance (an empty, dedicated container)
+        zip_path: Archive uploaded in each run
+        runs: Number of timed uploads
+        count: Number of backups present when timing list/retention
+
+    Returns:
+        dict: ``upload_mb_s`` (median), ``list_ms``, ``prune_ms`` and ``sas_us``
+    """
+    size_mb = Path(zip_path).stat().st_size / (1024 * 1024)
+
+    upload_times = []
+    for run in range(runs):
+        run_path = Path(zip_path).with_name(f'offline-backup-bench.local-20000101-{run:04d}.zip')
+        os.replace(zip_path, run_path)
+        start = time.perf_counter()
+        storage.upload(run_path)
+        upload_times.append(time.perf_counter() - start)
+        os.replace(run_path, zip_path)
+
+    # Fill the container so listing and pruning have work to do
+    for index in range(runs, count):
+        storage.upload_stream(f'offline-backup-bench.local-20000102-{index:04d}.zip', lambda f: f.write(b'x'))
+
+    start = time.perf_counter()
+    listed = storage.list_backups()
+    list_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for name in listed[:100]:
+        storage.generate_sas_url(name)
+    sas_us = (time.perf_counter() - start) * 1_000_000 / max(1, min(100, len(listed)))
+
+    start = time.perf_counter()
+    storage.delete_old_backups(keep_count=0)
+    prune_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'upload_mb_s': size_mb / statistics.median(upload_times),
+        'list_ms': list_ms,
+        'listed': len(listed),
+        'prune_ms': prune_ms,
+        'sas_us': sas_us,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark backup storage backends with the same workload'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            action='append',
+            help='Backend to measure: memory, local, azure or a dotted path (repeatable; default: memory and local)'
+        )
+        parser.add_argument(
+            '--size-mb',
+            type=float,
+            default=64,
+            help='Size of the uploaded archive in MB (default: 64)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Timed uploads per backend; the median is reported (default: 3)'
+        )
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=20,
+            help='Backups in the container when timing list and retention (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        backends = options['backend'] or ['memory', 'local']
+        size_bytes = int(options['size_mb'] * 1024 * 1024)
+        container = f'benchmark-{os.getpid()}'
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            zip_path = Path(tmpdir) / 'archive.zip'
+            with open(zip_path, 'wb') as f:
+                remaining = size_bytes
+                while remaining > 0:
+                    chunk = os.urandom(min(remaining, 1024 * 1024))
+                    f.write(chunk)
+                    remaining -= len(chunk)
+
+            self.stdout.write(
+                f'{"backend":<10} {"upload MB/s":>12} {"list ms":>10} {"prune ms":>10} {"sas us":>8}'
+            )
+            for backend in backends:
+                kwargs = {'container_name': container}
+                if backend == 'local':
+                    kwargs['root'] = Path(tmpdir) / 'storage'
+                try:
+                    storage = get_backup_storage(backend, **kwargs)
+                    try:
+                        result = run_storage_benchmark(storage, zip_path, options['runs'], options['count'])
+                    finally:
+                        self._cleanup(storage, container)
+                except (ExportError, ImportError) as e:
+                    raise CommandError(f'{backend}: {e}')
+
+                self.stdout.write(
+                    f'{backend:<10} {result["upload_mb_s"]:>12.1f} {result["list_ms"]:>10.2f} '
+                    f'{result["prune_ms"]:>10.2f} {result["sas_us"]:>8.1f}'
+                )
+
+    def _cleanup(self, storage, container):
+        """Remove the benchmark container (the local one goes with the temp dir)."""
+        if hasattr(storage, 'blob_service'):
+            storage.blob_service.delete_container(container)
+        elif hasattr(storage, 'blobs'):
+            storage.blobs.clear()
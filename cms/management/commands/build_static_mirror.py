@@ -0,0 +1,61 @@
+"""
+Management command to (re)build the static mirror of one or all sites.
+
+Publishing keeps the mirror up to date page by page; this command fills
+it for the first time or after template/static changes.
+
+Usage:
+    python manage.py build_static_mirror
+    python manage.py build_static_mirror --site=madmusic.iccmu.es --clear
+"""
+
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+from wagtail.models import Site
+
+from cms.export import ExportError
+from cms.export.mirror import StaticMirror
+
+
+class Command(BaseCommand):
+    help = 'Render live pages into the static mirror (STATIC_MIRROR_ROOT)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site',
+            type=str,
+            help='Site ID or hostname to mirror (default: all sites)'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Remove the existing mirror of each site before rendering'
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Enable verbose output'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mirror = StaticMirror(verbose=options['verbose'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        sites = Site.objects.all()
+        if options['site']:
+            site_filter = options['site']
+            sites = sites.filter(id=int(site_filter)) if site_filter.isdigit() else sites.filter(hostname=site_filter)
+            if not sites.exists():
+                raise CommandError(f'Site not found: {site_filter}')
+
+        for site in sites:
+            if options['clear']:
+                shutil.rmtree(mirror.root / site.hostname, ignore_errors=True)
+
+            exporter = mirror.publish_site(site)
+            self.stdout.write(self.style.SUCCESS(
+                f'{site.hostname}: {exporter.pages_exported} pages mirrored ({exporter.pages_failed} failed)'
+            ))
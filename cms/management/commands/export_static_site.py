@@ -6,12 +6,19 @@ HTML archive that can be browsed offline without a web server.
 
 Usage:
     python manage.py export_static_site --site=1 --output=/tmp/export --zip
-    python manage.py export_static_site --site=madmusic --upload-azure --verbose
+    python manage.py export_static_site --site=madmusic --zip --upload-azure --verbose
+    python manage.py export_static_site --site=madmusic --stream-azure
+    python manage.py export_static_site --site=madmusic --zip --delta --full-every=7 --upload-azure
+    python manage.py export_static_site --site=madmusic --throttle --rate-limit=2 --low-priority
+    python manage.py export_static_site --site=madmusic --output=/tmp/export --root-page=noticias
+    python manage.py export_static_site --site=madmusic --zip --upload-azure --enqueue
 """
 
 from django.core.management.base import BaseCommand, CommandError
 from cms.export.exporter import StaticSiteExporter
 from cms.export.azure_uploader import AzureBackupUploader
+from cms.export.throttle import ExportThrottle, lower_process_priority
+from cms.jobs import enqueue
 
 
 class Command(BaseCommand):
@@ -40,11 +47,80 @@ class Command(BaseCommand):
             action='store_true',
             help='Upload the ZIP to Azure Blob Storage (requires --zip)'
         )
+        parser.add_argument(
+            '--stream-azure',
+            action='store_true',
+            help='Stream the export as a ZIP straight to Azure without writing it to disk '
+                 '(add --zip to also keep a local copy of the ZIP)'
+        )
+        parser.add_argument(
+            '--delta',
+            action='store_true',
+            help='Only archive files changed since the previous backup (requires --zip; '
+                 'restore with the restore_backup command)'
+        )
+        parser.add_argument(
+            '--full-every',
+            type=int,
+            help='In --delta mode, create a full backup every N backups (default: BACKUP_FULL_EVERY or 7)'
+        )
         parser.add_argument(
             '--exclude-media',
             action='store_true',
             help='Skip copying media files (reduces export size)'
         )
+        parser.add_argument(
+            '--root-page',
+            type=str,
+            help='Export only this subtree (page ID or URL path, e.g. "noticias") and merge it into --output'
+        )
+        parser.add_argument(
+            '--pages',
+            type=str,
+            help='Comma-separated page IDs or URL paths to export and merge into --output'
+        )
+        parser.add_argument(
+            '--low-memory',
+            action='store_true',
+            help='Bounded-memory mode: stream pages in chunks and spill media references to disk'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Pages fetched per database query in --low-memory mode (default: 200)'
+        )
+        parser.add_argument(
+            '--throttle',
+            action='store_true',
+            help='Low-impact mode: limit render rate and back off when the host is under load'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            help='Maximum pages rendered per second (implies --throttle)'
+        )
+        parser.add_argument(
+            '--max-concurrency',
+            type=int,
+            help='Maximum pages rendered at the same time (implies --throttle)'
+        )
+        parser.add_argument(
+            '--low-priority',
+            action='store_true',
+            help='Lower the CPU/IO priority of the export process'
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Queue the export as a background job for run_jobs instead of running it now'
+        )
+        parser.add_argument(
+            '--priority',
+            type=int,
+            default=0,
+            help='Priority of the queued job, higher runs first (with --enqueue)'
+        )
         parser.add_argument(
             '--verbose',
             action='store_true',
@@ -56,15 +132,43 @@ class Command(BaseCommand):
             # Validate options
             if options['upload_azure'] and not options['zip']:
                 raise CommandError('--upload-azure requires --zip')
+            if options['stream_azure'] and (options['root_page'] or options['pages']):
+                raise CommandError('--stream-azure cannot be combined with --root-page/--pages')
+            if options['delta'] and (not options['zip'] or options['stream_azure']):
+                raise CommandError('--delta requires --zip and cannot be combined with --stream-azure')
+
+            if options['enqueue']:
+                return self._enqueue(options)
+
+            if options['low_priority']:
+                lower_process_priority(verbose=options['verbose'])
+
+            throttle = None
+            if options['throttle'] or options['rate_limit'] or options['max_concurrency']:
+                throttle = ExportThrottle(
+                    rate_limit=options['rate_limit'],
+                    max_concurrency=options['max_concurrency'],
+                    verbose=options['verbose']
+                )
 
             # Create exporter
             exporter = StaticSiteExporter(
                 site_id_or_hostname=options['site'],
                 output_dir=options['output'],
                 exclude_media=options['exclude_media'],
-                verbose=options['verbose']
+                verbose=options['verbose'],
+                throttle=throttle,
+                root_page=options['root_page'],
+                page_selectors=[
+                    selector.strip() for selector in (options['pages'] or '').split(',') if selector.strip()
+                ],
+                low_memory=options['low_memory'],
+                chunk_size=options['chunk_size']
             )
 
+            if options['stream_azure']:
+                return self._stream_to_azure(exporter, options)
+
             # Run export
             self.stdout.write(self.style.SUCCESS(
                 f'Starting export of site: {options["site"]}'
@@ -77,7 +181,7 @@ class Command(BaseCommand):
             # Create ZIP if requested
             if options['zip']:
                 self.stdout.write('Creating ZIP archive...')
-                zip_path = exporter.create_zip()
+                zip_path = exporter.create_zip(delta=options['delta'], full_every=options['full_every'])
                 self.stdout.write(self.style.SUCCESS(
                     f'ZIP created: {zip_path}'
                 ))
@@ -93,3 +197,40 @@ class Command(BaseCommand):
 
         except Exception as e:
             raise CommandError(f'Export failed: {str(e)}')
+
+    def _enqueue(self, options):
+        """Queue the export as an export_site job."""
+        if options['stream_azure'] or options['root_page'] or options['pages']:
+            raise CommandError('--enqueue cannot be combined with --stream-azure/--root-page/--pages')
+
+        job = enqueue(
+            'export_site',
+            priority=options['priority'],
+            site=options['site'],
+            output_dir=options['output'],
+            zip=options['zip'],
+            upload=options['upload_azure'],
+            delta=options['delta'],
+            full_every=options['full_every'],
+            exclude_media=options['exclude_media'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Queued export job #{job.pk} ({job.get_status_display()})'))
+
+    def _stream_to_azure(self, exporter, options):
+        """Export straight into a ZIP blob, optionally keeping a local copy."""
+        blob_name = exporter.archive_filename()
+        local_copy = None
+        if options['zip']:
+            local_copy = exporter.output_dir.parent / blob_name
+            local_copy.parent.mkdir(parents=True, exist_ok=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Streaming export of site {options["site"]} to Azure as {blob_name}'
+        ))
+        uploader = AzureBackupUploader()
+        url = uploader.upload_stream(blob_name, exporter.export_to_archive, local_copy=local_copy)
+        self.stdout.write(self.style.SUCCESS(
+            f'Uploaded to Azure: {url} ({uploader.blocks_uploaded} blocks)'
+        ))
+        if local_copy:
+            self.stdout.write(self.style.SUCCESS(f'ZIP created: {local_copy}'))
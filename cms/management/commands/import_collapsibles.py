@@ -4,6 +4,7 @@ a las páginas de Wagtail correspondientes.
 
 Uso:
     python manage.py import_collapsibles [--dry-run] [--page-slug SLUG]
+    python manage.py import_collapsibles --input data/collapsibles.jsonl
 """
 
 import json
@@ -11,9 +12,9 @@ import re
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
 from django.utils.text import slugify
-from bs4 import BeautifulSoup
 
 from cms.models import StandardPage
+from core.extraction import PANEL_BODY_XPATH, parse_document, soup_html
 
 
 class Command(BaseCommand):
@@ -35,6 +36,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Sobrescribir contenido existente',
         )
+        parser.add_argument(
+            '--input',
+            type=str,
+            help='JSON o JSON Lines generado por scripts/extract_collapsibles.py '
+                 '(default: data/collapsibles.json)',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
@@ -42,13 +49,24 @@ class Command(BaseCommand):
         force = options['force']
         
         # Cargar el JSON con los acordeones extraídos
-        json_path = Path(__file__).parent.parent.parent.parent / 'data' / 'collapsibles.json'
+        base_dir = Path(__file__).parent.parent.parent.parent
+        json_path = Path(options['input']) if options.get('input') else base_dir / 'data' / 'collapsibles.json'
+        if not json_path.is_absolute():
+            json_path = base_dir / json_path
         
         if not json_path.exists():
             raise CommandError(f'No se encontró el archivo {json_path}')
         
         with open(json_path, 'r', encoding='utf-8') as f:
-            collapsibles_data = json.load(f)
+            if json_path.suffix == '.jsonl':
+                # Una página por línea, con su page_key
+                collapsibles_data = {}
+                for line in f:
+                    if line.strip():
+                        page_data = json.loads(line)
+                        collapsibles_data[page_data.pop('page_key')] = page_data
+            else:
+                collapsibles_data = json.load(f)
         
         # Mapeo de archivos HTML a slugs de páginas
         # Basado en las páginas existentes en la base de datos
@@ -117,8 +135,9 @@ class Command(BaseCommand):
                 # Construir el StreamField con los acordeones
                 accordions_list = []
                 for accordion in page_data['accordions']:
-                    # Limpiar el HTML del contenido
-                    content_html = self.clean_html_for_richtext(accordion['content_html'])
+                    # Contenido ya limpio en el corpus (JSON antiguos: limpiar aquí)
+                    content_html = accordion.get('content_inner_html') or \
+                        self.clean_html_for_richtext(accordion['content_html'])
                     
                     # ListBlock no necesita el wrapper type/value
                     accordions_list.append({
@@ -175,15 +194,15 @@ class Command(BaseCommand):
         Returns:
             HTML limpio compatible con Wagtail
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
+        root = parse_document(html_content)
         
         # Encontrar el div.panel-body y extraer su contenido
-        panel_body = soup.find('div', class_='panel-body')
+        panel_body = root.xpath(PANEL_BODY_XPATH) if root is not None else []
         if not panel_body:
             return html_content
         
         # Obtener todo el contenido interno
-        content = ''.join(str(child) for child in panel_body.children)
+        content = soup_html(panel_body[0], inner=True)
         
         # Limpiar espacios en blanco excesivos
         content = re.sub(r'\n\s*\n', '\n\n', content)
@@ -1,6 +1,7 @@
 """
 Management command para importar imágenes scrapeadas a Wagtail Images
 """
+import hashlib
 import os
 import re
 from pathlib import Path
@@ -12,6 +13,7 @@ from django.core.management.base import BaseCommand
 from wagtail.images.models import Image
 
 from cms.models import NewsPage
+from core.image_store import MAP_NAME, ImageStore
 from core.models import Entrada
 
 
@@ -47,6 +49,16 @@ class Command(BaseCommand):
             help="Importar todas las imágenes del directorio scrapeado a Wagtail",
         )
 
+    def get_image_store(self, images_dir):
+        """ImageStore del directorio scrapeado, o None si no tiene image_map.json"""
+        if not hasattr(self, "_image_stores"):
+            self._image_stores = {}
+        images_path = Path(images_dir)
+        if images_path not in self._image_stores:
+            has_map = (images_path / MAP_NAME).exists()
+            self._image_stores[images_path] = ImageStore(images_path) if has_map else None
+        return self._image_stores[images_path]
+
     def find_image_file(self, image_name, images_dir, static_dir):
         """
         Buscar archivo de imagen en los directorios disponibles
@@ -67,6 +79,13 @@ class Command(BaseCommand):
         # Buscar en directorio scrapeado primero
         images_path = Path(images_dir)
         if images_path.exists():
+            # Fichero canónico según image_map.json (variantes y duplicados ya resueltos)
+            store = self.get_image_store(images_path)
+            if store is not None:
+                resolved = store.resolve(image_name)
+                if resolved is not None:
+                    return resolved
+
             # Buscar archivo exacto
             exact_match = images_path / image_name
             if exact_match.exists():
@@ -121,6 +140,13 @@ class Command(BaseCommand):
         if existing:
             return existing
 
+        # Verificar si ya existe el mismo contenido (Wagtail guarda el SHA-1)
+        with open(image_path, 'rb') as f:
+            file_hash = hashlib.sha1(f.read()).hexdigest()
+        existing = Image.objects.filter(file_hash=file_hash).first()
+        if existing:
+            return existing
+
         if dry_run:
             self.stdout.write(f"  [DRY-RUN] Importaría: {image_path.name} -> {title}")
             return None
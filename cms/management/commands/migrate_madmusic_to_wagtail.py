@@ -4,15 +4,29 @@ Comando para migrar datos de Madmusic desde core.models a Wagtail CMS.
 Uso:
     python manage.py migrate_madmusic_to_wagtail --dry-run  # Simulación
     python manage.py migrate_madmusic_to_wagtail --apply     # Aplicar cambios
+    python manage.py migrate_madmusic_to_wagtail --apply --skip-revisions
+
+Las páginas y noticias se planifican en memoria y se guardan en bloque con
+cms.page_tree.PageTreeBuilder (sin add_child por página), así que migrar
+miles de páginas lleva segundos.
 """
 
+import time
+
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 from django.utils import timezone
 from wagtail.models import Site, Page
+from wagtail.rich_text import RichText
 from wagtail.contrib.redirects.models import Redirect
 from core.models import Proyecto, Entrada, Pagina
 from cms.models import HomePage, StandardPage, NewsIndexPage, NewsPage
+from cms.page_tree import PageTreeBuilder
+
+
+def stream_body(html):
+    """Cuerpo de StandardPage (StreamField) con el HTML en un bloque de párrafo"""
+    return [("paragraph", RichText(html))]
 
 
 class Command(BaseCommand):
@@ -29,6 +43,11 @@ class Command(BaseCommand):
             action="store_true",
             help="Aplicar la migración (requerido para hacer cambios)",
         )
+        parser.add_argument(
+            "--skip-revisions",
+            action="store_true",
+            help="No crear revisiones de las páginas migradas (más rápido)",
+        )
 
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
@@ -179,7 +198,12 @@ class Command(BaseCommand):
             else:
                 self.stdout.write("✓ NewsIndexPage 'noticias' existente")
 
-        # 4. Migrar Páginas → StandardPage
+        # 4 y 5. Planificar páginas y noticias en memoria y guardarlas en bloque
+        builder = PageTreeBuilder(root_page, revisions=not options["skip_revisions"])
+        if news_index:
+            news_index = builder.child(root_page, "noticias")
+        started = time.perf_counter()
+
         self.stdout.write("\n=== MIGRANDO PÁGINAS → STANDARDPAGE ===")
         
         if proyecto:
@@ -187,7 +211,7 @@ class Command(BaseCommand):
             paginas_migradas = 0
             
             for pagina in paginas:
-                self._migrate_pagina(pagina, root_page, dry_run)
+                self._migrate_pagina(builder, pagina, root_page, dry_run)
                 paginas_migradas += 1
             
             self.stdout.write(
@@ -198,7 +222,6 @@ class Command(BaseCommand):
         else:
             self.stdout.write("  (No hay páginas para migrar)")
 
-        # 5. Migrar Entradas → NewsPage
         self.stdout.write("\n=== MIGRANDO ENTRADAS → NEWSPAGE ===")
         
         if proyecto and news_index:
@@ -206,7 +229,7 @@ class Command(BaseCommand):
             entradas_migradas = 0
             
             for entrada in entradas:
-                self._migrate_entrada(entrada, news_index, dry_run)
+                self._migrate_entrada(builder, entrada, news_index, dry_run)
                 entradas_migradas += 1
             
             self.stdout.write(
@@ -220,6 +243,19 @@ class Command(BaseCommand):
             elif not news_index:
                 self.stdout.write("  (No hay entradas para migrar - NewsIndexPage no creada)")
 
+        if not dry_run and len(builder):
+            stats = builder.save()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✓ Guardadas {stats['created']} páginas nuevas y {stats['updated']} actualizadas "
+                    f"en {time.perf_counter() - started:.2f}s"
+                )
+            )
+            self.stdout.write(
+                "  (El mirror estático no se actualiza en la migración: "
+                "ejecuta 'python manage.py build_static_mirror')"
+            )
+
         # 6. Crear redirects 301
         self.stdout.write("\n=== CREANDO REDIRECTS 301 ===")
         
@@ -243,8 +279,8 @@ class Command(BaseCommand):
                 self.style.SUCCESS("Migración completada exitosamente!")
             )
 
-    def _migrate_pagina(self, pagina, root_page, dry_run):
-        """Migra una Pagina a StandardPage respetando jerarquía de slugs"""
+    def _migrate_pagina(self, builder, pagina, root_page, dry_run):
+        """Planifica una Pagina como StandardPage respetando jerarquía de slugs"""
         slug_parts = pagina.slug.split("/")
         slug_parts = [s for s in slug_parts if s]  # Eliminar vacíos
         
@@ -254,88 +290,74 @@ class Command(BaseCommand):
             )
             return
 
-        # Construir jerarquía de páginas padre
+        # Construir jerarquía de páginas padre (excepto la última, que es la página real)
         current_parent = root_page
-        created_pages = []
         
-        # Crear páginas padre si no existen (excepto la última que es la página real)
-        for i, slug_part in enumerate(slug_parts[:-1]):
-            parent_slug = slug_part
+        for parent_slug in slug_parts[:-1]:
+            parent_page = builder.child(current_parent, parent_slug)
             
-            if dry_run:
-                existing = StandardPage.objects.child_of(current_parent).filter(slug=parent_slug).first()
-                if existing:
-                    current_parent = existing
-                    self.stdout.write(f"  [DRY-RUN] Padre existente: {current_parent.url_path}")
-                else:
-                    self.stdout.write(f"  [DRY-RUN] Se crearía padre: {parent_slug}")
-                    # Simular creación
-                    created_pages.append(parent_slug)
-            else:
-                # Buscar si ya existe
-                parent_page = StandardPage.objects.child_of(current_parent).filter(slug=parent_slug).first()
-                
-                if not parent_page:
-                    # Crear nueva página padre
-                    parent_page = StandardPage(
-                        title=parent_slug.replace("-", " ").title(),
-                        slug=parent_slug,
-                        body="<p>Página contenedora creada automáticamente durante la migración.</p>",
-                    )
-                    current_parent.add_child(instance=parent_page)
-                    parent_page.save_revision().publish()
-                    created_pages.append(parent_slug)
-                
-                current_parent = parent_page
+            if parent_page is None:
+                parent_page = builder.add(current_parent, StandardPage(
+                    title=parent_slug.replace("-", " ").title(),
+                    slug=parent_slug,
+                    body=stream_body("<p>Página contenedora creada automáticamente durante la migración.</p>"),
+                ))
+                if dry_run:
+                    self.stdout.write(f"  [DRY-RUN] Se crearía padre: {parent_page.url_path}")
+            elif dry_run:
+                self.stdout.write(f"  [DRY-RUN] Padre existente: {parent_page.url_path}")
+            
+            current_parent = parent_page
 
         # Crear/actualizar la página final
         final_slug = slug_parts[-1]
+        existing = builder.child(current_parent, final_slug)
+        
+        if existing is not None and not isinstance(existing, StandardPage):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  ⚠ {existing.url_path} ya existe y no es una StandardPage: {pagina.titulo}"
+                )
+            )
+            return
+        
+        # El body es un StreamField: el HTML va en un bloque de párrafo (RichText)
+        body_content = stream_body(pagina.cuerpo if pagina.cuerpo else "<p></p>")
         
         if dry_run:
-            existing = StandardPage.objects.child_of(current_parent).filter(slug=final_slug).first()
             if existing:
                 self.stdout.write(
                     f"  [DRY-RUN] Página existente: {pagina.titulo} → {existing.url_path}"
                 )
             else:
+                # Se planifica igualmente para que las páginas hijas la encuentren
+                page = builder.add(current_parent, StandardPage(title=pagina.titulo, slug=final_slug))
                 self.stdout.write(
-                    f"  [DRY-RUN] Se crearía: {pagina.titulo} → {current_parent.url_path}{final_slug}/"
+                    f"  [DRY-RUN] Se crearía: {pagina.titulo} → {page.url_path}"
                 )
+        elif existing:
+            # Actualizar si ya existe
+            builder.update(existing, title=pagina.titulo, body=body_content)
+            self.stdout.write(
+                f"  ✓ Actualizada: {pagina.titulo} → {existing.url_path}"
+            )
         else:
-            # Buscar si ya existe
-            existing = StandardPage.objects.child_of(current_parent).filter(slug=final_slug).first()
-            
-            # Convertir HTML a RichText (Wagtail lo maneja automáticamente)
-            body_content = pagina.cuerpo if pagina.cuerpo else "<p></p>"
-            
-            if existing:
-                # Actualizar si ya existe
-                existing.title = pagina.titulo
-                existing.body = body_content
-                existing.save()
-                existing.save_revision().publish()
-                self.stdout.write(
-                    f"  ✓ Actualizada: {pagina.titulo} → {existing.url_path}"
-                )
-            else:
-                # Crear nueva página
-                page = StandardPage(
-                    title=pagina.titulo,
-                    slug=final_slug,
-                    body=body_content,
-                )
-                current_parent.add_child(instance=page)
-                page.save_revision().publish()
-                self.stdout.write(
-                    f"  ✓ Creada: {pagina.titulo} → {page.url_path}"
-                )
+            # Crear nueva página
+            page = builder.add(current_parent, StandardPage(
+                title=pagina.titulo,
+                slug=final_slug,
+                body=body_content,
+            ))
+            self.stdout.write(
+                f"  ✓ Creada: {pagina.titulo} → {page.url_path}"
+            )
 
-    def _migrate_entrada(self, entrada, news_index, dry_run):
-        """Migra una Entrada a NewsPage bajo NewsIndexPage"""
+    def _migrate_entrada(self, builder, entrada, news_index, dry_run):
+        """Planifica una Entrada como NewsPage bajo NewsIndexPage"""
         slug = entrada.slug
+        existing = builder.child(news_index, slug)
         
         if dry_run:
-            existing = NewsPage.objects.child_of(news_index).filter(slug=slug).first()
             if existing:
                 self.stdout.write(
                     f"  [DRY-RUN] Noticia existente: {entrada.titulo} → {existing.url_path}"
@@ -344,49 +366,46 @@ class Command(BaseCommand):
                 self.stdout.write(
                     f"  [DRY-RUN] Se crearía: {entrada.titulo} → /noticias/{slug}/"
                 )
+            return
+        
+        # Convertir HTML a RichText
+        body_content = entrada.cuerpo if entrada.cuerpo else "<p></p>"
+        intro_content = entrada.resumen[:250] if entrada.resumen else ""
+        
+        # Publicar con fecha original
+        first_published_at = None
+        if entrada.fecha_publicacion:
+            first_published_at = timezone.make_aware(
+                timezone.datetime.combine(entrada.fecha_publicacion, timezone.datetime.min.time())
+            )
+        
+        if existing:
+            # Actualizar si ya existe
+            fields = {
+                "title": entrada.titulo,
+                "date": entrada.fecha_publicacion,
+                "intro": intro_content,
+                "body": body_content,
+            }
+            if first_published_at:
+                fields["first_published_at"] = first_published_at
+            news_page = builder.update(existing, **fields)
+            self.stdout.write(
+                f"  ✓ Actualizada: {entrada.titulo} → {news_page.url_path}"
+            )
         else:
-            # Buscar si ya existe
-            existing = NewsPage.objects.child_of(news_index).filter(slug=slug).first()
-            
-            # Convertir HTML a RichText
-            body_content = entrada.cuerpo if entrada.cuerpo else "<p></p>"
-            intro_content = entrada.resumen[:250] if entrada.resumen else ""
-            
-            if existing:
-                # Actualizar si ya existe
-                existing.title = entrada.titulo
-                existing.date = entrada.fecha_publicacion
-                existing.intro = intro_content
-                existing.body = body_content
-                existing.save()
-                news_page = existing
-            else:
-                # Crear nueva NewsPage
-                news_page = NewsPage(
-                    title=entrada.titulo,
-                    slug=slug,
-                    date=entrada.fecha_publicacion,
-                    intro=intro_content,
-                    body=body_content,
-                )
-                news_index.add_child(instance=news_page)
-            
-            # Publicar con fecha original
-            revision = news_page.save_revision()
-            if entrada.fecha_publicacion:
-                news_page.first_published_at = timezone.make_aware(
-                    timezone.datetime.combine(entrada.fecha_publicacion, timezone.datetime.min.time())
-                )
-            revision.publish()
-            
-            if existing:
-                self.stdout.write(
-                    f"  ✓ Actualizada: {entrada.titulo} → {news_page.url_path}"
-                )
-            else:
-                self.stdout.write(
-                    f"  ✓ Creada: {entrada.titulo} → {news_page.url_path}"
-                )
+            # Crear nueva NewsPage
+            news_page = builder.add(news_index, NewsPage(
+                title=entrada.titulo,
+                slug=slug,
+                date=entrada.fecha_publicacion,
+                intro=intro_content,
+                body=body_content,
+                first_published_at=first_published_at,
+            ))
+            self.stdout.write(
+                f"  ✓ Creada: {entrada.titulo} → {news_page.url_path}"
+            )
 
     def _create_redirects(self, proyecto, dry_run):
         """Crea redirects 301 para URLs antiguas de entradas"""
@@ -402,6 +421,16 @@ class Command(BaseCommand):
             )
             return 0
         
+        # Una consulta para las noticias y otra para los redirects existentes
+        news_pages = {}
+        existing_paths = set()
+        new_redirects = []
+        if not dry_run:
+            news_index = NewsIndexPage.objects.filter(slug="noticias").first()
+            if news_index:
+                news_pages = {page.slug: page for page in NewsPage.objects.child_of(news_index)}
+            existing_paths = set(Redirect.objects.filter(site=site).values_list("old_path", flat=True))
+        
         for entrada in entradas:
             # Determinar old_path
             # Prioridad: url_original si existe y es fiable, sino usar /<slug>/
@@ -439,24 +468,20 @@ class Command(BaseCommand):
                 redirects_count += 1
             else:
                 # Buscar la NewsPage correspondiente
-                news_index = NewsIndexPage.objects.filter(slug="noticias").first()
-                if news_index:
-                    news_page = NewsPage.objects.child_of(news_index).filter(slug=entrada.slug).first()
-                    
-                    if news_page:
-                        redirect, created = Redirect.objects.get_or_create(
-                            old_path=old_path,
-                            site=site,
-                            defaults={
-                                "redirect_page": news_page,
-                                "is_permanent": True,
-                            },
-                        )
-                        if created:
-                            redirects_count += 1
-                            self.stdout.write(
-                                f"  ✓ Redirect: {old_path} → {new_path}"
-                            )
+                news_page = news_pages.get(entrada.slug)
+                
+                if news_page and old_path not in existing_paths:
+                    existing_paths.add(old_path)
+                    new_redirects.append(
+                        Redirect(old_path=old_path, site=site, redirect_page=news_page, is_permanent=True)
+                    )
+                    redirects_count += 1
+                    self.stdout.write(
+                        f"  ✓ Redirect: {old_path} → {new_path}"
+                    )
+
+        if new_redirects:
+            Redirect.objects.bulk_create(new_redirects)
 
         return redirects_count
 
@@ -4,165 +4,42 @@ Management command para poblar páginas de Wagtail desde contenido HTML scrapead
 import re
 from pathlib import Path
 
-from bs4 import BeautifulSoup
 from django.core.management.base import BaseCommand
 
 from cms.models import StandardPage, HomePage
+from core.corpus import CorpusStore
 
 
-def clean_html_for_wagtail(html_content):
+def content_for_wagtail(document):
     """
-    Limpia y adapta HTML scrapeado para RichTextField de Wagtail
+    Adapta un documento del corpus preprocesado para RichTextField de Wagtail
+
+    La extracción (región principal, sidebars, clases de Bootstrap y URLs
+    del sitio original) ya está hecha en core/corpus.py.
 
     Args:
-        html_content: String con HTML crudo
+        document: CorpusDocument
 
     Returns:
-        String con HTML limpio y adaptado
+        tuple: (titulo, contenido_html)
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    # Remover elementos no deseados
-    for tag in soup.find_all(["script", "style", "nav", "header", "footer", "aside"]):
-        tag.decompose()
-
-    # Remover atributos de clases Bootstrap y otros atributos innecesarios
-    # pero conservar estructura semántica
-    for tag in soup.find_all(True):
-        # Remover clases de Bootstrap pero conservar otras clases útiles
-        if tag.get('class'):
-            classes = tag.get('class', [])
-            # Filtrar clases de Bootstrap pero conservar clases semánticas
-            filtered_classes = [c for c in classes if not any(
-                bootstrap_class in c.lower() for bootstrap_class in 
-                ['container', 'row', 'col-md', 'col-sm', 'col-xs', 'col-lg', 'offset']
-            )]
-            if filtered_classes:
-                tag['class'] = filtered_classes
-            else:
-                del tag['class']
-        
-        # Remover otros atributos innecesarios pero conservar id si es útil
-        attrs_to_remove = ['style', 'data-', 'role']
-        for attr in list(tag.attrs.keys()):
-            if any(attr.startswith(prefix) for prefix in attrs_to_remove):
-                del tag[attr]
-
-    # Convertir URLs absolutas a relativas
-    html_str = str(soup)
-
-    # Imágenes: convertir URLs de WordPress a rutas estáticas
-    html_str = re.sub(
-        r'src="https://madmusic\.iccmu\.es/wp-content/uploads/([^"]+)"',
-        r'src="/static/madmusic/images/\1"',
-        html_str
-    )
-
-    # Links internos: convertir URLs absolutas a relativas
-    html_str = re.sub(
-        r'href="https://madmusic\.iccmu\.es/([^"]+)"',
-        r'href="/madmusic/\1"',
-        html_str
-    )
+    titulo = document.title or "Página"
+    contenido = document.body or "<p>Contenido de la página</p>"
 
     # Limpiar múltiples espacios y saltos de línea innecesarios
-    html_str = re.sub(r'\n\s*\n\s*\n+', '\n\n', html_str)
-    html_str = re.sub(r' +', ' ', html_str)
+    contenido = re.sub(r'\n\s*\n\s*\n+', '\n\n', contenido)
+    contenido = re.sub(r' +', ' ', contenido)
 
-    # Asegurar que el HTML tenga estructura válida
     # Si no tiene etiquetas de párrafo, envolver texto en <p>
-    if not re.search(r'<[ph]', html_str, re.IGNORECASE):
-        # Es texto plano, convertir a párrafos
-        paragraphs = [p.strip() for p in html_str.split('\n\n') if p.strip()]
-        html_str = '\n'.join([f'<p>{p}</p>' for p in paragraphs])
-
-    return html_str
-
-
-def extract_content_from_html(html_path):
-    """
-    Extrae título y contenido principal de un archivo HTML scrapeado
-
-    Args:
-        html_path: Path al archivo HTML
-
-    Returns:
-        tuple: (titulo, contenido_html) o (None, None) si hay error
-    """
-    try:
-        with open(html_path, "r", encoding="utf-8") as f:
-            html_content = f.read()
-
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        # Extraer título
-        titulo = None
-        for selector in ["h1", "h2.title", ".entry-title", "title"]:
-            elem = soup.select_one(selector)
-            if elem:
-                titulo = elem.get_text(strip=True)
-                titulo = re.sub(r"\s+", " ", titulo)
-                # Limpiar título si contiene "ICCMU" o "MadMusic"
-                if "ICCMU" in titulo or "MadMusic" in titulo:
-                    parts = titulo.split("|")
-                    if len(parts) > 1:
-                        titulo = parts[0].strip()
-                if len(titulo) > 200:
-                    titulo = titulo[:200]
-                break
-
-        if not titulo:
-            titulo = "Página"
-
-        # Extraer contenido principal
-        contenido = None
-        main_section = soup.find("section", id="tools")
-        if main_section:
-            # Remover elementos no deseados
-            for elem in main_section.find_all(["script", "style", "nav", "header", "footer", "aside"]):
-                elem.decompose()
-            # Remover contenedores innecesarios pero conservar el contenido interno
-            # Buscar el contenido real dentro de section#tools
-            content_container = main_section.find("article") or main_section.find("div", class_="pagina-detalle") or main_section.find("div", class_="content")
-            if content_container:
-                contenido = str(content_container)
-            else:
-                # Si no hay contenedor específico, buscar en divs con contenido
-                # Buscar divs con clase col-md que contengan el contenido principal
-                content_divs = main_section.find_all("div", class_=lambda x: x and any(c in ["col-md-9", "col-md-10", "col-md-12"] for c in x))
-                if content_divs:
-                    # Tomar el div más grande o el que tenga más contenido
-                    contenido = str(max(content_divs, key=lambda d: len(str(d))))
-                else:
-                    # Usar todo el section
-                    contenido = str(main_section)
-        
-        if not contenido:
-            # Buscar en article o main
-            article = soup.find("article") or soup.find("main")
-            if article:
-                for elem in article.find_all(["script", "style", "nav", "header", "footer", "aside"]):
-                    elem.decompose()
-                # Buscar contenido dentro de article
-                content_div = article.find("div", class_="pagina-detalle") or article.find("div", class_="content")
-                if content_div:
-                    contenido = str(content_div)
-                else:
-                    contenido = str(article)
-            else:
-                contenido = "<p>Contenido de la página</p>"
-
-        # Limpiar y adaptar para Wagtail
-        contenido = clean_html_for_wagtail(contenido)
+    if not re.search(r'<[ph]', contenido, re.IGNORECASE):
+        paragraphs = [p.strip() for p in contenido.split('\n\n') if p.strip()]
+        contenido = '\n'.join([f'<p>{p}</p>' for p in paragraphs])
 
-        # Limitar tamaño si es muy grande
-        if len(contenido) > 100000:
-            contenido = contenido[:100000] + "<p>...</p>"
+    # Limitar tamaño si es muy grande
+    if len(contenido) > 100000:
+        contenido = contenido[:100000] + "<p>...</p>"
 
-        return titulo, contenido
-
-    except Exception as e:
-        return None, None
+    return titulo, contenido
 
 
 class Command(BaseCommand):
@@ -236,6 +113,9 @@ class Command(BaseCommand):
             "contacto": "contacto.html",
         }
 
+        # Corpus preprocesado (solo se vuelve a parsear lo que ha cambiado)
+        corpus = CorpusStore.open(scraped_dir)
+
         pages_updated = 0
         pages_not_found = 0
         pages_skipped = 0
@@ -275,14 +155,15 @@ class Command(BaseCommand):
                     pages_not_found += 1
                     continue
 
-            # Extraer contenido
-            titulo, contenido = extract_content_from_html(html_path)
-            if not titulo or not contenido:
+            # Contenido ya extraído en el corpus preprocesado
+            document = corpus.get(html_path.relative_to(scraped_dir))
+            if document is None:
                 self.stdout.write(
                     self.style.WARNING(f"  ⚠ Error extrayendo: {slug}")
                 )
                 pages_not_found += 1
                 continue
+            titulo, contenido = content_for_wagtail(document)
 
             # Buscar página en Wagtail
             # Las páginas están bajo home_page con jerarquía de slugs
@@ -0,0 +1,66 @@
+"""
+Management command to apply the backup retention policy.
+
+Keeps the last backups and one backup per day, ISO week and month for
+each site (BACKUP_RETENTION), plus everything kept delta backups depend
+on, and deletes the rest from the backup storage in batches.
+
+Usage:
+    python manage.py prune_backups --dry-run
+    python manage.py prune_backups --daily=7 --weekly=4 --monthly=12
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cms.export import ExportError
+from cms.export.retention import RetentionPolicy
+from cms.export.storage import get_backup_storage
+
+
+class Command(BaseCommand):
+    help = 'Delete stored backups not kept by the daily/weekly/monthly retention policy'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--last',
+            type=int,
+            help='Most recent backups always kept per site (default: BACKUP_RETENTION or 1)'
+        )
+        parser.add_argument(
+            '--daily',
+            type=int,
+            help='Days with one backup kept (default: BACKUP_RETENTION or 7)'
+        )
+        parser.add_argument(
+            '--weekly',
+            type=int,
+            help='Weeks with one backup kept (default: BACKUP_RETENTION or 4)'
+        )
+        parser.add_argument(
+            '--monthly',
+            type=int,
+            help='Months with one backup kept (default: BACKUP_RETENTION or 12)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the backups that would be deleted'
+        )
+
+    def handle(self, *args, **options):
+        policy = RetentionPolicy.from_settings(
+            last=options['last'],
+            daily=options['daily'],
+            weekly=options['weekly'],
+            monthly=options['monthly']
+        )
+
+        try:
+            deleted = get_backup_storage().apply_retention(policy, dry_run=options['dry_run'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        for name in deleted:
+            self.stdout.write(f'{verb} {name}')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(deleted)} backup(s) with {policy!r}'))
@@ -0,0 +1,52 @@
+"""
+Management command to restore a backup archive, replaying delta chains.
+
+A full backup is simply extracted. For a delta backup the full backup it
+is based on and every delta in between are looked up in the same
+directory and applied in order.
+
+Usage:
+    python manage.py restore_backup /tmp/offline-backup-madmusic.iccmu.es-20250103-0300-delta.zip --output=/tmp/restored
+    python manage.py restore_backup /tmp/offline-backup-madmusic.iccmu.es-20250101-0300.zip --output=/tmp/restored --no-verify
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cms.export import ExportError
+from cms.export.delta import restore_backup_chain
+
+
+class Command(BaseCommand):
+    help = 'Restore a backup archive, replaying the delta chain it depends on'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'archive',
+            help='Backup ZIP to restore (full or delta)'
+        )
+        parser.add_argument(
+            '--output',
+            required=True,
+            help='Directory to restore into'
+        )
+        parser.add_argument(
+            '--no-verify',
+            action='store_true',
+            help='Skip checking the restored files against the backup manifest'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            chain = restore_backup_chain(
+                options['archive'],
+                options['output'],
+                verify=not options['no_verify']
+            )
+        except ExportError as e:
+            raise CommandError(f'Restore failed: {e}')
+
+        for path in chain:
+            self.stdout.write(f'Applied {path.name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Restored {len(chain)} archive(s) into {options["output"]}'
+        ))
@@ -0,0 +1,88 @@
+"""
+Management command to run background job workers (see cms.jobs).
+
+Workers poll the cms_job table, so no broker is needed. With --processes
+several workers run in separate processes; SIGTERM/SIGINT lets each one
+finish its current job before exiting.
+
+Usage:
+    python manage.py run_jobs
+    python manage.py run_jobs --processes=4
+    python manage.py run_jobs --burst
+"""
+
+import multiprocessing
+import os
+import socket
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from cms.jobs import requeue_stale_jobs, run_worker
+
+
+def _worker_process(index, poll_interval, burst):
+    """Entry point of a forked worker process."""
+    name = f'{socket.gethostname()}:{os.getpid()}:{index}'
+    run_worker(name=name, poll_interval=poll_interval, burst=burst)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers from the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Worker processes to run (default: 1)'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for new jobs'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds between polls when the queue is empty (default: JOBS_POLL_INTERVAL or 2)'
+        )
+        parser.add_argument(
+            '--requeue-stale',
+            action='store_true',
+            help='Only requeue jobs stuck in "running" longer than JOBS_TIMEOUT and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_stale']:
+            count = requeue_stale_jobs()
+            self.stdout.write(self.style.SUCCESS(f'Requeued {count} stale job(s)'))
+            return
+
+        processes = max(1, options['processes'])
+        if processes == 1:
+            processed = run_worker(poll_interval=options['poll_interval'], burst=options['burst'])
+            self.stdout.write(self.style.SUCCESS(f'Worker stopped after {processed} job(s)'))
+            return
+
+        # Each process must open its own database connection
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=_worker_process,
+                args=(index, options['poll_interval'], options['burst'])
+            )
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {processes} worker processes'))
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # Workers got the signal too and finish their current job
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('All workers stopped'))
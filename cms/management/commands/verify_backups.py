@@ -0,0 +1,102 @@
+"""
+Management command to verify the integrity of backup archives.
+
+Checks the local backups (BACKUP_DIR) and the ones in the configured
+backup storage in parallel. Remote archives are read with ranged
+requests, without downloading them to disk.
+
+Usage:
+    python manage.py verify_backups
+    python manage.py verify_backups --location=azure --workers=8
+    python manage.py verify_backups --site=madmusic.iccmu.es --latest
+"""
+
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cms.export import ExportError
+from cms.export.catalog import get_backup_catalog
+from cms.export.storage import backup_storage_configured, get_backup_storage
+from cms.export.verify import verify_backups
+
+
+class Command(BaseCommand):
+    help = 'Verify local and stored backup archives against their embedded manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--location',
+            choices=['local', 'azure', 'all'],
+            default='all',
+            help='Backups to verify: local, azure (the backup storage backend) or all (default)'
+        )
+        parser.add_argument(
+            '--site',
+            help='Only backups of this hostname'
+        )
+        parser.add_argument(
+            '--latest',
+            action='store_true',
+            help='Only the most recent backup of each location'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Archives verified in parallel (default: 4)'
+        )
+
+    def handle(self, *args, **options):
+        catalog = get_backup_catalog()
+        catalog.invalidate()
+        locations = ['local', 'azure'] if options['location'] == 'all' else [options['location']]
+
+        storage = None
+        targets = []
+        for location in locations:
+            if location == 'azure':
+                if not backup_storage_configured():
+                    if options['location'] == 'azure':
+                        raise CommandError('Backup storage is not configured')
+                    continue
+                try:
+                    storage = get_backup_storage()
+                except ExportError as e:
+                    raise CommandError(str(e))
+
+            entries = [
+                entry for entry in catalog.entries(location)
+                if not options['site'] or entry['site'] == options['site']
+            ]
+            if options['latest']:
+                entries = entries[:1]
+            for entry in entries:
+                if location == 'local':
+                    opener = partial(open, entry['path'], 'rb')
+                else:
+                    opener = partial(storage.open_backup, entry['name'])
+                targets.append((location, entry['name'], opener))
+
+        if not targets:
+            self.stdout.write('No backups to verify')
+            return
+
+        results = verify_backups(targets, workers=options['workers'])
+
+        failed = 0
+        for result in results:
+            label = f'[{result["location"]}] {result["name"]}'
+            if result['ok']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'OK      {label} ({result["members"]} files, {result["kind"] or "no manifest"})'
+                ))
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'FAILED  {label}'))
+                for error in result['errors']:
+                    self.stdout.write(f'        {error}')
+
+        if failed:
+            raise CommandError(f'{failed} of {len(results)} backup(s) failed verification')
+        self.stdout.write(self.style.SUCCESS(f'{len(results)} backup(s) verified'))
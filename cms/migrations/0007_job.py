@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cms", "0006_homepage_background_gradient_end_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("task", models.CharField(help_text="Nombre de la tarea registrada en cms.jobs", max_length=100)),
+                ("kwargs", models.JSONField(blank=True, default=dict)),
+                ("priority", models.IntegerField(default=0, help_text="Mayor valor = se ejecuta antes")),
+                ("status", models.CharField(choices=[("pending", "Pendiente"), ("running", "En curso"), ("succeeded", "Completada"), ("failed", "Fallida")], default="pending", max_length=10)),
+                ("dedupe_key", models.CharField(blank=True, default="", max_length=64)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("max_attempts", models.PositiveIntegerField(default=3)),
+                ("run_after", models.DateTimeField(default=django.utils.timezone.now)),
+                ("progress", models.FloatField(default=0)),
+                ("progress_message", models.CharField(blank=True, default="", max_length=255)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, default="")),
+                ("worker", models.CharField(blank=True, default="", max_length=100)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [models.Index(fields=["status", "-priority", "run_after"], name="cms_job_queue_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="job",
+            constraint=models.UniqueConstraint(condition=models.Q(("status", "pending"), models.Q(("dedupe_key", ""), _negated=True)), fields=("dedupe_key",), name="cms_job_unique_pending"),
+        ),
+    ]
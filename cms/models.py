@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django import forms
 from wagtail.models import Page
 from wagtail.fields import RichTextField, StreamField
@@ -193,3 +194,66 @@ class NewsPage(Page):
 
     parent_page_types = ["cms.NewsIndexPage"]
 
+
+
+class Job(models.Model):
+    """
+    Tarea en segundo plano de la cola en base de datos (ver cms.jobs).
+
+    Los workers (``manage.py run_jobs``) ejecutan primero las de mayor
+    prioridad. Solo puede haber una tarea pendiente por ``dedupe_key``.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pendiente"),
+        (STATUS_RUNNING, "En curso"),
+        (STATUS_SUCCEEDED, "Completada"),
+        (STATUS_FAILED, "Fallida"),
+    ]
+
+    task = models.CharField(max_length=100, help_text="Nombre de la tarea registrada en cms.jobs")
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0, help_text="Mayor valor = se ejecuta antes")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    dedupe_key = models.CharField(max_length=64, blank=True, default="")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.FloatField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True, default="")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    worker = models.CharField(max_length=100, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "-priority", "run_after"], name="cms_job_queue_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status="pending") & ~models.Q(dedupe_key=""),
+                name="cms_job_unique_pending",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
+
+    def set_progress(self, progress, message=""):
+        """
+        Guarda el progreso de la tarea (0-1) y un mensaje opcional.
+
+        Se guarda directamente con update() para no pisar otros campos.
+        """
+        self.progress = max(0.0, min(1.0, float(progress)))
+        self.progress_message = message[:255]
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, progress_message=self.progress_message)
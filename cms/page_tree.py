@@ -0,0 +1,240 @@
+"""
+Construcción en bloque de árboles de páginas de Wagtail.
+
+``add_child`` calcula la ruta de treebeard consultando el último hijo,
+inserta la página, actualiza ``numchild`` del padre y, con
+``save_revision().publish()``, escribe además revisión, página otra vez y
+registro de auditoría: varias consultas por página. Para migraciones de
+miles de páginas eso son minutos.
+
+``PageTreeBuilder`` carga una vez el subárbol existente bajo una raíz y
+planifica en memoria las páginas nuevas y las actualizaciones:
+
+- Las rutas de treebeard se calculan a partir del último hijo conocido de
+  cada padre, sin consultas.
+- ``save()`` inserta las páginas nuevas con un INSERT por lotes por tabla y
+  tipo de contenido (``bulk_create`` no admite herencia multitabla), ajusta
+  ``numchild`` de los padres existentes en una pasada, actualiza las
+  páginas existentes con ``bulk_update`` y, salvo ``revisions=False``, crea
+  las revisiones publicadas también en bloque.
+- Las páginas quedan publicadas e indexadas en la búsqueda, pero no se
+  envían las señales ``page_published`` ni se escribe el registro de
+  auditoría; el mirror estático se regenera aparte (``build_static_mirror``).
+
+Uso:
+    builder = PageTreeBuilder(home)
+    padre = builder.child(home, "equipo") or builder.add(home, StandardPage(title="Equipo", slug="equipo"))
+    builder.add(padre, StandardPage(title="Participantes", slug="participantes"))
+    builder.save()
+"""
+
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.utils import timezone
+from wagtail.models import Page, Revision
+from wagtail.search.backends import get_search_backends
+
+# bulk_update genera un CASE por fila: con lotes grandes la consulta crece demasiado
+UPDATE_BATCH = 200
+
+
+class PageTreeBuilder:
+    """Planifica y guarda en bloque páginas bajo una raíz de Wagtail."""
+
+    def __init__(self, root, revisions=True):
+        """
+        Args:
+            root: Página raíz del subárbol (ya guardada)
+            revisions: Crear una revisión publicada por cada página nueva o
+                actualizada, como ``save_revision().publish()``
+        """
+        self.root = root
+        self.revisions = revisions
+        self.now = timezone.now()
+        self.created = []
+        self.updated = {}
+        self._pages = {}
+        self._last_step = defaultdict(int)
+        self._numchild_changed = {}
+
+        pages = [root] + list(Page.objects.descendant_of(root).specific())
+        for page in pages:
+            self._pages[page.url_path] = page
+            if page.depth > root.depth:
+                parent_path = page.path[:-Page.steplen]
+                step = Page._str2int(page.path[-Page.steplen:])
+                self._last_step[parent_path] = max(self._last_step[parent_path], step)
+
+    def __len__(self):
+        """Páginas pendientes de guardar (nuevas y actualizadas)."""
+        return len(self.created) + len(self.updated)
+
+    def child(self, parent, slug):
+        """Hijo de ``parent`` con ese slug (existente o planificado), o None."""
+        return self._pages.get(f"{parent.url_path}{slug}/")
+
+    def add(self, parent, page):
+        """
+        Planificar ``page`` (sin guardar) como último hijo de ``parent``.
+
+        ``parent`` puede ser una página existente o una planificada con
+        ``add``. La página queda publicada al guardar.
+
+        Returns:
+            La misma página, con ruta, profundidad y url_path asignados
+        """
+        # Usar siempre la instancia del árbol cargado para que numchild cuadre
+        parent = self._pages.get(parent.url_path, parent)
+        url_path = f"{parent.url_path}{page.slug}/"
+        if url_path in self._pages:
+            raise ValueError(f"Ya existe una página en {url_path}")
+
+        step = self._last_step[parent.path] + 1
+        self._last_step[parent.path] = step
+        page.depth = parent.depth + 1
+        page.path = Page._get_path(parent.path, page.depth, step)
+        page.numchild = 0
+        page.url_path = url_path
+        page.draft_title = page.title
+        page.locale_id = parent.locale_id
+        page.live = True
+        page.has_unpublished_changes = False
+        page.first_published_at = page.first_published_at or self.now
+        page.last_published_at = self.now
+
+        parent.numchild += 1
+        if parent.pk:
+            self._numchild_changed[parent.pk] = parent
+
+        self._pages[url_path] = page
+        self.created.append(page)
+        return page
+
+    def update(self, page, **fields):
+        """Cambiar campos de una página existente y publicarla al guardar."""
+        if page.pk is None:
+            # Planificada con add: basta con cambiar la instancia
+            for name, value in fields.items():
+                setattr(page, name, value)
+            if "title" in fields:
+                page.draft_title = page.title
+            return page
+
+        if "title" in fields:
+            fields["draft_title"] = fields["title"]
+        fields.update(live=True, has_unpublished_changes=False, last_published_at=self.now)
+        for name, value in fields.items():
+            setattr(page, name, value)
+        self.updated.setdefault(page, set()).update(fields)
+        return page
+
+    @transaction.atomic
+    def save(self):
+        """
+        Guardar todo lo planificado.
+
+        Returns:
+            dict: ``created`` y ``updated``
+        """
+        self._insert_pages()
+        if self._numchild_changed:
+            Page.objects.bulk_update(
+                [Page(pk=page.pk, numchild=page.numchild) for page in self._numchild_changed.values()],
+                ["numchild"],
+                batch_size=UPDATE_BATCH,
+            )
+
+        by_model = defaultdict(list)
+        for page, fields in self.updated.items():
+            by_model[(type(page), frozenset(fields))].append(page)
+        for (model, fields), pages in by_model.items():
+            model.objects.bulk_update(pages, sorted(fields), batch_size=UPDATE_BATCH)
+
+        if self.revisions:
+            self._create_revisions()
+        self._index()
+
+        stats = {"created": len(self.created), "updated": len(self.updated)}
+        self._numchild_changed = {}
+        self.created = []
+        self.updated = {}
+        return stats
+
+    def _insert_pages(self):
+        """INSERT por lotes de las páginas nuevas: primero la tabla de Page y luego la de cada tipo."""
+        if not self.created:
+            return
+
+        base_fields = Page._meta.concrete_fields
+        rows = [Page(**{field.attname: getattr(page, field.attname) for field in base_fields if not field.primary_key})
+                for page in self.created]
+        Page.objects.bulk_create(rows)
+        if any(row.pk is None for row in rows):
+            # La base de datos no devuelve los ids del INSERT por lotes
+            ids = dict(Page.objects.filter(path__in=[row.path for row in rows]).values_list("path", "id"))
+            for row in rows:
+                row.pk = ids[row.path]
+        for page, row in zip(self.created, rows):
+            page.pk = page.id = row.pk
+
+        by_model = defaultdict(list)
+        for page in self.created:
+            by_model[type(page)].append(page)
+        for model, pages in by_model.items():
+            for table in [*reversed(model._meta.get_parent_list()), model]:
+                if table is Page or table._meta.proxy:
+                    continue
+                for page in pages:
+                    setattr(page, table._meta.pk.attname, page.pk)
+                fields = table._meta.local_concrete_fields
+                batch_size = connection.ops.bulk_batch_size(fields, pages) or len(pages)
+                for start in range(0, len(pages), batch_size):
+                    table._base_manager._insert(pages[start:start + batch_size], fields=fields)
+
+    def _create_revisions(self):
+        """Una revisión publicada por página nueva o actualizada."""
+        pages = self.created + list(self.updated)
+        if not pages:
+            return
+
+        base_content_type = ContentType.objects.get_for_model(Page)
+        revisions = [
+            Revision(
+                content_type_id=page.content_type_id,
+                base_content_type=base_content_type,
+                object_id=str(page.pk),
+                created_at=self.now,
+                content=page.serializable_data(),
+                object_str=str(page),
+            )
+            for page in pages
+        ]
+        Revision.objects.bulk_create(revisions)
+        if any(revision.pk is None for revision in revisions):
+            ids = dict(
+                Revision.objects.filter(base_content_type=base_content_type, created_at=self.now,
+                                        object_id__in=[revision.object_id for revision in revisions])
+                .values_list("object_id", "id")
+            )
+            for revision in revisions:
+                revision.pk = ids[revision.object_id]
+
+        for page, revision in zip(pages, revisions):
+            page.latest_revision_id = page.live_revision_id = revision.pk
+        Page.objects.bulk_update(
+            [Page(pk=page.pk, latest_revision_id=page.latest_revision_id, live_revision_id=page.live_revision_id)
+             for page in pages],
+            ["latest_revision", "live_revision"],
+            batch_size=UPDATE_BATCH,
+        )
+
+    def _index(self):
+        """Indexar en la búsqueda lo que ``post_save`` habría indexado."""
+        by_model = defaultdict(list)
+        for page in self.created + list(self.updated):
+            by_model[type(page)].append(page)
+        for backend in get_search_backends(with_auto_update=True):
+            for model, pages in by_model.items():
+                backend.add_bulk(model, pages)
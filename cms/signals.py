@@ -0,0 +1,93 @@
+"""
+Señales del CMS: mantiene el mirror estático al publicar/despublicar/mover páginas.
+"""
+import logging
+
+from wagtail.signals import page_published, page_slug_changed, page_unpublished, post_page_move
+
+logger = logging.getLogger(__name__)
+
+
+def mirror_page_published(sender, instance, **kwargs):
+    """
+    Renderiza la página publicada en el mirror estático.
+
+    Solo la página se renderiza dentro de la petición de publicación; sus
+    dependientes (ancestros y, en el menú, todo el mirror) se encolan como
+    tarea ``mirror_dependents`` (ver cms.jobs).
+    """
+    from cms.export.mirror import StaticMirror
+
+    try:
+        StaticMirror().publish(instance, dependents=False)
+    except Exception:
+        # Un fallo del mirror nunca debe impedir publicar; la página se sirve dinámicamente
+        logger.exception("Error actualizando el mirror estático para la página %s", instance.pk)
+    enqueue_mirror_dependents(instance)
+
+
+def mirror_page_unpublished(sender, instance, **kwargs):
+    """Elimina la página despublicada del mirror estático y encola sus dependientes."""
+    from cms.export.mirror import StaticMirror
+
+    try:
+        StaticMirror().unpublish(instance, dependents=False)
+    except Exception:
+        logger.exception("Error eliminando la página %s del mirror estático", instance.pk)
+    enqueue_mirror_dependents(instance)
+
+
+def mirror_page_moved(sender, instance, parent_page_before, parent_page_after,
+                      url_path_before, url_path_after, **kwargs):
+    """
+    Traslada la página movida en el mirror estático.
+
+    Se borran los ficheros de la URL anterior, se renderiza el subárbol en la
+    nueva y se encolan los dependientes de la página y, si cambia de padre,
+    los del padre anterior, que la listaba.
+    """
+    from cms.export.mirror import StaticMirror
+
+    try:
+        mirror = StaticMirror()
+        mirror.move(instance, url_path_before, dependents=False)
+        if parent_page_before.pk != parent_page_after.pk:
+            mirror.publish(parent_page_before, dependents=False)
+    except Exception:
+        logger.exception("Error moviendo la página %s en el mirror estático", instance.pk)
+    enqueue_mirror_dependents(instance)
+    if parent_page_before.pk != parent_page_after.pk:
+        enqueue_mirror_dependents(parent_page_before)
+
+
+def mirror_page_slug_changed(sender, instance, instance_before, **kwargs):
+    """
+    Borra del mirror estático la URL anterior de una página cuyo slug ha cambiado.
+
+    Wagtail la envía al confirmar la transacción de la publicación; la página
+    (y su subárbol) se renderiza en la URL nueva.
+    """
+    from cms.export.mirror import StaticMirror
+
+    try:
+        StaticMirror().move(instance, instance_before.url_path, dependents=False)
+    except Exception:
+        logger.exception("Error moviendo la página %s en el mirror estático", instance.pk)
+
+
+def enqueue_mirror_dependents(page):
+    """Encola el renderizado de los dependientes de una página en el mirror."""
+    from cms.jobs import enqueue
+
+    try:
+        enqueue("mirror_dependents", priority=5, page_id=page.pk)
+    except Exception:
+        logger.exception("Error encolando los dependientes de la página %s en el mirror estático", page.pk)
+
+
+def connect_static_mirror_signals():
+    """Conecta los handlers del mirror estático a las señales de Wagtail."""
+    page_published.connect(mirror_page_published, dispatch_uid="cms_static_mirror_published")
+    page_unpublished.connect(mirror_page_unpublished, dispatch_uid="cms_static_mirror_unpublished")
+    post_page_move.connect(mirror_page_moved, dispatch_uid="cms_static_mirror_moved")
+    page_slug_changed.connect(mirror_page_slug_changed, dispatch_uid="cms_static_mirror_slug_changed")
@@ -2,15 +2,22 @@
 Views for CMS functionality including backup downloads.
 """
 
-from pathlib import Path
+from functools import wraps
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
+from django.contrib.auth.views import redirect_to_login
 from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
-from django.http import FileResponse, Http404, JsonResponse
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseRedirect, JsonResponse,
+    StreamingHttpResponse
+)
+from django.utils.http import http_date
 from django.views.decorators.http import require_GET
 
-from cms.export.azure_uploader import AzureBackupUploader
+from cms.export.catalog import get_backup_catalog
+from cms.export.storage import get_backup_storage, verify_backup_token
 
 
 @require_GET
@@ -25,25 +32,10 @@ def download_offline_backup(request):
         - User must be authenticated and staff
     
     Returns:
-        FileResponse with the latest backup ZIP
+        Latest backup ZIP (resumable with Range), sendfile offload or
+        redirect to Azure (see _latest_backup_response)
     """
-    backup_dir = Path(settings.BASE_DIR) / 'backups'
-    
-    # Create backup directory if it doesn't exist
-    backup_dir.mkdir(exist_ok=True)
-    
-    # Find latest backup
-    backups = sorted(backup_dir.glob('offline-backup-*.zip'), reverse=True)
-    if not backups:
-        raise Http404("No hay backups disponibles")
-    
-    latest_backup = backups[0]
-    
-    return FileResponse(
-        open(latest_backup, 'rb'),
-        as_attachment=True,
-        filename=latest_backup.name
-    )
+    return _latest_backup_response(request)
 
 
 @require_GET
@@ -60,7 +52,7 @@ def download_offline_backup_signed(request):
         request: HttpRequest with 'token' query parameter
     
     Returns:
-        FileResponse with the latest backup ZIP
+        Latest backup ZIP (see _latest_backup_response)
         
     Raises:
         Http404: If token is invalid, expired, or no backups available
@@ -77,21 +69,175 @@ def download_offline_backup_signed(request):
         raise Http404("Token inválido o expirado")
     
     # Token is valid, proceed with download
-    backup_dir = Path(settings.BASE_DIR) / 'backups'
-    backup_dir.mkdir(exist_ok=True)
+    return _latest_backup_response(request)
+
+
+def _latest_backup_response(request):
+    """
+    Devuelve el backup completo más reciente según el catálogo en memoria.
+    
+    Los backups incrementales (delta) no se sirven: sin su cadena no
+    sirven para navegar offline.
     
-    # Find latest backup
-    backups = sorted(backup_dir.glob('offline-backup-*.zip'), reverse=True)
-    if not backups:
+    Según la configuración, la descarga:
+    1. Redirige a una URL SAS de corta duración si el backup está en Azure
+       o en el backend de backups configurado (BACKUP_DOWNLOAD_AZURE_REDIRECT)
+    2. Se delega al servidor web con X-Accel-Redirect/X-Sendfile
+       (BACKUP_SENDFILE_HEADER)
+    3. Se sirve desde Django con soporte de Range/If-Range para reanudar
+    
+    Raises:
+        Http404: Si no hay backups disponibles
+    """
+    catalog = get_backup_catalog()
+    latest_backup = catalog.latest('local', kind='full')
+    
+    if getattr(settings, 'BACKUP_DOWNLOAD_AZURE_REDIRECT', False):
+        azure_backups = {entry['name']: entry for entry in catalog.entries('azure')}
+        azure_backup = catalog.latest('azure', kind='full') if latest_backup is None else azure_backups.get(latest_backup['name'])
+        if azure_backup is not None:
+            expiry_minutes = getattr(settings, 'BACKUP_SAS_EXPIRY_MINUTES', 10)
+            sas_url = get_backup_storage().generate_sas_url(
+                azure_backup['name'], expiry_hours=expiry_minutes / 60
+            )
+            return HttpResponseRedirect(sas_url)
+    
+    if latest_backup is None:
+        raise Http404("No hay backups disponibles")
+    
+    path = latest_backup['path']
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        # Borrado desde la última lectura del catálogo
+        catalog.invalidate('local')
         raise Http404("No hay backups disponibles")
     
-    latest_backup = backups[0]
+    sendfile_header = getattr(settings, 'BACKUP_SENDFILE_HEADER', None)
+    if sendfile_header:
+        response = HttpResponse(content_type='application/zip')
+        if sendfile_header == 'X-Accel-Redirect':
+            accel_prefix = getattr(settings, 'BACKUP_ACCEL_PREFIX', '/_protected_backups/')
+            response[sendfile_header] = accel_prefix.rstrip('/') + '/' + path.name
+        else:
+            response[sendfile_header] = str(path)
+        response['Content-Disposition'] = f'attachment; filename="{path.name}"'
+        return response
+    
+    return _ranged_file_response(request, path, stat, latest_backup['checksum'])
+
+
+@require_GET
+def download_stored_backup(request, container, name):
+    """
+    Descarga un backup del almacenamiento local con una URL firmada.
+    
+    URL: /backup-storage/<container>/<name>?token=<token>
+    
+    Las URLs las genera LocalBackupStorage.generate_sas_url (equivalente
+    local de las URLs SAS de Azure) y caducan igual que éstas.
+    
+    Raises:
+        Http404: Si el token no es válido o el backup no existe
+    """
+    if not verify_backup_token(request.GET.get('token', ''), container, name):
+        raise Http404("Token inválido o expirado")
+    
+    storage = get_backup_storage('local', container_name=container)
+    path = storage.local_path(name)
+    try:
+        stat = path.stat()
+    except (AttributeError, FileNotFoundError):
+        raise Http404("Backup no encontrado")
+    
+    return _ranged_file_response(request, path, stat)
+
+
+def _ranged_file_response(request, path, stat, checksum=None):
+    """
+    Sirve un fichero con soporte de peticiones Range (un solo rango) e If-Range.
+    
+    Args:
+        request: HttpRequest
+        path: Path del fichero
+        stat: Resultado de path.stat()
+        checksum: MD5 del fichero (para el ETag), si se conoce
+    
+    Returns:
+        FileResponse (200), StreamingHttpResponse (206) o HttpResponse (416)
+    """
+    size = stat.st_size
+    etag = f'"{checksum}"' if checksum else f'"{size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = http_date(stat.st_mtime)
+    
+    byte_range = _parse_range(request.META.get('HTTP_RANGE'), size)
+    
+    # Si el fichero cambió desde la primera descarga, se envía completo
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, last_modified):
+        byte_range = None
+    
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_file_range(path, start, end - start + 1),
+            status=206,
+            content_type='application/zip'
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Disposition'] = f'attachment; filename="{path.name}"'
+    
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def _parse_range(header, size):
+    """
+    Interpreta una cabecera Range de un solo rango de bytes.
+    
+    Returns:
+        (start, end) inclusivo, 'unsatisfiable', o None si no hay rango válido
+        (en cuyo caso se sirve el fichero completo)
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if not start:
+            # Sufijo: los últimos N bytes
+            length = int(end)
+            if length <= 0:
+                return 'unsatisfiable'
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
     
-    return FileResponse(
-        open(latest_backup, 'rb'),
-        as_attachment=True,
-        filename=latest_backup.name
-    )
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, min(end, size - 1)
+
+
+def _iter_file_range(path, start, length, chunk_size=64 * 1024):
+    """Lee ``length`` bytes de un fichero a partir de ``start``."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
 
 
 @require_GET
@@ -126,7 +272,8 @@ def generate_download_token(request):
 @user_passes_test(lambda u: u.is_staff)
 def download_from_azure(request):
     """
-    Descarga el backup más reciente desde Azure Blob Storage.
+    Descarga el backup más reciente desde Azure Blob Storage
+    (o desde el backend de BACKUP_STORAGE_BACKEND).
     
     URL: /download-from-azure/
     
@@ -138,7 +285,7 @@ def download_from_azure(request):
         Redirect to SAS URL for download
     """
     try:
-        uploader = AzureBackupUploader()
+        uploader = get_backup_storage()
         
         # Generate SAS URL for latest.zip
         sas_url = uploader.generate_sas_url('latest.zip', expiry_hours=1)
@@ -157,38 +304,147 @@ def download_from_azure(request):
 @user_passes_test(lambda u: u.is_staff)
 def list_backups(request):
     """
-    Lista todos los backups disponibles (local y Azure).
+    Lista los backups disponibles (local y Azure), del más reciente al más antiguo.
+    
+    URL: /list-backups/?site=<hostname>&location=<local|azure>&page=1&per_page=50
     
-    URL: /list-backups/
+    Sin page ni per_page se devuelven todos los backups, como antes de
+    paginar el listado.
     
     Requires:
         - User must be authenticated and staff
     
     Returns:
-        JSON with list of available backups
+        JSON with the requested page of backups (all of them by default)
+        under 'results', plus the legacy 'local' entries and 'azure' blob names
+    """
+    params = _list_backups_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    
+    catalog = get_backup_catalog()
+    return _list_backups_response(catalog, catalog.list(**params))
+
+
+def _list_backups_params(request):
     """
+    Valida los parámetros de list_backups.
+    
+    Returns:
+        dict con los argumentos de BackupCatalog.list, o JsonResponse (400)
+    """
+    location = request.GET.get('location')
+    if location not in (None, '', 'local', 'azure'):
+        return JsonResponse({'error': 'location debe ser "local" o "azure"'}, status=400)
+    
+    # Solo se pagina si se pide: los clientes existentes esperan la lista completa
+    paginate = 'page' in request.GET or 'per_page' in request.GET
+    try:
+        page = int(request.GET.get('page', 1))
+        per_page = min(int(request.GET.get('per_page', 50)), 500) if paginate else None
+    except ValueError:
+        return JsonResponse({'error': 'page y per_page deben ser números'}, status=400)
+    
+    return {
+        'site': request.GET.get('site') or None,
+        'location': location or None,
+        'page': page,
+        'per_page': per_page,
+    }
+
+
+def _list_backups_response(catalog, listing):
+    """Construye el JSON de list_backups a partir de una página del catálogo."""
+    results = [
+        {
+            'name': entry['name'],
+            'site': entry['site'],
+            'kind': entry['kind'],
+            'location': entry['location'],
+            'size': entry['size'],
+            'size_mb': entry['size'] / (1024 * 1024),
+            'created': entry['created'].isoformat(),
+            # Epoch en segundos, el campo que devolvía list_backups antes del catálogo
+            'modified': entry['created'].timestamp(),
+            'checksum': entry['checksum'],
+        }
+        for entry in listing['results']
+    ]
     backups = {
-        'local': [],
-        'azure': []
+        'count': listing['count'],
+        'page': listing['page'],
+        'per_page': listing['per_page'],
+        'pages': listing['pages'],
+        'results': results,
+        # Claves anteriores al catálogo, con su forma original: 'local' con
+        # name/size_mb/modified y 'azure' con los nombres de blob que devuelve
+        # AzureBackupUploader.list_backups(). El detalle completo va en 'results'.
+        'local': [
+            {'name': entry['name'], 'size_mb': entry['size_mb'], 'modified': entry['modified']}
+            for entry in results if entry['location'] == 'local'
+        ],
+        'azure': [entry['name'] for entry in results if entry['location'] == 'azure'],
     }
-    
-    # List local backups
-    backup_dir = Path(settings.BASE_DIR) / 'backups'
-    if backup_dir.exists():
-        for backup_file in sorted(backup_dir.glob('offline-backup-*.zip'), reverse=True):
-            backups['local'].append({
-                'name': backup_file.name,
-                'size_mb': backup_file.stat().st_size / (1024 * 1024),
-                'modified': backup_file.stat().st_mtime
-            })
-    
-    # List Azure backups (if configured)
-    if hasattr(settings, 'AZURE_ACCOUNT_NAME') and hasattr(settings, 'AZURE_ACCOUNT_KEY'):
-        try:
-            uploader = AzureBackupUploader()
-            azure_backups = uploader.list_backups()
-            backups['azure'] = azure_backups
-        except Exception as e:
-            backups['azure_error'] = str(e)
+    if catalog.azure_error:
+        backups['azure_error'] = catalog.azure_error
     
     return JsonResponse(backups)
+
+
+def _async_staff_get(view):
+    """
+    Equivalente async de @require_GET + @user_passes_test(is_staff).
+    
+    Los decoradores de Django 4.2 no admiten vistas async. El usuario se
+    resuelve en un hilo (sesión en base de datos) y el resto de la vista
+    se ejecuta en el event loop.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        is_staff = await sync_to_async(lambda: request.user.is_staff)()
+        if not is_staff:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@_async_staff_get
+async def download_from_azure_async(request):
+    """
+    Versión async de download_from_azure para el perfil ASGI.
+    
+    URL: /download-from-azure/ (con BACKUP_ASYNC_VIEWS)
+    
+    La URL SAS se firma localmente con la clave de la cuenta, sin llamadas
+    a Azure, así que la vista no bloquea el event loop.
+    """
+    try:
+        sas_url = get_backup_storage().generate_sas_url('latest.zip', expiry_hours=1)
+    except Exception as e:
+        raise Http404(f"Error al acceder a Azure: {str(e)}")
+    
+    return JsonResponse({
+        'download_url': sas_url,
+        'expires_in_hours': 1
+    })
+
+
+@_async_staff_get
+async def list_backups_async(request):
+    """
+    Versión async de list_backups para el perfil ASGI.
+    
+    URL: /list-backups/ (con BACKUP_ASYNC_VIEWS)
+    
+    Cuando caduca el catálogo, el listado de Azure se pide con el SDK async
+    (azure.storage.blob.aio), así que una llamada lenta a Azure no ocupa
+    un worker mientras se sirven páginas.
+    """
+    params = _list_backups_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    
+    catalog = get_backup_catalog()
+    return _list_backups_response(catalog, await catalog.alist(**params))
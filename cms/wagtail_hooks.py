@@ -1,11 +1,17 @@
 """
 Hooks de Wagtail para personalización del admin y userbar.
 """
+import logging
+
 from django.templatetags.static import static
 from django.urls import reverse
 from django.http import HttpResponseRedirect
 from wagtail import hooks
+from wagtail.admin.viewsets.model import ModelViewSet
+
+from cms.models import Job
 
+logger = logging.getLogger(__name__)
 
 @hooks.register("register_admin_branding")
 def admin_branding():
@@ -76,3 +82,73 @@ def redirect_to_edit_page(request, page):
         # Redirigir de vuelta a la página de edición
         edit_url = reverse('wagtailadmin_pages:edit', args=[page.id])
         return HttpResponseRedirect(edit_url)
+
+
+@hooks.register("after_publish_page")
+def enqueue_after_publish(request, page):
+    """
+    Encola el trabajo que sigue a una publicación (ver cms.jobs).
+
+    - Calentar la caché de la página y sus ancestros
+    - Generar las renditions de las imágenes que usa la página
+    - Si JOBS_EXPORT_ON_PUBLISH está activo, reexportar el site a ZIP.
+      La exportación se retrasa JOBS_EXPORT_DELAY segundos y se deduplica,
+      así que publicar varias páginas seguidas genera una sola exportación.
+
+    Un fallo al encolar se registra y no impide publicar, como en cms.signals.
+    """
+    from django.conf import settings
+    from django.contrib.contenttypes.models import ContentType
+    from wagtail.images import get_image_model
+    from wagtail.models import ReferenceIndex
+
+    from cms.jobs import enqueue
+
+    try:
+        enqueue("warm_cache", priority=10, page_id=page.pk)
+    except Exception:
+        logger.exception("Error encolando el calentado de caché de la página %s", page.pk)
+
+    try:
+        image_type = ContentType.objects.get_for_model(get_image_model())
+        image_ids = sorted(
+            int(object_id) for object_id in ReferenceIndex.get_references_for_object(page)
+            .filter(to_content_type=image_type)
+            .values_list("to_object_id", flat=True)
+            .distinct()
+        )
+        if image_ids:
+            enqueue("generate_renditions", priority=5, image_ids=image_ids)
+    except Exception:
+        logger.exception("Error encolando las renditions de la página %s", page.pk)
+
+    if getattr(settings, "JOBS_EXPORT_ON_PUBLISH", False):
+        try:
+            site = page.get_site()
+            if site is not None:
+                enqueue(
+                    "export_site",
+                    delay=getattr(settings, "JOBS_EXPORT_DELAY", 300),
+                    site=site.hostname,
+                    upload=getattr(settings, "JOBS_EXPORT_UPLOAD", False),
+                )
+        except Exception:
+            logger.exception("Error encolando la exportación del site de la página %s", page.pk)
+
+
+class JobViewSet(ModelViewSet):
+    """Listado de la cola de tareas en el admin (Ajustes > Tareas)."""
+
+    model = Job
+    icon = "time"
+    menu_label = "Tareas"
+    add_to_settings_menu = True
+    list_display = ["task", "status", "priority", "progress", "progress_message", "attempts", "created_at", "finished_at"]
+    list_filter = ["status", "task"]
+    form_fields = ["priority", "max_attempts", "run_after"]
+    inspect_view_enabled = True
+
+
+@hooks.register("register_admin_viewset")
+def register_job_viewset():
+    return JobViewSet("jobs")
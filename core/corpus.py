@@ -0,0 +1,312 @@
+"""
+Corpus scrapeado preprocesado.
+
+Los comandos de importación (populate_wagtail_from_scraped, poblar_madmusic,
+poblar_madmusic_completo, importar_noticias_destacadas) y
+scripts/extract_collapsibles.py necesitan lo mismo de cada página de
+``scraped_madmusic/html``: título, cuerpo limpio, texto, acordeones e
+imágenes. En vez de parsear el directorio entero en cada ejecución, se
+parsea una vez (core/extraction.py) y el resultado se guarda en SQLite
+(por defecto ``scraped_madmusic/corpus.sqlite3``).
+
+La reconstrucción es incremental: solo se vuelven a parsear los ficheros
+cuyo mtime o tamaño ha cambiado y cuyo SHA-256 es distinto del guardado;
+los ficheros eliminados se quitan del almacén. Si cambia
+``EXTRACTOR_VERSION`` (porque cambia lo que se extrae) se reparsea todo.
+Con ``update(workers=N)`` los ficheros pendientes se parsean en N procesos
+y se guardan por lotes a medida que terminan.
+
+No depende de Django, así que también se puede usar desde los scripts.
+
+Uso:
+    corpus = CorpusStore.open("scraped_madmusic/html")   # actualiza lo que haya cambiado
+    doc = corpus.get("equipo/participantes.html")
+    doc.title, doc.body, doc.accordions
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path, PurePosixPath
+
+from core.extraction import (SOURCE_URL, extract_accordions, extract_block, extract_content,
+                             parse_document)
+
+STORE_NAME = "corpus.sqlite3"
+
+# Documentos parseados que se escriben en cada transacción
+WRITE_BATCH = 50
+
+# Subirla cuando cambie lo que se guarda de cada documento
+EXTRACTOR_VERSION = "3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    slug TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    body TEXT NOT NULL,
+    text TEXT NOT NULL,
+    description TEXT NOT NULL,
+    images TEXT NOT NULL,
+    accordions TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    parsed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_slug ON documents (slug);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ("path", "slug", "url", "title", "body", "text", "description", "images", "accordions",
+           "content_hash", "mtime", "size", "parsed_at")
+
+
+class CorpusDocument:
+    """
+    Una página del corpus.
+
+    Attributes:
+        path: Ruta relativa al directorio HTML (``equipo/participantes.html``)
+        slug: Último segmento (``participantes``)
+        url: URL en el sitio original
+        title: Título o None
+        body: HTML del contenido principal, con las URLs reescritas y sin
+            clases de Bootstrap ni atributos style/data-*
+        text: Texto del contenido principal
+        description: HTML del div.description (noticias) con solo href,
+            src y alt, o ""
+        images: URLs de las imágenes del contenido
+        accordions: Acordeones (ver core.extraction.extract_accordions)
+        content_hash: SHA-256 del fichero HTML
+    """
+
+    def __init__(self, row):
+        self.path = row["path"]
+        self.slug = row["slug"]
+        self.url = row["url"]
+        self.title = row["title"]
+        self.body = row["body"]
+        self.text = row["text"]
+        self.description = row["description"]
+        self.images = json.loads(row["images"])
+        self.accordions = json.loads(row["accordions"])
+        self.content_hash = row["content_hash"]
+
+    def __repr__(self):
+        return f"<CorpusDocument {self.path}>"
+
+
+def document_url(path):
+    """URL original de un fichero (``equipo/participantes.html`` -> ``.../equipo/participantes/``)."""
+    return f"{SOURCE_URL}{PurePosixPath(path).with_suffix('').as_posix()}/"
+
+
+def parse_file(path, relative_path, content_hash):
+    """
+    Parsear un fichero HTML una sola vez y extraer todo lo que se guarda.
+
+    Returns:
+        dict: Fila de la tabla documents (sin mtime, size ni parsed_at)
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        root = parse_document(f.read())
+    url = document_url(relative_path)
+    row = {
+        "path": relative_path,
+        "slug": PurePosixPath(relative_path).stem,
+        "url": url,
+        "title": None,
+        "body": "",
+        "text": "",
+        "description": "",
+        "images": "[]",
+        "accordions": "[]",
+        "content_hash": content_hash,
+    }
+    if root is None:
+        return row
+
+    # Primero lo que lee el árbol sin tocarlo; extract_content lo modifica
+    row["accordions"] = json.dumps(extract_accordions(root), ensure_ascii=False)
+    row["description"] = extract_block(root, "description", keep_attributes=("href", "src", "alt"))
+    content = extract_content(root, base_url=url, strip_layout=True)
+    row.update(title=content.title, body=content.body, text=content.text,
+               images=json.dumps(content.images, ensure_ascii=False))
+    return row
+
+
+def _parse_pending(item):
+    """parse_file para una entrada de ``pending`` (tiene que ser picklable para el pool)."""
+    relative_path, path, mtime, size, content_hash = item
+    row = parse_file(path, relative_path, content_hash)
+    row.update(mtime=mtime, size=size, parsed_at=time.time())
+    return tuple(row[column] for column in COLUMNS)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CorpusStore:
+    """Almacén SQLite del corpus preprocesado, seguro entre hilos."""
+
+    def __init__(self, html_dir, path=None):
+        """
+        Args:
+            html_dir: Directorio con el HTML scrapeado
+            path: Fichero SQLite (por defecto corpus.sqlite3 junto a html_dir)
+        """
+        self.html_dir = Path(html_dir)
+        self.path = str(path) if path else str(self.html_dir.parent / STORE_NAME)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, html_dir, path=None):
+        """Abrir el almacén y ponerlo al día con el directorio."""
+        store = cls(html_dir, path)
+        store.update()
+        return store
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _scan_files(self):
+        """Ficheros HTML del directorio: ruta relativa -> (Path, mtime, tamaño)."""
+        files = {}
+        if self.html_dir.is_dir():
+            for path in self.html_dir.rglob("*.html"):
+                stat = path.stat()
+                files[path.relative_to(self.html_dir).as_posix()] = (path, stat.st_mtime, stat.st_size)
+        return files
+
+    def _write_rows(self, rows):
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO documents ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                rows,
+            )
+            self._conn.commit()
+
+    def update(self, rebuild=False, workers=1):
+        """
+        Poner el almacén al día con el directorio HTML.
+
+        Args:
+            rebuild: Volver a parsear todo aunque no haya cambiado
+            workers: Procesos para parsear los ficheros pendientes (1 = sin procesos)
+
+        Returns:
+            dict: ``parsed``, ``touched`` (mtime nuevo, mismo contenido),
+            ``unchanged``, ``removed`` y ``seconds``
+        """
+        started = time.perf_counter()
+        stats = {"parsed": 0, "touched": 0, "unchanged": 0, "removed": 0}
+        with self._lock:
+            rebuild = rebuild or self._get_meta("extractor_version") != EXTRACTOR_VERSION
+            stored = {
+                row["path"]: row
+                for row in self._conn.execute("SELECT path, content_hash, mtime, size FROM documents")
+            }
+
+        files = self._scan_files()
+        pending = []
+        touched = []
+        for relative_path, (path, mtime, size) in files.items():
+            previous = stored.get(relative_path)
+            if not rebuild and previous is not None and previous["mtime"] == mtime and previous["size"] == size:
+                stats["unchanged"] += 1
+                continue
+            content_hash = file_sha256(path)
+            if not rebuild and previous is not None and previous["content_hash"] == content_hash:
+                touched.append((mtime, size, relative_path))
+                continue
+            pending.append((relative_path, path, mtime, size, content_hash))
+
+        if workers and workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                self._write_all(pool.map(_parse_pending, pending, chunksize=4))
+        else:
+            self._write_all(map(_parse_pending, pending))
+
+        removed = [(relative_path,) for relative_path in stored if relative_path not in files]
+        with self._lock:
+            self._conn.executemany("UPDATE documents SET mtime = ?, size = ? WHERE path = ?", touched)
+            self._conn.executemany("DELETE FROM documents WHERE path = ?", removed)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                               ("extractor_version", EXTRACTOR_VERSION))
+            self._conn.commit()
+
+        stats.update(parsed=len(pending), touched=len(touched), removed=len(removed),
+                     seconds=time.perf_counter() - started)
+        return stats
+
+    def _write_all(self, rows):
+        """Guardar las filas por lotes según van llegando."""
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, WRITE_BATCH))
+            if not batch:
+                break
+            self._write_rows(batch)
+
+    def get(self, path):
+        """
+        Documento por ruta (relativa al directorio HTML, o absoluta dentro de
+        él), o None.
+        """
+        path = Path(path)
+        if path.is_absolute():
+            try:
+                path = path.resolve().relative_to(self.html_dir.resolve())
+            except ValueError:
+                return None
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE path = ?", (path.as_posix(),)).fetchone()
+        return CorpusDocument(row) if row else None
+
+    def by_slug(self, slug):
+        """Primer documento con ese slug (el de ruta más corta), o None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE slug = ? ORDER BY length(path), path LIMIT 1", (slug,)
+            ).fetchone()
+        return CorpusDocument(row) if row else None
+
+    def documents(self):
+        """Todos los documentos, por ruta."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM documents ORDER BY path").fetchall()
+        return [CorpusDocument(row) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,218 @@
+"""
+Frontera de crawling persistente y reanudable.
+
+Guarda en SQLite cada URL descubierta (páginas e imágenes) con su
+profundidad, prioridad y estado (pendiente, en curso, hecha, fallida), de
+forma incremental: si el crawler se interrumpe, ``requeue_in_progress()``
+devuelve a la cola lo que estaba a medias y el resto se conserva, así que
+la siguiente pasada no vuelve a descargar lo ya hecho.
+
+Las pendientes se sirven por prioridad y luego por profundidad (BFS). La
+prioridad sale de una lista de patrones de URL: las que encajan con el
+primer patrón van antes que las del segundo, y así sucesivamente; las que
+no encajan con ninguno van al final.
+
+No depende de Django, así que también se puede usar desde los scripts.
+
+Uso:
+    frontier = CrawlFrontier("scraped_madmusic/crawl_state.sqlite3", priorities=[r"/noticias/"])
+    frontier.add("https://madmusic.iccmu.es", 0)
+    for url, depth in frontier.claim(8):
+        ...
+        frontier.mark(url, CrawlFrontier.DONE)
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    seq INTEGER NOT NULL,
+    updated_at REAL,
+    PRIMARY KEY (kind, url)
+);
+CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (kind, status, priority, depth, seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class CrawlFrontier:
+    """Frontera de URLs en SQLite, segura entre hilos."""
+
+    QUEUED = "queued"
+    IN_PROGRESS = "in_progress"
+    DONE = "done"
+    FAILED = "failed"
+
+    PAGE = "page"
+    IMAGE = "image"
+
+    def __init__(self, path=":memory:", priorities=()):
+        """
+        Args:
+            path: Fichero SQLite (":memory:" para una frontera no persistente)
+            priorities: Expresiones regulares de URL, de más a menos prioritaria
+        """
+        self.path = str(path)
+        directory = os.path.dirname(self.path) if self.path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.priorities = [re.compile(pattern) for pattern in priorities]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM frontier").fetchone()[0]
+        if self.priorities:
+            self._reprioritize()
+
+    def priority(self, url):
+        """Posición del primer patrón que encaja (len(patrones) si ninguno)."""
+        for index, pattern in enumerate(self.priorities):
+            if pattern.search(url):
+                return index
+        return len(self.priorities)
+
+    def _reprioritize(self):
+        """Recalcular la prioridad de las pendientes con los patrones actuales."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, url FROM frontier WHERE status = ?", (self.QUEUED,)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE frontier SET priority = ? WHERE kind = ? AND url = ?",
+                [(self.priority(url), kind, url) for kind, url in rows],
+            )
+            self._conn.commit()
+
+    def reset(self):
+        """Vaciar la frontera (empezar un crawl desde cero)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM frontier")
+            self._conn.execute("DELETE FROM meta")
+            self._conn.commit()
+            self._seq = 0
+
+    def requeue_in_progress(self):
+        """Devolver a la cola lo que quedó a medias en una pasada interrumpida."""
+        with self._lock:
+            count = self._conn.execute(
+                "UPDATE frontier SET status = ? WHERE status = ?", (self.QUEUED, self.IN_PROGRESS)
+            ).rowcount
+            self._conn.commit()
+        return count
+
+    def add_many(self, urls, depth, kind=PAGE):
+        """
+        Añadir URLs pendientes.
+
+        Las que ya se conocen no cambian de estado; si se encuentran a menos
+        profundidad que antes y siguen pendientes, se actualiza la profundidad.
+
+        Returns:
+            int: URLs nuevas
+        """
+        now = time.time()
+        with self._lock:
+            rows = []
+            for url in urls:
+                self._seq += 1
+                rows.append((url, kind, depth, self.priority(url), self.QUEUED, self._seq, now))
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, kind, depth, priority, status, seq, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE frontier SET depth = ? WHERE kind = ? AND url = ? AND status = ? AND depth > ?",
+                [(depth, kind, url, self.QUEUED, depth) for url in urls],
+            )
+            self._conn.commit()
+        return added
+
+    def add(self, url, depth, kind=PAGE):
+        """Añadir una URL pendiente. Returns: True si es nueva."""
+        return self.add_many([url], depth, kind) == 1
+
+    def claim(self, limit, kind=PAGE):
+        """
+        Tomar hasta ``limit`` URLs pendientes y marcarlas en curso.
+
+        Returns:
+            list: ``(url, depth)`` por prioridad, profundidad y orden de llegada
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, depth FROM frontier WHERE kind = ? AND status = ? "
+                "ORDER BY priority, depth, seq LIMIT ?",
+                (kind, self.QUEUED, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE frontier SET status = ?, updated_at = ? WHERE kind = ? AND url = ?",
+                [(self.IN_PROGRESS, time.time(), kind, url) for url, _depth in rows],
+            )
+            self._conn.commit()
+        return rows
+
+    def mark(self, url, status, kind=PAGE, error=None):
+        """Guardar el estado final (DONE o FAILED) de una URL."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE frontier SET status = ?, error = ?, updated_at = ? WHERE kind = ? AND url = ?",
+                (status, error, time.time(), kind, url),
+            )
+            self._conn.commit()
+
+    def urls(self, status=None, kind=PAGE):
+        """URLs de un tipo, opcionalmente filtradas por estado."""
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute("SELECT url FROM frontier WHERE kind = ?", (kind,))
+            else:
+                rows = self._conn.execute(
+                    "SELECT url FROM frontier WHERE kind = ? AND status = ?", (kind, status)
+                )
+            return [url for (url,) in rows.fetchall()]
+
+    def counts(self, kind=PAGE):
+        """Número de URLs por estado."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM frontier WHERE kind = ? GROUP BY status", (kind,)
+            ).fetchall()
+        counts = {self.QUEUED: 0, self.IN_PROGRESS: 0, self.DONE: 0, self.FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,491 @@
+"""
+Extracción del contenido principal de las páginas HTML scrapeadas.
+
+Motor común de los comandos de importación (sincronizar_madmusic,
+poblar_madmusic, poblar_madmusic_completo, populate_wagtail_from_scraped e
+importar_noticias_destacadas). Cada documento se parsea una sola vez con
+lxml y un único recorrido del árbol:
+
+- descarta la cabecera, el pie, los menús, los sidebars (``col-md-3``,
+  ``parent_sidebar``...), las migas de pan, scripts y formularios sin
+  bajar a sus hijos;
+- localiza el título y la región principal (la columna ``col-md-9`` del
+  tema, ``article``, ``section#tools``, ``main`` o ``body``, por este
+  orden) y, dentro de ella, el div de contenido (``div.content``).
+
+El título es el h1 de la región principal; si no tiene (listados y
+portada), el de la cabecera (``.title_container`` o el primer texto del
+slider), que se guarda antes de descartarla. Los h1 de los teasers de
+noticias (``.iccmuteaser`` o dentro de un enlace) nunca son el título.
+
+Después, una pasada sobre el contenido elegido reescribe las URLs del sitio
+original a rutas locales, limpia atributos si se pide y recoge las imágenes.
+
+No depende de Django, así que también se puede usar desde los scripts.
+
+Uso:
+    content = extract_content(html)
+    content.title, content.body, content.images
+"""
+
+import copy
+import html as html_lib
+import re
+from urllib.parse import urljoin
+
+import lxml.etree
+import lxml.html
+
+SOURCE_URL = "https://madmusic.iccmu.es/"
+UPLOADS_URL = SOURCE_URL + "wp-content/uploads/"
+STATIC_IMAGES = "/static/madmusic/images/"
+LOCAL_PREFIX = "/madmusic/"
+
+# Elementos que nunca son contenido
+LAYOUT_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "form", "aside", "iframe"}
+# Subcadenas del atributo class de sidebars, menús y migas de pan
+LAYOUT_CLASSES = ("sidebar", "col-md-3", "menu-principal-container", "breadcrumb")
+# Columna principal del tema de Bootstrap
+MAIN_COLUMN_CLASSES = {"col-md-9", "col-md-8", "col-md-10"}
+# Clases de maquetación que no aportan nada en un RichTextField
+BOOTSTRAP_CLASSES = ("container", "row", "col-md", "col-sm", "col-xs", "col-lg", "offset")
+
+SITE_TITLES = {"ICCMU", "MadMusic", "Instituto Complutensede Ciencias Musicales",
+               "Instituto Complutense de Ciencias Musicales"}
+# Prefijos que WordPress añade al título de los archivos de categoría y etiqueta
+ARCHIVE_PREFIXES = ("Categoría:", "Etiqueta:")
+# Clase de los teasers de noticias en listados y portada
+TEASER_CLASS = "iccmuteaser"
+MAX_TITLE_LENGTH = 200
+
+
+class ExtractedContent:
+    """
+    Resultado de extract_content().
+
+    Attributes:
+        title: Título de la página o None
+        body: HTML del contenido principal ("" si no hay)
+        images: URLs de las imágenes del contenido (originales, sin reescribir)
+        in_content_block: True si el cuerpo sale del div de ``content_class``
+            y no de toda la región principal
+    """
+
+    def __init__(self, title=None, body="", images=None, element=None, in_content_block=False):
+        self.title = title
+        self.body = body
+        self.images = images or []
+        self.in_content_block = in_content_block
+        self._element = element
+
+    @property
+    def text(self):
+        """Texto del contenido, una línea por bloque."""
+        if self._element is None:
+            return ""
+        lines = (line.strip() for line in self._element.itertext())
+        return "\n".join(line for line in lines if line)
+
+    def __repr__(self):
+        return f"<ExtractedContent {self.title!r} ({len(self.body)} chars, {len(self.images)} images)>"
+
+
+def clean_title(title):
+    """
+    Normalizar espacios y quitar el nombre del sitio y el prefijo de archivo.
+
+    ``Equipo | ICCMU`` -> ``Equipo``; ``Congresos | Seminarios | ICCMU`` ->
+    ``Congresos | Seminarios``; ``Categoría: Empleo`` -> ``Empleo``.
+    """
+    title = re.sub(r"\s+", " ", title).strip()
+    if "|" in title:
+        parts = [part.strip() for part in title.split("|")]
+        parts = [part for part in parts if part and part not in SITE_TITLES] or parts
+        title = " | ".join(parts)
+    for prefix in ARCHIVE_PREFIXES:
+        if title.startswith(prefix) and title[len(prefix):].strip():
+            title = title[len(prefix):].strip()
+    return title[:MAX_TITLE_LENGTH]
+
+
+def parse_document(html):
+    """
+    Parsear un documento.
+
+    Args:
+        html: str, o bytes (la codificación sale del <meta charset>)
+
+    Returns:
+        Elemento raíz, o None si el documento está vacío
+    """
+    if isinstance(html, str):
+        # lxml no acepta str con declaración de codificación: pasarlo como UTF-8
+        html = html.encode("utf-8")
+        parser = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+    else:
+        parser = lxml.html.HTMLParser(remove_comments=True)
+    if not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html, parser=parser)
+    except (lxml.etree.ParserError, ValueError):
+        return None
+
+
+def _classes(element):
+    return element.get("class") or ""
+
+
+def _is_layout(element):
+    if element.tag in LAYOUT_TAGS:
+        return True
+    classes = _classes(element).lower()
+    return bool(classes) and any(name in classes for name in LAYOUT_CLASSES)
+
+
+class _Scan:
+    """Lo que encuentra el recorrido del documento (el primero de cada tipo)."""
+
+    def __init__(self, content_class):
+        self.content_class = content_class
+        self.tools = None
+        self.column = None
+        self.article = None
+        self.main = None
+        self.body = None
+        self.page_title = None
+        self.headings = []
+        self.header_headings = []
+        self.entry_title = None
+        self.content_divs = []
+
+
+def _scan(root, content_class):
+    """
+    Recorrer el árbol una vez, en orden de documento.
+
+    Los elementos de maquetación se eliminan del árbol sin visitar sus
+    descendientes, así que nada de lo que se registra está dentro de un
+    sidebar o un menú.
+    """
+    scan = _Scan(content_class)
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+        if _is_layout(element):
+            if tag == "header":
+                # El título de listados y portada solo está en la cabecera
+                scan.header_headings.extend(element.iter("h1"))
+            element.drop_tree()
+            continue
+
+        if tag == "div":
+            tokens = _classes(element).split()
+            if scan.column is None and MAIN_COLUMN_CLASSES.intersection(tokens):
+                scan.column = element
+            if content_class in tokens:
+                scan.content_divs.append(element)
+        elif tag == "h1":
+            scan.headings.append(element)
+        elif tag == "title" and scan.page_title is None:
+            scan.page_title = element
+        elif tag == "section" and scan.tools is None and element.get("id") == "tools":
+            scan.tools = element
+        elif tag == "article" and scan.article is None:
+            scan.article = element
+        elif tag == "main" and scan.main is None:
+            scan.main = element
+        elif tag == "body":
+            scan.body = element
+        if scan.entry_title is None and "entry-title" in _classes(element).split():
+            scan.entry_title = element
+
+        # Hijos en orden inverso: la pila los saca en orden de documento
+        stack.extend(reversed(element))
+    return scan
+
+
+def _contains(ancestor, element):
+    return element is ancestor or any(parent is ancestor for parent in element.iterancestors())
+
+
+def _text(element):
+    return re.sub(r"\s+", " ", element.text_content()).strip()
+
+
+def _in_teaser(element):
+    """True si el elemento está dentro de un enlace o de un teaser de noticia."""
+    return any(parent.tag == "a" or TEASER_CLASS in _classes(parent).split()
+               for parent in element.iterancestors())
+
+
+def _find_title(scan, region):
+    """
+    Título: h1 de la región, h1 de la cabecera, otro h1 de la página,
+    .entry-title y por último <title>.
+    """
+    headings = [h1 for h1 in scan.headings if not _in_teaser(h1)]
+    candidates = []
+    if region is not None:
+        candidates.extend(h1 for h1 in headings if _contains(region, h1))
+    candidates.extend(scan.header_headings)
+    candidates.extend(headings)
+    if scan.entry_title is not None:
+        candidates.append(scan.entry_title)
+    for element in candidates:
+        title = clean_title(_text(element))
+        if title and title not in SITE_TITLES:
+            return title
+    if scan.page_title is not None:
+        title = clean_title(_text(scan.page_title))
+        if title and title not in SITE_TITLES:
+            return title
+    return None
+
+
+def inner_html(element):
+    """HTML de los hijos de ``element`` (sin la etiqueta propia)."""
+    parts = [html_lib.escape(element.text, quote=False)] if element.text else []
+    parts.extend(lxml.html.tostring(child, encoding="unicode") for child in element)
+    return "".join(parts)
+
+
+def _rewrite_url(value, prefix_relative):
+    if value.startswith(UPLOADS_URL):
+        return STATIC_IMAGES + value[len(UPLOADS_URL):]
+    if value.startswith(SOURCE_URL):
+        return LOCAL_PREFIX + value[len(SOURCE_URL):]
+    if prefix_relative and value.startswith("/") and not value.startswith(("//", LOCAL_PREFIX)):
+        return LOCAL_PREFIX.rstrip("/") + value
+    return value
+
+
+def _finish(element, base_url, rewrite_urls, prefix_relative, strip_layout, keep_attributes):
+    """Pasada final sobre el contenido: imágenes, URLs y atributos."""
+    images = []
+    for node in element.iter():
+        if not isinstance(node.tag, str):
+            continue
+        if node.tag == "img":
+            src = node.get("src") or node.get("data-src")
+            if src:
+                src = urljoin(base_url, src) if base_url else src
+                if src not in images:
+                    images.append(src)
+
+        if keep_attributes is not None:
+            for name in list(node.attrib):
+                if name not in keep_attributes:
+                    del node.attrib[name]
+        elif strip_layout:
+            classes = [c for c in _classes(node).split()
+                       if not any(layout in c.lower() for layout in BOOTSTRAP_CLASSES)]
+            if classes:
+                node.set("class", " ".join(classes))
+            elif "class" in node.attrib:
+                del node.attrib["class"]
+            for name in list(node.attrib):
+                if name in ("style", "role") or name.startswith("data-"):
+                    del node.attrib[name]
+
+        if rewrite_urls:
+            for name in ("src", "href"):
+                value = node.get(name)
+                if value:
+                    node.set(name, _rewrite_url(value, prefix_relative and name == "href"))
+    return images
+
+
+def extract_content(html, base_url=None, content_class="content", rewrite_urls=True,
+                    prefix_relative_links=False, strip_layout=False, keep_attributes=None):
+    """
+    Extraer título, contenido principal e imágenes de un documento HTML.
+
+    Args:
+        html: Documento (str o bytes), o árbol de parse_document() (que se
+            modifica: quitar maquetación, reescribir URLs...)
+        base_url: URL de la página, para devolver las imágenes absolutas
+        content_class: Clase del div que contiene el texto dentro de la
+            región principal ("content" en las páginas, "description" en
+            las entradas de noticias)
+        rewrite_urls: Convertir URLs del sitio original en rutas locales
+            (uploads -> /static/madmusic/images/, resto -> /madmusic/)
+        prefix_relative_links: Añadir /madmusic a los enlaces que empiezan por /
+        strip_layout: Quitar clases de Bootstrap y atributos style, role y data-*
+        keep_attributes: Si se indica, conservar solo estos atributos (p. ej.
+            ("href", "src", "alt"))
+
+    Returns:
+        ExtractedContent
+    """
+    root = html if isinstance(html, lxml.etree._Element) else parse_document(html)
+    if root is None:
+        return ExtractedContent()
+
+    scan = _scan(root, content_class)
+    region = next(
+        (element for element in (scan.column, scan.article, scan.tools, scan.main, scan.body) if element is not None),
+        None,
+    )
+    title = _find_title(scan, region)
+    if region is None:
+        return ExtractedContent(title=title)
+
+    content = next((div for div in scan.content_divs if _contains(region, div)), None)
+    # Un div de contenido vacío no sirve: usar toda la región
+    if content is not None and not _text(content) and not content.xpath(".//img"):
+        content = None
+    element = content if content is not None else region
+
+    keep = set(keep_attributes) if keep_attributes is not None else None
+    images = _finish(element, base_url, rewrite_urls, prefix_relative_links, strip_layout, keep)
+    return ExtractedContent(title=title, body=inner_html(element).strip(), images=images, element=element,
+                            in_content_block=content is not None)
+
+
+def _has_class(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+PANEL_XPATH = f".//div[{_has_class('panel')}]"
+HEADING_XPATH = f".//div[{_has_class('panel-heading')}]//h4[{_has_class('panel-title')}]"
+COLLAPSE_XPATH = f".//div[{_has_class('panel-collapse')}]"
+PANEL_BODY_XPATH = f".//div[{_has_class('panel-body')}]"
+
+
+# Formato de los acordeones: el de str() de BeautifulSoup con html.parser,
+# que es el que tenían los JSON de data/ y el que espera import_collapsibles
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+             "source", "track", "wbr"}
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+ASCII_SPACES = " \n\t\f\r"
+
+
+def _soup_text(text, preserve):
+    """Texto como lo guarda BeautifulSoup: los blancos sueltos quedan en un salto o un espacio."""
+    if not text:
+        return ""
+    if not preserve and not text.strip(ASCII_SPACES):
+        text = "\n" if "\n" in text else " "
+    return html_lib.escape(text, quote=False)
+
+
+def _soup_attribute(name, value):
+    if name == "class":
+        value = " ".join(value.split())
+    value = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if '"' in value:
+        if "'" not in value:
+            return f"{name}='{value}'"
+        value = value.replace('"', "&quot;")
+    return f'{name}="{value}"'
+
+
+def _soup_markup(element, parts, preserve=False):
+    tag = element.tag
+    preserve = preserve or tag in PRESERVE_WHITESPACE_TAGS
+    attributes = "".join(" " + _soup_attribute(name, value) for name, value in sorted(element.attrib.items()))
+    if tag in VOID_TAGS:
+        parts.append(f"<{tag}{attributes}/>")
+    else:
+        parts.append(f"<{tag}{attributes}>")
+        parts.append(_soup_text(element.text, preserve))
+        for child in element:
+            if isinstance(child.tag, str):
+                _soup_markup(child, parts, preserve)
+            parts.append(_soup_text(child.tail, preserve))
+        parts.append(f"</{tag}>")
+
+
+def soup_html(element, inner=False):
+    """
+    HTML de ``element`` con el formato de BeautifulSoup (``str(tag)`` con
+    html.parser): blancos entre etiquetas reducidos a un salto de línea,
+    etiquetas vacías como ``<br/>``, atributos en orden alfabético y el
+    atributo class normalizado.
+
+    Args:
+        element: Elemento de lxml
+        inner: Solo el contenido, sin la etiqueta propia
+    """
+    parts = []
+    if inner:
+        parts.append(_soup_text(element.text, element.tag in PRESERVE_WHITESPACE_TAGS))
+        for child in element:
+            if isinstance(child.tag, str):
+                _soup_markup(child, parts)
+            parts.append(_soup_text(child.tail, element.tag in PRESERVE_WHITESPACE_TAGS))
+    else:
+        _soup_markup(element, parts)
+    return "".join(parts)
+
+
+def _joined_text(element):
+    """Texto con los fragmentos recortados y unidos sin separador."""
+    return "".join(part.strip() for part in element.itertext())
+
+
+def extract_accordions(root):
+    """
+    Acordeones de Bootstrap (``div.panel`` con ``panel-heading`` y
+    ``panel-collapse``) de un árbol de parse_document(), sin modificarlo.
+
+    Returns:
+        list: Un dict por acordeón: ``title``, ``collapse_id``,
+        ``content_html`` (el div.panel-body), ``content_inner_html`` (su
+        contenido), ``content_text`` (inicio del texto), ``has_images``,
+        ``has_links`` y ``has_lists``
+    """
+    accordions = []
+    for panel in root.xpath(PANEL_XPATH):
+        headings = panel.xpath(HEADING_XPATH)
+        if not headings:
+            continue
+        links = headings[0].xpath(".//a")
+        title = " ".join(_joined_text(links[0] if links else headings[0]).split())
+
+        collapses = panel.xpath(COLLAPSE_XPATH)
+        if not collapses:
+            continue
+        bodies = collapses[0].xpath(PANEL_BODY_XPATH)
+        if not bodies:
+            continue
+        body = bodies[0]
+
+        content_text = _joined_text(body)
+        accordions.append({
+            "title": title,
+            "collapse_id": collapses[0].get("id", ""),
+            "content_html": soup_html(body),
+            "content_inner_html": re.sub(r"\n\s*\n", "\n\n", soup_html(body, inner=True)).strip(),
+            "content_text": content_text[:200] + "..." if len(content_text) > 200 else content_text,
+            "has_images": bool(body.xpath(".//img")),
+            "has_links": bool(body.xpath(".//a")),
+            "has_lists": bool(body.xpath(".//ul|.//ol")),
+        })
+    return accordions
+
+
+def extract_block(root, class_name, rewrite_urls=False, keep_attributes=None):
+    """
+    HTML interno del primer ``div.<class_name>`` de un árbol (p. ej. el
+    div.description de una noticia), o "" si no hay. No modifica el árbol.
+    """
+    blocks = root.xpath(f"//div[{_has_class(class_name)}]")
+    if not blocks:
+        return ""
+    block = copy.deepcopy(blocks[0])
+    for element in block.xpath(".//script|.//style"):
+        element.drop_tree()
+    keep = set(keep_attributes) if keep_attributes is not None else None
+    _finish(block, None, rewrite_urls, False, False, keep)
+    return inner_html(block).strip()
+
+
+def extract_file(path, **options):
+    """extract_content() de un fichero HTML guardado en UTF-8."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return extract_content(f.read(), **options)
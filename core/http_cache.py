@@ -0,0 +1,188 @@
+"""
+Caché HTTP persistente para peticiones condicionales (ETag / Last-Modified).
+
+La usan ``scripts/scrape_madmusic.py`` y ``manage.py sincronizar_madmusic``
+para no volver a descargar lo que no ha cambiado en el sitio original. Por
+cada URL se guarda en SQLite el ETag, el Last-Modified, el SHA-256 del
+contenido y, si existe, la copia local. En la siguiente pasada se envían
+``If-None-Match`` / ``If-Modified-Since`` y un 304 se trata como "sin
+cambios". Si el servidor no envía validadores, el hash del contenido
+permite detectar que un 200 trae lo mismo de antes.
+
+No depende de Django, así que también se puede usar desde los scripts.
+
+Uso:
+    cache = HttpCache("data/http_cache.sqlite3")
+    result = cache.get(session.get, url, timeout=10)
+    if result.not_modified:
+        ...  # reutilizar result.entry["local_path"]
+    else:
+        ...  # procesar result.response y luego:
+        cache.store(url, result.response, local_path=path)
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    local_path TEXT,
+    fetched_at REAL
+)
+"""
+
+
+class CachedResponse:
+    """
+    Resultado de HttpCache.get().
+
+    Attributes:
+        response: Respuesta de requests (200, 304, 404...)
+        entry: Entrada previa de la caché (dict) o None
+        not_modified: True si el servidor respondió 304
+    """
+
+    def __init__(self, response, entry):
+        self.response = response
+        self.entry = entry
+        self.not_modified = response.status_code == 304 and entry is not None
+
+
+class HttpCache:
+    """Caché de validadores HTTP en SQLite, segura entre hilos."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, url):
+        """Entrada guardada para ``url`` (dict) o None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM http_cache WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def conditional_headers(self, entry, require_local=False):
+        """
+        Cabeceras condicionales para una entrada de la caché.
+
+        Con ``require_local`` no se envían si la copia local ya no existe:
+        un 304 no serviría de nada sin ella.
+        """
+        if entry is None:
+            return {}
+        if require_local and not (entry["local_path"] and os.path.exists(entry["local_path"])):
+            return {}
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def get(self, fetch, url, require_local=False, **kwargs):
+        """
+        GET condicional.
+
+        Args:
+            fetch: Función con la firma de ``requests.get`` (p. ej. session.get)
+            url: URL a pedir
+            require_local: Solo pedir condicionalmente si hay copia local
+            **kwargs: Argumentos extra para ``fetch``
+
+        Returns:
+            CachedResponse
+        """
+        entry = self.lookup(url)
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(self.conditional_headers(entry, require_local=require_local))
+        response = fetch(url, headers=headers, **kwargs)
+        result = CachedResponse(response, entry)
+        with self._lock:
+            if result.not_modified:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if result.not_modified:
+            self.touch(url)
+        return result
+
+    def store(self, url, response, content=None, sha256=None, local_path=None):
+        """
+        Guardar los validadores de una respuesta 200 ya procesada.
+
+        Debe llamarse cuando el contenido se ha guardado/aplicado, de modo
+        que un fallo a mitad no deje una entrada que luego dé 304.
+
+        Args:
+            content: Cuerpo de la respuesta (si no se pasa ``sha256``)
+            sha256: Hash ya calculado (p. ej. al escribir en streaming)
+            local_path: Copia local del contenido
+
+        Returns:
+            bool: True si el contenido es distinto del guardado anteriormente
+        """
+        if sha256 is None:
+            if content is None:
+                content = response.content
+            sha256 = hashlib.sha256(content).hexdigest()
+            size = len(content)
+        else:
+            size = None
+
+        previous = self.lookup(url)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, sha256, size, local_path, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    sha256,
+                    size,
+                    str(local_path) if local_path else None,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+        return previous is None or previous["sha256"] != sha256
+
+    def unchanged(self, url, content):
+        """True si ``content`` es idéntico al guardado para ``url``."""
+        entry = self.lookup(url)
+        return entry is not None and entry["sha256"] == hashlib.sha256(content).hexdigest()
+
+    def touch(self, url):
+        """Marcar una entrada como revalidada ahora."""
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def forget(self, url):
+        """Eliminar la entrada de ``url``."""
+        with self._lock:
+            self._conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
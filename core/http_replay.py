@@ -0,0 +1,235 @@
+"""
+Modo grabación/reproducción HTTP para el scraper y los comandos de sincronización.
+
+Permite medir y probar ``scripts/scrape_madmusic.py``, ``scripts/download_css.py``,
+``sincronizar_madmusic`` e ``importar_noticias_destacadas`` sin acceder al
+sitio real:
+
+- record: las peticiones salen a la red y cada respuesta se guarda en el
+  archivo (un directorio con ``index.jsonl`` y los cuerpos por SHA-256).
+- replay: las respuestas se sirven desde el archivo con una latencia
+  configurable, sin red. Una URL que no está en el archivo da
+  ConnectionError, como si no hubiera conexión. Las cabeceras
+  If-None-Match / If-Modified-Since se respetan (304), así que la caché
+  condicional de core/http_cache.py funciona igual que contra el sitio.
+
+Se activa montando un adaptador de transporte en la sesión de requests:
+
+    session = configure_session(requests.Session())
+
+que lee HTTP_REPLAY_MODE (record/replay), HTTP_REPLAY_ARCHIVE (por
+defecto data/http_archive) y HTTP_REPLAY_LATENCY (segundos) del entorno,
+o con los argumentos ``mode``, ``archive`` y ``latency``.
+
+No depende de Django, así que también se puede usar desde los scripts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_ARCHIVE = os.path.join("data", "http_archive")
+
+MODES = ("record", "replay")
+
+# Cabeceras que no tiene sentido reproducir (el cuerpo se guarda ya descomprimido)
+SKIPPED_HEADERS = {"content-encoding", "transfer-encoding", "connection", "set-cookie"}
+
+
+def archive_key(method, url):
+    return f"{method.upper()} {url}"
+
+
+class HttpArchive:
+    """
+    Archivo de respuestas grabadas.
+
+    ``index.jsonl`` tiene una línea por respuesta (la última gana) y los
+    cuerpos se guardan en ``bodies/<sha256>``, así que repetir una grabación
+    no duplica contenido.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path / "index.jsonl"
+        self.bodies_dir = self.path / "bodies"
+        self._lock = threading.Lock()
+        self._entries = {}
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[archive_key(entry["method"], entry["url"])] = entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, method, url):
+        """Entrada grabada (dict) o None."""
+        return self._entries.get(archive_key(method, url))
+
+    def body(self, entry):
+        """Cuerpo de una entrada."""
+        return (self.bodies_dir / entry["sha256"]).read_bytes()
+
+    def add(self, method, url, status, headers, body, reason=""):
+        """Grabar una respuesta."""
+        sha256 = hashlib.sha256(body).hexdigest()
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "reason": reason,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in SKIPPED_HEADERS},
+            "sha256": sha256,
+            "size": len(body),
+        }
+        with self._lock:
+            self.bodies_dir.mkdir(parents=True, exist_ok=True)
+            body_path = self.bodies_dir / sha256
+            if not body_path.exists():
+                tmp_path = body_path.with_suffix(f".{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(body)
+                os.replace(tmp_path, body_path)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._entries[archive_key(method, url)] = entry
+        return entry
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(path):
+    """Archivo compartido por ruta (las sesiones de varios hilos usan el mismo)."""
+    key = os.path.abspath(path)
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = HttpArchive(path)
+        return _archives[key]
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Adaptador que hace la petición real y graba la respuesta."""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # Las respuestas condicionales (304) no sustituyen a la grabada
+        if response.status_code != 304:
+            self.archive.add(request.method, request.url, response.status_code, response.headers,
+                             response.content, response.reason or "")
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adaptador que sirve las respuestas desde el archivo, sin red."""
+
+    def __init__(self, archive, latency=0.0):
+        super().__init__()
+        self.archive = archive
+        self.latency = latency
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.latency:
+            time.sleep(self.latency)
+
+        entry = self.archive.lookup(request.method, request.url)
+        if entry is None:
+            raise requests.ConnectionError(f"No grabado en {self.archive.path}: {request.method} {request.url}",
+                                           request=request)
+
+        headers = CaseInsensitiveDict(entry["headers"])
+        status, reason, body = entry["status"], entry["reason"], None
+        if status == 200 and self._not_modified(request, headers):
+            status, reason, body = 304, "Not Modified", b""
+        if body is None:
+            body = self.archive.body(entry)
+            headers["Content-Length"] = str(len(body))
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = headers
+        response.encoding = get_encoding_from_headers(headers)
+        response.raw = BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    @staticmethod
+    def _not_modified(request, headers):
+        etag = headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return True
+        last_modified = headers.get("Last-Modified")
+        return bool(last_modified) and "If-None-Match" not in request.headers \
+            and request.headers.get("If-Modified-Since") == last_modified
+
+    def close(self):
+        pass
+
+
+def adapter_settings(adapter):
+    """Argumentos de HTTPAdapter (pool y reintentos) con los que se creó un adaptador."""
+    if not isinstance(adapter, HTTPAdapter):
+        return {}
+    return {
+        "pool_connections": adapter._pool_connections,
+        "pool_maxsize": adapter._pool_maxsize,
+        "pool_block": adapter._pool_block,
+        "max_retries": adapter.max_retries,
+    }
+
+
+def configure_session(session, mode=None, archive=None, latency=None, **adapter_kwargs):
+    """
+    Montar el adaptador de grabación o reproducción en una sesión.
+
+    Sin ``mode`` ni HTTP_REPLAY_MODE la sesión queda como estaba.
+
+    Args:
+        session: requests.Session
+        mode: "record", "replay" o None (usar HTTP_REPLAY_MODE)
+        archive: Directorio del archivo (HTTP_REPLAY_ARCHIVE o data/http_archive)
+        latency: Segundos añadidos a cada respuesta reproducida (HTTP_REPLAY_LATENCY)
+        **adapter_kwargs: Argumentos de HTTPAdapter para grabar (pool_connections,
+            pool_maxsize...). Por defecto se copian del adaptador https:// que
+            se sustituye, para no perder el tamaño del pool
+
+    Returns:
+        requests.Session: La misma sesión
+    """
+    mode = mode or os.environ.get("HTTP_REPLAY_MODE") or None
+    if mode is None:
+        return session
+    if mode not in MODES:
+        raise ValueError(f"Modo HTTP desconocido: {mode} (record o replay)")
+
+    archive = get_archive(archive or os.environ.get("HTTP_REPLAY_ARCHIVE") or DEFAULT_ARCHIVE)
+    if mode == "record":
+        if not adapter_kwargs:
+            adapter_kwargs = adapter_settings(session.get_adapter("https://"))
+        adapter = RecordingAdapter(archive, **adapter_kwargs)
+    else:
+        if latency is None:
+            latency = float(os.environ.get("HTTP_REPLAY_LATENCY") or 0)
+        adapter = ReplayAdapter(archive, latency=latency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
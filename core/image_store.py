@@ -0,0 +1,307 @@
+"""
+Almacén de imágenes scrapeadas direccionado por contenido.
+
+WordPress sirve cada imagen en varios tamaños (``foto-350x350.jpg``,
+``foto-1024x768.jpg``, ``foto-scaled.jpg``) y el scraper antiguo guardaba
+cada repetición como ``foto_1.jpg``, ``foto_1_2.jpg``... Este módulo:
+
+- Guarda cada contenido una sola vez (SHA-256): descargar otra vez la
+  misma imagen no crea otro fichero.
+- Agrupa las variantes de tamaño de una imagen y elige la mejor (el
+  original sin sufijo, luego ``-scaled``, luego la de más píxeles).
+- Escribe ``image_map.json`` en el directorio de imágenes con qué fichero
+  canónico corresponde a cada URL y a cada nombre antiguo, para que los
+  comandos de importación (import_images_to_wagtail,
+  importar_noticias_destacadas) usen siempre el mismo fichero.
+
+Los ficheros conservan un nombre legible (el de la variante sin sufijos);
+si dos contenidos distintos coinciden en nombre, el segundo lleva los
+primeros caracteres de su hash.
+
+No depende de Django, así que también se puede usar desde los scripts.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path, PurePosixPath
+from urllib.parse import urlparse, urlunparse
+
+MAP_NAME = "image_map.json"
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"}
+
+SIZE_SUFFIX = re.compile(r"-(\d+)x(\d+)$")
+SCALED_SUFFIX = "-scaled"
+# Sufijos _1, _1_2... que añadía el scraper al repetir una descarga
+COPY_SUFFIX = re.compile(r"(?:_\d+)+$")
+
+
+def split_variant(name):
+    """
+    Separar el nombre de una imagen en (base, extensión, rango).
+
+    El rango ordena las variantes de la misma imagen: mayor es mejor.
+
+        >>> split_variant("foto-350x350.jpg")
+        ('foto', '.jpg', (0, 122500))
+        >>> split_variant("foto.jpg")
+        ('foto', '.jpg', (2, 0))
+    """
+    path = PurePosixPath(name)
+    ext = path.suffix.lower()
+    stem = path.stem
+
+    match = SIZE_SUFFIX.search(stem)
+    if match:
+        return stem[:match.start()], ext, (0, int(match.group(1)) * int(match.group(2)))
+    if stem.endswith(SCALED_SUFFIX):
+        return stem[:-len(SCALED_SUFFIX)], ext, (1, 0)
+    return stem, ext, (2, 0)
+
+
+def variant_key(name):
+    """Clave común a todas las variantes de una imagen (``foto.jpg``)."""
+    base, ext, _rank = split_variant(name)
+    return f"{base}{ext}"
+
+
+def original_url(url):
+    """
+    URL del original de una variante de tamaño, o None si ya es el original.
+
+    ``.../foto-350x350.jpg`` -> ``.../foto.jpg``
+    """
+    parsed = urlparse(url)
+    path = PurePosixPath(parsed.path)
+    base, _ext, rank = split_variant(path.name)
+    if rank == (2, 0):
+        return None
+    return urlunparse(parsed._replace(path=str(path.with_name(f"{base}{path.suffix}"))))
+
+
+def best_variants(urls):
+    """
+    Quedarse con la mejor variante de cada imagen (p. ej. de un srcset).
+
+    Returns:
+        list: Una URL por imagen, en el orden de la primera aparición
+    """
+    best = {}
+    for url in urls:
+        parsed = urlparse(url)
+        key = (parsed.netloc, str(PurePosixPath(parsed.path).parent), variant_key(PurePosixPath(parsed.path).name))
+        _base, _ext, rank = split_variant(PurePosixPath(parsed.path).name)
+        if key not in best or rank > best[key][0]:
+            best[key] = (rank, url)
+    return [url for _rank, url in best.values()]
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageStore:
+    """
+    Directorio de imágenes deduplicado con su ``image_map.json``.
+
+    El mapa tiene tres tablas:
+    - ``files``: hash -> fichero canónico
+    - ``urls``: URL descargada -> fichero canónico
+    - ``aliases``: nombre de fichero o clave de variante -> fichero canónico
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.map_path = self.directory / MAP_NAME
+        self._lock = threading.Lock()
+        self.files = {}
+        self.urls = {}
+        self.aliases = {}
+        if self.map_path.exists():
+            with open(self.map_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.urls = data.get("urls", {})
+            self.aliases = data.get("aliases", {})
+
+    def _existing(self, filename):
+        if filename and (self.directory / filename).exists():
+            return self.directory / filename
+        return None
+
+    def lookup_url(self, url):
+        """Fichero canónico ya descargado para ``url`` (o su original), o None."""
+        with self._lock:
+            path = self._existing(self.urls.get(url))
+            if path is None and original_url(url):
+                path = self._existing(self.urls.get(original_url(url)))
+            return path
+
+    def resolve(self, name_or_url):
+        """
+        Fichero canónico para una URL o nombre de imagen, o None.
+
+        Acepta nombres de variantes (``foto-350x350.jpg``) y nombres
+        antiguos eliminados por dedupe() (``foto_1_2.jpg``).
+        """
+        if "://" in name_or_url:
+            path = self.lookup_url(name_or_url)
+            if path is not None:
+                return path
+            name = PurePosixPath(urlparse(name_or_url).path).name
+        else:
+            name = name_or_url
+        with self._lock:
+            for candidate in (name, self.aliases.get(name), self.aliases.get(variant_key(name))):
+                path = self._existing(candidate)
+                if path is not None:
+                    return path
+        return None
+
+    def _free_name(self, name, sha256):
+        """Nombre para un contenido nuevo (con el hash si el nombre está ocupado)."""
+        path = PurePosixPath(name)
+        for candidate in (name, f"{path.stem}-{sha256[:8]}{path.suffix}"):
+            if not (self.directory / candidate).exists() and candidate not in self.files.values():
+                return candidate
+        return f"{path.stem}-{sha256}{path.suffix}"
+
+    def _record_variant(self, key, filename):
+        """Apuntar la clave de variante al mejor fichero conocido."""
+        current = self.aliases.get(key)
+        if current is None or split_variant(filename)[2] > split_variant(current)[2]:
+            self.aliases[key] = filename
+
+    def add_file(self, tmp_path, name, urls=()):
+        """
+        Incorporar un fichero descargado.
+
+        Si el contenido ya estaba, se borra ``tmp_path`` y se devuelve el
+        fichero existente; si no, se mueve a un nombre libre.
+
+        Args:
+            tmp_path: Fichero temporal dentro del directorio
+            name: Nombre preferido (normalmente el de la URL)
+            urls: URLs que sirven este contenido
+
+        Returns:
+            tuple: (Path canónico, True si el contenido es nuevo)
+        """
+        sha256 = file_sha256(tmp_path)
+        with self._lock:
+            filename = self.files.get(sha256)
+            is_new = self._existing(filename) is None
+            if is_new:
+                filename = self._free_name(name, sha256)
+                os.replace(tmp_path, self.directory / filename)
+                self.files[sha256] = filename
+            else:
+                os.unlink(tmp_path)
+            for url in urls:
+                self.urls[url] = filename
+            if name != filename:
+                self.aliases[name] = filename
+            self._record_variant(variant_key(name), filename)
+        return self.directory / filename, is_new
+
+    def add_url(self, url, filename):
+        """Apuntar una URL a un fichero ya guardado."""
+        with self._lock:
+            self.urls[url] = filename
+
+    def save(self):
+        """Escribir ``image_map.json``."""
+        with self._lock:
+            data = {
+                "files": dict(sorted(self.files.items())),
+                "urls": dict(sorted(self.urls.items())),
+                "aliases": dict(sorted(self.aliases.items())),
+            }
+            tmp_path = self.map_path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.map_path)
+
+    def dedupe(self, collapse_variants=True, dry_run=False):
+        """
+        Deduplicar un directorio ya existente.
+
+        - Los ficheros con el mismo contenido se reducen a uno (el de nombre
+          más limpio: sin sufijos de copia, el más corto).
+        - Con ``collapse_variants``, las variantes de tamaño de una imagen
+          se reducen a la mejor disponible. Dos ficheros distintos del mismo
+          rango (p. ej. ``foto.jpg`` y ``foto_1.jpg`` con otro contenido) se
+          conservan los dos.
+        Los nombres eliminados quedan como alias en el mapa.
+
+        Returns:
+            dict: ``files`` (antes), ``kept``, ``removed`` y ``bytes_freed``
+        """
+        by_hash = {}
+        name_sha = {}
+        for path in sorted(self.directory.iterdir()):
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                name_sha[path.name] = file_sha256(path)
+                by_hash.setdefault(name_sha[path.name], []).append(path)
+
+        def cleanliness(path):
+            return (bool(COPY_SUFFIX.search(path.stem)), len(path.name), path.name)
+
+        keep = {}
+        remove = {}
+        for sha256, paths in by_hash.items():
+            paths.sort(key=cleanliness)
+            keep[paths[0].name] = sha256
+            for duplicate in paths[1:]:
+                remove[duplicate.name] = paths[0].name
+
+        if collapse_variants:
+            groups = {}
+            for name in keep:
+                groups.setdefault(variant_key(name), []).append(name)
+            for names in groups.values():
+                if len(names) < 2:
+                    continue
+                names.sort(key=lambda n: (split_variant(n)[2], -len(n)), reverse=True)
+                best_rank = split_variant(names[0])[2]
+                for variant in names[1:]:
+                    if split_variant(variant)[2] < best_rank:
+                        remove[variant] = names[0]
+                        del keep[variant]
+            # Lo eliminado como duplicado de una variante apunta al ganador
+            for name, target in remove.items():
+                while target in remove:
+                    target = remove[target]
+                remove[name] = target
+
+        stats = {"files": sum(len(paths) for paths in by_hash.values()), "kept": len(keep),
+                 "removed": len(remove), "bytes_freed": 0}
+        for name in remove:
+            stats["bytes_freed"] += (self.directory / name).stat().st_size
+
+        if dry_run:
+            return stats
+
+        with self._lock:
+            for name, sha256 in keep.items():
+                self.files[sha256] = name
+                self._record_variant(variant_key(name), name)
+            for name, target in remove.items():
+                (self.directory / name).unlink()
+                # Volver a descargar una variante eliminada da el fichero ganador
+                self.files[name_sha[name]] = target
+                self.aliases[name] = target
+                self._record_variant(variant_key(name), target)
+            for url, filename in list(self.urls.items()):
+                if filename in remove:
+                    self.urls[url] = remove[filename]
+        self.save()
+        return stats
@@ -0,0 +1,83 @@
+"""
+Management command para medir el motor de extracción (core/extraction.py)
+sobre el HTML scrapeado
+
+Extrae título, cuerpo e imágenes de todos los documentos del directorio
+varias veces y muestra la mediana. Con --comparar mide también lo que
+cuesta solo parsear los mismos documentos con BeautifulSoup (html.parser),
+lo mínimo que pagaban los extractores anteriores, que además volvían a
+parsear fragmentos varias veces.
+
+Uso:
+    python manage.py benchmark_extraccion
+    python manage.py benchmark_extraccion --scraped-dir=scraped_madmusic/html --runs=5 --comparar
+"""
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.extraction import extract_content
+
+
+def time_runs(function, documents, runs):
+    """Mediana en segundos de aplicar ``function`` a todos los documentos"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for document in documents:
+            function(document)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Mide la extracción de contenido sobre el HTML scrapeado"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scraped-dir",
+            type=str,
+            default="scraped_madmusic/html",
+            help="Directorio con el HTML scrapeado",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=3,
+            help="Repeticiones (se muestra la mediana)",
+        )
+        parser.add_argument(
+            "--comparar",
+            action="store_true",
+            help="Medir también el parseo con BeautifulSoup",
+        )
+
+    def handle(self, *args, **options):
+        scraped_dir = Path(options["scraped_dir"])
+        if not scraped_dir.is_absolute():
+            scraped_dir = Path(settings.BASE_DIR) / scraped_dir
+        paths = sorted(scraped_dir.rglob("*.html"))
+        if not paths:
+            raise CommandError(f"No hay HTML en {scraped_dir}")
+
+        documents = [path.read_text(encoding="utf-8", errors="replace") for path in paths]
+        size_mb = sum(len(document.encode("utf-8")) for document in documents) / (1024 * 1024)
+        runs = max(1, options["runs"])
+        self.stdout.write(f"{len(documents)} documentos ({size_mb:.1f} MB), {runs} repeticiones")
+
+        results = [("core.extraction", time_runs(extract_content, documents, runs))]
+        if options["comparar"]:
+            from bs4 import BeautifulSoup
+
+            results.append((
+                "BeautifulSoup (solo parseo)",
+                time_runs(lambda document: BeautifulSoup(document, "html.parser"), documents, runs),
+            ))
+
+        for name, seconds in results:
+            self.stdout.write(
+                f"  {name:<30} {seconds:7.3f}s  {len(documents) / seconds:8.1f} docs/s  {size_mb / seconds:6.1f} MB/s"
+            )
@@ -0,0 +1,64 @@
+"""
+Management command para construir o actualizar el corpus preprocesado del HTML scrapeado
+
+Parsea scraped_madmusic/html una vez y guarda título, cuerpo limpio, texto,
+acordeones e imágenes de cada página en scraped_madmusic/corpus.sqlite3
+(ver core/corpus.py). Solo se vuelven a parsear los archivos que han
+cambiado. Los comandos de importación actualizan el corpus por su cuenta;
+este comando sirve para prepararlo o forzar una reconstrucción.
+"""
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.corpus import CorpusStore
+
+
+class Command(BaseCommand):
+    help = "Construye o actualiza el corpus preprocesado de scraped_madmusic/html"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scraped-dir",
+            type=str,
+            default="scraped_madmusic/html",
+            help="Directorio con el HTML scrapeado",
+        )
+        parser.add_argument(
+            "--store",
+            type=str,
+            help="Fichero SQLite del corpus (default: corpus.sqlite3 junto al directorio HTML)",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Volver a parsear todos los archivos aunque no hayan cambiado",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Procesos para parsear (default: núcleos de la CPU; 1 = sin procesos)",
+        )
+
+    def handle(self, *args, **options):
+        scraped_dir = Path(options["scraped_dir"])
+        if not scraped_dir.is_absolute():
+            scraped_dir = Path(settings.BASE_DIR) / scraped_dir
+        if not scraped_dir.is_dir():
+            raise CommandError(f"Directorio no encontrado: {scraped_dir}")
+
+        corpus = CorpusStore(scraped_dir, options.get("store"))
+        stats = corpus.update(rebuild=options["rebuild"], workers=options["workers"])
+        total = len(corpus)
+        corpus.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Corpus {corpus.path}: {total} documentos "
+                f"({stats['parsed']} parseados, {stats['touched']} con mtime nuevo, "
+                f"{stats['unchanged']} sin cambios, {stats['removed']} eliminados) en {stats['seconds']:.2f}s"
+            )
+        )
@@ -0,0 +1,57 @@
+"""
+Management command para deduplicar las imágenes scrapeadas
+
+Reduce scraped_madmusic/images a un fichero por contenido (SHA-256) y, salvo
+--keep-variants, a la mejor variante de tamaño de cada imagen de WordPress
+(foto.jpg frente a foto-350x350.jpg). Los nombres eliminados quedan en
+image_map.json, así que import_images_to_wagtail e importar_noticias_destacadas
+los siguen encontrando (ver core/image_store.py).
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.image_store import ImageStore
+
+
+class Command(BaseCommand):
+    help = "Deduplica las imágenes scrapeadas por contenido y variante de tamaño"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--images-dir",
+            type=str,
+            default="scraped_madmusic/images",
+            help="Directorio con las imágenes scrapeadas",
+        )
+        parser.add_argument(
+            "--keep-variants",
+            action="store_true",
+            help="Eliminar solo duplicados exactos, conservando las variantes de tamaño",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Simular sin borrar ficheros",
+        )
+
+    def handle(self, *args, **options):
+        images_dir = Path(options["images_dir"])
+        if not images_dir.is_absolute():
+            images_dir = Path(settings.BASE_DIR) / images_dir
+        if not images_dir.is_dir():
+            raise CommandError(f"No existe el directorio de imágenes: {images_dir}")
+
+        stats = ImageStore(images_dir).dedupe(
+            collapse_variants=not options["keep_variants"],
+            dry_run=options["dry_run"],
+        )
+
+        prefix = "[DRY-RUN] " if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}{stats['files']} imágenes: {stats['kept']} conservadas, "
+                f"{stats['removed']} eliminadas ({stats['bytes_freed'] / 1024 / 1024:.1f} MB liberados)"
+            )
+        )
@@ -14,6 +14,9 @@ from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 
+from core.corpus import CorpusStore
+from core.http_replay import configure_session
+from core.image_store import MAP_NAME, ImageStore
 from core.models import Entrada, Proyecto
 
 
@@ -78,10 +81,28 @@ class Command(BaseCommand):
             help="Descargar imágenes desde URLs si no están en el directorio local",
         )
 
+    def get_image_store(self, images_dir):
+        """ImageStore del directorio scrapeado, o None si no tiene image_map.json"""
+        if not hasattr(self, "_image_stores"):
+            self._image_stores = {}
+        images_path = Path(images_dir)
+        if images_path not in self._image_stores:
+            has_map = (images_path / MAP_NAME).exists()
+            self._image_stores[images_path] = ImageStore(images_path) if has_map else None
+        return self._image_stores[images_path]
+
     def find_image_file(self, image_url, images_dir):
         """Buscar archivo de imagen en el directorio scrapeado"""
         if not image_url:
             return None
+
+        # Fichero canónico según image_map.json (variantes y duplicados ya resueltos)
+        if Path(images_dir).exists():
+            store = self.get_image_store(images_dir)
+            if store is not None:
+                resolved = store.resolve(image_url)
+                if resolved is not None:
+                    return resolved
         
         # Extraer nombre del archivo de la URL
         parsed_url = urlparse(image_url)
@@ -132,12 +153,28 @@ class Command(BaseCommand):
         
         return None
 
-    def download_image(self, image_url):
-        """Descargar imagen desde URL"""
+    def download_image(self, image_url, images_dir=None):
+        """
+        Descargar imagen desde URL (HTTP_REPLAY_MODE graba/reproduce, ver core/http_replay.py)
+
+        Si hay un directorio de imágenes con image_map.json, la imagen se
+        guarda en él deduplicada y se devuelve su Path; si no, un ContentFile.
+        """
+        if not hasattr(self, "_session"):
+            self._session = configure_session(requests.Session())
         try:
-            response = requests.get(image_url, timeout=10, stream=True)
+            response = self._session.get(image_url, timeout=10, stream=True)
             response.raise_for_status()
-            return ContentFile(response.content)
+            store = self.get_image_store(images_dir) if images_dir and Path(images_dir).exists() else None
+            if store is None:
+                return ContentFile(response.content)
+            tmp_path = store.directory / ".importar_noticias.part"
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+            path, _is_new = store.add_file(tmp_path, Path(urlparse(image_url).path).name, urls=[image_url])
+            store.save()
+            return path
         except Exception as e:
             self.stdout.write(
                 self.style.WARNING(f"  ⚠ Error descargando imagen {image_url}: {e}")
@@ -169,6 +206,9 @@ class Command(BaseCommand):
             },
         )
 
+        # Corpus preprocesado (solo se vuelve a parsear lo que ha cambiado)
+        corpus = CorpusStore.open(scraped_dir)
+
         # Leer archivo inicio.html
         inicio_html = scraped_dir / "inicio.html"
         if not inicio_html.exists():
@@ -262,7 +302,7 @@ class Command(BaseCommand):
                                 self.stdout.write(
                                     f"  [→] Descargando imagen: {imagen_url}"
                                 )
-                                image_content = self.download_image(imagen_url)
+                                image_content = self.download_image(imagen_url, images_dir)
                                 if image_content:
                                     # Guardar temporalmente para procesar después
                                     imagen_file = image_content
@@ -271,55 +311,18 @@ class Command(BaseCommand):
                 entrada_html = scraped_dir / f"{slug}.html"
                 cuerpo = resumen  # Por defecto usar el resumen
 
-                if entrada_html.exists():
+                entrada_doc = corpus.get(f"{slug}.html")
+                if entrada_doc is not None:
                     try:
-                        with open(entrada_html, "r", encoding="utf-8") as ef:
-                            entrada_content = ef.read()
-                        entrada_soup = BeautifulSoup(entrada_content, "html.parser")
-
-                        # Extraer contenido completo - buscar específicamente el div.description
-                        description_div = entrada_soup.find("div", class_="description")
-                        if description_div:
-                            # Remover scripts y estilos
-                            for script in description_div(["script", "style"]):
-                                script.decompose()
-                            # Limpiar atributos innecesarios pero mantener estructura HTML básica
-                            for tag in description_div.find_all():
-                                # Mantener solo atributos esenciales (href para enlaces, src para imágenes)
-                                if tag.name == 'a' and 'href' in tag.attrs:
-                                    tag.attrs = {'href': tag.attrs['href']}
-                                elif tag.name == 'img' and 'src' in tag.attrs:
-                                    tag.attrs = {'src': tag.attrs['src'], 'alt': tag.attrs.get('alt', '')}
-                                else:
-                                    # Para otros tags, limpiar todos los atributos excepto los esenciales
-                                    clean_attrs = {}
-                                    if 'href' in tag.attrs:
-                                        clean_attrs['href'] = tag.attrs['href']
-                                    if 'src' in tag.attrs:
-                                        clean_attrs['src'] = tag.attrs['src']
-                                    if 'alt' in tag.attrs:
-                                        clean_attrs['alt'] = tag.attrs['alt']
-                                    tag.attrs = clean_attrs
-                            
-                            # Obtener solo el contenido interno del div.description
-                            cuerpo = ''.join(str(child) for child in description_div.children)
+                        # Contenido completo: el div.description con solo los
+                        # atributos esenciales (ver core/corpus.py)
+                        if entrada_doc.description:
                             # Limpiar espacios múltiples en HTML
-                            cuerpo = re.sub(r'\s+', ' ', cuerpo)
+                            cuerpo = re.sub(r'\s+', ' ', entrada_doc.description)
                             cuerpo = re.sub(r'>\s+<', '><', cuerpo)
-                        else:
-                            # Fallback: buscar en main_content
-                            main_content = (
-                                entrada_soup.find("main")
-                                or entrada_soup.find("section", id="tools")
-                                or entrada_soup.find("article")
-                            )
-                            if main_content:
-                                # Remover scripts y estilos
-                                for script in main_content(["script", "style"]):
-                                    script.decompose()
-                                cuerpo = main_content.get_text(separator="\n", strip=True)
-                                # Limpiar espacios múltiples
-                                cuerpo = re.sub(r"\n{3,}", "\n\n", cuerpo)
+                        elif entrada_doc.text:
+                            # Fallback: texto de la región principal
+                            cuerpo = entrada_doc.text
                     except Exception as e:
                         self.stdout.write(
                             self.style.WARNING(
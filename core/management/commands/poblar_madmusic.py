@@ -6,10 +6,11 @@ import re
 from pathlib import Path
 from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 
+from core.corpus import CorpusStore
+from core.extraction import parse_document
 from core.models import Entrada, Pagina, Proyecto
 
 
@@ -95,6 +96,9 @@ class Command(BaseCommand):
             "actualidad-2": "actualidad-2.html",  # Noticias
         }
 
+        # Corpus preprocesado (solo se vuelve a parsear lo que ha cambiado)
+        corpus = CorpusStore.open(scraped_dir)
+
         # Procesar todas las páginas del menú
         pages_created = 0
         pages_updated = 0
@@ -129,42 +133,13 @@ class Command(BaseCommand):
                     continue
 
             try:
-                with open(html_path, "r", encoding="utf-8") as f:
-                    html_content = f.read()
-
-                soup = BeautifulSoup(html_content, "html.parser")
-
-                # Extraer título
-                title_tag = soup.find("h1") or soup.find("h2") or soup.find("title")
-                if title_tag:
-                    titulo = title_tag.get_text(strip=True)
-                    # Limpiar título
-                    titulo = re.sub(r"\s+", " ", titulo)
-                    if len(titulo) > 200:
-                        titulo = titulo[:200]
-                else:
-                    titulo = slug_menu.replace("-", " ").replace("/", " - ").title()
-
-                # Extraer contenido principal
-                main_content = soup.find("main") or soup.find("section", id="tools") or soup.find("article")
-                if main_content:
-                    # Remover scripts y estilos
-                    for script in main_content(["script", "style"]):
-                        script.decompose()
-                    cuerpo = main_content.get_text(separator="\n", strip=True)
-                    # También intentar obtener HTML limpio
-                    cuerpo_html = str(main_content)
-                else:
-                    # Si no hay main, buscar en body
-                    body = soup.find("body")
-                    if body:
-                        for script in body(["script", "style", "header", "footer", "nav"]):
-                            script.decompose()
-                        cuerpo = body.get_text(separator="\n", strip=True)
-                        cuerpo_html = str(body)
-                    else:
-                        cuerpo = "Contenido de la página"
-                        cuerpo_html = "<p>Contenido de la página</p>"
+                # Título y contenido principal del corpus preprocesado (ver core/corpus.py)
+                document = corpus.get(html_path.relative_to(scraped_dir))
+                if document is None:
+                    raise ValueError(f"{html_path} no está en el corpus")
+                titulo = document.title or slug_menu.replace("-", " ").replace("/", " - ").title()
+                cuerpo = document.text or "Contenido de la página"
+                cuerpo_html = document.body or "<p>Contenido de la página</p>"
 
                 # Limpiar y limitar cuerpo
                 cuerpo = re.sub(r"\n{3,}", "\n\n", cuerpo)
@@ -229,11 +204,13 @@ class Command(BaseCommand):
             if cat_path.exists():
                 try:
                     with open(cat_path, "r", encoding="utf-8") as f:
-                        html_content = f.read()
+                        root = parse_document(f.read())
 
-                    soup = BeautifulSoup(html_content, "html.parser")
                     # Buscar enlaces a entradas individuales
-                    entrada_links = soup.find_all("a", href=re.compile(r"/\d{4}/|/[a-z-]+/$"))
+                    entrada_pattern = re.compile(r"/\d{4}/|/[a-z-]+/$")
+                    entrada_links = [] if root is None else [
+                        link for link in root.iter("a") if entrada_pattern.search(link.get("href", ""))
+                    ]
 
                     for link in entrada_links[:10]:  # Limitar a 10 por categoría
                         href = link.get("href", "")
@@ -246,33 +223,11 @@ class Command(BaseCommand):
                             entrada_slug = slug_match.group(1)
                             if entrada_slug and len(entrada_slug) > 5:
                                 # Buscar si existe el HTML de esta entrada
-                                entrada_html = scraped_dir / f"{entrada_slug}.html"
-                                if entrada_html.exists():
+                                entrada_doc = corpus.get(f"{entrada_slug}.html")
+                                if entrada_doc is not None:
                                     try:
-                                        with open(entrada_html, "r", encoding="utf-8") as ef:
-                                            entrada_content = ef.read()
-                                        entrada_soup = BeautifulSoup(entrada_content, "html.parser")
-
-                                        titulo_elem = entrada_soup.find("h1") or entrada_soup.find("title")
-                                        titulo_entrada = titulo_elem.get_text(strip=True) if titulo_elem else entrada_slug.replace("-", " ").title()
-
-                                        cuerpo_elem = entrada_soup.find("main") or entrada_soup.find("article") or entrada_soup.find("section", id="tools")
-                                        if cuerpo_elem:
-                                            for script in cuerpo_elem(["script", "style"]):
-                                                script.decompose()
-                                            cuerpo_entrada = cuerpo_elem.get_text(separator="\n", strip=True)
-                                        else:
-                                            cuerpo_entrada = f"Contenido de {titulo_entrada}"
-
-                                        # Buscar fecha
-                                        fecha_elem = entrada_soup.find(class_=re.compile("date|fecha"))
-                                        fecha = None
-                                        if fecha_elem:
-                                            fecha_text = fecha_elem.get_text()
-                                            fecha_match = re.search(r"(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})", fecha_text)
-                                            if fecha_match:
-                                                # Intentar parsear fecha (simplificado)
-                                                pass
+                                        titulo_entrada = entrada_doc.title or entrada_slug.replace("-", " ").title()
+                                        cuerpo_entrada = entrada_doc.text or f"Contenido de {titulo_entrada}"
 
                                         Entrada.objects.get_or_create(
                                             slug=entrada_slug,
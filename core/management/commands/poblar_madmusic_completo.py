@@ -1,94 +1,22 @@
 """
 Management command para poblar todas las páginas de Madmusic con contenido real desde HTML scrapeado
 """
-import re
 from pathlib import Path
 
-from bs4 import BeautifulSoup
 from django.core.management.base import BaseCommand
 
+from core.corpus import CorpusStore
 from core.models import Pagina, Proyecto
 
 
-def extract_content_from_html(html_path):
-    """Extraer título y contenido de un archivo HTML"""
-    try:
-        with open(html_path, "r", encoding="utf-8") as f:
-            html_content = f.read()
-
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        # Extraer título - buscar en varios lugares
-        titulo = None
-        for selector in ["h1", "h2.title", ".entry-title", "title"]:
-            elem = soup.select_one(selector)
-            if elem:
-                titulo = elem.get_text(strip=True)
-                # Limpiar título
-                titulo = re.sub(r"\s+", " ", titulo)
-                if "ICCMU" in titulo or "MadMusic" in titulo:
-                    # Intentar extraer solo la parte relevante
-                    parts = titulo.split("|")
-                    if len(parts) > 1:
-                        titulo = parts[0].strip()
-                if len(titulo) > 200:
-                    titulo = titulo[:200]
-                break
-
-        if not titulo:
-            titulo = "Página"
-
-        # Extraer contenido principal
-        contenido = None
-        
-        # Buscar en section#tools (contenido principal del sitio)
-        main_section = soup.find("section", id="tools")
-        if main_section:
-            # Remover elementos no deseados
-            for elem in main_section.find_all(["script", "style", "nav", "header", "footer"]):
-                elem.decompose()
-            contenido = str(main_section)
-        
-        # Si no hay section#tools, buscar en article o main
-        if not contenido:
-            article = soup.find("article") or soup.find("main")
-            if article:
-                for elem in article.find_all(["script", "style", "nav", "header", "footer"]):
-                    elem.decompose()
-                contenido = str(article)
-
-        # Si aún no hay contenido, usar body sin header/footer
-        if not contenido:
-            body = soup.find("body")
-            if body:
-                # Remover header, footer, nav, scripts, styles
-                for tag in body.find_all(["header", "footer", "nav", "script", "style"]):
-                    tag.decompose()
-                contenido = str(body)
-
-        # Limpiar contenido HTML
-        if contenido:
-            # Convertir URLs absolutas a relativas para imágenes
-            contenido = re.sub(
-                r'src="https://madmusic\.iccmu\.es/wp-content/uploads/([^"]+)"',
-                r'src="/static/madmusic/images/\1"',
-                contenido
-            )
-            contenido = re.sub(
-                r'href="https://madmusic\.iccmu\.es/([^"]+)"',
-                r'href="/madmusic/\1"',
-                contenido
-            )
-            # Limitar tamaño
-            if len(contenido) > 100000:
-                contenido = contenido[:100000] + "..."
-        else:
-            contenido = "<p>Contenido de la página</p>"
-
-        return titulo, contenido
-
-    except Exception as e:
-        return None, None
+def content_from_document(document):
+    """Título y contenido de un documento del corpus preprocesado (ver core/corpus.py)"""
+    titulo = document.title or "Página"
+    contenido = document.body or "<p>Contenido de la página</p>"
+    # Limitar tamaño
+    if len(contenido) > 100000:
+        contenido = contenido[:100000] + "..."
+    return titulo, contenido
 
 
 class Command(BaseCommand):
@@ -154,6 +82,9 @@ class Command(BaseCommand):
             "contacto": "contacto.html",
         }
 
+        # Corpus preprocesado (solo se vuelve a parsear lo que ha cambiado)
+        corpus = CorpusStore.open(scraped_dir)
+
         pages_created = 0
         pages_updated = 0
         pages_not_found = 0
@@ -188,14 +119,14 @@ class Command(BaseCommand):
                     pages_not_found += 1
                     continue
 
-            titulo, contenido = extract_content_from_html(html_path)
-
-            if not titulo or not contenido:
+            document = corpus.get(html_path.relative_to(scraped_dir))
+            if document is None:
                 self.stdout.write(
                     self.style.WARNING(f"  ⚠ Error extrayendo: {slug}")
                 )
                 pages_not_found += 1
                 continue
+            titulo, contenido = content_from_document(document)
 
             # Crear o actualizar página
             pagina, created = Pagina.objects.get_or_create(
@@ -3,6 +3,15 @@ ASGI config for proyectos project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Perfil de despliegue ASGI: las vistas de backups que llaman a Azure
+(list-backups, download-from-azure) se sirven con sus versiones async
+(BACKUP_ASYNC_VIEWS), de modo que una llamada lenta al almacenamiento no
+ocupa un worker. El resto del sitio (Wagtail, admin) sigue siendo
+síncrono y Django lo ejecuta en hilos. Los middlewares del proyecto
+admiten los dos modos, así que no añaden cambios de contexto.
+
+    gunicorn proyectos.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +21,23 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "proyectos.settings")
+os.environ.setdefault("BACKUP_ASYNC_VIEWS", "1")
+
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """Aplicación Django con cierre ordenado de los clientes async de Azure."""
+    if scope["type"] == "lifespan":
+        from cms.export.blob_clients import close_async_blob_services
 
-application = get_asgi_application()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await close_async_blob_services()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    else:
+        await django_application(scope, receive, send)
@@ -3,19 +3,14 @@ Middleware para capturar errores 404 incluso en modo DEBUG
 """
 from django.http import Http404
 from django.shortcuts import render
+from django.utils.deprecation import MiddlewareMixin
 
 
-class Custom404Middleware:
+class Custom404Middleware(MiddlewareMixin):
     """
     Middleware que captura errores 404 y muestra la página personalizada
     incluso cuando DEBUG=True
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        return self.get_response(request)
-
     def process_exception(self, request, exception):
         """
         Captura excepciones Http404 y renderiza el template personalizado
@@ -1,19 +1,56 @@
 import logging
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
-class DomainUrlConfMiddleware:
+class RequestMiddleware:
     """
-    Middleware que selecciona el URLConf apropiado basado en el dominio del host.
+    Base de los middlewares del proyecto que solo actúan antes de la vista.
+
+    Como MiddlewareMixin, funciona en WSGI y en ASGI, pero en ASGI no pasa
+    ``process_request`` a un hilo con sync_to_async en cada petición: se
+    llama ``aprocess_request`` en el propio bucle. Por defecto ejecuta
+    ``process_request``, que por eso no debe bloquear; las subclases que
+    consultan la base de datos sobrescriben ``aprocess_request`` con el ORM
+    async.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_request(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.aprocess_request(request) or await self.get_response(request)
+
+    def process_request(self, request):
+        """Devolver una respuesta para cortar la petición, o None para seguir."""
+        return None
+
+    async def aprocess_request(self, request):
+        return self.process_request(request)
+
+
+class DomainUrlConfMiddleware(RequestMiddleware):
+    """
+    Middleware que selecciona el URLConf apropiado basado en el dominio del host.
+
+    Admite peticiones síncronas y async (perfil ASGI) sin cambiar de hilo.
+    """
+
+    def process_request(self, request):
         host = request.get_host().split(":")[0]
         urlconf = settings.URLCONFS_BY_HOST.get(host, settings.ROOT_URLCONF)
 
@@ -21,7 +58,6 @@ class DomainUrlConfMiddleware:
             logger.debug(f"Usando URLConf '{urlconf}' para host '{host}'")
 
         request.urlconf = urlconf
-        return self.get_response(request)
 
 
 
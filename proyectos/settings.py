@@ -188,6 +188,27 @@ else:
     MEDIA_ROOT = BASE_DIR / "media"
     MEDIA_URL = "/media/"
 
+# Mirror estático (cms.export.mirror): al publicar, las páginas se renderizan a
+# disco y StaticMirrorMiddleware las sirve a usuarios anónimos sin pasar por Wagtail
+STATIC_MIRROR_ROOT = os.environ.get("STATIC_MIRROR_ROOT")
+# "X-Accel-Redirect" (nginx) o "X-Sendfile" (Apache) para delegar el envío al servidor
+STATIC_MIRROR_SENDFILE_HEADER = os.environ.get("STATIC_MIRROR_SENDFILE_HEADER")
+
+if STATIC_MIRROR_ROOT:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+        "proyectos.static_mirror_middleware.StaticMirrorMiddleware",
+    )
+
+# Descarga de backups (cms.views): "X-Accel-Redirect" (nginx) o "X-Sendfile" (Apache)
+# para que el servidor web envíe el ZIP, y redirección a una URL SAS si está en Azure
+BACKUP_SENDFILE_HEADER = os.environ.get("BACKUP_SENDFILE_HEADER")
+BACKUP_DOWNLOAD_AZURE_REDIRECT = os.environ.get("BACKUP_DOWNLOAD_AZURE_REDIRECT", "").lower() in ("1", "true", "yes")
+
+# Vistas async de backups (list-backups, download-from-azure) con el SDK async de Azure.
+# proyectos/asgi.py lo activa por defecto; bajo WSGI se usan las vistas síncronas.
+BACKUP_ASYNC_VIEWS = os.environ.get("BACKUP_ASYNC_VIEWS", "").lower() in ("1", "true", "yes")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
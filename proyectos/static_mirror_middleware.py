@@ -0,0 +1,80 @@
+"""
+Middleware que sirve páginas desde el mirror estático (cms.export.mirror).
+
+Las peticiones GET/HEAD anónimas sin query string se responden con el HTML
+pre-renderizado si existe en STATIC_MIRROR_ROOT; en caso contrario la
+petición sigue su curso normal por Django/Wagtail. Los renders del propio
+exportador (cabecera X-Static-Export) nunca se sirven desde el mirror.
+
+Con STATIC_MIRROR_SENDFILE_HEADER = "X-Accel-Redirect" (nginx) o
+"X-Sendfile" (Apache) el envío del fichero se delega al servidor web.
+"""
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse
+
+from cms.export.exporter import EXPORT_REQUEST_META
+from cms.export.mirror import StaticMirror
+from proyectos.middleware import RequestMiddleware
+
+
+class StaticMirrorMiddleware(RequestMiddleware):
+    """
+    Middleware static-first: mirror en disco con fallback dinámico.
+
+    Admite peticiones síncronas y async (perfil ASGI) sin cambiar de hilo:
+    comprobar el fichero es un stat local, más barato que el salto a un
+    hilo que evita.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "STATIC_MIRROR_ROOT", None):
+            raise MiddlewareNotUsed("STATIC_MIRROR_ROOT no configurado")
+
+        super().__init__(get_response)
+        self.mirror = StaticMirror()
+        self.session_cookie = settings.SESSION_COOKIE_NAME
+        self.sendfile_header = getattr(settings, "STATIC_MIRROR_SENDFILE_HEADER", None)
+        self.accel_prefix = getattr(settings, "STATIC_MIRROR_ACCEL_PREFIX", "/_static_mirror/")
+
+    def process_request(self, request):
+        mirror_file = self._get_mirror_file(request)
+        if mirror_file is None:
+            return None
+
+        return self._serve(mirror_file)
+
+    def _get_mirror_file(self, request):
+        """Devuelve el fichero del mirror para la petición, o None si hay que ir a Django."""
+        if request.method not in ("GET", "HEAD") or request.META.get("QUERY_STRING"):
+            return None
+
+        # El exportador está regenerando el mirror: necesita la versión dinámica
+        if request.META.get(EXPORT_REQUEST_META):
+            return None
+
+        # Usuarios con sesión (editores, staff) siempre reciben la versión dinámica
+        if self.session_cookie in request.COOKIES:
+            return None
+
+        host = request.get_host().split(":")[0]
+        mirror_file = self.mirror.file_for_path(host, request.path)
+        if mirror_file is None or not mirror_file.is_file():
+            return None
+        return mirror_file
+
+    def _serve(self, mirror_file):
+        """Construye la respuesta para un acierto en el mirror."""
+        if self.sendfile_header == "X-Accel-Redirect":
+            relative = mirror_file.relative_to(self.mirror.root).as_posix()
+            response = HttpResponse(content_type="text/html; charset=utf-8")
+            response["X-Accel-Redirect"] = self.accel_prefix.rstrip("/") + "/" + relative
+        elif self.sendfile_header:
+            response = HttpResponse(content_type="text/html; charset=utf-8")
+            response[self.sendfile_header] = str(mirror_file)
+        else:
+            response = FileResponse(open(mirror_file, "rb"), content_type="text/html; charset=utf-8")
+
+        response["X-Static-Mirror"] = "hit"
+        return response
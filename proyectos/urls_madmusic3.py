@@ -7,6 +7,14 @@ from wagtail.documents import urls as wagtaildocs_urls
 
 from cms import views as cms_views
 
+# Perfil ASGI: las vistas que llaman a Azure no bloquean workers (ver proyectos/asgi.py)
+if getattr(settings, "BACKUP_ASYNC_VIEWS", False):
+    download_from_azure = cms_views.download_from_azure_async
+    list_backups = cms_views.list_backups_async
+else:
+    download_from_azure = cms_views.download_from_azure
+    list_backups = cms_views.list_backups
+
 urlpatterns = [
     path("admin/", include(wagtailadmin_urls)),
     path("documents/", include(wagtaildocs_urls)),
@@ -15,8 +23,9 @@ urlpatterns = [
     path("download-offline-backup/", cms_views.download_offline_backup, name="download_offline_backup"),
     path("download-offline/", cms_views.download_offline_backup_signed, name="download_offline_backup_signed"),
     path("generate-download-token/", cms_views.generate_download_token, name="generate_download_token"),
-    path("download-from-azure/", cms_views.download_from_azure, name="download_from_azure"),
-    path("list-backups/", cms_views.list_backups, name="list_backups"),
+    path("download-from-azure/", download_from_azure, name="download_from_azure"),
+    path("list-backups/", list_backups, name="list_backups"),
+    path("backup-storage/<str:container>/<str:name>", cms_views.download_stored_backup, name="download_stored_backup"),
     
     # Wagtail pages (must be last)
     path("", include(wagtail_urls)),
@@ -8,19 +8,30 @@ cuando sea posible (para mantener localhost en desarrollo).
 
 from wagtail.models import Site
 
+from proyectos.middleware import RequestMiddleware
 
-class WagtailSiteMiddleware:
+
+class WagtailSiteMiddleware(RequestMiddleware):
     """
     Middleware que configura el Site de Wagtail según el prefijo de la URL.
+
+    Admite peticiones síncronas y async (perfil ASGI); en ASGI el Site se
+    busca con el ORM async.
     """
 
-    def __init__(self, get_response):
-        self.get_response = get_response
+    def process_request(self, request):
+        lookup = self._site_lookup(request)
+        if lookup is not None:
+            self._set_site(request, Site.objects.filter(hostname=lookup[0], port=lookup[1]).first())
 
-    def __call__(self, request):
+    async def aprocess_request(self, request):
+        lookup = self._site_lookup(request)
+        if lookup is not None:
+            self._set_site(request, await Site.objects.filter(hostname=lookup[0], port=lookup[1]).afirst())
+
+    def _site_lookup(self, request):
+        """(hostname, puerto) del Site local que corresponde al prefijo de la ruta, o None."""
         host = request.get_host().split(':')[0]
-        port_str = request.get_host().split(':')[1] if ':' in request.get_host() else '80'
-        port = int(port_str) if port_str != '' else 80
         
         # Mapeo de prefijos de path según el hostname
         # Si estamos en localhost/127.0.0.1, usar Sites locales
@@ -34,15 +45,14 @@ class WagtailSiteMiddleware:
             # En producción, usar los dominios reales (ya manejado por DomainUrlConfMiddleware)
             path_to_site_lookup = {}
         
-        # Detectar el prefijo de path y configurar el Site correspondiente
-        for path_prefix, (site_hostname, site_port) in path_to_site_lookup.items():
+        # Detectar el prefijo de path
+        for path_prefix, site_lookup in path_to_site_lookup.items():
             if request.path.startswith(path_prefix):
-                # Buscar el Site correspondiente
-                site = Site.objects.filter(hostname=site_hostname, port=site_port).first()
-                if site:
-                    # Configurar el Site en el request para que Wagtail lo use
-                    request._wagtail_site = site
-                break
-
-        response = self.get_response(request)
-        return response
+                return site_lookup
+        return None
+
+    @staticmethod
+    def _set_site(request, site):
+        if site:
+            # Configurar el Site en el request para que Wagtail lo use
+            request._wagtail_site = site
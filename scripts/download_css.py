@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
-"""Descargar CSS y recursos necesarios del sitio original"""
+"""
+Descargar CSS y recursos necesarios del sitio original
+
+HTTP_REPLAY_MODE=record|replay graba o reproduce las respuestas
+(ver core/http_replay.py).
+"""
 
 import os
+import sys
 import requests
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+from core.http_replay import configure_session
+
 CSS_DIR = BASE_DIR / "madmusic_app" / "static" / "madmusic" / "css"
 CSS_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -19,7 +28,7 @@ CSS_URLS = [
     "https://madmusic.iccmu.es/wp-content/themes/iccmu/css/font-awesome.min.css",
 ]
 
-session = requests.Session()
+session = configure_session(requests.Session())
 session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
 })
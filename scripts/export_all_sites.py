@@ -6,11 +6,14 @@ Uso:
     python scripts/export_all_sites.py
     python scripts/export_all_sites.py --upload-azure
     python scripts/export_all_sites.py --exclude-media --verbose
+    python scripts/export_all_sites.py --workers 3 --max-db-connections 3 --upload-azure
+    python scripts/export_all_sites.py --delta --full-every 7 --upload-azure
 """
 
 import os
 import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
@@ -23,27 +26,129 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proyectos.settings')
 import django
 django.setup()
 
+from django.db import connections
 from wagtail.models import Site
 from cms.export.exporter import StaticSiteExporter
 from cms.export.azure_uploader import AzureBackupUploader
 from cms.export import ExportError
 
 
+def _export_site(site_id, output_base, exclude_media=False, verbose=False, delta=False, full_every=None):
+    """
+    Exporta un único site y crea su ZIP.
+    
+    Se usa tanto en modo secuencial como dentro de los procesos worker del
+    modo concurrente, por lo que sólo recibe y devuelve datos serializables.
+    
+    Args:
+        site_id: ID del Site de Wagtail
+        output_base: Directorio base para exports
+        exclude_media: Si True, no copia media files
+        verbose: Si True, muestra output detallado
+        delta: Si True, crea un backup incremental cuando sea posible
+        full_every: Backups por cadena incremental, incluido el completo
+    
+    Returns:
+        dict: Resultado con site, zip_path, pages_exported y pages_failed
+    """
+    site = Site.objects.get(id=site_id)
+    
+    if verbose:
+        print(f"\n{'='*60}")
+        print(f"Exporting site: {site.hostname} (ID: {site.id})")
+        print(f"{'='*60}")
+    
+    # Create output directory for this site
+    output_dir = Path(output_base) / f"export-{site.hostname}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Export
+    exporter = StaticSiteExporter(
+        site_id_or_hostname=site.id,
+        output_dir=str(output_dir),
+        exclude_media=exclude_media,
+        verbose=verbose
+    )
+    exporter.export()
+    
+    # Create ZIP
+    zip_path = exporter.create_zip(delta=delta, full_every=full_every)
+    
+    if verbose:
+        print(f"\n✅ Export successful: {zip_path}")
+    
+    return {
+        'site': site.hostname,
+        'zip_path': str(zip_path),
+        'pages_exported': exporter.pages_exported,
+        'pages_failed': exporter.pages_failed
+    }
+
+
+def _upload_archive(zip_path, verbose=False):
+    """
+    Sube un ZIP a Azure Blob Storage.
+    
+    Args:
+        zip_path: Ruta al ZIP a subir
+        verbose: Si True, muestra output detallado
+    
+    Returns:
+        str: URL del blob subido
+    """
+    if verbose:
+        print(f"Uploading to Azure: {zip_path}")
+    
+    uploader = AzureBackupUploader()
+    url = uploader.upload(zip_path)
+    
+    if verbose:
+        print(f"✅ Uploaded to Azure: {url}")
+    
+    return url
+
+
+def _init_export_worker():
+    """
+    Inicializa un proceso worker del pool de exportación.
+    
+    Las conexiones a la base de datos heredadas del proceso padre no se
+    pueden compartir entre procesos, así que se cierran para que cada worker
+    abra la suya propia (una por worker).
+    """
+    connections.close_all()
+
+
 def export_all_sites(output_base='/tmp/exports', upload_azure=False, 
-                     exclude_media=False, verbose=False):
+                     exclude_media=False, verbose=False, workers=1,
+                     max_db_connections=None, upload_workers=2, delta=False,
+                     full_every=None):
     """
     Exporta todos los sites de Wagtail.
     
+    Con ``workers > 1`` cada site se exporta en un proceso independiente y
+    los uploads a Azure se solapan con el renderizado de los sites restantes,
+    de modo que el tiempo total se aproxima al del site más lento.
+    
     Args:
         output_base: Directorio base para exports
         upload_azure: Si True, sube cada ZIP a Azure
         exclude_media: Si True, no copia media files
         verbose: Si True, muestra output detallado
+        workers: Número máximo de procesos de exportación en paralelo
+        max_db_connections: Límite global de conexiones a la base de datos
+            abiertas por los workers (por defecto, igual a ``workers``)
+        upload_workers: Número de uploads a Azure en paralelo
+        delta: Si True, crea backups incrementales (ver cms.export.delta)
+        full_every: Con ``delta``, crea un backup completo cada N backups
+    
+    Returns:
+        dict: Resultados con las claves 'success' y 'failed'
     """
-    sites = Site.objects.all()
+    sites = list(Site.objects.all())
     
     if verbose:
-        print(f"Found {sites.count()} sites to export")
+        print(f"Found {len(sites)} sites to export")
         print("-" * 60)
     
     results = {
@@ -51,58 +156,95 @@ def export_all_sites(output_base='/tmp/exports', upload_azure=False,
         'failed': []
     }
     
-    for site in sites:
-        try:
-            if verbose:
-                print(f"\n{'='*60}")
-                print(f"Exporting site: {site.hostname} (ID: {site.id})")
-                print(f"{'='*60}")
-            
-            # Create output directory for this site
-            output_dir = Path(output_base) / f"export-{site.hostname}"
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Export
-            exporter = StaticSiteExporter(
-                site_id_or_hostname=site.id,
-                output_dir=str(output_dir),
-                exclude_media=exclude_media,
-                verbose=verbose
-            )
-            exporter.export()
-            
-            # Create ZIP
-            zip_path = exporter.create_zip()
-            
-            if verbose:
-                print(f"\n✅ Export successful: {zip_path}")
+    if workers <= 1 or len(sites) <= 1:
+        for site in sites:
+            try:
+                result = _export_site(site.id, output_base, exclude_media, verbose, delta, full_every)
+                
+                # Upload to Azure if requested
+                if upload_azure:
+                    _upload_archive(result['zip_path'], verbose)
+                
+                results['success'].append(result)
             
-            # Upload to Azure if requested
-            if upload_azure:
+            except Exception as e:
                 if verbose:
-                    print(f"Uploading to Azure...")
-                
-                uploader = AzureBackupUploader()
-                url = uploader.upload(zip_path)
+                    print(f"\n❌ Export failed for {site.hostname}: {e}")
                 
+                results['failed'].append({
+                    'site': site.hostname,
+                    'error': str(e)
+                })
+        
+        return results
+    
+    return _export_sites_concurrently(
+        sites, results, output_base, upload_azure, exclude_media, verbose,
+        workers, max_db_connections, upload_workers, delta, full_every
+    )
+
+
+def _export_sites_concurrently(sites, results, output_base, upload_azure, exclude_media,
+                               verbose, workers, max_db_connections, upload_workers,
+                               delta=False, full_every=None):
+    """
+    Exporta los sites en un pool de procesos y solapa los uploads.
+    
+    Cada worker mantiene como mucho una conexión a la base de datos, por lo
+    que el número de procesos se limita por ``max_db_connections``. Los
+    resultados se agregan en el mismo orden que los sites para que el dict
+    final sea idéntico al del modo secuencial.
+    """
+    if max_db_connections is None:
+        max_db_connections = workers
+    pool_size = max(1, min(workers, max_db_connections, len(sites)))
+    
+    if verbose:
+        print(f"Concurrent mode: {pool_size} export worker(s), {upload_workers} upload worker(s)")
+    
+    # No compartir el socket de la base de datos con los procesos hijos
+    connections.close_all()
+    
+    outcomes = {}
+    upload_futures = {}
+    
+    with ProcessPoolExecutor(max_workers=pool_size, initializer=_init_export_worker) as export_pool, \
+            ThreadPoolExecutor(max_workers=max(1, upload_workers)) as upload_pool:
+        export_futures = {
+            export_pool.submit(
+                _export_site, site.id, output_base, exclude_media, verbose, delta, full_every
+            ): site
+            for site in sites
+        }
+        
+        for future in as_completed(export_futures):
+            site = export_futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
                 if verbose:
-                    print(f"✅ Uploaded to Azure: {url}")
+                    print(f"\n❌ Export failed for {site.hostname}: {e}")
+                outcomes[site.id] = ('failed', {'site': site.hostname, 'error': str(e)})
+                continue
             
-            results['success'].append({
-                'site': site.hostname,
-                'zip_path': str(zip_path),
-                'pages_exported': exporter.pages_exported,
-                'pages_failed': exporter.pages_failed
-            })
-        
-        except Exception as e:
-            if verbose:
-                print(f"\n❌ Export failed for {site.hostname}: {e}")
+            outcomes[site.id] = ('success', result)
             
-            results['failed'].append({
-                'site': site.hostname,
-                'error': str(e)
-            })
+            # Subir mientras se siguen renderizando los demás sites
+            if upload_azure:
+                upload_futures[upload_pool.submit(_upload_archive, result['zip_path'], verbose)] = site
+        
+        for future in as_completed(upload_futures):
+            site = upload_futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                if verbose:
+                    print(f"\n❌ Export failed for {site.hostname}: {e}")
+                outcomes[site.id] = ('failed', {'site': site.hostname, 'error': str(e)})
+    
+    for site in sites:
+        status, entry = outcomes[site.id]
+        results[status].append(entry)
     
     return results
 
@@ -185,6 +327,35 @@ def main():
         metavar='DAYS',
         help='Clean up exports older than N days'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of sites exported in parallel worker processes (default: 1)'
+    )
+    parser.add_argument(
+        '--max-db-connections',
+        type=int,
+        metavar='N',
+        help='Global cap on DB connections held by export workers (default: --workers)'
+    )
+    parser.add_argument(
+        '--upload-workers',
+        type=int,
+        default=2,
+        help='Number of concurrent Azure uploads in parallel mode (default: 2)'
+    )
+    parser.add_argument(
+        '--delta',
+        action='store_true',
+        help='Create incremental backups against the previous ZIP of each site'
+    )
+    parser.add_argument(
+        '--full-every',
+        type=int,
+        metavar='N',
+        help='With --delta, create a full backup every N backups (default: BACKUP_FULL_EVERY or 7)'
+    )
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -207,7 +378,12 @@ def main():
             output_base=args.output,
             upload_azure=args.upload_azure,
             exclude_media=args.exclude_media,
-            verbose=args.verbose
+            verbose=args.verbose,
+            workers=args.workers,
+            max_db_connections=args.max_db_connections,
+            upload_workers=args.upload_workers,
+            delta=args.delta,
+            full_every=args.full_every
         )
         
         print_summary(results)
@@ -3,87 +3,113 @@
 Script para extraer contenido de acordeones Bootstrap del HTML scrapeado de madmusic.iccmu.es
 
 Este script:
-1. Lee los archivos HTML del directorio scraped_madmusic/html/
-2. Extrae todos los acordeones (elementos con class="panel-collapse collapse")
-3. Genera un JSON estructurado con el contenido
-4. Preserva el HTML interno completo
+1. Lee los acordeones (elementos con class="panel-collapse collapse") del
+   corpus preprocesado de scraped_madmusic/html/ (core/corpus.py), que solo
+   vuelve a parsear los archivos HTML que han cambiado
+   (con --workers, en varios procesos)
+2. Genera un JSON estructurado con el contenido (o JSON Lines con --jsonl,
+   una página por línea), escrito página a página sin montarlo en memoria
+3. Preserva el HTML interno completo
+
+Uso:
+    python scripts/extract_collapsibles.py
+    python scripts/extract_collapsibles.py --workers 8 --jsonl
+    python scripts/extract_collapsibles.py --all --output data/collapsibles_todo.json
 """
 
+import argparse
 import json
 import os
+import sys
+import tempfile
 from pathlib import Path
-from bs4 import BeautifulSoup
-from typing import Dict, List, Any
+from typing import Any, Dict, Iterator, List, Tuple
+
+# core/corpus.py no depende de Django
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.corpus import CorpusStore
+
+
+# Archivos HTML que contienen acordeones (basado en el análisis previo)
+HTML_FILES = [
+    'servicios-e-infraestructura.html',
+    'transferencia/exposiciones.html',
+    'transferencia/conciertos.html',
+    'proyecto-madmusic/objetivos.html',
+    'proyecto-madmusic/investigacion.html',
+    'formacion-empleo/empleo.html',
+    'equipo/participantes.html',
+    'equipo/grupos-beneficiarios.html',
+    'equipo.html',
+    'divulgacion-cientifica/publicaciones-madmusic-2.html',
+    'divulgacion-cientifica/cuadernos-de-musica-iberoamericana.html',
+    'divulgacion-cientifica/congresos-madmusic.html',
+    'divulgacion-cientifica/articulos-en-revistas-cientificas.html',
+    'divulgacion-cientifica/archivos.html',
+    'cursos-de-verano.html',
+]
 
 
-def extract_accordions_from_html(html_path: str) -> List[Dict[str, Any]]:
+def iter_pages(corpus: CorpusStore, html_files: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
     """
-    Extrae todos los acordeones de un archivo HTML.
-    
-    Args:
-        html_path: Ruta al archivo HTML
-        
-    Returns:
-        Lista de diccionarios con la información de cada acordeón
+    Recorre los archivos indicados y devuelve (page_key, datos) de los que
+    tienen acordeones.
     """
-    with open(html_path, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
-    
-    accordions = []
-    
-    # Buscar todos los paneles con acordeones
-    panels = soup.find_all('div', class_='panel')
-    
-    for panel in panels:
-        # Buscar el heading (título clickeable)
-        heading = panel.find('div', class_='panel-heading')
-        if not heading:
-            continue
-            
-        title_elem = heading.find('h4', class_='panel-title')
-        if not title_elem:
-            continue
-        
-        # Extraer el título (puede estar dentro de un <a>)
-        title_link = title_elem.find('a')
-        if title_link:
-            # Remover espacios en blanco excesivos y saltos de línea
-            title = ' '.join(title_link.get_text(strip=True).split())
-        else:
-            title = ' '.join(title_elem.get_text(strip=True).split())
-        
-        # Buscar el contenido colapsable
-        collapse = panel.find('div', class_='panel-collapse')
-        if not collapse:
-            continue
-        
-        # Extraer el ID del collapse para mantener la estructura
-        collapse_id = collapse.get('id', '')
+    for html_file in html_files:
+        document = corpus.get(html_file)
         
-        # Buscar el cuerpo del panel
-        body = collapse.find('div', class_='panel-body')
-        if not body:
+        if document is None:
+            print(f"⚠️  Archivo no encontrado: {html_file}")
             continue
         
-        # Extraer el contenido HTML completo del body
-        content_html = str(body)
-        
-        # También extraer el texto plano para referencia
-        content_text = body.get_text(strip=True)
-        
-        accordion_data = {
-            'title': title,
-            'collapse_id': collapse_id,
-            'content_html': content_html,
-            'content_text': content_text[:200] + '...' if len(content_text) > 200 else content_text,  # Preview
-            'has_images': bool(body.find_all('img')),
-            'has_links': bool(body.find_all('a')),
-            'has_lists': bool(body.find_all(['ul', 'ol']))
-        }
+        print(f"📄 Procesando: {html_file}")
+        accordions = document.accordions
         
-        accordions.append(accordion_data)
+        if accordions:
+            # Limpiar el nombre del archivo para usarlo como key
+            page_key = html_file.replace('.html', '').replace('/', '_')
+            print(f"   ✅ Extraídos {len(accordions)} acordeones")
+            yield page_key, {
+                'source_file': html_file,
+                'accordion_count': len(accordions),
+                'accordions': accordions
+            }
+        else:
+            print(f"   ⚠️  No se encontraron acordeones")
+
+
+def write_output(pages: Iterator[Tuple[str, Dict[str, Any]]], output_file: Path, jsonl: bool) -> List[Tuple[str, int]]:
+    """
+    Escribe las páginas según llegan, en un temporal que sustituye al
+    fichero de salida al terminar.
     
-    return accordions
+    En JSON el resultado es idéntico a ``json.dump(todo, indent=2)``; en
+    JSON Lines cada línea es un objeto con ``page_key`` y los datos de la
+    página.
+    
+    Returns:
+        Lista de (source_file, número de acordeones) de cada página escrita
+    """
+    written = []
+    fd, tmp_path = tempfile.mkstemp(dir=output_file.parent, prefix=output_file.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            if not jsonl:
+                f.write('{')
+            for page_key, page_data in pages:
+                if jsonl:
+                    f.write(json.dumps({'page_key': page_key, **page_data}, ensure_ascii=False) + '\n')
+                else:
+                    value = json.dumps(page_data, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                    f.write(f"{',' if written else ''}\n  {json.dumps(page_key, ensure_ascii=False)}: {value}")
+                written.append((page_data['source_file'], page_data['accordion_count']))
+            if not jsonl:
+                f.write('\n}' if written else '}')
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return written
 
 
 def main():
@@ -91,71 +117,51 @@ def main():
     
     # Configurar rutas
     base_dir = Path(__file__).parent.parent
-    html_dir = base_dir / 'scraped_madmusic' / 'html'
-    output_dir = base_dir / 'data'
-    output_dir.mkdir(exist_ok=True)
     
-    # Archivos HTML que contienen acordeones (basado en el análisis previo)
-    html_files = [
-        'servicios-e-infraestructura.html',
-        'transferencia/exposiciones.html',
-        'transferencia/conciertos.html',
-        'proyecto-madmusic/objetivos.html',
-        'proyecto-madmusic/investigacion.html',
-        'formacion-empleo/empleo.html',
-        'equipo/participantes.html',
-        'equipo/grupos-beneficiarios.html',
-        'equipo.html',
-        'divulgacion-cientifica/publicaciones-madmusic-2.html',
-        'divulgacion-cientifica/cuadernos-de-musica-iberoamericana.html',
-        'divulgacion-cientifica/congresos-madmusic.html',
-        'divulgacion-cientifica/articulos-en-revistas-cientificas.html',
-        'divulgacion-cientifica/archivos.html',
-        'cursos-de-verano.html',
-    ]
+    parser = argparse.ArgumentParser(description='Extrae los acordeones del HTML scrapeado de madmusic')
+    parser.add_argument('--html-dir', default=str(base_dir / 'scraped_madmusic' / 'html'),
+                        help='Directorio con el HTML scrapeado')
+    parser.add_argument('--output', help='Fichero de salida (default: data/collapsibles.json, '
+                                         'o data/collapsibles.jsonl con --jsonl)')
+    parser.add_argument('--jsonl', action='store_true',
+                        help='Escribir JSON Lines (una página por línea)')
+    parser.add_argument('--all', action='store_true',
+                        help='Todas las páginas del corpus con acordeones, no solo las conocidas')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Procesos para parsear los archivos cambiados (1 = sin procesos)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Volver a parsear todos los archivos aunque no hayan cambiado')
+    args = parser.parse_args()
     
-    all_data = {}
-    total_accordions = 0
+    html_dir = Path(args.html_dir)
+    output_file = Path(args.output) if args.output else base_dir / 'data' / (
+        'collapsibles.jsonl' if args.jsonl else 'collapsibles.json')
+    output_file.parent.mkdir(parents=True, exist_ok=True)
     
     print("🔍 Extrayendo acordeones del HTML scrapeado...\n")
+
+    corpus = CorpusStore(html_dir)
+    stats = corpus.update(rebuild=args.rebuild, workers=args.workers)
+    print(f"📚 Corpus: {stats['parsed']} parseados, {stats['unchanged'] + stats['touched']} sin cambios "
+          f"({stats['seconds']:.2f}s)\n")
     
-    for html_file in html_files:
-        html_path = html_dir / html_file
-        
-        if not html_path.exists():
-            print(f"⚠️  Archivo no encontrado: {html_file}")
-            continue
-        
-        print(f"📄 Procesando: {html_file}")
-        accordions = extract_accordions_from_html(str(html_path))
-        
-        if accordions:
-            # Limpiar el nombre del archivo para usarlo como key
-            page_key = html_file.replace('.html', '').replace('/', '_')
-            all_data[page_key] = {
-                'source_file': html_file,
-                'accordion_count': len(accordions),
-                'accordions': accordions
-            }
-            total_accordions += len(accordions)
-            print(f"   ✅ Extraídos {len(accordions)} acordeones")
-        else:
-            print(f"   ⚠️  No se encontraron acordeones")
+    if args.all:
+        html_files = [document.path for document in corpus.documents() if document.accordions]
+    else:
+        html_files = HTML_FILES
     
-    # Guardar el JSON
-    output_file = output_dir / 'collapsibles.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=2)
+    written = write_output(iter_pages(corpus, html_files), output_file, args.jsonl)
+    corpus.close()
     
     print(f"\n✨ Extracción completada!")
-    print(f"📊 Total de páginas procesadas: {len(all_data)}")
-    print(f"📊 Total de acordeones extraídos: {total_accordions}")
+    print(f"📊 Total de páginas procesadas: {len(written)}")
+    print(f"📊 Total de acordeones extraídos: {sum(count for _, count in written)}")
     print(f"💾 Datos guardados en: {output_file}")
     
     # Mostrar resumen por página
     print("\n📋 Resumen por página:")
-    for page_key, page_data in sorted(all_data.items(), key=lambda x: x[1]['accordion_count'], reverse=True):
-        print(f"   • {page_data['source_file']}: {page_data['accordion_count']} acordeones")
+    for source_file, count in sorted(written, key=lambda x: x[1], reverse=True):
+        print(f"   • {source_file}: {count} acordeones")
 
 
 if __name__ == '__main__':
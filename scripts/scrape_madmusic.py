@@ -2,40 +2,166 @@
 """
 Web Scraper recursivo para https://madmusic.iccmu.es/
 Extrae todo el contenido incluyendo imágenes y maneja menús desplegables.
+
+El recorrido es en anchura (BFS): las páginas de cada nivel se descargan en
+paralelo (--workers) y las imágenes van a un pool de descargas aparte
+(--image-workers), así que parsear páginas no espera a las imágenes. En
+lugar de una pausa fija entre peticiones, cada host admite como máximo
+--per-host peticiones a la vez separadas al menos --delay segundos.
+
+Las pasadas siguientes usan peticiones condicionales (ETag /
+If-Modified-Since, ver core/http_cache.py): las páginas e imágenes que
+responden 304 no se vuelven a descargar ni a escribir; los enlaces de una
+página sin cambios se leen de la copia local. --no-cache lo desactiva.
+
+Con --record DIR se graban todas las respuestas y con --replay DIR se
+reproducen sin red (ver core/http_replay.py), con --latency segundos por
+respuesta, para medir el crawler de forma reproducible.
+
+Las imágenes se guardan deduplicadas por contenido (core/image_store.py):
+de las variantes de tamaño de WordPress se descarga el original, y
+images/image_map.json dice qué fichero corresponde a cada URL.
+
+La frontera (URLs pendientes, hechas y fallidas, páginas e imágenes) se
+guarda según avanza en <output>/crawl_state.sqlite3 (core/crawl_frontier.py).
+Con --resume una pasada interrumpida, o cortada con --max-pages, sigue
+donde se quedó sin volver a descargar lo ya hecho. --prioritize REGEX
+(repetible) descarga antes las URLs que encajan; el resto va por
+profundidad.
+
+Uso:
+    python scripts/scrape_madmusic.py
+    python scripts/scrape_madmusic.py --depth 5 --workers 8 --per-host 4 --delay 0.1
+    python scripts/scrape_madmusic.py --no-cache
+    python scripts/scrape_madmusic.py --record data/http_archive
+    python scripts/scrape_madmusic.py --replay data/http_archive --latency 0.05 --no-cache
+    python scripts/scrape_madmusic.py --max-pages 50 --prioritize /noticias/
+    python scripts/scrape_madmusic.py --resume
 """
 
+import hashlib
 import os
 import re
 import sys
+import threading
 import time
 import urllib.parse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
 
+# core/http_cache.py no depende de Django
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.crawl_frontier import CrawlFrontier
+from core.http_cache import CachedResponse, HttpCache
+from core.http_replay import configure_session
+from core.image_store import ImageStore, best_variants, original_url
+
+
+class HostLimiter:
+    """
+    Límite de cortesía por host.
+
+    Cada host admite como máximo ``per_host`` peticiones simultáneas, y dos
+    peticiones al mismo host empiezan separadas al menos ``delay`` segundos.
+    """
+
+    def __init__(self, per_host=4, delay=0.1):
+        self.per_host = max(1, per_host)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    @contextmanager
+    def slot(self, host):
+        """Espera turno para hacer una petición a ``host``."""
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+
 
 class MadMusicScraper:
-    def __init__(self, base_url="https://madmusic.iccmu.es/", output_dir="scraped_content"):
+    def __init__(self, base_url="https://madmusic.iccmu.es/", output_dir="scraped_content",
+                 workers=8, image_workers=8, per_host=4, delay=0.1, cache_path=None,
+                 http_mode=None, http_archive=None, latency=None, state_path=None, priorities=()):
         self.base_url = base_url
         self.domain = urlparse(base_url).netloc
         self.output_dir = Path(output_dir)
         self.visited_urls = set()
         self.failed_urls = set()
         self.downloaded_images = set()
+        self.unchanged_urls = set()
+        
+        # Caché de peticiones condicionales (None = descargar siempre todo)
+        self.cache = HttpCache(cache_path) if cache_path else None
+        
+        # Frontera persistente (None = solo en memoria, no reanudable)
+        self.frontier = CrawlFrontier(state_path or ':memory:', priorities=priorities)
+        
+        # Grabación/reproducción HTTP (None = red real, salvo HTTP_REPLAY_MODE)
+        self.http_mode = http_mode
+        self.http_archive = http_archive
+        self.latency = latency
+        
+        # Concurrencia: páginas e imágenes en pools separados
+        self.workers = max(1, workers)
+        self.image_workers = max(1, image_workers)
+        self.limiter = HostLimiter(per_host=per_host, delay=delay)
+        self._lock = threading.Lock()
+        self._queued_images = set()
+        self._image_pool = None
+        self._image_futures = []
+        self._local = threading.local()
         
         # Crear directorios
         self.html_dir = self.output_dir / "html"
         self.images_dir = self.output_dir / "images"
         self.html_dir.mkdir(parents=True, exist_ok=True)
         self.images_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Configurar sesión de requests
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
+        self.images = ImageStore(self.images_dir)
+        
+    @property
+    def session(self):
+        """Sesión de requests del hilo actual (Session no es thread-safe)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            })
+            configure_session(session, self.http_mode, self.http_archive, self.latency)
+            self._local.session = session
+        return session
+    
+    def fetch(self, url, **kwargs):
+        """GET respetando el límite de cortesía del host"""
+        with self.limiter.slot(urlparse(url).netloc):
+            return self.session.get(url, timeout=10, **kwargs)
+    
+    def conditional_fetch(self, url, **kwargs):
+        """
+        GET condicional si hay caché.
+        
+        Solo se pide condicionalmente si la copia local sigue existiendo.
+        
+        Returns:
+            CachedResponse: con ``not_modified`` True si el servidor respondió 304
+        """
+        if self.cache is None:
+            return CachedResponse(self.fetch(url, **kwargs), None)
+        return self.cache.get(self.fetch, url, require_local=True, **kwargs)
     
     def is_valid_url(self, url):
         """Verificar si la URL es válida para scraping"""
@@ -120,19 +246,79 @@ class MadMusicScraper:
                 if urlparse(absolute_url).netloc == self.domain or not urlparse(absolute_url).netloc:
                     images.append(absolute_url)
         
-        return list(set(images))  # Eliminar duplicados
+        # Eliminar duplicados y quedarse con la mejor variante de cada imagen
+        return best_variants(list(dict.fromkeys(images)))
+    
+    def queue_images(self, images):
+        """
+        Enviar imágenes al pool de descargas.
+        
+        Fuera de crawl() (sin pool) se descargan en el momento.
+        """
+        with self._lock:
+            new_images = [img_url for img_url in images if img_url not in self._queued_images]
+            self._queued_images.update(new_images)
+        
+        self.frontier.add_many(new_images, 0, kind=CrawlFrontier.IMAGE)
+        self._submit_images(new_images)
+    
+    def _submit_images(self, images):
+        for img_url in images:
+            if self._image_pool is None:
+                self._download_tracked(img_url)
+            else:
+                self._image_futures.append(self._image_pool.submit(self._download_tracked, img_url))
+    
+    def _download_tracked(self, img_url):
+        """Descargar una imagen y guardar su estado en la frontera"""
+        self.download_image(img_url)
+        status = CrawlFrontier.DONE if img_url in self.downloaded_images else CrawlFrontier.FAILED
+        self.frontier.mark(img_url, status, kind=CrawlFrontier.IMAGE)
+    
+    def _image_candidates(self, img_url):
+        """URLs a probar para una imagen: primero el original de una variante de tamaño"""
+        original = original_url(img_url)
+        return [original, img_url] if original else [img_url]
     
     def download_image(self, img_url):
-        """Descargar una imagen"""
+        """
+        Descargar una imagen al almacén deduplicado (core/image_store.py).
+        
+        De una variante de WordPress (``-350x350``, ``-scaled``) se descarga
+        el original si existe; un contenido ya guardado no crea otro fichero.
+        """
         if img_url in self.downloaded_images:
             return
         
+        # El original ya se descargó a partir de otra variante
+        existing = self.images.lookup_url(img_url)
+        if existing is not None and original_url(img_url):
+            self.images.add_url(img_url, existing.name)
+            with self._lock:
+                self.downloaded_images.add(img_url)
+            return
+        
+        tmp_path = self.images_dir / f".{threading.get_ident()}.part"
         try:
-            response = self.session.get(img_url, timeout=10, stream=True)
-            response.raise_for_status()
+            candidates = self._image_candidates(img_url)
+            for candidate in candidates:
+                result = self.conditional_fetch(candidate, stream=True)
+                if result.not_modified:
+                    self.images.add_url(img_url, Path(result.entry['local_path']).name)
+                    with self._lock:
+                        self.downloaded_images.add(img_url)
+                        self.unchanged_urls.add(img_url)
+                    return
+                response = result.response
+                if response.status_code == 404 and candidate != candidates[-1]:
+                    # Devolver la conexión al pool antes de probar la variante
+                    response.close()
+                    continue
+                response.raise_for_status()
+                break
             
             # Determinar extensión
-            parsed = urlparse(img_url)
+            parsed = urlparse(candidate)
             ext = Path(parsed.path).suffix or '.jpg'
             if ext not in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']:
                 ext = '.jpg'
@@ -142,22 +328,23 @@ class MadMusicScraper:
             if not safe_name.endswith(ext):
                 safe_name += ext
             
-            # Guardar imagen
-            img_path = self.images_dir / safe_name
-            counter = 1
-            while img_path.exists():
-                name_part = img_path.stem
-                img_path = self.images_dir / f"{name_part}_{counter}{ext}"
-                counter += 1
-            
-            with open(img_path, 'wb') as f:
+            # Guardar imagen: se escribe aparte y el almacén la deduplica por hash
+            digest = hashlib.sha256()
+            with open(tmp_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
+                    digest.update(chunk)
+            img_path, is_new = self.images.add_file(tmp_path, safe_name, urls=[candidate, img_url])
+            if self.cache is not None:
+                self.cache.store(candidate, response, sha256=digest.hexdigest(), local_path=img_path)
             
-            self.downloaded_images.add(img_url)
-            print(f"      [IMG] {safe_name}", flush=True)
+            with self._lock:
+                self.downloaded_images.add(img_url)
+            print(f"      [IMG] {img_path.name}{'' if is_new else ' (ya guardada)'}", flush=True)
             
         except Exception as e:
+            # Una descarga a medias no debe quedarse en el directorio de imágenes
+            tmp_path.unlink(missing_ok=True)
             print(f"      [!] Error imagen: {str(e)[:50]}", flush=True)
     
     def url_to_filename(self, url):
@@ -180,86 +367,180 @@ class MadMusicScraper:
         
         return safe_name
     
-    def scrape_page(self, url):
-        """Scrapear una página individual"""
-        if url in self.visited_urls:
-            return set()
-        
-        page_num = len(self.visited_urls) + 1
-        print(f"\n[{page_num}] {url}", flush=True)
-        self.visited_urls.add(url)
+    def scrape_page(self, url, page_num=None):
+        """
+        Scrapear una página individual.
+        
+        Guarda el HTML, envía sus imágenes al pool de descargas y devuelve
+        los enlaces encontrados. La salida es una línea por página porque
+        varias páginas se descargan a la vez.
+        """
+        with self._lock:
+            if page_num is None:
+                if url in self.visited_urls:
+                    return set()
+                self.visited_urls.add(url)
+                page_num = len(self.visited_urls)
         
         try:
             # Descargar página
-            print(f"  [→] Descargando...", end='', flush=True)
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            print(f" ✓ ({len(response.content)} bytes)", flush=True)
-            
-            # Parsear HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Guardar HTML
             safe_filename = self.url_to_filename(url)
-            html_path = self.html_dir / safe_filename
-            html_path.parent.mkdir(parents=True, exist_ok=True)
+            result = self.conditional_fetch(url)
             
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(soup.prettify())
-            print(f"  [HTML] Guardado: {safe_filename}", flush=True)
+            if result.not_modified:
+                # Sin cambios (304): los enlaces e imágenes salen de la copia local
+                html_path = Path(result.entry['local_path'])
+                soup = BeautifulSoup(html_path.read_bytes(), 'html.parser')
+                with self._lock:
+                    self.unchanged_urls.add(url)
+                size_note = 'sin cambios (304)'
+            else:
+                response = result.response
+                response.raise_for_status()
+                
+                # Parsear HTML
+                soup = BeautifulSoup(response.content, 'html.parser')
+                
+                # Guardar HTML
+                html_path = self.html_dir / safe_filename
+                html_path.parent.mkdir(parents=True, exist_ok=True)
+                
+                with open(html_path, 'w', encoding='utf-8') as f:
+                    f.write(soup.prettify())
+                if self.cache is not None:
+                    self.cache.store(url, response, local_path=html_path)
+                size_note = f'{len(response.content)} bytes'
             
-            # Extraer y descargar imágenes
+            # Imágenes al pool de descargas, enlaces al crawler
             images = self.extract_images(soup, url)
-            if images:
-                print(f"  [→] Descargando {len(images)} imágenes...", flush=True)
-                for img_url in images:
-                    self.download_image(img_url)
-            
-            # Extraer enlaces
+            self.queue_images(images)
             links = self.extract_links(soup, url)
-            print(f"  [→] Encontrados {len(links)} enlaces", flush=True)
             
+            print(
+                f"[{page_num}] {url} ✓ ({size_note}) -> {safe_filename} | "
+                f"{len(images)} imágenes, {len(links)} enlaces",
+                flush=True
+            )
             return links
             
         except requests.exceptions.Timeout:
-            print(f"  [!] TIMEOUT", flush=True)
-            self.failed_urls.add(url)
-            return set()
+            print(f"[{page_num}] {url} [!] TIMEOUT", flush=True)
         except requests.exceptions.RequestException as e:
-            print(f"  [!] Error HTTP: {str(e)[:60]}", flush=True)
-            self.failed_urls.add(url)
-            return set()
+            print(f"[{page_num}] {url} [!] Error HTTP: {str(e)[:60]}", flush=True)
         except Exception as e:
-            print(f"  [!] Error: {str(e)[:60]}", flush=True)
+            print(f"[{page_num}] {url} [!] Error: {str(e)[:60]}", flush=True)
+        with self._lock:
             self.failed_urls.add(url)
-            return set()
+        return set()
     
-    def scrape_recursive(self, start_url=None, max_depth=10, current_depth=0):
-        """Scrapear recursivamente desde una URL inicial"""
+    def print_progress(self):
+        """Mostrar progreso"""
+        print(
+            f"  [📊] Progreso: {len(self.visited_urls)} páginas | {len(self.downloaded_images)} imágenes | "
+            f"{len(self.failed_urls)} errores | {len(self.unchanged_urls)} sin cambios",
+            flush=True
+        )
+    
+    def _load_state(self):
+        """Recuperar de la frontera lo hecho en pasadas anteriores (--resume)"""
+        requeued = self.frontier.requeue_in_progress()
+        done = self.frontier.urls(CrawlFrontier.DONE)
+        failed = self.frontier.urls(CrawlFrontier.FAILED)
+        self.visited_urls.update(done, failed)
+        self.failed_urls.update(failed)
+        self.downloaded_images.update(self.frontier.urls(CrawlFrontier.DONE, kind=CrawlFrontier.IMAGE))
+        self._queued_images.update(self.frontier.urls(kind=CrawlFrontier.IMAGE))
+        pending = self.frontier.counts()[CrawlFrontier.QUEUED]
+        print(
+            f"  [↻] Reanudando: {len(done)} páginas hechas, {len(failed)} fallidas, "
+            f"{pending} pendientes ({requeued} interrumpidas)",
+            flush=True
+        )
+    
+    def crawl(self, start_url=None, max_depth=10, max_pages=None, resume=False):
+        """
+        Recorrer el sitio en anchura desde una URL inicial.
+        
+        Se descargan las páginas a menos de ``max_depth`` enlaces de la
+        inicial, con hasta ``workers`` páginas en vuelo; cada página se
+        descarga una sola vez. El estado se guarda en la frontera según
+        avanza: con ``resume`` se continúa la pasada anterior y con
+        ``max_pages`` se para tras ese número de páginas (las pendientes
+        quedan para la siguiente).
+        """
         if start_url is None:
             start_url = self.base_url
         
-        if current_depth >= max_depth:
-            return
-        
         normalized_start = self.normalize_url(start_url)
-        if not self.is_valid_url(normalized_start):
+        if max_depth <= 0 or not self.is_valid_url(normalized_start):
             return
         
-        # Scrapear página actual
-        links = self.scrape_page(normalized_start)
-        
-        # Mostrar progreso
-        print(f"\n  [📊] Progreso: {len(self.visited_urls)} páginas | {len(self.downloaded_images)} imágenes | {len(self.failed_urls)} errores", flush=True)
-        
-        # Scrapear enlaces encontrados recursivamente
-        new_links = [link for link in links if link not in self.visited_urls]
-        if new_links:
-            print(f"  [→] Profundidad {current_depth + 1}/{max_depth}: {len(new_links)} enlaces nuevos\n", flush=True)
-        
-        for link in new_links:
-            time.sleep(0.5)  # Pausa entre requests
-            self.scrape_recursive(link, max_depth, current_depth + 1)
+        if resume and self.frontier.get_meta('start_url') == normalized_start:
+            self._load_state()
+        else:
+            if resume:
+                print("  [!] No hay un crawl anterior de esta URL: empezando desde cero", flush=True)
+            self.frontier.reset()
+            self.frontier.set_meta('start_url', normalized_start)
+            self.frontier.add(normalized_start, 0)
+        
+        in_flight = {}
+        current_depth = 0
+        started = 0
+        completed = 0
+        
+        page_pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='page')
+        self._image_pool = ThreadPoolExecutor(max_workers=self.image_workers, thread_name_prefix='image')
+        try:
+            # Imágenes que quedaron pendientes en la pasada anterior
+            self._submit_images(self.frontier.urls(CrawlFrontier.QUEUED, kind=CrawlFrontier.IMAGE))
+            
+            while True:
+                slots = self.workers - len(in_flight)
+                if max_pages is not None:
+                    slots = min(slots, max_pages - started)
+                for url, depth in self.frontier.claim(slots):
+                    if depth > current_depth:
+                        current_depth = depth
+                        print(f"\n  [→] Profundidad {depth + 1}/{max_depth}\n", flush=True)
+                    self.visited_urls.add(url)
+                    started += 1
+                    future = page_pool.submit(self.scrape_page, url, len(self.visited_urls))
+                    in_flight[future] = (url, depth)
+                
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    links = future.result()
+                    if depth + 1 < max_depth:
+                        self.frontier.add_many(sorted(links), depth + 1)
+                    status = CrawlFrontier.FAILED if url in self.failed_urls else CrawlFrontier.DONE
+                    self.frontier.mark(url, status)
+                    completed += 1
+                    if completed % 20 == 0:
+                        self.print_progress()
+            
+            # Esperar a las imágenes pendientes
+            for future in self._image_futures:
+                future.result()
+        finally:
+            page_pool.shutdown(wait=True, cancel_futures=True)
+            self._image_pool.shutdown(wait=True, cancel_futures=True)
+            self._image_pool = None
+            self._image_futures = []
+            self.images.save()
+        self.print_progress()
+        
+        pending = self.frontier.counts()[CrawlFrontier.QUEUED]
+        if pending:
+            print(f"  [⏸] Quedan {pending} páginas pendientes (continuar con --resume)", flush=True)
+    
+    def scrape_recursive(self, start_url=None, max_depth=10):
+        """Compatibilidad: el recorrido ahora es crawl() (BFS concurrente)"""
+        self.crawl(start_url, max_depth)
     
     def generate_report(self):
         """Generar reporte del scraping"""
@@ -272,7 +553,8 @@ class MadMusicScraper:
             f.write(f"URL Base: {self.base_url}\n")
             f.write(f"Total páginas scrapeadas: {len(self.visited_urls)}\n")
             f.write(f"Total imágenes descargadas: {len(self.downloaded_images)}\n")
-            f.write(f"URLs fallidas: {len(self.failed_urls)}\n\n")
+            f.write(f"URLs fallidas: {len(self.failed_urls)}\n")
+            f.write(f"URLs sin cambios (304): {len(self.unchanged_urls)}\n\n")
             
             f.write("PÁGINAS SCRAPEADAS:\n")
             f.write("-" * 80 + "\n")
@@ -298,11 +580,51 @@ def main():
     parser.add_argument('--output', default='scraped_madmusic',
                        help='Directorio de salida')
     parser.add_argument('--depth', type=int, default=5,
-                       help='Profundidad máxima de recursión')
+                       help='Profundidad máxima (enlaces desde la URL inicial)')
+    parser.add_argument('--workers', type=int, default=8,
+                       help='Páginas descargadas a la vez')
+    parser.add_argument('--image-workers', type=int, default=8,
+                       help='Imágenes descargadas a la vez')
+    parser.add_argument('--per-host', type=int, default=4,
+                       help='Peticiones simultáneas máximas por host')
+    parser.add_argument('--delay', type=float, default=0.1,
+                       help='Segundos mínimos entre el inicio de dos peticiones al mismo host')
+    parser.add_argument('--cache', default=None,
+                       help='Base SQLite de la caché HTTP (por defecto <output>/http_cache.sqlite3)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Descargar todo sin peticiones condicionales')
+    http_mode = parser.add_mutually_exclusive_group()
+    http_mode.add_argument('--record', metavar='DIR',
+                          help='Grabar las respuestas HTTP en este archivo')
+    http_mode.add_argument('--replay', metavar='DIR',
+                          help='Reproducir las respuestas desde este archivo, sin red')
+    parser.add_argument('--latency', type=float, default=None,
+                       help='Segundos añadidos a cada respuesta reproducida (con --replay)')
+    parser.add_argument('--state', default=None,
+                       help='Base SQLite de la frontera (por defecto <output>/crawl_state.sqlite3)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continuar el crawl anterior sin volver a descargar lo ya hecho')
+    parser.add_argument('--max-pages', type=int, default=None,
+                       help='Parar tras descargar este número de páginas en esta pasada')
+    parser.add_argument('--prioritize', action='append', default=[], metavar='REGEX',
+                       help='Descargar antes las URLs que encajan (repetible, por orden de prioridad)')
     
     args = parser.parse_args()
     
-    scraper = MadMusicScraper(base_url=args.url, output_dir=args.output)
+    scraper = MadMusicScraper(
+        base_url=args.url,
+        output_dir=args.output,
+        workers=args.workers,
+        image_workers=args.image_workers,
+        per_host=args.per_host,
+        delay=args.delay,
+        cache_path=None if args.no_cache else (args.cache or os.path.join(args.output, 'http_cache.sqlite3')),
+        http_mode='record' if args.record else 'replay' if args.replay else None,
+        http_archive=args.record or args.replay,
+        latency=args.latency,
+        state_path=args.state or os.path.join(args.output, 'crawl_state.sqlite3'),
+        priorities=args.prioritize
+    )
     
     try:
         print("=" * 80, flush=True)
@@ -311,10 +633,12 @@ def main():
         print(f"URL Base: {args.url}", flush=True)
         print(f"Directorio: {args.output}", flush=True)
         print(f"Profundidad: {args.depth}", flush=True)
+        print(f"Concurrencia: {args.workers} páginas, {args.image_workers} imágenes, "
+              f"{args.per_host} por host cada {args.delay}s", flush=True)
         print("=" * 80, flush=True)
         print("", flush=True)
         
-        scraper.scrape_recursive(max_depth=args.depth)
+        scraper.crawl(max_depth=args.depth, max_pages=args.max_pages, resume=args.resume)
         
         print("\n" + "=" * 80, flush=True)
         print("SCRAPING COMPLETADO", flush=True)
@@ -322,6 +646,7 @@ def main():
         print(f"Páginas: {len(scraper.visited_urls)}", flush=True)
         print(f"Imágenes: {len(scraper.downloaded_images)}", flush=True)
         print(f"Errores: {len(scraper.failed_urls)}", flush=True)
+        print(f"Sin cambios (304): {len(scraper.unchanged_urls)}", flush=True)
         
         scraper.generate_report()
         
@@ -2,23 +2,46 @@
 Tests for static site export functionality.
 """
 
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
 import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest import mock
 
-from django.test import TestCase, Client
+import pytest
+
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
+from django.utils.timezone import now as timezone_now
 from wagtail.models import Site, Page
 from wagtail.test.utils import WagtailPageTests
 
 from cms.models import HomePage, StandardPage
+from cms.export import blob_clients
+from cms.export.azure_uploader import AzureBackupUploader
+from cms.export.catalog import BackupCatalog, get_backup_catalog, reset_backup_catalog
+from cms.export.delta import restore_backup_chain
+from cms.export.retention import RetentionPolicy
+from cms.export.verify import verify_archive
+from cms.export.storage import LocalBackupStorage, MemoryBackupStorage, get_backup_storage, verify_backup_token
 from cms.export.exporter import StaticSiteExporter
 from cms.export.html_rewriter import HTMLRewriter
+from cms.export.mirror import StaticMirror
+from cms.export.spill import SpillableSet
+from cms.export.throttle import ExportThrottle
 from cms.export import ExportError
 
 
-class StaticSiteExporterTestCase(WagtailPageTests):
-    """Tests for StaticSiteExporter class"""
+class ExportPageTreeMixin:
+    """Page tree shared by exporter tests: home > page-1 > nested, home > page-2"""
     
     def setUp(self):
         """Set up test data"""
@@ -60,6 +83,10 @@ class StaticSiteExporterTestCase(WagtailPageTests):
         # Update the site root to the home page
         self.site.root_page = self.home_page
         self.site.save()
+
+
+class StaticSiteExporterTestCase(ExportPageTreeMixin, WagtailPageTests):
+    """Tests for StaticSiteExporter class"""
     
     def test_resolve_site_by_id(self):
         """Test that site can be resolved by ID"""
@@ -148,6 +175,141 @@ class StaticSiteExporterTestCase(WagtailPageTests):
                 else:
                     raise
     
+    def test_export_with_throttle(self):
+        """Test that a throttled export waits once per page"""
+        clock = FakeClock()
+        throttle = ExportThrottle(
+            rate_limit=100, metrics_hook=lambda: {}, clock=clock, sleep=clock.sleep
+        )
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            exporter = StaticSiteExporter(
+                site_id_or_hostname=self.site.id,
+                output_dir=tmpdir,
+                exclude_media=True,
+                throttle=throttle
+            )
+            pages = list(exporter._get_pages_to_export())
+            for page in pages:
+                exporter._export_page_safely(page, exporter.client)
+            
+            self.assertEqual(exporter.pages_exported + exporter.pages_failed, len(pages))
+            self.assertEqual(len(clock.sleeps), len(pages) - 1)
+    
+    def test_selective_pages_to_export(self):
+        """Test that --root-page limits the export to a subtree"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            exporter = StaticSiteExporter(
+                site_id_or_hostname=self.site.id,
+                output_dir=tmpdir,
+                root_page='/page-1/'
+            )
+            pages = exporter._get_pages_to_export()
+            
+            self.assertEqual(
+                set(pages.values_list('id', flat=True)),
+                {self.page1.id, self.nested_page.id}
+            )
+            self.assertTrue(exporter.merge)
+    
+    def test_selective_page_selectors(self):
+        """Test that --pages accepts IDs and URL paths"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            exporter = StaticSiteExporter(
+                site_id_or_hostname=self.site.id,
+                output_dir=tmpdir,
+                page_selectors=[str(self.page2.id), 'page-1/nested']
+            )
+            pages = exporter._get_pages_to_export()
+            
+            self.assertEqual(
+                set(pages.values_list('id', flat=True)),
+                {self.page2.id, self.nested_page.id}
+            )
+    
+    def test_selective_invalid_page(self):
+        """Test that an unknown page selector raises error"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertRaises(ExportError):
+                StaticSiteExporter(
+                    site_id_or_hostname=self.site.id,
+                    output_dir=tmpdir,
+                    root_page='does-not-exist'
+                )
+    
+    def test_selective_export_dependency_closure(self):
+        """Test that linked pages and referenced static files are merged in"""
+        html = (
+            '<html><head><link rel="stylesheet" href="/static/css/style.css"></head>'
+            '<body><a href="/page-2/">Page 2</a><a href="/">Home</a></body></html>'
+        )
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            static_root = Path(tmpdir) / 'staticfiles'
+            (static_root / 'css').mkdir(parents=True)
+            (static_root / 'img').mkdir()
+            (static_root / 'js').mkdir()
+            (static_root / 'css' / 'style.css').write_text("body { background: url('../img/bg.png'); }")
+            (static_root / 'img' / 'bg.png').write_bytes(b'png')
+            (static_root / 'js' / 'unused.js').write_text('')
+            
+            output_dir = Path(tmpdir) / 'export'
+            output_dir.mkdir()
+            # Existing export already contains the home page
+            (output_dir / 'index.html').write_text('<html>old home</html>')
+            
+            with override_settings(STATIC_ROOT=static_root):
+                exporter = StaticSiteExporter(
+                    site_id_or_hostname=self.site.id,
+                    output_dir=str(output_dir),
+                    exclude_media=True,
+                    root_page=str(self.page1.id)
+                )
+                exporter._render_page = lambda page, client=None, raw=False: html
+                exporter.export()
+            
+            # Subtree plus the missing linked page, home left untouched
+            self.assertEqual(
+                exporter.exported_page_ids,
+                {self.page1.id, self.nested_page.id, self.page2.id}
+            )
+            self.assertTrue((output_dir / 'page-2' / 'index.html').exists())
+            self.assertEqual((output_dir / 'index.html').read_text(), '<html>old home</html>')
+            
+            # Only referenced static files (and CSS dependencies) are copied
+            self.assertTrue((output_dir / 'static' / 'css' / 'style.css').exists())
+            self.assertTrue((output_dir / 'static' / 'img' / 'bg.png').exists())
+            self.assertFalse((output_dir / 'static' / 'js' / 'unused.js').exists())
+    
+    def test_low_memory_export(self):
+        """Test that low-memory mode streams pages and writes the same files"""
+        html = '<html><body><img src="/media/images/a.jpg"><a href="/page-1/">P1</a><a href="/">Home</a></body></html>'
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            exporter = StaticSiteExporter(
+                site_id_or_hostname=self.site.id,
+                output_dir=tmpdir,
+                exclude_media=True,
+                low_memory=True,
+                chunk_size=2,
+                spill_threshold=1
+            )
+            exporter._render_page = lambda page, client=None, raw=False: html.encode('utf-8')
+            
+            for page in exporter._get_pages_to_export().iterator(chunk_size=2):
+                exporter._export_page_safely(page, exporter.client)
+            
+            self.assertEqual(exporter.pages_exported, 4)
+            self.assertEqual(list(exporter.collected_media), ['/media/images/a.jpg'])
+            self.assertTrue(exporter.collected_links.spilled)
+            
+            written = (Path(tmpdir) / 'page-1' / 'nested' / 'index.html').read_text(encoding='utf-8')
+            self.assertIn('src="../../media/images/a.jpg"', written)
+            self.assertIn('offline-notice', written)
+            
+            exporter.collected_media.close()
+            exporter.collected_links.close()
+    
     def test_create_zip(self):
         """Test ZIP creation"""
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -163,7 +325,9 @@ class StaticSiteExporterTestCase(WagtailPageTests):
                 output_dir=str(output_dir)
             )
             
-            zip_path = exporter.create_zip()
+            # The checksum is computed while writing, not by re-reading the ZIP
+            with mock.patch('cms.export.catalog.file_md5', side_effect=AssertionError('re-read')):
+                zip_path = exporter.create_zip()
             
             # Verify ZIP was created
             self.assertTrue(zip_path.exists())
@@ -172,6 +336,370 @@ class StaticSiteExporterTestCase(WagtailPageTests):
             with zipfile.ZipFile(zip_path, 'r') as zipf:
                 names = zipf.namelist()
                 self.assertIn('index.html', names)
+            
+            checksum = hashlib.md5(zip_path.read_bytes()).hexdigest()
+            self.assertEqual(zip_path.with_name(zip_path.name + '.md5').read_text().split()[0], checksum)
+            with open(zip_path, 'rb') as f:
+                self.assertTrue(verify_archive(f)['ok'])
+    
+    def test_export_to_archive(self):
+        """Test that a full export can be written to a non-seekable stream"""
+        html = '<html><body><a href="/page-1/">P1</a></body></html>'
+        
+        class Unseekable(io.RawIOBase):
+            def __init__(self):
+                self.chunks = []
+            
+            def writable(self):
+                return True
+            
+            def write(self, data):
+                self.chunks.append(bytes(data))
+                return len(data)
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            static_root = Path(tmpdir) / 'staticfiles'
+            (static_root / 'css').mkdir(parents=True)
+            (static_root / 'css' / 'style.css').write_text('body {}')
+            output_dir = Path(tmpdir) / 'export'
+            
+            stream = Unseekable()
+            with override_settings(STATIC_ROOT=static_root):
+                exporter = StaticSiteExporter(
+                    site_id_or_hostname=self.site.id,
+                    output_dir=str(output_dir),
+                    exclude_media=True
+                )
+                exporter._render_page = lambda page, client=None, raw=False: html
+                exporter.export_to_archive(stream)
+            
+            # Nothing is written to the output directory
+            self.assertFalse(output_dir.exists())
+            
+            with zipfile.ZipFile(io.BytesIO(b''.join(stream.chunks))) as zipf:
+                self.assertEqual(sorted(zipf.namelist()), [
+                    'index.html',
+                    'page-1/index.html',
+                    'page-1/nested/index.html',
+                    'page-2/index.html',
+                    'static/css/style.css',
+                ])
+                self.assertIn('href="page-1/index.html"', zipf.read('index.html').decode('utf-8'))
+
+
+class StaticMirrorTestCase(ExportPageTreeMixin, WagtailPageTests):
+    """Tests for StaticMirror class (reuses the exporter page tree)"""
+    
+    @staticmethod
+    def _render(exporter, page, client=None, raw=False):
+        return f'<html><body><a href="http://127.0.0.1:8000/page-1/">{page.title}</a></body></html>'
+    
+    def test_publish_renders_page_with_live_urls(self):
+        """Test that a published page is written to the mirror with absolute URLs"""
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                mock.patch.object(StaticSiteExporter, '_render_page', self._render):
+            mirror = StaticMirror(root=tmpdir)
+            mirror.publish(self.nested_page)
+            
+            site_dir = Path(tmpdir) / self.site.hostname
+            html = (site_dir / 'page-1' / 'nested' / 'index.html').read_text()
+            self.assertIn('href="/page-1/"', html)
+            self.assertNotIn('offline-notice', html)
+            
+            # Ancestors list their children, so they are refreshed too
+            self.assertTrue((site_dir / 'page-1' / 'index.html').exists())
+            self.assertTrue((site_dir / 'index.html').exists())
+            # Nested page is below the menu levels: siblings are untouched
+            self.assertFalse((site_dir / 'page-2' / 'index.html').exists())
+    
+    def test_publish_menu_page_refreshes_mirrored_pages(self):
+        """Test that menu-level pages re-render every mirrored page"""
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                mock.patch.object(StaticSiteExporter, '_render_page', self._render):
+            mirror = StaticMirror(root=tmpdir)
+            mirror.publish(self.nested_page)
+            
+            rendered = mirror.publish(self.page2)
+            
+            self.assertEqual(
+                {page.id for page in rendered},
+                {self.page2.id, self.home_page.id, self.page1.id, self.nested_page.id}
+            )
+    
+    def test_unpublish_removes_subtree(self):
+        """Test that unpublishing removes the page and its descendants"""
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                mock.patch.object(StaticSiteExporter, '_render_page', self._render):
+            mirror = StaticMirror(root=tmpdir)
+            mirror.publish(self.nested_page)
+            
+            self.page1.live = False
+            mirror.unpublish(self.page1)
+            
+            site_dir = Path(tmpdir) / self.site.hostname
+            self.assertFalse((site_dir / 'page-1').exists())
+            self.assertTrue((site_dir / 'index.html').exists())
+    
+    def test_republish_bypasses_mirror_middleware(self):
+        """Test that re-rendering an already mirrored page is not served the stale mirror file"""
+        middleware = list(settings.MIDDLEWARE)
+        if 'proyectos.static_mirror_middleware.StaticMirrorMiddleware' not in middleware:
+            middleware.insert(1, 'proyectos.static_mirror_middleware.StaticMirrorMiddleware')
+        # madmusic.iccmu.es serves Wagtail at / (proyectos.urls_madmusic)
+        self.site.hostname = 'madmusic.iccmu.es'
+        self.site.save()
+        
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                override_settings(STATIC_MIRROR_ROOT=tmpdir, MIDDLEWARE=middleware):
+            mirror = StaticMirror(root=tmpdir)
+            mirror.publish(self.page2)
+            mirror_file = Path(tmpdir) / 'madmusic.iccmu.es' / 'page-2' / 'index.html'
+            self.assertIn('Page 2', mirror_file.read_text())
+            
+            # Anonymous visitors get the mirror file
+            response = Client().get('/page-2/', HTTP_HOST='madmusic.iccmu.es')
+            self.assertEqual(response['X-Static-Mirror'], 'hit')
+            response.close()
+            
+            self.page2.title = 'Page 2 updated'
+            self.page2.save()
+            exporter = mirror.publish_site(self.site)
+            
+            self.assertEqual(exporter.pages_failed, 0)
+            self.assertIn('Page 2 updated', mirror_file.read_text())
+
+    def test_publish_signal_defers_dependents_to_job(self):
+        """Test that the publish signal renders only the page and queues its dependents"""
+        from cms import jobs
+        from cms.models import Job
+        from cms.signals import mirror_page_published
+
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                override_settings(STATIC_MIRROR_ROOT=tmpdir), \
+                mock.patch.object(StaticSiteExporter, '_render_page', self._render):
+            StaticMirror(root=tmpdir).publish(self.nested_page)
+            site_dir = Path(tmpdir) / self.site.hostname
+            (site_dir / 'page-1' / 'nested' / 'index.html').unlink()
+
+            mirror_page_published(sender=StandardPage, instance=self.page2)
+
+            self.assertTrue((site_dir / 'page-2' / 'index.html').exists())
+            self.assertFalse((site_dir / 'page-1' / 'nested' / 'index.html').exists())
+            job = Job.objects.get(task='mirror_dependents')
+            self.assertEqual(job.kwargs, {'page_id': self.page2.id})
+
+            (site_dir / 'page-1' / 'nested').mkdir(exist_ok=True)
+            (site_dir / 'page-1' / 'nested' / 'index.html').write_text('stale')
+            jobs.run_worker(name='test', burst=True)
+
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+            self.assertEqual(job.result, {'rendered': 3})
+            self.assertIn('Nested Page', (site_dir / 'page-1' / 'nested' / 'index.html').read_text())
+
+    def _connect_mirror_signals(self):
+        from cms.signals import connect_static_mirror_signals, mirror_page_moved, mirror_page_published, \
+            mirror_page_slug_changed, mirror_page_unpublished
+        from wagtail.signals import page_published, page_slug_changed, page_unpublished, post_page_move
+
+        connect_static_mirror_signals()
+        self.addCleanup(page_published.disconnect, mirror_page_published, dispatch_uid='cms_static_mirror_published')
+        self.addCleanup(page_unpublished.disconnect, mirror_page_unpublished,
+                        dispatch_uid='cms_static_mirror_unpublished')
+        self.addCleanup(post_page_move.disconnect, mirror_page_moved, dispatch_uid='cms_static_mirror_moved')
+        self.addCleanup(page_slug_changed.disconnect, mirror_page_slug_changed,
+                        dispatch_uid='cms_static_mirror_slug_changed')
+
+    def test_page_move_moves_mirror_files(self):
+        """Test that moving a page removes its old mirror files and renders it at the new URL"""
+        from cms.models import Job
+
+        self._connect_mirror_signals()
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                override_settings(STATIC_MIRROR_ROOT=tmpdir), \
+                mock.patch.object(StaticSiteExporter, '_render_page', self._render):
+            StaticMirror(root=tmpdir).publish(self.nested_page)
+            site_dir = Path(tmpdir) / self.site.hostname
+            (site_dir / 'page-1' / 'index.html').write_text('stale')
+
+            Page.objects.get(pk=self.nested_page.pk).move(self.page2, pos='last-child')
+
+            self.assertFalse((site_dir / 'page-1' / 'nested').exists())
+            self.assertIn('Nested Page', (site_dir / 'page-2' / 'nested' / 'index.html').read_text())
+            # The old parent no longer lists the page
+            self.assertIn('Page 1', (site_dir / 'page-1' / 'index.html').read_text())
+            self.assertEqual(
+                sorted(job.kwargs['page_id'] for job in Job.objects.filter(task='mirror_dependents')),
+                sorted([self.nested_page.id, self.page1.id])
+            )
+
+    def test_slug_change_removes_old_mirror_files(self):
+        """Test that republishing under a new slug stops serving the old URL and its subtree"""
+        self._connect_mirror_signals()
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                override_settings(STATIC_MIRROR_ROOT=tmpdir), \
+                mock.patch.object(StaticSiteExporter, '_render_page', self._render):
+            StaticMirror(root=tmpdir).publish(self.nested_page)
+            site_dir = Path(tmpdir) / self.site.hostname
+
+            page = StandardPage.objects.get(pk=self.page1.pk)
+            page.slug = 'page-1-renamed'
+            with self.captureOnCommitCallbacks(execute=True):
+                page.save_revision().publish()
+
+            self.assertFalse((site_dir / 'page-1').exists())
+            self.assertTrue((site_dir / 'page-1-renamed' / 'index.html').exists())
+            self.assertIn('Nested Page', (site_dir / 'page-1-renamed' / 'nested' / 'index.html').read_text())
+
+    def test_file_for_path_rejects_hidden_segments(self):
+        """Test that request paths cannot escape the mirror"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mirror = StaticMirror(root=tmpdir)
+            
+            self.assertEqual(
+                mirror.file_for_path('example.com', '/a/b/'),
+                Path(tmpdir) / 'example.com' / 'a' / 'b' / 'index.html'
+            )
+            self.assertIsNone(mirror.file_for_path('example.com', '/../secret/'))
+
+
+# Runs in a child process so ru_maxrss measures only the export. "build"
+# migrates a throwaway SQLite database and creates the synthetic site;
+# "export" runs StaticSiteExporter.export() and reports the RSS before it
+# and the peak RSS (ru_maxrss) after it, in KiB.
+LOW_MEMORY_BENCH_SCRIPT = """
+import json, resource, sys
+import django
+django.setup()
+from django.core.management import call_command
+from wagtail.models import Page, Site
+
+mode, output_dir, page_count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+
+if mode == 'build':
+    from cms.models import HomePage, StandardPage
+    from cms.page_tree import PageTreeBuilder
+
+    call_command('migrate', verbosity=0)
+    home = HomePage(title='Bench Home', slug='bench-home')
+    Page.objects.get(depth=1).add_child(instance=home)
+    # madmusic.iccmu.es serves Wagtail at / (proyectos.urls_madmusic)
+    Site.objects.filter(is_default_site=True).update(root_page=home, hostname='madmusic.iccmu.es')
+    images = ''.join(f'<p><img src="/media/images/{index}.jpg"></p>' for index in range(50))
+    builder = PageTreeBuilder(home, revisions=False)
+    for index in range(page_count):
+        body = images + f'<img src="/media/unique/{index}.jpg"><a href="/bench-home/page-{index + 1}/">next</a>'
+        builder.add(home, StandardPage(title=f'Page {index}', slug=f'page-{index}', body=[('raw_html', body)]))
+    builder.save()
+else:
+    from cms.export.exporter import StaticSiteExporter
+
+    def current_rss_kb():
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Peak minus the RSS right before export() bounds the export's growth from
+    # above, even when the peak was reached during setup
+    baseline = current_rss_kb()
+    exporter = StaticSiteExporter(
+        site_id_or_hostname=Site.objects.get(is_default_site=True).id,
+        output_dir=output_dir,
+        exclude_media=True,
+        low_memory=True,
+        spill_threshold=1000,
+    )
+    exporter.export()
+    print(json.dumps({
+        'pages_exported': exporter.pages_exported,
+        'baseline_kb': baseline,
+        'peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+"""
+
+
+@pytest.mark.slow
+class LowMemoryExportBenchmarkTestCase(TestCase):
+    """
+    Peak RSS check for low-memory exports of a synthetic site.
+    
+    The export runs end to end (export() with real page rendering) in a
+    child process against its own SQLite database. The page count defaults
+    to a small value; run with EXPORT_BENCH_PAGES=50000 to verify a
+    50k-page site.
+    """
+    
+    def _run_bench(self, mode, workdir, output_dir, page_count):
+        settings_module = Path(workdir) / 'bench_settings.py'
+        if not settings_module.exists():
+            (Path(workdir) / 'static').mkdir()
+            settings_module.write_text(
+                'from proyectos.settings import *  # noqa\n'
+                f'DATABASES = {{"default": {{"ENGINE": "django.db.backends.sqlite3", '
+                f'"NAME": {str(Path(workdir) / "bench.sqlite3")!r}}}}}\n'
+                f'STATIC_ROOT = {str(Path(workdir) / "static")!r}\n'
+                'STATIC_MIRROR_ROOT = None\n'
+                'ALLOWED_HOSTS = ["*"]\n'
+            )
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='bench_settings',
+            PYTHONPATH=os.pathsep.join([str(workdir), str(settings.BASE_DIR)]),
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', LOW_MEMORY_BENCH_SCRIPT, mode, str(output_dir), str(page_count)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-3000:])
+        return result.stdout
+    
+    def test_peak_rss_is_bounded(self):
+        """Test that the export's peak RSS growth stays below the ceiling"""
+        page_count = int(os.environ.get('EXPORT_BENCH_PAGES', 200))
+        ceiling_mb = float(os.environ.get('EXPORT_BENCH_CEILING_MB', 64))
+        
+        with tempfile.TemporaryDirectory() as workdir:
+            output_dir = Path(workdir) / 'site'
+            self._run_bench('build', workdir, output_dir, page_count)
+            report = json.loads(self._run_bench('export', workdir, output_dir, page_count).splitlines()[-1])
+            
+            self.assertEqual(report['pages_exported'], page_count + 1)
+            self.assertTrue((output_dir / 'page-0' / 'index.html').exists())
+            # ru_maxrss is in KiB on Linux
+            growth_mb = (report['peak_kb'] - report['baseline_kb']) / 1024
+            self.assertLess(growth_mb, ceiling_mb)
+
+
+class SpillableSetTestCase(TestCase):
+    """Tests for SpillableSet class"""
+    
+    def test_stays_in_memory_below_threshold(self):
+        """Test that small sets never touch disk"""
+        items = SpillableSet(threshold=3)
+        items.update(['a', 'b', 'a'])
+        
+        self.assertFalse(items.spilled)
+        self.assertEqual(len(items), 2)
+        self.assertIn('a', items)
+        items.close()
+    
+    def test_spills_to_disk_above_threshold(self):
+        """Test that items move to SQLite past the threshold"""
+        items = SpillableSet(threshold=2)
+        items.update(['c', 'a', 'b', 'a'])
+        items.add('d')
+        
+        self.assertTrue(items.spilled)
+        self.assertEqual(len(items), 4)
+        self.assertIn('b', items)
+        self.assertNotIn('z', items)
+        self.assertEqual(list(items), ['a', 'b', 'c', 'd'])
+        
+        db_path = items._db_path
+        items.close()
+        self.assertFalse(os.path.exists(db_path))
 
 
 class HTMLRewriterTestCase(TestCase):
@@ -227,6 +755,75 @@ class HTMLRewriterTestCase(TestCase):
             self.assertIn('href="../../index.html"', rewritten)
             self.assertIn('href="../index.html"', rewritten)
     
+    def test_collect_page_links_and_static(self):
+        """Test that internal links and static references are collected"""
+        html = '''
+        <html>
+        <head>
+            <link rel="stylesheet" href="/static/css/style.css">
+        </head>
+        <body>
+            <a href="/noticias/evento?page=2#top">Evento</a>
+            <a href="https://example.com">External</a>
+            <div data-url="/page-1/">Menu</div>
+        </body>
+        </html>
+        '''
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            rewriter = HTMLRewriter(
+                html=html,
+                current_page_url='/',
+                site_root_url='/',
+                output_dir=tmpdir
+            )
+            rewriter.rewrite()
+            
+            self.assertEqual(rewriter.collected_page_links, {'/noticias/evento/', '/page-1/'})
+            self.assertEqual(rewriter.collected_static_files, {'/static/css/style.css'})
+    
+    def test_rewrite_to_matches_rewrite(self):
+        """Test that streaming output is identical to rewrite()"""
+        html = (
+            b'<!DOCTYPE html>\n<html lang="es"><head><link rel="stylesheet" href="/static/a.css"></head>'
+            b'<body class="a b"><p>\xc3\xa1 &amp; b</p><a href="/x/">x</a></body></html>\n'
+        )
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            expected = HTMLRewriter(html, '/page-1/', '/', tmpdir).rewrite()
+            
+            output = io.StringIO()
+            HTMLRewriter(html, '/page-1/', '/', tmpdir).rewrite_to(output)
+            
+            self.assertEqual(output.getvalue(), expected)
+    
+    def test_live_urls_mode(self):
+        """Test that live-URL mode keeps absolute paths and no offline notice"""
+        html = '''
+        <html>
+        <head><link rel="canonical" href="https://madmusic.iccmu.es/page-1/"></head>
+        <body>
+            <a href="http://127.0.0.1:8000/page-1/">Page 1</a>
+            <img src="/media/images/logo.jpg">
+        </body>
+        </html>
+        '''
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            rewriter = HTMLRewriter(
+                html=html,
+                current_page_url='/page-2/',
+                site_root_url='/',
+                output_dir=tmpdir,
+                live_urls=True
+            )
+            rewritten = rewriter.rewrite()
+            
+            self.assertIn('href="/page-1/"', rewritten)
+            self.assertIn('src="/media/images/logo.jpg"', rewritten)
+            self.assertIn('rel="canonical"', rewritten)
+            self.assertNotIn('offline-notice', rewritten)
+    
     def test_skip_external_links(self):
         """Test that external links are not rewritten"""
         html = '''
@@ -330,6 +927,46 @@ class HTMLRewriterTestCase(TestCase):
             self.assertIn('href="static/css/style.css"', rewritten)
             self.assertIn('src="static/js/script.js"', rewritten)
     
+    def test_collect_every_static_reference(self):
+        """Test that images, icons, preloads and srcset under /static/ are rewritten and collected"""
+        html = '''
+        <html>
+        <head>
+            <link rel="icon" href="/static/img/favicon.ico">
+            <link rel="preload" href="/static/fonts/font.woff2" as="font">
+            <link rel="stylesheet" href="/static/css/style.css">
+        </head>
+        <body>
+            <img src="/static/img/logo.png" srcset="/static/img/logo.png 1x, /static/img/logo@2x.png 2x">
+            <picture><source srcset="/media/images/a.webp 400w, https://example.com/b.webp 800w"></picture>
+            <div style="background: url('/static/img/bg.jpg')"></div>
+            <script src="/static/js/script.js"></script>
+        </body>
+        </html>
+        '''
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            rewriter = HTMLRewriter(
+                html=html,
+                current_page_url='/noticias/',
+                site_root_url='/',
+                output_dir=tmpdir
+            )
+            rewritten = rewriter.rewrite()
+            
+            self.assertEqual(rewriter.collected_static_files, {
+                '/static/img/favicon.ico', '/static/fonts/font.woff2', '/static/css/style.css',
+                '/static/img/logo.png', '/static/img/logo@2x.png', '/static/img/bg.jpg', '/static/js/script.js',
+            })
+            self.assertEqual(rewriter.collected_media_files, {'/media/images/a.webp'})
+            self.assertIn('href="../static/img/favicon.ico"', rewritten)
+            self.assertIn('href="../static/fonts/font.woff2"', rewritten)
+            self.assertIn('src="../static/img/logo.png"', rewritten)
+            self.assertIn('srcset="../static/img/logo.png 1x, ../static/img/logo@2x.png 2x"', rewritten)
+            self.assertIn('srcset="../media/images/a.webp 400w, https://example.com/b.webp 800w"', rewritten)
+            self.assertIn('url(../static/img/bg.jpg)', rewritten)
+            self.assertNotIn('"/static/', rewritten)
+    
     def test_remove_canonical_links(self):
         """Test that canonical links are removed"""
         html = '''
@@ -400,6 +1037,447 @@ class HTMLRewriterTestCase(TestCase):
             self.assertIn('url(media/images/bg.jpg)', rewritten)
 
 
+class FakeClock:
+    """Deterministic clock whose sleep advances time instead of blocking"""
+    
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ExportThrottleTestCase(TestCase):
+    """Tests for ExportThrottle class"""
+    
+    def test_rate_limit_spaces_renders(self):
+        """Test that renders are spaced by 1/rate seconds"""
+        clock = FakeClock()
+        throttle = ExportThrottle(
+            rate_limit=4, metrics_hook=lambda: {}, clock=clock, sleep=clock.sleep
+        )
+        
+        for _ in range(5):
+            throttle.wait()
+        
+        # First render is immediate, the next four wait 0.25s each
+        self.assertEqual(clock.sleeps, [0.25] * 4)
+        self.assertEqual(clock.now, 1.0)
+    
+    def test_backs_off_when_latency_is_high(self):
+        """Test that the rate halves while the host is overloaded"""
+        clock = FakeClock()
+        throttle = ExportThrottle(
+            rate_limit=8,
+            metrics_hook=lambda: {'latency_ms': 900},
+            latency_target_ms=500,
+            check_interval=1,
+            clock=clock,
+            sleep=clock.sleep
+        )
+        
+        throttle.wait()
+        self.assertEqual(throttle.current_rate, 4)
+        throttle.wait()
+        self.assertEqual(throttle.current_rate, 2)
+        self.assertEqual(throttle.backoffs, 2)
+    
+    def test_recovers_when_host_is_healthy(self):
+        """Test that the rate grows back up to the limit"""
+        metrics = {'db_latency_ms': 200}
+        clock = FakeClock()
+        throttle = ExportThrottle(
+            rate_limit=2,
+            metrics_hook=lambda: metrics,
+            db_latency_target_ms=50,
+            check_interval=1,
+            clock=clock,
+            sleep=clock.sleep
+        )
+        
+        throttle.wait()
+        self.assertEqual(throttle.current_rate, 1)
+        
+        metrics['db_latency_ms'] = 1
+        for _ in range(20):
+            throttle.wait()
+        self.assertEqual(throttle.current_rate, 2)
+    
+    def test_rejects_non_positive_rate(self):
+        """Test that a zero or negative rate is rejected up front"""
+        for rate in (0, -1):
+            with self.assertRaises(ValueError):
+                ExportThrottle(rate_limit=rate, metrics_hook=lambda: {})
+        with self.assertRaises(ValueError):
+            ExportThrottle(rate_limit=1, min_rate=0, metrics_hook=lambda: {})
+
+
+class FakeBlobClient:
+    """In-memory stand-in for azure.storage.blob.BlobClient"""
+    
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+        self.url = f'https://account.blob.core.windows.net/{container.name}/{name}'
+        self.staged = {}
+        self.stage_calls = []
+        self.fail_blocks = set()
+    
+    def get_block_list(self, block_list_type='committed'):
+        from azure.core.exceptions import ResourceNotFoundError
+        from azure.storage.blob import BlobBlock
+        
+        if not self.staged and self.name not in self.container.blobs:
+            raise ResourceNotFoundError('BlobNotFound')
+        return [], [BlobBlock(block_id=block_id) for block_id in self.staged]
+    
+    def stage_block(self, block_id, data, length=None, validate_content=False):
+        self.stage_calls.append(block_id)
+        if block_id in self.fail_blocks:
+            raise ConnectionError('connection dropped')
+        self.staged[block_id] = bytes(data)
+    
+    def commit_block_list(self, block_list, content_settings=None, metadata=None):
+        self.container.blobs[self.name] = b''.join(self.staged[block.id] for block in block_list)
+        self.container.content_settings[self.name] = content_settings
+        self.staged = {}
+    
+    def delete_blob(self):
+        del self.container.blobs[self.name]
+    
+    def get_blob_properties(self):
+        from types import SimpleNamespace
+        return SimpleNamespace(size=len(self.container.blobs[self.name]))
+    
+    def download_blob(self, offset=0, length=None):
+        from types import SimpleNamespace
+        self.container.range_reads.append((offset, length))
+        data = self.container.blobs[self.name][offset:offset + length if length else None]
+        return SimpleNamespace(readall=lambda: data)
+    
+    def start_copy_from_url(self, source_url):
+        source = source_url.split('?')[0].rsplit('/', 1)[-1]
+        self.container.blobs[self.name] = self.container.blobs[source]
+        return {'copy_status': 'success', 'copy_id': 'copy-1'}
+
+
+class FakeContainerClient:
+    """In-memory stand-in for azure.storage.blob.ContainerClient"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.blobs = {}
+        self.content_settings = {}
+        self.blob_clients = {}
+        self.list_calls = 0
+        self.batch_calls = []
+        self.range_reads = []
+    
+    def create_container(self):
+        pass
+    
+    def delete_blobs(self, *names, raise_on_any_failure=True):
+        from types import SimpleNamespace
+        self.batch_calls.append(names)
+        return iter([
+            SimpleNamespace(status_code=202 if self.blobs.pop(name, None) is not None else 404)
+            for name in names
+        ])
+    
+    def list_blobs(self, name_starts_with=None):
+        from types import SimpleNamespace
+        from django.utils import timezone
+        
+        self.list_calls += 1
+        for index, (name, data) in enumerate(sorted(self.blobs.items())):
+            if name_starts_with and not name.startswith(name_starts_with):
+                continue
+            created = timezone.now() + timezone.timedelta(seconds=index)
+            yield SimpleNamespace(
+                name=name,
+                size=len(data),
+                content_settings=self.content_settings.get(name),
+                creation_time=created,
+                last_modified=created
+            )
+    
+    def get_blob_client(self, name):
+        if name not in self.blob_clients:
+            self.blob_clients[name] = FakeBlobClient(self, name)
+        return self.blob_clients[name]
+
+
+class FakeBlobService:
+    """In-memory stand-in for azure.storage.blob.BlobServiceClient"""
+    
+    def __init__(self):
+        self.containers = {}
+    
+    def get_container_client(self, name):
+        if name not in self.containers:
+            self.containers[name] = FakeContainerClient(name)
+        return self.containers[name]
+
+
+@override_settings(AZURE_ACCOUNT_NAME='account', AZURE_ACCOUNT_KEY='a2V5')
+class AzureBackupUploaderTestCase(TestCase):
+    """Tests for AzureBackupUploader block uploads"""
+    
+    def setUp(self):
+        self.service = FakeBlobService()
+        patcher = mock.patch.object(AzureBackupUploader, '_get_blob_service', return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.zip_path = Path(self.temp_dir) / 'offline-backup-test.zip'
+        self.data = os.urandom(10 * 1024 + 123)
+        self.zip_path.write_bytes(self.data)
+        
+        reset_backup_catalog()
+        self.addCleanup(reset_backup_catalog)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_upload_in_blocks(self):
+        """Test that the archive is staged in blocks and latest.zip is copied"""
+        uploader = AzureBackupUploader(block_size=1024, max_concurrency=4)
+        url = uploader.upload(self.zip_path)
+        
+        container = self.service.containers['backups']
+        self.assertTrue(url.endswith('/backups/offline-backup-test.zip'))
+        self.assertEqual(container.blobs['offline-backup-test.zip'], self.data)
+        self.assertEqual(container.blobs['latest.zip'], self.data)
+        self.assertEqual(uploader.blocks_uploaded, 11)
+        # latest.zip is a server-side copy, no blocks are sent for it
+        self.assertEqual(container.get_blob_client('latest.zip').stage_calls, [])
+        
+        # Whole-file MD5 is stored on the blob
+        content_md5 = container.content_settings['offline-backup-test.zip'].content_md5
+        self.assertEqual(bytes(content_md5), hashlib.md5(self.data).digest())
+    
+    def test_block_ids_have_equal_length(self):
+        """Test that block IDs are uniform and carry the block MD5"""
+        uploader = AzureBackupUploader(block_size=1024)
+        blocks, digest = uploader._plan_blocks(self.zip_path)
+        
+        self.assertEqual(len({len(block_id) for block_id, _offset, _length in blocks}), 1)
+        self.assertEqual(blocks[-1][2], 123)
+        self.assertTrue(blocks[0][0].endswith(hashlib.md5(self.data[:1024]).hexdigest()))
+        self.assertEqual(digest, hashlib.md5(self.data).digest())
+    
+    def test_resume_skips_staged_blocks(self):
+        """Test that an interrupted upload only resends the missing blocks"""
+        uploader = AzureBackupUploader(block_size=1024, max_concurrency=2)
+        uploader.BLOCK_RETRIES = 1
+        blob = self.service.get_container_client('backups').get_blob_client('offline-backup-test.zip')
+        last_block = uploader._plan_blocks(self.zip_path)[0][-1][0]
+        blob.fail_blocks.add(last_block)
+        
+        with self.assertRaises(ExportError):
+            uploader.upload(self.zip_path)
+        self.assertEqual(len(blob.staged), 10)
+        
+        blob.fail_blocks.clear()
+        blob.stage_calls.clear()
+        uploader.upload(self.zip_path)
+        
+        self.assertEqual(blob.stage_calls, [last_block])
+        self.assertEqual(uploader.blocks_skipped, 10)
+        self.assertEqual(self.service.containers['backups'].blobs['offline-backup-test.zip'], self.data)
+    
+    def test_upload_stream(self):
+        """Test that streamed data is staged in blocks and optionally kept locally"""
+        local_copy = Path(self.temp_dir) / 'copy.zip'
+        uploader = AzureBackupUploader(block_size=1024, max_concurrency=2)
+        
+        def write_archive(fileobj):
+            for start in range(0, len(self.data), 700):
+                fileobj.write(self.data[start:start + 700])
+        
+        url = uploader.upload_stream('offline-backup-stream.zip', write_archive, local_copy=local_copy)
+        
+        container = self.service.containers['backups']
+        self.assertTrue(url.endswith('/backups/offline-backup-stream.zip'))
+        self.assertEqual(container.blobs['offline-backup-stream.zip'], self.data)
+        self.assertEqual(container.blobs['latest.zip'], self.data)
+        self.assertEqual(uploader.blocks_uploaded, 11)
+        self.assertEqual(local_copy.read_bytes(), self.data)
+    
+    def test_upload_stream_failure_is_not_committed(self):
+        """Test that a failing producer leaves no blob and no local copy"""
+        local_copy = Path(self.temp_dir) / 'copy.zip'
+        uploader = AzureBackupUploader(block_size=1024)
+        
+        def write_archive(fileobj):
+            fileobj.write(self.data)
+            raise ExportError('render failed')
+        
+        with self.assertRaises(ExportError):
+            uploader.upload_stream('offline-backup-stream.zip', write_archive, local_copy=local_copy)
+        
+        self.assertNotIn('offline-backup-stream.zip', self.service.containers['backups'].blobs)
+        self.assertFalse(local_copy.exists())
+
+
+class BackupCatalogTestCase(TestCase):
+    """Tests for the in-memory backup catalog"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.backup_dir = Path(self.temp_dir)
+        self.clock = FakeClock()
+        self.catalog = BackupCatalog(backup_dir=self.backup_dir, ttl=60, clock=self.clock)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _write_backup(self, site, stamp, data=b'zip', mtime=None):
+        path = self.backup_dir / f'offline-backup-{site}-{stamp}.zip'
+        path.write_bytes(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+    
+    def test_lists_local_backups_newest_first(self):
+        """Test that local backups are listed with site, size and checksum"""
+        old = self._write_backup('madmusic.iccmu.es', '20250101-0300', mtime=1000)
+        self._write_backup('fondos.iccmu.es', '20250102-0300', data=b'zipzip', mtime=2000)
+        self.catalog.record_local(old)
+        
+        entries = self.catalog.entries('local')
+        
+        self.assertEqual([entry['site'] for entry in entries], ['fondos.iccmu.es', 'madmusic.iccmu.es'])
+        self.assertEqual(entries[0]['size'], 6)
+        self.assertIsNone(entries[0]['checksum'])
+        self.assertEqual(entries[1]['checksum'], hashlib.md5(b'zip').hexdigest())
+        self.assertEqual(self.catalog.latest('local')['name'], entries[0]['name'])
+    
+    def test_reads_from_memory_until_ttl(self):
+        """Test that the directory is only rescanned after the TTL or a change"""
+        self._write_backup('madmusic.iccmu.es', '20250101-0300')
+        self.assertEqual(len(self.catalog.entries('local')), 1)
+        
+        with mock.patch.object(BackupCatalog, '_load_local') as load:
+            self.catalog.entries('local')
+            load.assert_not_called()
+            
+            self.clock.now += 61
+            self.catalog.entries('local')
+            load.assert_called_once()
+    
+    def test_directory_change_refreshes(self):
+        """Test that a new file is picked up before the TTL expires"""
+        self._write_backup('madmusic.iccmu.es', '20250101-0300')
+        self.assertEqual(len(self.catalog.entries('local')), 1)
+        
+        path = self._write_backup('madmusic.iccmu.es', '20250102-0300')
+        os.utime(self.backup_dir, ns=(0, os.stat(self.backup_dir).st_mtime_ns + 1))
+        
+        self.assertIn(path.name, [entry['name'] for entry in self.catalog.entries('local')])
+    
+    def test_pagination_and_site_filter(self):
+        """Test that listings can be paginated and filtered by site"""
+        for day in range(1, 6):
+            self._write_backup('madmusic.iccmu.es', f'2025010{day}-0300', mtime=day * 1000)
+        self._write_backup('fondos.iccmu.es', '20250101-0300')
+        
+        listing = self.catalog.list(site='madmusic.iccmu.es', location='local', page=2, per_page=2)
+        
+        self.assertEqual(listing['count'], 5)
+        self.assertEqual(listing['pages'], 3)
+        self.assertEqual(
+            [entry['name'] for entry in listing['results']],
+            ['offline-backup-madmusic.iccmu.es-20250103-0300.zip',
+             'offline-backup-madmusic.iccmu.es-20250102-0300.zip']
+        )
+    
+    @override_settings(AZURE_ACCOUNT_NAME='account', AZURE_ACCOUNT_KEY='a2V5')
+    def test_azure_backups_follow_uploads(self):
+        """Test that Azure listings are cached and updated by the uploader"""
+        service = FakeBlobService()
+        zip_path = self._write_backup('madmusic.iccmu.es', '20250101-0300', data=b'data')
+        
+        with mock.patch.object(AzureBackupUploader, '_get_blob_service', return_value=service), \
+                mock.patch('cms.export.storage.get_backup_catalog', return_value=self.catalog):
+            self.assertEqual(self.catalog.entries('azure'), [])
+            AzureBackupUploader().upload(zip_path)
+            entries = self.catalog.entries('azure')
+            
+            # Answered from memory: the container was listed only once
+            self.assertEqual(service.containers['backups'].list_calls, 1)
+            self.assertEqual(entries[0]['name'], zip_path.name)
+            self.assertEqual(entries[0]['checksum'], hashlib.md5(b'data').hexdigest())
+            
+            # A refresh reads the Content-MD5 stored on the blob
+            self.catalog.invalidate('azure')
+            self.assertEqual(self.catalog.entries('azure')[0]['checksum'], hashlib.md5(b'data').hexdigest())
+            
+            AzureBackupUploader().delete_old_backups(keep_count=0)
+            self.assertEqual(self.catalog.entries('azure'), [])
+
+
+@override_settings(AZURE_ACCOUNT_NAME='account', AZURE_ACCOUNT_KEY='a2V5')
+class BlobClientRegistryTestCase(TestCase):
+    """Tests for the pooled BlobServiceClient registry"""
+    
+    def setUp(self):
+        blob_clients.close_blob_services()
+        self.addCleanup(blob_clients.close_blob_services)
+    
+    def test_client_is_shared(self):
+        """Test that every caller in the process gets the same client"""
+        first = blob_clients.get_blob_service()
+        second = blob_clients.get_blob_service()
+        
+        self.assertIs(first, second)
+        self.assertEqual(first.account_name, 'account')
+        
+        stats = blob_clients.pool_stats()
+        self.assertEqual(len(stats['clients']), 1)
+        self.assertEqual(stats['clients'][0]['account'], 'account')
+    
+    def test_uploader_uses_shared_client(self):
+        """Test that AzureBackupUploader reuses the pooled client"""
+        self.assertIs(AzureBackupUploader().blob_service, AzureBackupUploader().blob_service)
+    
+    def test_new_process_gets_new_client(self):
+        """Test that clients inherited through fork are not reused"""
+        first = blob_clients.get_blob_service()
+        
+        with mock.patch.object(blob_clients.os, 'getpid', return_value=os.getpid() + 1):
+            second = blob_clients.get_blob_service()
+        
+        self.assertIsNot(first, second)
+    
+    @override_settings(AZURE_POOL_KEEPALIVE=0)
+    def test_idle_connections_are_recycled(self):
+        """Test that idle pooled connections are dropped after the keep-alive"""
+        client = blob_clients.get_blob_service()
+        recycles = blob_clients.pool_stats()['recycles']
+        
+        with mock.patch('requests.Session.close') as close:
+            self.assertIs(blob_clients.get_blob_service(), client)
+        
+        close.assert_called_once()
+        self.assertEqual(blob_clients.pool_stats()['recycles'], recycles + 1)
+    
+    @override_settings()
+    def test_missing_credentials(self):
+        """Test that missing settings raise ExportError"""
+        del settings.AZURE_ACCOUNT_KEY
+        with self.assertRaises(ExportError):
+            blob_clients.get_blob_service()
+
+
 class DownloadViewsTestCase(TestCase):
     """Tests for backup download views"""
     
@@ -462,3 +1540,581 @@ class DownloadViewsTestCase(TestCase):
         data = response.json()
         self.assertIn('local', data)
         self.assertIn('azure', data)
+    
+    def test_list_backups_paginated_from_catalog(self):
+        """Test that the listing is served from the catalog with filters"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for day in range(1, 4):
+                path = Path(tmpdir) / f'offline-backup-madmusic.iccmu.es-2025010{day}-0300.zip'
+                path.write_bytes(b'zip')
+                os.utime(path, (day * 1000, day * 1000))
+            
+            with override_settings(BACKUP_DIR=tmpdir):
+                reset_backup_catalog()
+                self.addCleanup(reset_backup_catalog)
+                self.client.login(username='staff', password='testpass123')
+                response = self.client.get(
+                    '/list-backups/',
+                    {'site': 'madmusic.iccmu.es', 'location': 'local', 'per_page': 2},
+                    HTTP_HOST='madmusic.iccmu.es'
+                )
+                
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(data['count'], 3)
+                self.assertEqual(data['pages'], 2)
+                self.assertEqual(data['local'][0]['name'], 'offline-backup-madmusic.iccmu.es-20250103-0300.zip')
+                
+                response = self.client.get('/download-offline-backup/', HTTP_HOST='madmusic.iccmu.es')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('20250103-0300', response['Content-Disposition'])
+                response.close()
+
+    def test_list_backups_unpaginated_by_default(self):
+        """Test that without page/per_page every backup is listed with its epoch 'modified'"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for day in range(1, 61):
+                path = Path(tmpdir) / f'offline-backup-madmusic.iccmu.es-202501{day:02d}-0300.zip'
+                path.write_bytes(b'zip')
+                os.utime(path, (day * 1000, day * 1000))
+
+            with override_settings(BACKUP_DIR=tmpdir):
+                reset_backup_catalog()
+                self.addCleanup(reset_backup_catalog)
+                self.client.login(username='staff', password='testpass123')
+                response = self.client.get('/list-backups/', {'location': 'local'}, HTTP_HOST='madmusic.iccmu.es')
+
+                data = response.json()
+                self.assertEqual(len(data['local']), 60)
+                self.assertEqual(data['pages'], 1)
+                self.assertEqual(data['local'][0]['modified'], 60000)
+                self.assertEqual(set(data['local'][0]), {'name', 'size_mb', 'modified'})
+                self.assertIn('created', data['results'][0])
+
+
+@override_settings(BACKUP_SENDFILE_HEADER=None, BACKUP_DOWNLOAD_AZURE_REDIRECT=False)
+class BackupDownloadTestCase(TestCase):
+    """Tests for resumable, offloaded and redirected backup downloads"""
+    
+    def setUp(self):
+        self.client = Client(HTTP_HOST='madmusic.iccmu.es')
+        self.staff_user = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.login(username='staff', password='testpass123')
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = bytes(range(256)) * 40
+        self.backup = Path(self.temp_dir) / 'offline-backup-madmusic.iccmu.es-20250101-0300.zip'
+        self.backup.write_bytes(self.data)
+        
+        settings_override = override_settings(BACKUP_DIR=self.temp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_backup_catalog()
+        self.addCleanup(reset_backup_catalog)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _get(self, **headers):
+        response = self.client.get('/download-offline-backup/', **headers)
+        self.addCleanup(response.close)
+        return response
+    
+    def test_full_download_advertises_ranges(self):
+        """Test that a plain request returns the whole file with validators"""
+        response = self._get()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+    
+    def test_range_resumes_download(self):
+        """Test that a Range request returns only the requested bytes"""
+        etag = self._get()['ETag']
+        
+        response = self._get(HTTP_RANGE='bytes=1000-', HTTP_IF_RANGE=etag)
+        
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 1000-{len(self.data) - 1}/{len(self.data)}')
+        self.assertEqual(b''.join(response.streaming_content), self.data[1000:])
+        
+        response = self._get(HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+    
+    def test_if_range_mismatch_sends_full_file(self):
+        """Test that a stale If-Range validator restarts the download"""
+        response = self._get(HTTP_RANGE='bytes=1000-', HTTP_IF_RANGE='"stale"')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+    
+    def test_unsatisfiable_range(self):
+        """Test that a range past the end of the file returns 416"""
+        response = self._get(HTTP_RANGE=f'bytes={len(self.data)}-')
+        
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+    
+    @override_settings(BACKUP_SENDFILE_HEADER='X-Accel-Redirect', BACKUP_ACCEL_PREFIX='/_backups/')
+    def test_sendfile_offload(self):
+        """Test that the transfer can be delegated to nginx"""
+        response = self._get()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/_backups/{self.backup.name}')
+        self.assertEqual(response.content, b'')
+    
+    @override_settings(BACKUP_DOWNLOAD_AZURE_REDIRECT=True, AZURE_ACCOUNT_NAME='account', AZURE_ACCOUNT_KEY='a2V5')
+    def test_redirects_to_azure_when_uploaded(self):
+        """Test that a backup present in Azure is served through a SAS URL"""
+        reset_backup_catalog()
+        get_backup_catalog().record_azure(self.backup.name, len(self.data))
+        
+        with mock.patch.object(AzureBackupUploader, '_get_blob_service', return_value=FakeBlobService()), \
+                mock.patch.object(BackupCatalog, '_load_azure'):
+            response = self._get()
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(
+            f'https://account.blob.core.windows.net/backups/{self.backup.name}?'
+        ))
+
+
+class BackupStorageTestCase(TestCase):
+    """Tests for the local and in-memory backup storage backends"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.zip_path = Path(self.temp_dir) / 'offline-backup-madmusic.iccmu.es-20250101-0300.zip'
+        self.data = os.urandom(4096)
+        self.zip_path.write_bytes(self.data)
+        
+        reset_backup_catalog()
+        self.addCleanup(reset_backup_catalog)
+        MemoryBackupStorage.reset()
+        self.addCleanup(MemoryBackupStorage.reset)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_backend_selection(self):
+        """Test that backends are chosen by name or setting"""
+        self.assertIsInstance(get_backup_storage('memory'), MemoryBackupStorage)
+        with override_settings(BACKUP_STORAGE_BACKEND='local', BACKUP_STORAGE_ROOT=self.temp_dir):
+            self.assertIsInstance(get_backup_storage(), LocalBackupStorage)
+    
+    @override_settings(BACKUP_STORAGE_BACKEND='local')
+    def test_local_upload_and_retention(self):
+        """Test that local storage keeps backups, latest.zip and prunes old ones"""
+        storage = LocalBackupStorage(root=Path(self.temp_dir) / 'storage')
+        storage.upload(self.zip_path)
+        newer = self.zip_path.with_name('offline-backup-madmusic.iccmu.es-20250102-0300.zip')
+        newer.write_bytes(b'newer')
+        storage.upload(newer)
+        os.utime(storage.local_path(self.zip_path.name), (1000, 1000))
+        
+        self.assertEqual(sorted(storage.list_backups()), [self.zip_path.name, newer.name])
+        self.assertEqual((storage.container_dir / 'latest.zip').read_bytes(), b'newer')
+        
+        with override_settings(BACKUP_STORAGE_ROOT=storage.root):
+            catalog = get_backup_catalog()
+            self.assertEqual(catalog.latest('azure')['name'], newer.name)
+        
+        storage.delete_old_backups(keep_count=1)
+        self.assertEqual(storage.list_backups(), [newer.name])
+    
+    def test_memory_upload_stream(self):
+        """Test that in-memory storage is shared between instances"""
+        MemoryBackupStorage().upload_stream(self.zip_path.name, lambda f: f.write(self.data))
+        
+        storage = MemoryBackupStorage()
+        self.assertEqual(storage.read_backup(self.zip_path.name), self.data)
+        self.assertEqual(storage.read_backup('latest.zip'), self.data)
+        self.assertEqual(storage.list_backup_entries()[0]['checksum'], hashlib.md5(self.data).hexdigest())
+    
+    def test_signed_local_url(self):
+        """Test that signed URLs are bound to the backup and expire"""
+        storage = LocalBackupStorage(root=Path(self.temp_dir) / 'storage')
+        url = storage.generate_sas_url(self.zip_path.name)
+        token = url.split('token=')[1]
+        
+        self.assertTrue(url.startswith(f'/backup-storage/backups/{self.zip_path.name}?'))
+        self.assertTrue(verify_backup_token(token, 'backups', self.zip_path.name))
+        self.assertFalse(verify_backup_token(token, 'backups', 'offline-backup-other.zip'))
+        self.assertFalse(verify_backup_token(token + 'x', 'backups', self.zip_path.name))
+        
+        expired = storage.generate_sas_url(self.zip_path.name, expiry_hours=-1).split('token=')[1]
+        self.assertFalse(verify_backup_token(expired, 'backups', self.zip_path.name))
+    
+    def test_signed_local_url_download(self):
+        """Test that the signed URL view serves the stored backup"""
+        with override_settings(BACKUP_STORAGE_ROOT=Path(self.temp_dir) / 'storage'):
+            storage = LocalBackupStorage()
+            url = storage.upload(self.zip_path)
+            client = Client(HTTP_HOST='madmusic.iccmu.es')
+            
+            response = client.get(url, HTTP_RANGE='bytes=0-99')
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(b''.join(response.streaming_content), self.data[:100])
+            
+            response = client.get(url.split('?')[0] + '?token=invalid')
+            self.assertEqual(response.status_code, 404)
+    
+    def test_benchmark_command(self):
+        """Test that the benchmark runs offline for the local and memory backends"""
+        from django.core.management import call_command
+        
+        out = io.StringIO()
+        call_command('benchmark_backup_storage', '--size-mb=0.05', '--runs=2', '--count=4', stdout=out)
+        
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], ['backend', 'memory', 'local'])
+
+
+class DeltaBackupTestCase(TestCase):
+    """Tests for incremental backups, chain restore and chain-aware retention"""
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.output_dir = self.temp_dir / 'export'
+        (self.output_dir / 'page-1').mkdir(parents=True)
+        (self.output_dir / 'index.html').write_text('home')
+        (self.output_dir / 'page-1' / 'index.html').write_text('page 1')
+        (self.output_dir / 'old.html').write_text('old')
+        
+        reset_backup_catalog()
+        self.addCleanup(reset_backup_catalog)
+        MemoryBackupStorage.reset()
+        self.addCleanup(MemoryBackupStorage.reset)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _create_zip(self, exporter, day, **kwargs):
+        name = f'offline-backup-{exporter.site.hostname}-202501{day:02d}-0300.zip'
+        with mock.patch.object(exporter, 'archive_filename', return_value=name):
+            return exporter.create_zip(delta=True, **kwargs)
+    
+    def test_delta_chain_restore(self):
+        """Test that deltas only hold changes and replay to the latest state"""
+        exporter = StaticSiteExporter(site_id_or_hostname=Site.objects.get(is_default_site=True).id,
+                                      output_dir=str(self.output_dir))
+        
+        full = self._create_zip(exporter, 1, full_every=3)
+        self.assertEqual(exporter.backup_manifest['kind'], 'full')
+        
+        (self.output_dir / 'page-1' / 'index.html').write_text('page 1 edited')
+        (self.output_dir / 'old.html').unlink()
+        (self.output_dir / 'new.html').write_text('new')
+        delta = self._create_zip(exporter, 2, full_every=3)
+        
+        self.assertTrue(delta.name.endswith('-delta.zip'))
+        self.assertEqual(exporter.backup_manifest['base'], full.name)
+        self.assertEqual(exporter.backup_manifest['deleted'], ['old.html'])
+        with zipfile.ZipFile(delta) as zipf:
+            self.assertEqual(sorted(zipf.namelist()), ['backup-manifest.json', 'new.html', 'page-1/index.html'])
+        
+        (self.output_dir / 'index.html').write_text('home edited')
+        second_delta = self._create_zip(exporter, 3, full_every=3)
+        self.assertEqual(exporter.backup_manifest['sequence'], 2)
+        
+        restored = self.temp_dir / 'restored'
+        chain = restore_backup_chain(second_delta, restored)
+        self.assertEqual([path.name for path in chain], [full.name, delta.name, second_delta.name])
+        self.assertEqual(
+            sorted(path.relative_to(restored).as_posix() for path in restored.rglob('*') if path.is_file()),
+            ['index.html', 'new.html', 'page-1/index.html']
+        )
+        self.assertEqual((restored / 'index.html').read_text(), 'home edited')
+        
+        # The chain is full: the next backup starts a new one
+        self._create_zip(exporter, 4, full_every=3)
+        self.assertEqual(exporter.backup_manifest['kind'], 'full')
+        
+        delta.unlink()
+        with self.assertRaises(ExportError):
+            restore_backup_chain(second_delta, self.temp_dir / 'broken')
+    
+    def test_retention_keeps_chain(self):
+        """Test that pruning keeps the full backup and deltas a kept delta needs"""
+        from datetime import datetime, timedelta, timezone
+        
+        storage = MemoryBackupStorage()
+        names = [
+            'offline-backup-madmusic.iccmu.es-20250101-0300.zip',
+            'offline-backup-madmusic.iccmu.es-20250102-0300-delta.zip',
+            'offline-backup-madmusic.iccmu.es-20250103-0300.zip',
+            'offline-backup-madmusic.iccmu.es-20250104-0300-delta.zip',
+            'offline-backup-madmusic.iccmu.es-20250105-0300-delta.zip',
+        ]
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for day, name in enumerate(names):
+            storage.upload_stream(name, lambda f: f.write(b'x'))
+            storage.blobs[name]['created'] = start + timedelta(days=day)
+        
+        self.assertEqual(storage.read_backup('latest.zip'), storage.read_backup(names[2]))
+        
+        storage.delete_old_backups(keep_count=1)
+        self.assertEqual(sorted(storage.list_backups()), names[2:])
+
+
+@override_settings(AZURE_ACCOUNT_NAME='account', AZURE_ACCOUNT_KEY='a2V5')
+class BackupRetentionTestCase(TestCase):
+    """Tests for retention policies, batch deletes and archive verification"""
+    
+    def setUp(self):
+        self.service = FakeBlobService()
+        patcher = mock.patch.object(AzureBackupUploader, '_get_blob_service', return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        reset_backup_catalog()
+        self.addCleanup(reset_backup_catalog)
+    
+    @staticmethod
+    def _entries(days):
+        from datetime import datetime, timedelta, timezone
+        
+        start = datetime(2025, 1, 1, 3, tzinfo=timezone.utc)
+        return [
+            {
+                'name': f'offline-backup-madmusic.iccmu.es-{(start + timedelta(days=day)):%Y%m%d}-0300.zip',
+                'created': start + timedelta(days=day),
+            }
+            for day in days
+        ]
+    
+    def test_policy_keeps_one_backup_per_period(self):
+        """Test daily/weekly/monthly selection"""
+        entries = self._entries(range(90))
+        keep = RetentionPolicy(daily=3, weekly=2, monthly=3).select(entries)
+        
+        self.assertEqual(sorted(name[-17:-9] for name in keep), [
+            '20250131', '20250228', '20250329', '20250330', '20250331',
+        ])
+        self.assertEqual(RetentionPolicy(last=2).select(entries), {entries[-1]['name'], entries[-2]['name']})
+    
+    def test_azure_retention_uses_batch_delete(self):
+        """Test that pruning sends one batch request per DELETE_BATCH_SIZE blobs"""
+        uploader = AzureBackupUploader()
+        uploader.DELETE_BATCH_SIZE = 4
+        entries = self._entries(range(10))
+        container = self.service.get_container_client('backups')
+        for entry in entries:
+            container.blobs[entry['name']] = b'x'
+        
+        with mock.patch.object(uploader, 'list_backup_entries', return_value=entries):
+            deleted = uploader.apply_retention(RetentionPolicy(last=3))
+        
+        self.assertEqual(deleted, [entry['name'] for entry in entries[:7]])
+        self.assertEqual([len(batch) for batch in container.batch_calls], [4, 3])
+        self.assertEqual(sorted(container.blobs), [entry['name'] for entry in entries[7:]])
+    
+    def test_verify_remote_archive_with_ranged_reads(self):
+        """Test that a stored archive is checked against its manifest without a full download"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            export_dir = Path(tmpdir) / 'export'
+            export_dir.mkdir()
+            (export_dir / 'index.html').write_bytes(os.urandom(64 * 1024))
+            (export_dir / 'page.html').write_text('page')
+            zip_path = Path(tmpdir) / 'offline-backup-madmusic.iccmu.es-20250101-0300.zip'
+            exporter = StaticSiteExporter(site_id_or_hostname=Site.objects.get(is_default_site=True).id,
+                                          output_dir=str(export_dir))
+            with mock.patch.object(exporter, 'archive_filename', return_value=zip_path.name):
+                exporter.create_zip()
+            
+            uploader = AzureBackupUploader()
+            uploader.upload(zip_path)
+        
+        with uploader.open_backup(zip_path.name, read_size=16 * 1024) as fileobj:
+            result = verify_archive(fileobj)
+        self.assertTrue(result['ok'], result['errors'])
+        self.assertEqual((result['kind'], result['members']), ('full', 2))
+        container = self.service.containers['backups']
+        self.assertTrue(all(length <= 64 * 1024 + 100 for _offset, length in container.range_reads))
+        
+        # Change one byte of the page data: the member no longer checks out
+        data = bytearray(container.blobs[zip_path.name])
+        with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+            info = zipf.getinfo('page.html')
+        data[info.header_offset + 30 + len(info.filename) + len(info.extra)] ^= 0xFF
+        container.blobs[zip_path.name] = bytes(data)
+        with uploader.open_backup(zip_path.name) as fileobj:
+            result = verify_archive(fileobj)
+        self.assertFalse(result['ok'])
+        self.assertTrue(result['errors'][0].startswith('page.html'))
+
+
+class AsyncBackupViewsTestCase(TestCase):
+    """Tests for the async backup views of the ASGI profile"""
+    
+    def setUp(self):
+        from django.test import AsyncRequestFactory
+        
+        self.factory = AsyncRequestFactory()
+        self.staff_user = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.regular_user = User.objects.create_user(username='regular', password='testpass123')
+        
+        self.temp_dir = tempfile.mkdtemp()
+        (Path(self.temp_dir) / 'offline-backup-madmusic.iccmu.es-20250101-0300.zip').write_bytes(b'local')
+        
+        settings_override = override_settings(BACKUP_DIR=self.temp_dir, BACKUP_STORAGE_BACKEND='memory')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_backup_catalog()
+        self.addCleanup(reset_backup_catalog)
+        MemoryBackupStorage.reset()
+        self.addCleanup(MemoryBackupStorage.reset)
+        MemoryBackupStorage().upload_stream('offline-backup-madmusic.iccmu.es-20250102-0300.zip', lambda f: f.write(b'x'))
+        reset_backup_catalog()
+    
+    def _request(self, path, user):
+        request = self.factory.get(path)
+        request.user = user
+        return request
+    
+    async def test_list_backups_async(self):
+        """Test that the async listing matches the sync view"""
+        from cms.views import list_backups_async
+        
+        with mock.patch.object(MemoryBackupStorage, 'list_backup_entries', side_effect=AssertionError('sync call')):
+            with mock.patch.object(
+                MemoryBackupStorage, 'alist_backup_entries',
+                return_value=[{'name': 'offline-backup-madmusic.iccmu.es-20250102-0300.zip', 'size': 1,
+                               'created': timezone_now(), 'checksum': None}]
+            ):
+                response = await list_backups_async(self._request('/list-backups/', self.staff_user))
+        
+        self.assertEqual(response.status_code, 200)
+        import json
+        data = json.loads(response.content)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([entry['location'] for entry in data['results']], ['azure', 'local'])
+        # 'azure' keeps its old contract: blob names, not dicts
+        self.assertEqual(data['azure'], ['offline-backup-madmusic.iccmu.es-20250102-0300.zip'])
+        
+        response = await list_backups_async(self._request('/list-backups/?location=x', self.staff_user))
+        self.assertEqual(response.status_code, 400)
+    
+    async def test_async_views_require_staff(self):
+        """Test that non-staff users are redirected to login"""
+        from cms.views import download_from_azure_async, list_backups_async
+        
+        for view in (list_backups_async, download_from_azure_async):
+            response = await view(self._request('/list-backups/', self.regular_user))
+            self.assertEqual(response.status_code, 302)
+    
+    async def test_download_from_azure_async(self):
+        """Test that the async download view returns a signed URL"""
+        from cms.views import download_from_azure_async
+        import json
+        
+        response = await download_from_azure_async(self._request('/download-from-azure/', self.staff_user))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/backup-storage/backups/latest.zip?token=', json.loads(response.content)['download_url'])
+
+
+
+def load_export_all_sites_script():
+    """Import scripts/export_all_sites.py as a module."""
+    import importlib.util
+    
+    script = Path(settings.BASE_DIR) / 'scripts' / 'export_all_sites.py'
+    spec = importlib.util.spec_from_file_location('export_all_sites', script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ExportAllSitesScriptTestCase(TestCase):
+    """Tests for the sequential and concurrent modes of scripts/export_all_sites.py"""
+    
+    def setUp(self):
+        self.script = load_export_all_sites_script()
+        root_page = Site.objects.get(is_default_site=True).root_page
+        for hostname in ('one.example.org', 'two.example.org', 'broken.example.org'):
+            Site.objects.create(hostname=hostname, root_page=root_page)
+        self.hostnames = dict(Site.objects.values_list('id', 'hostname'))
+        self.output_base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_base, ignore_errors=True)
+        
+        # Worker processes get their own database connection, which cannot
+        # see the test transaction: run the pool in threads with a fake export
+        patches = [
+            mock.patch.object(self.script, '_export_site', side_effect=self._export_site),
+            mock.patch.object(self.script, 'ProcessPoolExecutor', ThreadPoolExecutor),
+            mock.patch.object(self.script, 'connections'),
+            mock.patch.object(self.script, 'AzureBackupUploader', return_value=self),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.uploaded = []
+    
+    def _export_site(self, site_id, output_base, exclude_media=False, verbose=False, delta=False,
+                     full_every=None):
+        hostname = self.hostnames[site_id]
+        if hostname.startswith('broken.'):
+            raise ExportError(f'Cannot export {hostname}')
+        return {
+            'site': hostname,
+            'zip_path': str(Path(output_base) / f'offline-backup-{hostname}.zip'),
+            'pages_exported': site_id,
+            'pages_failed': 0,
+        }
+    
+    def upload(self, zip_path):
+        """AzureBackupUploader.upload() stand-in: fails for the 'two' site."""
+        if 'two.example.org' in zip_path:
+            raise RuntimeError('Azure unavailable')
+        self.uploaded.append(Path(zip_path).name)
+        return f'https://example.blob.core.windows.net/backups/{Path(zip_path).name}'
+    
+    def _export(self, **kwargs):
+        return self.script.export_all_sites(output_base=self.output_base, upload_azure=True, **kwargs)
+    
+    def test_concurrent_results_match_sequential(self):
+        """Test that the concurrent mode returns the same results dict as the sequential one"""
+        sequential = self._export(workers=1)
+        concurrent = self._export(workers=3, upload_workers=2)
+        
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual(
+            [entry['site'] for entry in concurrent['failed']],
+            [hostname for hostname in self.hostnames.values() if hostname.startswith(('two.', 'broken.'))]
+        )
+    
+    def test_upload_failure_moves_site_to_failed(self):
+        """Test that a site whose upload fails is reported as failed, not as exported"""
+        for workers in (1, 3):
+            results = self._export(workers=workers)
+            
+            self.assertNotIn('two.example.org', [entry['site'] for entry in results['success']])
+            self.assertIn(
+                {'site': 'two.example.org', 'error': 'Azure unavailable'},
+                results['failed']
+            )
+            self.assertIn('offline-backup-one.example.org.zip', self.uploaded)
+    
+    def test_single_worker_keeps_sequential_path(self):
+        """Test that --workers 1 exports the sites in order without the process pool"""
+        argv = ['export_all_sites.py', '--workers', '1', '--output', self.output_base]
+        with mock.patch.object(sys, 'argv', argv), \
+                mock.patch.object(self.script, '_export_sites_concurrently') as concurrently, \
+                mock.patch.object(self.script, 'ProcessPoolExecutor') as process_pool, \
+                mock.patch.object(self.script, 'print_summary') as print_summary, \
+                self.assertRaises(SystemExit):
+            self.script.main()
+        
+        concurrently.assert_not_called()
+        process_pool.assert_not_called()
+        self.assertEqual(
+            [call.args[0] for call in self.script._export_site.call_args_list],
+            list(Site.objects.values_list('id', flat=True))
+        )
+        results = print_summary.call_args.args[0]
+        self.assertEqual([entry['site'] for entry in results['failed']], ['broken.example.org'])
@@ -0,0 +1,217 @@
+"""
+Tests for the database-backed job queue.
+"""
+
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.signals import template_rendered
+from django.utils import timezone
+from wagtail.models import Site
+
+from cms import jobs
+from cms.export.mirror import StaticMirror
+from cms.models import HomePage, Job
+from cms.wagtail_hooks import enqueue_after_publish
+
+
+class JobQueueTestCase(TestCase):
+    """Enqueue, claim, retry and progress of background jobs."""
+
+    def setUp(self):
+        self.calls = []
+        self._tasks = dict(jobs.TASKS)
+
+        @jobs.job_task('test_record')
+        def record(job, value):
+            self.calls.append(value)
+            job.set_progress(0.5, f'value {value}')
+            return {'value': value}
+
+        @jobs.job_task('test_fail')
+        def fail(job):
+            raise RuntimeError('boom')
+
+    def tearDown(self):
+        jobs.TASKS.clear()
+        jobs.TASKS.update(self._tasks)
+
+    def test_enqueue_unknown_task(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('does_not_exist')
+
+    def test_identical_pending_jobs_are_deduplicated(self):
+        first = jobs.enqueue('test_record', value=1)
+        second = jobs.enqueue('test_record', priority=5, value=1)
+        other = jobs.enqueue('test_record', value=2)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertNotEqual(first.pk, other.pk)
+        first.refresh_from_db()
+        self.assertEqual(first.priority, 5)
+
+        # Once it has run, the same job can be queued again
+        jobs.run_worker(name='test', burst=True)
+        self.assertNotEqual(jobs.enqueue('test_record', value=1).pk, first.pk)
+
+    def test_enqueue_retries_when_duplicate_is_claimed(self):
+        pending = jobs.enqueue('test_record', value=1)
+        get = Job.objects.get
+
+        def claim_then_get(**kwargs):
+            # A worker claims the pending job between the INSERT and the SELECT
+            jobs.claim_next_job('other')
+            return get(**kwargs)
+
+        with mock.patch.object(Job.objects, 'get', side_effect=claim_then_get):
+            job = jobs.enqueue('test_record', value=1)
+
+        self.assertNotEqual(job.pk, pending.pk)
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(Job.objects.filter(task='test_record').count(), 2)
+
+    def test_priority_then_age_order(self):
+        low = jobs.enqueue('test_record', value='low')
+        high = jobs.enqueue('test_record', priority=10, value='high')
+        jobs.enqueue('test_record', delay=3600, priority=100, value='later')
+        jobs.enqueue('test_record', value='low2')
+
+        processed = jobs.run_worker(name='test', burst=True)
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(self.calls, ['high', 'low', 'low2'])
+        low.refresh_from_db()
+        high.refresh_from_db()
+        self.assertEqual(high.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(high.result, {'value': 'high'})
+        self.assertEqual(high.progress, 1)
+        self.assertEqual(high.progress_message, 'value high')
+        self.assertEqual(high.worker, 'test')
+
+    def test_claim_is_exclusive(self):
+        job = jobs.enqueue('test_record', value=1)
+        claimed = jobs.claim_next_job('a')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(jobs.claim_next_job('b'))
+
+    @override_settings(JOBS_RETRY_DELAY=10)
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue('test_fail', max_attempts=2)
+
+        self.assertEqual(jobs.run_worker(name='test', burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertIn('RuntimeError: boom', job.error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.run_worker(name='test', burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_yields_to_identical_pending_job(self):
+        job = jobs.enqueue('test_fail')
+        claimed = jobs.claim_next_job('test')
+        duplicate = jobs.enqueue('test_fail')
+        self.assertNotEqual(duplicate.pk, job.pk)
+
+        jobs.run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+
+    @override_settings(JOBS_TIMEOUT=60)
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.enqueue('test_record', value=1)
+        jobs.claim_next_job('dead-worker')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+
+    def test_run_jobs_command_burst(self):
+        jobs.enqueue('test_record', value=1)
+        call_command('run_jobs', '--burst', stdout=mock.MagicMock())
+        self.assertEqual(self.calls, [1])
+
+    def test_export_command_enqueue(self):
+        call_command(
+            'export_static_site', '--site=madmusic.iccmu.es', '--zip', '--enqueue', '--priority=3',
+            stdout=mock.MagicMock()
+        )
+        job = Job.objects.get(task='export_site')
+        self.assertEqual(job.priority, 3)
+        self.assertEqual(job.kwargs['site'], 'madmusic.iccmu.es')
+        self.assertTrue(job.kwargs['zip'])
+
+
+class PublishHooksTestCase(TestCase):
+    """Jobs queued by the after_publish_page hook."""
+
+    def setUp(self):
+        self.site = Site.objects.get(is_default_site=True)
+        self.home_page = HomePage(title='Test Home', slug='test-home', intro='Test intro')
+        self.site.root_page.add_child(instance=self.home_page)
+        self.site.root_page = self.home_page
+        self.site.save()
+
+    def test_publish_enqueues_warm_cache(self):
+        enqueue_after_publish(None, self.home_page)
+        enqueue_after_publish(None, self.home_page)
+
+        self.assertEqual(Job.objects.filter(task='warm_cache').count(), 1)
+        self.assertFalse(Job.objects.filter(task='export_site').exists())
+
+        self.assertEqual(jobs.run_worker(name='test', burst=True), 1)
+        job = Job.objects.get(task='warm_cache')
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {'warmed': 1})
+
+    @override_settings(JOBS_EXPORT_ON_PUBLISH=True, JOBS_EXPORT_DELAY=300)
+    def test_publish_enqueues_delayed_export(self):
+        enqueue_after_publish(None, self.home_page)
+        enqueue_after_publish(None, self.home_page)
+
+        job = Job.objects.get(task='export_site')
+        self.assertEqual(job.kwargs['site'], self.site.hostname)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=200))
+
+    def test_publish_never_fails_on_enqueue_errors(self):
+        with override_settings(JOBS_EXPORT_ON_PUBLISH=True), \
+                mock.patch.object(jobs, 'enqueue', side_effect=RuntimeError('queue down')), \
+                self.assertLogs('cms.wagtail_hooks', level='ERROR') as logs:
+            enqueue_after_publish(None, self.home_page)
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_warm_cache_bypasses_static_mirror(self):
+        middleware = list(settings.MIDDLEWARE)
+        middleware.insert(1, 'proyectos.static_mirror_middleware.StaticMirrorMiddleware')
+        rendered = []
+
+        def record(sender, template, **kwargs):
+            rendered.append(template.name)
+
+        template_rendered.connect(record)
+        self.addCleanup(template_rendered.disconnect, record)
+
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                override_settings(STATIC_MIRROR_ROOT=tmpdir, MIDDLEWARE=middleware):
+            # A stale mirror file would answer the request without rendering anything
+            _site_id, _root_url, path = self.home_page.get_url_parts()
+            stale = StaticMirror(root=tmpdir).file_for_path(self.site.hostname, path)
+            stale.parent.mkdir(parents=True)
+            stale.write_text('<html>stale</html>')
+
+            enqueue_after_publish(None, self.home_page)
+            jobs.run_worker(name='test', burst=True)
+
+        self.assertEqual(Job.objects.get(task='warm_cache').result, {'warmed': 1})
+        self.assertTrue(rendered)
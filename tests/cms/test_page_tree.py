@@ -0,0 +1,139 @@
+"""
+Tests for bulk page tree construction and the Madmusic migration that uses it.
+"""
+
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from wagtail.models import Page, Revision
+
+from cms.models import HomePage, NewsPage, StandardPage
+from cms.page_tree import PageTreeBuilder
+from core.models import Entrada, Pagina, Proyecto
+
+
+def assert_tree_is_valid(testcase):
+    """treebeard's consistency check: paths, depths and numchild."""
+    testcase.assertEqual(Page.find_problems(), ([], [], [], [], []))
+
+
+class PageTreeBuilderTestCase(TestCase):
+    """Planning pages in memory and saving them in bulk."""
+
+    def setUp(self):
+        root = Page.objects.get(depth=1)
+        self.home = HomePage(title='Home', slug='tree-home')
+        root.add_child(instance=self.home)
+        self.existing = StandardPage(title='Existing', slug='existing')
+        self.home.add_child(instance=self.existing)
+
+    def test_builds_nested_tree(self):
+        builder = PageTreeBuilder(self.home)
+        team = builder.add(self.home, StandardPage(title='Team', slug='team'))
+        for index in range(3):
+            builder.add(team, StandardPage(title=f'Member {index}', slug=f'member-{index}'))
+        builder.add(self.existing, StandardPage(title='Child', slug='child'))
+
+        self.assertIs(builder.child(self.home, 'team'), team)
+        self.assertEqual(builder.save(), {'created': 5, 'updated': 0})
+
+        assert_tree_is_valid(self)
+        team = StandardPage.objects.get(slug='team')
+        self.assertEqual(team.url_path, '/tree-home/team/')
+        self.assertEqual(team.numchild, 3)
+        self.assertEqual(
+            [page.slug for page in team.get_children()], ['member-0', 'member-1', 'member-2']
+        )
+        self.assertEqual(Page.objects.get(pk=self.existing.pk).numchild, 1)
+        self.assertTrue(team.live)
+        self.assertEqual(team.draft_title, 'Team')
+        self.assertEqual(team.live_revision, team.latest_revision)
+        self.assertEqual(team.latest_revision.as_object().title, 'Team')
+
+        # The planned tree keeps working with regular treebeard operations
+        team.add_child(instance=StandardPage(title='Late', slug='late'))
+        assert_tree_is_valid(self)
+
+    def test_update_existing_page(self):
+        builder = PageTreeBuilder(self.home)
+        existing = builder.child(self.home, 'existing')
+        builder.update(existing, title='Renamed', intro='<p>Intro</p>')
+        self.assertEqual(builder.save(), {'created': 0, 'updated': 1})
+
+        page = StandardPage.objects.get(pk=self.existing.pk)
+        self.assertEqual((page.title, page.draft_title, page.intro), ('Renamed', 'Renamed', '<p>Intro</p>'))
+        self.assertEqual(page.live_revision.as_object().title, 'Renamed')
+
+    def test_skip_revisions(self):
+        builder = PageTreeBuilder(self.home, revisions=False)
+        builder.add(self.home, StandardPage(title='Fast', slug='fast'))
+        builder.save()
+
+        page = StandardPage.objects.get(slug='fast')
+        self.assertTrue(page.live)
+        self.assertIsNone(page.latest_revision)
+        self.assertFalse(Revision.objects.filter(object_id=str(page.pk)).exists())
+
+    def test_duplicate_slug(self):
+        builder = PageTreeBuilder(self.home)
+        with self.assertRaises(ValueError):
+            builder.add(self.home, StandardPage(title='Existing', slug='existing'))
+
+
+class MigrateMadmusicToWagtailTestCase(TestCase):
+    """migrate_madmusic_to_wagtail builds the whole tree in bulk."""
+
+    def setUp(self):
+        proyecto = Proyecto.objects.create(slug='madmusic', titulo='Madmusic')
+        Pagina.objects.create(proyecto=proyecto, titulo='Participantes', slug='equipo/participantes', cuerpo='<p>P</p>')
+        Pagina.objects.create(proyecto=proyecto, titulo='Equipo', slug='equipo', cuerpo='<p>E</p>')
+        Pagina.objects.create(proyecto=proyecto, titulo='Objetivos', slug='proyecto/objetivos', cuerpo='')
+        entrada = Entrada.objects.create(proyecto=proyecto, titulo='Concierto', slug='concierto', cuerpo='<p>C</p>',
+                                         url_original='https://madmusic.iccmu.es/concierto/')
+        Entrada.objects.filter(pk=entrada.pk).update(fecha_publicacion=date(2021, 5, 4))
+
+    def migrate(self, *args):
+        out = StringIO()
+        call_command('migrate_madmusic_to_wagtail', '--apply', *args, stdout=out)
+        return out.getvalue()
+
+    def test_apply_builds_tree(self):
+        output = self.migrate()
+
+        self.assertIn('Guardadas 5 páginas nuevas y 0 actualizadas', output)
+        assert_tree_is_valid(self)
+        equipo = StandardPage.objects.get(url_path='/madmusic-home/equipo/')
+        self.assertEqual(equipo.title, 'Equipo')
+        self.assertEqual(equipo.body[0].block_type, 'paragraph')
+        self.assertIn('<p>E</p>', str(equipo.live_revision.as_object().body))
+        self.assertEqual(equipo.get_children().get().url_path, '/madmusic-home/equipo/participantes/')
+        self.assertEqual(StandardPage.objects.get(slug='proyecto').title, 'Proyecto')
+
+        news = NewsPage.objects.get(slug='concierto')
+        self.assertEqual(news.url_path, '/madmusic-home/noticias/concierto/')
+        self.assertEqual(timezone.localtime(news.first_published_at).date(), date(2021, 5, 4))
+        self.assertEqual(news.date, date(2021, 5, 4))
+        self.assertIsNotNone(news.live_revision)
+        self.assertTrue(news.redirect_set.filter(old_path='/concierto').exists())
+
+    def test_second_run_updates(self):
+        self.migrate()
+        Pagina.objects.filter(slug='equipo').update(titulo='Equipo MadMusic')
+
+        output = self.migrate('--skip-revisions')
+
+        self.assertIn('Guardadas 0 páginas nuevas y 4 actualizadas', output)
+        assert_tree_is_valid(self)
+        self.assertEqual(StandardPage.objects.get(slug='equipo').title, 'Equipo MadMusic')
+        self.assertEqual(NewsPage.objects.count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        count = Page.objects.count()
+        out = StringIO()
+        call_command('migrate_madmusic_to_wagtail', '--dry-run', stdout=out)
+
+        self.assertEqual(Page.objects.count(), count)
+        self.assertIn('Se crearía: Participantes', out.getvalue())
@@ -0,0 +1,118 @@
+"""
+Tests para el corpus scrapeado preprocesado (core/corpus.py)
+"""
+
+import os
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.corpus import CorpusStore, document_url
+
+PAGE = """
+<html><head><title>{title} | ICCMU</title></head><body>
+<div class="col-md-3 parent_sidebar"><a href="/otra/">Otra</a></div>
+<div class="col-md-9"><h1 class="title">{title}</h1><div class="content">
+  <p class="row" style="x">{text}</p>
+  <img src="https://madmusic.iccmu.es/wp-content/uploads/foto.jpg">
+  <div class="panel panel-default">
+    <div class="panel-heading"><h4 class="panel-title"><a href="#c1"> Acordeón </a></h4></div>
+    <div id="c1" class="panel-collapse collapse"><div class="panel-body"><ul><li>Uno</li></ul></div></div>
+  </div>
+  <div class="description"><p class="x"><a href="/a/" target="_blank">Noticia</a></p></div>
+</div></div>
+</body></html>
+"""
+
+
+def write_page(html_dir, name, title="Equipo", text="Texto"):
+    path = html_dir / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(PAGE.format(title=title, text=text), encoding="utf-8")
+    return path
+
+
+class TestCorpusStore:
+    """Tests para CorpusStore"""
+
+    def test_build_stores_extracted_fields(self, tmp_path):
+        html_dir = tmp_path / "html"
+        write_page(html_dir, "equipo/participantes.html", title="Participantes")
+
+        corpus = CorpusStore.open(html_dir)
+        doc = corpus.get("equipo/participantes.html")
+
+        assert corpus.path == str(tmp_path / "corpus.sqlite3")
+        assert doc.slug == "participantes"
+        assert doc.url == "https://madmusic.iccmu.es/equipo/participantes/"
+        assert doc.title == "Participantes"
+        assert "Otra" not in doc.body
+        assert 'class="row"' not in doc.body and "style=" not in doc.body
+        assert "Texto" in doc.text
+        assert doc.images == ["https://madmusic.iccmu.es/wp-content/uploads/foto.jpg"]
+        assert doc.accordions[0]["title"] == "Acordeón"
+        assert doc.accordions[0]["content_inner_html"] == "<ul><li>Uno</li></ul>"
+        assert doc.description == '<p><a href="/a/">Noticia</a></p>'
+        assert corpus.get(html_dir / "equipo" / "participantes.html").path == doc.path
+        assert corpus.by_slug("participantes").path == doc.path
+
+    def test_incremental_update(self, tmp_path):
+        html_dir = tmp_path / "html"
+        first = write_page(html_dir, "a.html")
+        second = write_page(html_dir, "b.html")
+        corpus = CorpusStore(html_dir)
+        assert corpus.update()["parsed"] == 2
+
+        # Nada cambia: no se parsea nada
+        assert corpus.update()["unchanged"] == 2
+
+        # Mismo contenido con otro mtime: solo se actualiza el mtime
+        stat = first.stat()
+        os.utime(first, (stat.st_atime, stat.st_mtime + 10))
+        stats = corpus.update()
+        assert (stats["parsed"], stats["touched"]) == (0, 1)
+
+        # Contenido distinto: se vuelve a parsear
+        write_page(html_dir, "b.html", title="Nuevo")
+        os.utime(second, (stat.st_atime, stat.st_mtime + 20))
+        assert corpus.update()["parsed"] == 1
+        assert corpus.get("b.html").title == "Nuevo"
+
+        # Fichero eliminado
+        first.unlink()
+        assert corpus.update()["removed"] == 1
+        assert corpus.get("a.html") is None
+        assert len(corpus) == 1
+
+    def test_rebuild(self, tmp_path):
+        html_dir = tmp_path / "html"
+        write_page(html_dir, "a.html")
+        corpus = CorpusStore.open(html_dir)
+        assert corpus.update(rebuild=True)["parsed"] == 1
+
+    def test_parallel_update_matches_serial(self, tmp_path):
+        html_dir = tmp_path / "html"
+        for number in range(6):
+            write_page(html_dir, f"pagina-{number}.html", title=f"Página {number}")
+
+        serial = CorpusStore(html_dir, tmp_path / "serie.sqlite3")
+        parallel = CorpusStore(html_dir, tmp_path / "procesos.sqlite3")
+        assert serial.update()["parsed"] == 6
+        assert parallel.update(workers=2)["parsed"] == 6
+        assert parallel.update(workers=2)["unchanged"] == 6
+
+        for expected, document in zip(serial.documents(), parallel.documents()):
+            assert (document.path, document.title, document.body, document.accordions) == (
+                expected.path, expected.title, expected.body, expected.accordions)
+
+    def test_document_url(self):
+        assert document_url("equipo.html") == "https://madmusic.iccmu.es/equipo/"
+
+    def test_construir_corpus_command(self, tmp_path):
+        html_dir = tmp_path / "html"
+        write_page(html_dir, "a.html")
+
+        out = StringIO()
+        call_command("construir_corpus", scraped_dir=str(html_dir), stdout=out)
+
+        assert "1 documentos (1 parseados" in out.getvalue()
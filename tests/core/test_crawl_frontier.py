@@ -0,0 +1,66 @@
+"""
+Tests para la frontera de crawling persistente (core/crawl_frontier.py)
+"""
+
+from core.crawl_frontier import CrawlFrontier
+
+
+class TestCrawlFrontier:
+    """Tests para CrawlFrontier"""
+
+    def test_claim_in_breadth_first_order(self):
+        frontier = CrawlFrontier()
+        frontier.add("https://example.org", 0)
+        frontier.add_many(["https://example.org/b", "https://example.org/a"], 1)
+        frontier.add_many(["https://example.org/b/c"], 2)
+
+        assert frontier.claim(2) == [("https://example.org", 0), ("https://example.org/b", 1)]
+        assert frontier.claim(5) == [("https://example.org/a", 1), ("https://example.org/b/c", 2)]
+        assert frontier.claim(5) == []
+
+    def test_known_urls_are_not_requeued(self):
+        frontier = CrawlFrontier()
+        assert frontier.add("https://example.org/a", 1)
+        frontier.claim(1)
+        frontier.mark("https://example.org/a", CrawlFrontier.DONE)
+
+        assert not frontier.add("https://example.org/a", 1)
+        assert frontier.claim(1) == []
+        assert frontier.counts()[CrawlFrontier.DONE] == 1
+
+    def test_shallower_rediscovery_updates_depth(self):
+        frontier = CrawlFrontier()
+        frontier.add("https://example.org/a", 3)
+        frontier.add("https://example.org/a", 1)
+        assert frontier.claim(1) == [("https://example.org/a", 1)]
+
+    def test_url_pattern_priorities(self):
+        frontier = CrawlFrontier(priorities=[r"/noticias/", r"/equipo"])
+        frontier.add_many(["https://example.org/otra", "https://example.org/equipo", "https://example.org/noticias/x"], 1)
+        assert [url for url, _ in frontier.claim(3)] == [
+            "https://example.org/noticias/x", "https://example.org/equipo", "https://example.org/otra"
+        ]
+
+    def test_resume_from_disk(self, tmp_path):
+        path = tmp_path / "state.sqlite3"
+        frontier = CrawlFrontier(path)
+        frontier.add_many(["https://example.org/a", "https://example.org/b", "https://example.org/c"], 0)
+        frontier.add("https://example.org/img.png", 0, kind=CrawlFrontier.IMAGE)
+        frontier.claim(2)
+        frontier.mark("https://example.org/a", CrawlFrontier.DONE)
+        frontier.set_meta("start_url", "https://example.org")
+        frontier.close()
+
+        resumed = CrawlFrontier(path)
+        assert resumed.get_meta("start_url") == "https://example.org"
+        assert resumed.requeue_in_progress() == 1
+        assert resumed.urls(CrawlFrontier.DONE) == ["https://example.org/a"]
+        assert [url for url, _ in resumed.claim(5)] == ["https://example.org/b", "https://example.org/c"]
+        assert resumed.urls(CrawlFrontier.QUEUED, kind=CrawlFrontier.IMAGE) == ["https://example.org/img.png"]
+
+        # Los nuevos añadidos siguen detrás de los antiguos
+        resumed.add("https://example.org/d", 0)
+        assert resumed.claim(1) == [("https://example.org/d", 0)]
+
+        resumed.reset()
+        assert resumed.urls() == []
@@ -0,0 +1,126 @@
+"""
+Tests para la escritura en streaming de scripts/extract_collapsibles.py
+"""
+
+import importlib.util
+import json
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from wagtail.models import Page
+
+from cms.models import StandardPage
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "extract_collapsibles.py"
+
+
+def load_extract_module():
+    spec = importlib.util.spec_from_file_location("extract_collapsibles", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def page_data(source_file, titles):
+    accordions = [
+        {"title": title, "content_inner_html": f"<p>Contenido de «{title}»</p>"}
+        for title in titles
+    ]
+    return {"source_file": source_file, "accordion_count": len(accordions), "accordions": accordions}
+
+
+PAGES = [
+    ("equipo", page_data("equipo.html", ["Dirección", "Investigadores"])),
+    ("equipo_participantes", page_data("equipo/participantes.html", ["Participantes"])),
+    ("cursos-de-verano", page_data("cursos-de-verano.html", ["Edición 2024", "Edición 2025", "Más"])),
+]
+
+
+class FakeDocument:
+    def __init__(self, path, accordions):
+        self.path = path
+        self.accordions = accordions
+
+
+class FakeCorpus:
+    def __init__(self, documents):
+        self.documents = {document.path: document for document in documents}
+
+    def get(self, path):
+        return self.documents.get(path)
+
+
+class TestWriteOutput:
+    """write_output escribe página a página lo mismo que json.dumps del total"""
+
+    @pytest.fixture
+    def module(self):
+        return load_extract_module()
+
+    @pytest.mark.parametrize("count", [0, 1, len(PAGES)])
+    def test_json_matches_json_dumps(self, module, tmp_path, count):
+        pages = PAGES[:count]
+        output = tmp_path / "collapsibles.json"
+
+        written = module.write_output(iter(pages), output, jsonl=False)
+
+        assert output.read_text(encoding="utf-8") == json.dumps(dict(pages), indent=2, ensure_ascii=False)
+        assert written == [(data["source_file"], data["accordion_count"]) for _, data in pages]
+
+    @pytest.mark.parametrize("count", [0, 1, len(PAGES)])
+    def test_jsonl_one_page_per_line(self, module, tmp_path, count):
+        pages = PAGES[:count]
+        output = tmp_path / "collapsibles.jsonl"
+
+        module.write_output(iter(pages), output, jsonl=True)
+
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == [{"page_key": key, **data} for key, data in pages]
+
+    def test_iter_pages_skips_missing_and_empty(self, module, tmp_path, capsys):
+        corpus = FakeCorpus([
+            FakeDocument("equipo.html", PAGES[0][1]["accordions"]),
+            FakeDocument("vacia.html", []),
+        ])
+
+        pages = list(module.iter_pages(corpus, ["equipo.html", "vacia.html", "no-existe.html"]))
+
+        assert pages == [PAGES[0]]
+        assert "Archivo no encontrado: no-existe.html" in capsys.readouterr().out
+
+    def test_temp_file_removed_on_error(self, module, tmp_path):
+        output = tmp_path / "collapsibles.json"
+        output.write_text("anterior", encoding="utf-8")
+
+        def failing_pages():
+            yield PAGES[0]
+            raise RuntimeError("corpus roto")
+
+        with pytest.raises(RuntimeError):
+            module.write_output(failing_pages(), output, jsonl=False)
+
+        # El fichero anterior sigue intacto y no queda ningún temporal
+        assert output.read_text(encoding="utf-8") == "anterior"
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["collapsibles.json"]
+
+    @pytest.mark.django_db
+    def test_jsonl_round_trip_through_import(self, module, tmp_path):
+        root = Page.objects.get(depth=1)
+        for slug in ("equipo", "participantes", "cursos-de-verano"):
+            root.add_child(instance=StandardPage(title=slug, slug=slug))
+        output = tmp_path / "collapsibles.jsonl"
+        module.write_output(iter(PAGES), output, jsonl=True)
+
+        out = StringIO()
+        call_command("import_collapsibles", "--input", str(output), stdout=out)
+
+        assert "Páginas actualizadas: 3" in out.getvalue()
+        for page_key, data in PAGES:
+            slug = {"equipo_participantes": "participantes"}.get(page_key, page_key)
+            block = StandardPage.objects.get(slug=slug).body[0]
+            assert block.block_type == "accordion_group"
+            assert [
+                (accordion["title"], accordion["content"].source) for accordion in block.value["accordions"]
+            ] == [(accordion["title"], accordion["content_inner_html"]) for accordion in data["accordions"]]
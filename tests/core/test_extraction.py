@@ -0,0 +1,199 @@
+"""
+Tests para el motor de extracción de contenido (core/extraction.py)
+"""
+
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from core.extraction import clean_title, extract_accordions, extract_content, extract_file, parse_document
+from core.management.commands.sincronizar_madmusic import extract_content_from_html
+
+SCRAPED_HTML = Path(__file__).resolve().parents[2] / "scraped_madmusic" / "html"
+
+ACCORDION = """
+<div class="panel  panel-default">
+  <div class="panel-heading"><h4 class="panel-title"><a href="#c1">
+    Fondos   del archivo </a></h4></div>
+  <div id="c1" class="panel-collapse collapse"><div class="panel-body   extra">
+    <p title='Dice "hola"'>Uno<br>dos &amp; tres</p>
+
+    <pre>  a
+  b</pre>
+    <img src="/a.jpg" alt="">
+  </div></div>
+</div>
+"""
+
+# Títulos que daba el extractor de BeautifulSoup de sincronizar_madmusic
+# (section#tools h1 y, si no, el primer h1 de la página) en listados y portada
+LISTING_TITLES = {
+    "index.html": "MadMusic-CM H2019/HUM-5731",
+    "inicio.html": "MadMusic-CM H2019/HUM-5731",
+    "actualidad-2.html": "Noticias",
+    "contacto.html": "Contacto",
+    "category/convocatoria.html": "Convocatoria",
+    "category/noticias-actualidad.html": "Actualidad",
+    "divulgacion-cientifica/archivos.html": "Fondos documentales",
+}
+
+PAGE = """
+<html>
+<head><title>Equipo | ICCMU</title><script>var x = 1;</script></head>
+<body>
+  <header><h1>Instituto Complutense<br>de Ciencias Musicales</h1></header>
+  <main><section id="page"><div class="container"><div class="row">
+    <div class="col-md-3 parent_sidebar"><ul><li><a href="/otra/">Otra</a></li></ul></div>
+    <div class="col-md-9 content_container"><div class="row">
+      <div class="col-md-12"><div class="breadcrumbs"><a href="/">Inicio</a></div></div>
+      <div class="col-md-12"><h1 class="title">Equipo</h1></div>
+      <div class="col-md-12"><div class="content">
+        <p style="color: red" data-x="1">Texto con <a href="https://madmusic.iccmu.es/equipo/ana/">enlace</a>.</p>
+        <img src="https://madmusic.iccmu.es/wp-content/uploads/2020/01/foto.jpg" alt="Foto" class="aligncenter">
+        <div class="sidebar">No</div>
+        <p><a href="/contacto/">Contacto</a></p>
+      </div></div>
+    </div></div>
+  </div></div></section></main>
+  <footer><p>Pie</p></footer>
+</body>
+</html>
+"""
+
+
+class TestExtractContent:
+    """Tests para extract_content"""
+
+    def test_title_from_main_column(self):
+        assert extract_content(PAGE).title == "Equipo"
+
+    def test_body_is_content_block_without_layout(self):
+        content = extract_content(PAGE)
+        assert content.in_content_block
+        assert content.body.startswith("<p")
+        for unwanted in ("Inicio", "Otra", "No</div>", "Pie", "var x"):
+            assert unwanted not in content.body
+
+    def test_urls_are_rewritten_and_images_collected(self):
+        content = extract_content(PAGE)
+        assert 'href="/madmusic/equipo/ana/"' in content.body
+        assert 'src="/static/madmusic/images/2020/01/foto.jpg"' in content.body
+        assert 'href="/contacto/"' in content.body
+        assert content.images == ["https://madmusic.iccmu.es/wp-content/uploads/2020/01/foto.jpg"]
+
+    def test_prefix_relative_links(self):
+        content = extract_content(PAGE, prefix_relative_links=True)
+        assert 'href="/madmusic/contacto/"' in content.body
+
+    def test_keep_attributes(self):
+        body = extract_content(PAGE, rewrite_urls=False, keep_attributes=("href", "src", "alt")).body
+        assert "style=" not in body and "data-x" not in body and "class=" not in body
+        assert 'alt="Foto"' in body
+
+    def test_strip_layout(self):
+        html = '<div class="col-md-9"><div class="content"><p class="row destacado" role="note">x</p></div></div>'
+        body = extract_content(html, strip_layout=True).body
+        assert body == '<p class="destacado">x</p>'
+
+    def test_falls_back_to_region_and_title_tag(self):
+        content = extract_content("<html><head><title>Aviso | ICCMU</title></head><body><p>Hola</p></body></html>")
+        assert content.title == "Aviso"
+        assert content.body == "<p>Hola</p>"
+        assert not content.in_content_block
+        assert content.text == "Hola"
+
+    def test_section_tools(self):
+        html = '<html><section id="tools"><h1>Equipo del proyecto</h1><article><p>Texto</p></article></section></html>'
+        content = extract_content(html)
+        assert content.title == "Equipo del proyecto"
+        assert content.body == "<p>Texto</p>"
+
+    def test_empty_document(self):
+        content = extract_content("")
+        assert content.title is None
+        assert content.body == ""
+        assert content.images == []
+
+    def test_bytes_use_declared_charset(self):
+        html = '<html><head><meta charset="iso-8859-1"></head><body><p>Canción</p></body></html>'
+        assert "Canción" in extract_content(html.encode("iso-8859-1")).body
+
+    def test_listing_title_from_header_not_teasers(self):
+        html = """
+        <html><body>
+          <header class="site-header"><h1>Instituto Complutense<br>de Ciencias Musicales</h1>
+            <div class="title_container"><h1 class="title">Noticias</h1></div></header>
+          <div class="col-md-9"><div class="iccmuteaser"><a href="/n/"><h1 class="title">Una noticia</h1></a></div>
+            <a href="/m/"><h1>Otra noticia</h1></a></div>
+        </body></html>
+        """
+        content = extract_content(html)
+        assert content.title == "Noticias"
+        assert "Una noticia" in content.body
+
+    def test_extract_file(self, tmp_path):
+        path = tmp_path / "equipo.html"
+        path.write_text(PAGE, encoding="utf-8")
+        assert extract_file(path).title == "Equipo"
+
+
+class TestExtractAccordions:
+    """Tests para extract_accordions: mismo formato que BeautifulSoup con html.parser"""
+
+    def test_format(self):
+        accordion, = extract_accordions(parse_document(ACCORDION))
+        assert accordion["title"] == "Fondos del archivo"
+        assert accordion["collapse_id"] == "c1"
+        assert accordion["content_html"] == (
+            '<div class="panel-body extra">\n<p title=\'Dice "hola"\'>Uno<br/>dos &amp; tres</p>\n'
+            '<pre>  a\n  b</pre>\n<img alt="" src="/a.jpg"/>\n</div>'
+        )
+        assert accordion["content_inner_html"] == (
+            '<p title=\'Dice "hola"\'>Uno<br/>dos &amp; tres</p>\n<pre>  a\n  b</pre>\n<img alt="" src="/a.jpg"/>'
+        )
+        assert accordion["content_text"] == "Unodos & tresa\n  b"
+        assert (accordion["has_images"], accordion["has_links"], accordion["has_lists"]) == (True, False, False)
+
+    def test_matches_beautifulsoup(self):
+        body = BeautifulSoup(ACCORDION, "html.parser").find("div", class_="panel-body")
+        accordion, = extract_accordions(parse_document(ACCORDION))
+        assert accordion["content_html"] == str(body)
+
+
+class TestCleanTitle:
+    """Tests para clean_title"""
+
+    def test_removes_site_name(self):
+        assert clean_title("  Equipo \n | ICCMU") == "Equipo"
+        assert clean_title("ICCMU | Equipo") == "Equipo"
+
+    def test_keeps_compound_titles(self):
+        assert clean_title("Congresos | Seminarios |  ICCMU") == "Congresos | Seminarios"
+
+    def test_removes_archive_prefix(self):
+        assert clean_title("Categoría: Empleo") == "Empleo"
+        assert clean_title("Categoría:") == "Categoría:"
+
+    def test_truncates(self):
+        assert len(clean_title("a" * 300)) == 200
+
+
+@pytest.mark.skipif(not SCRAPED_HTML.is_dir(), reason="Sin corpus scrapeado")
+class TestTitleParity:
+    """Los títulos de listados y portada coinciden con los del extractor anterior"""
+
+    @pytest.mark.parametrize("name, title", sorted(LISTING_TITLES.items()))
+    def test_listing_and_home_titles(self, name, title):
+        html = (SCRAPED_HTML / name).read_text(encoding="utf-8")
+        assert extract_content_from_html(html)[0] == title
+
+    @pytest.mark.parametrize("name", ["equipo.html", "cursos-de-verano.html",
+                                      "divulgacion-cientifica/cuadernos-de-musica-iberoamericana.html"])
+    def test_accordions_match_beautifulsoup(self, name):
+        html = (SCRAPED_HTML / name).read_text(encoding="utf-8")
+        bodies = [panel.find("div", class_="panel-collapse").find("div", class_="panel-body")
+                  for panel in BeautifulSoup(html, "html.parser").find_all("div", class_="panel")]
+        accordions = extract_accordions(parse_document(html))
+        assert accordions
+        assert [accordion["content_html"] for accordion in accordions] == [str(body) for body in bodies]
@@ -0,0 +1,106 @@
+"""
+Tests para la caché HTTP condicional (core/http_cache.py)
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from core.http_cache import HttpCache
+from core.http_replay import HttpArchive
+from core.models import Pagina, Proyecto
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("utf-8")
+        self.headers = headers or {}
+
+
+class FakeServer:
+    """Servidor con ETag: responde 304 si If-None-Match coincide"""
+
+    def __init__(self, content, etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        if headers.get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.content, {"ETag": self.etag, "Last-Modified": "Mon, 01 Sep 2025 10:00:00 GMT"})
+
+
+class TestHttpCache:
+    """Tests para HttpCache"""
+
+    def test_conditional_request_after_store(self, tmp_path):
+        cache = HttpCache(tmp_path / "cache.sqlite3")
+        server = FakeServer(b"<html>uno</html>")
+
+        first = cache.get(server.get, "https://example.org/a/")
+        assert not first.not_modified
+        assert server.requests[0] == {}
+        assert cache.store("https://example.org/a/", first.response) is True
+
+        second = cache.get(server.get, "https://example.org/a/")
+        assert second.not_modified
+        assert server.requests[1]["If-None-Match"] == '"v1"'
+        assert server.requests[1]["If-Modified-Since"] == "Mon, 01 Sep 2025 10:00:00 GMT"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_not_stored_means_full_request(self, tmp_path):
+        cache = HttpCache(tmp_path / "cache.sqlite3")
+        server = FakeServer(b"x")
+        cache.get(server.get, "https://example.org/a/")
+        cache.get(server.get, "https://example.org/a/")
+        assert server.requests == [{}, {}]
+
+    def test_require_local_copy(self, tmp_path):
+        cache = HttpCache(tmp_path / "cache.sqlite3")
+        server = FakeServer(b"x")
+        local = tmp_path / "a.html"
+        local.write_text("x")
+        cache.store("https://example.org/a/", cache.get(server.get, "https://example.org/a/").response, local_path=local)
+
+        assert cache.get(server.get, "https://example.org/a/", require_local=True).not_modified
+        local.unlink()
+        assert not cache.get(server.get, "https://example.org/a/", require_local=True).not_modified
+
+    def test_content_hash_detects_unchanged_body(self, tmp_path):
+        cache = HttpCache(tmp_path / "cache.sqlite3")
+        response = FakeResponse(200, b"same")
+        assert cache.store("https://example.org/a/", response) is True
+        assert cache.unchanged("https://example.org/a/", b"same")
+        assert not cache.unchanged("https://example.org/a/", b"other")
+        assert cache.store("https://example.org/a/", response) is False
+
+
+@pytest.mark.django_db
+class TestSincronizarMadmusicCache:
+    """sincronizar_madmusic no vuelve a procesar páginas sin cambios"""
+
+    def test_second_sync_uses_conditional_requests(self, tmp_path, settings, monkeypatch):
+        settings.MADMUSIC_HTTP_CACHE = str(tmp_path / "cache.sqlite3")
+        proyecto = Proyecto.objects.create(slug="madmusic", titulo="Madmusic")
+        Pagina.objects.create(proyecto=proyecto, slug="equipo", titulo="Equipo", cuerpo="")
+
+        # Sitio original reproducido desde un archivo grabado, sin red
+        HttpArchive(tmp_path / "archive").add(
+            "GET", "https://madmusic.iccmu.es/equipo/", 200, {"ETag": '"v1"'},
+            b'<html><section id="tools"><h1>Equipo del proyecto</h1><article><p>Texto</p></article></section></html>'
+        )
+        monkeypatch.setenv("HTTP_REPLAY_MODE", "replay")
+        monkeypatch.setenv("HTTP_REPLAY_ARCHIVE", str(tmp_path / "archive"))
+
+        call_command("sincronizar_madmusic", stdout=StringIO())
+        out = StringIO()
+        call_command("sincronizar_madmusic", stdout=out)
+
+        assert "304" in out.getvalue()
+        assert Pagina.objects.get(slug="equipo").titulo == "Equipo del proyecto"
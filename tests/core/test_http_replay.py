@@ -0,0 +1,82 @@
+"""
+Tests para el modo grabación/reproducción HTTP (core/http_replay.py)
+"""
+
+import time
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.http_cache import HttpCache
+from core.http_replay import HttpArchive, RecordingAdapter, configure_session
+
+
+class TestHttpReplay:
+    """Tests para la reproducción desde un archivo grabado"""
+
+    def test_replay_serves_recorded_response(self, tmp_path):
+        HttpArchive(tmp_path).add("GET", "https://example.org/a/", 200,
+                                  {"Content-Type": "text/html; charset=utf-8"}, "<p>ñ</p>".encode("utf-8"))
+        session = configure_session(requests.Session(), mode="replay", archive=tmp_path)
+
+        response = session.get("https://example.org/a/", timeout=5)
+        assert response.status_code == 200
+        assert response.text == "<p>ñ</p>"
+
+        streamed = session.get("https://example.org/a/", stream=True)
+        assert b"".join(streamed.iter_content(chunk_size=2)) == "<p>ñ</p>".encode("utf-8")
+
+    def test_replay_missing_url_is_connection_error(self, tmp_path):
+        session = configure_session(requests.Session(), mode="replay", archive=tmp_path)
+        with pytest.raises(requests.ConnectionError):
+            session.get("https://example.org/missing/")
+
+    def test_replay_latency(self, tmp_path):
+        HttpArchive(tmp_path).add("GET", "https://example.org/a/", 200, {}, b"x")
+        session = configure_session(requests.Session(), mode="replay", archive=tmp_path, latency=0.05)
+        start = time.monotonic()
+        session.get("https://example.org/a/")
+        assert time.monotonic() - start >= 0.05
+
+    def test_replay_honours_conditional_cache(self, tmp_path):
+        HttpArchive(tmp_path / "archive").add("GET", "https://example.org/a/", 200, {"ETag": '"v1"'}, b"x")
+        session = configure_session(requests.Session(), mode="replay", archive=tmp_path / "archive")
+        cache = HttpCache(tmp_path / "cache.sqlite3")
+
+        first = cache.get(session.get, "https://example.org/a/")
+        cache.store("https://example.org/a/", first.response)
+        assert cache.get(session.get, "https://example.org/a/").not_modified
+
+    def test_environment_selects_mode(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("HTTP_REPLAY_MODE", raising=False)
+        session = requests.Session()
+        assert configure_session(session) is session
+        assert not isinstance(session.get_adapter("https://example.org/"), RecordingAdapter)
+
+        monkeypatch.setenv("HTTP_REPLAY_MODE", "record")
+        monkeypatch.setenv("HTTP_REPLAY_ARCHIVE", str(tmp_path))
+        assert isinstance(configure_session(requests.Session()).get_adapter("https://example.org/"), RecordingAdapter)
+
+        monkeypatch.setenv("HTTP_REPLAY_MODE", "bogus")
+        with pytest.raises(ValueError):
+            configure_session(requests.Session())
+
+    def test_record_keeps_pool_size(self, tmp_path):
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+        adapter = configure_session(session, mode="record", archive=tmp_path).get_adapter("https://example.org/")
+        assert isinstance(adapter, RecordingAdapter)
+        assert (adapter._pool_connections, adapter._pool_maxsize) == (8, 8)
+
+        session = configure_session(requests.Session(), mode="record", archive=tmp_path, pool_maxsize=4)
+        assert session.get_adapter("http://example.org/")._pool_maxsize == 4
+
+    def test_archive_reload_keeps_last_entry(self, tmp_path):
+        archive = HttpArchive(tmp_path)
+        archive.add("GET", "https://example.org/a/", 200, {}, b"old")
+        archive.add("GET", "https://example.org/a/", 200, {}, b"new")
+
+        reloaded = HttpArchive(tmp_path)
+        assert len(reloaded) == 1
+        assert reloaded.body(reloaded.lookup("GET", "https://example.org/a/")) == b"new"
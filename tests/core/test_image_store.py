@@ -0,0 +1,111 @@
+"""
+Tests para el almacén de imágenes deduplicado (core/image_store.py)
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.image_store import ImageStore, best_variants, original_url, split_variant
+
+
+def write(directory, name, content):
+    path = directory / name
+    path.write_bytes(content)
+    return path
+
+
+class TestVariants:
+    """Tests para las variantes de tamaño de WordPress"""
+
+    def test_split_variant(self):
+        assert split_variant("foto-350x350.jpg") == ("foto", ".jpg", (0, 122500))
+        assert split_variant("foto-scaled.jpg") == ("foto", ".jpg", (1, 0))
+        assert split_variant("foto.JPG") == ("foto", ".jpg", (2, 0))
+        # Los sufijos de copia no son variantes
+        assert split_variant("foto_1.jpg") == ("foto_1", ".jpg", (2, 0))
+
+    def test_original_url(self):
+        assert original_url("https://x.org/up/foto-350x350.jpg?v=1") == "https://x.org/up/foto.jpg?v=1"
+        assert original_url("https://x.org/up/foto.jpg") is None
+
+    def test_best_variants_keeps_order(self):
+        urls = [
+            "https://x.org/up/a-300x200.jpg",
+            "https://x.org/up/b.png",
+            "https://x.org/up/a-1024x683.jpg",
+            "https://x.org/otro/a-150x150.jpg",
+        ]
+        assert best_variants(urls) == [
+            "https://x.org/up/a-1024x683.jpg",
+            "https://x.org/up/b.png",
+            "https://x.org/otro/a-150x150.jpg",
+        ]
+
+
+class TestImageStore:
+    """Tests para ImageStore"""
+
+    def test_add_file_stores_content_once(self, tmp_path):
+        store = ImageStore(tmp_path)
+        first, is_new = store.add_file(write(tmp_path, "a.part", b"x"), "a.jpg", urls=["https://x.org/a.jpg"])
+        second, is_new_again = store.add_file(write(tmp_path, "b.part", b"x"), "b.jpg", urls=["https://x.org/b.jpg"])
+
+        assert (is_new, is_new_again) == (True, False)
+        assert first == second == tmp_path / "a.jpg"
+        assert not (tmp_path / "b.part").exists()
+        assert store.resolve("https://x.org/b.jpg") == first
+        assert store.resolve("b.jpg") == first
+
+    def test_name_collision_uses_hash(self, tmp_path):
+        store = ImageStore(tmp_path)
+        store.add_file(write(tmp_path, "1.part", b"uno"), "a.jpg")
+        path, is_new = store.add_file(write(tmp_path, "2.part", b"dos"), "a.jpg")
+        assert is_new
+        assert path.name.startswith("a-") and path.suffix == ".jpg"
+
+    def test_variant_url_resolves_to_original(self, tmp_path):
+        store = ImageStore(tmp_path)
+        store.add_file(write(tmp_path, "1.part", b"orig"), "foto.jpg", urls=["https://x.org/foto.jpg"])
+        assert store.lookup_url("https://x.org/foto-350x350.jpg") == tmp_path / "foto.jpg"
+
+    def test_map_is_persisted(self, tmp_path):
+        store = ImageStore(tmp_path)
+        store.add_file(write(tmp_path, "1.part", b"orig"), "foto.jpg", urls=["https://x.org/foto.jpg"])
+        store.save()
+        assert ImageStore(tmp_path).resolve("https://x.org/foto.jpg") == tmp_path / "foto.jpg"
+
+    def test_dedupe_collapses_copies_and_variants(self, tmp_path):
+        write(tmp_path, "foto.jpg", b"original")
+        write(tmp_path, "foto_1.jpg", b"original")
+        write(tmp_path, "foto-350x350.jpg", b"reducida")
+        write(tmp_path, "otra_1.jpg", b"uno")
+        write(tmp_path, "otra_2.jpg", b"dos")
+
+        stats = ImageStore(tmp_path).dedupe()
+
+        assert stats["files"] == 5
+        assert stats["removed"] == 2
+        assert sorted(p.name for p in tmp_path.glob("*.jpg")) == ["foto.jpg", "otra_1.jpg", "otra_2.jpg"]
+        store = ImageStore(tmp_path)
+        assert store.resolve("foto_1.jpg") == tmp_path / "foto.jpg"
+        assert store.resolve("foto-350x350.jpg") == tmp_path / "foto.jpg"
+        assert store.resolve("otra_2.jpg") == tmp_path / "otra_2.jpg"
+
+    def test_dedupe_keep_variants_and_dry_run(self, tmp_path):
+        write(tmp_path, "foto.jpg", b"original")
+        write(tmp_path, "foto-350x350.jpg", b"reducida")
+
+        assert ImageStore(tmp_path).dedupe(dry_run=True)["removed"] == 1
+        assert ImageStore(tmp_path).dedupe(collapse_variants=False)["removed"] == 0
+        assert (tmp_path / "foto-350x350.jpg").exists()
+
+    def test_deduplicar_imagenes_command(self, tmp_path):
+        write(tmp_path, "a.png", b"x")
+        write(tmp_path, "a_1.png", b"x")
+
+        out = StringIO()
+        call_command("deduplicar_imagenes", images_dir=str(tmp_path), stdout=out)
+
+        assert "1 eliminadas" in out.getvalue()
+        assert not (tmp_path / "a_1.png").exists()
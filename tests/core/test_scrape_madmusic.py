@@ -0,0 +1,174 @@
+"""
+Tests para el crawler de scripts/scrape_madmusic.py sobre un sitio grabado (core/http_replay.py)
+"""
+
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+from core.http_replay import HttpArchive, ReplayAdapter
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "scrape_madmusic.py"
+SITE = "https://madmusic.iccmu.es"
+HTML = {"Content-Type": "text/html; charset=utf-8"}
+JPEG = {"Content-Type": "image/jpeg"}
+
+
+def load_scraper_module():
+    spec = importlib.util.spec_from_file_location("scrape_madmusic", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def page(title, links=(), images=()):
+    body = "".join(f'<a href="{href}">{href}</a>' for href in links)
+    body += "".join(f'<img src="{src}">' for src in images)
+    return f"<html><head><title>{title}</title></head><body><h1>{title}</h1>{body}</body></html>".encode()
+
+
+def record_site(archive):
+    """Portada, equipo (con subpágina), un listado de noticias y una página sin grabar."""
+    uploads = f"{SITE}/wp-content/uploads/2020/01"
+    noticias = [f"/noticias/n-{number}/" for number in range(6)]
+    archive.add("GET", f"{SITE}/", 200, HTML, page(
+        "Inicio", ["/equipo/", "/noticias/", "/no-grabada/", "https://otro.example.org/"],
+        [f"{uploads}/foto-350x350.jpg", "/logo.png"]))
+    archive.add("GET", f"{SITE}/equipo", 200, HTML, page(
+        "Equipo", ["/equipo/participantes/", "/"], [f"{uploads}/foto.jpg"]))
+    archive.add("GET", f"{SITE}/equipo/participantes", 200, HTML, page("Participantes", ["/equipo/"], ["/logo.png"]))
+    archive.add("GET", f"{SITE}/noticias", 200, HTML, page("Noticias", noticias))
+    for number, href in enumerate(noticias):
+        archive.add("GET", f"{SITE}{href.rstrip('/')}", 200, HTML, page(
+            f"Noticia {number}", ["/noticias/"], [f"{uploads}/n-{number}.jpg"]))
+        archive.add("GET", f"{uploads}/n-{number}.jpg", 200, JPEG, f"noticia {number}".encode())
+    archive.add("GET", f"{uploads}/foto.jpg", 200, JPEG, b"foto original")
+    archive.add("GET", f"{SITE}/logo.png", 200, {"Content-Type": "image/png"}, b"logo")
+
+
+class TestMadMusicScraperCrawl:
+    """Crawl BFS completo reproducido desde un archivo HTTP, sin red"""
+
+    @pytest.fixture
+    def requests_log(self, monkeypatch):
+        """Peticiones en curso a la vez e instante en que empieza cada una."""
+        log = {"active": 0, "peak": 0, "starts": []}
+        lock = threading.Lock()
+        send = ReplayAdapter.send
+
+        def tracked_send(adapter, request, **kwargs):
+            with lock:
+                log["active"] += 1
+                log["peak"] = max(log["peak"], log["active"])
+                log["starts"].append(time.monotonic())
+            try:
+                return send(adapter, request, **kwargs)
+            finally:
+                with lock:
+                    log["active"] -= 1
+
+        monkeypatch.setattr(ReplayAdapter, "send", tracked_send)
+        return log
+
+    def test_crawl_replayed_site(self, tmp_path, requests_log):
+        archive_dir = tmp_path / "archive"
+        record_site(HttpArchive(archive_dir))
+        output = tmp_path / "scraped_madmusic"
+
+        module = load_scraper_module()
+        scraper = module.MadMusicScraper(
+            base_url=f"{SITE}/", output_dir=output, workers=4, image_workers=4, per_host=2, delay=0.01,
+            http_mode="replay", http_archive=str(archive_dir), latency=0.05,
+        )
+        scraper.crawl(max_depth=3)
+        scraper.generate_report()
+
+        # Estructura de scraped_madmusic/
+        pages = sorted(str(path.relative_to(output / "html")) for path in (output / "html").rglob("*.html"))
+        assert pages == sorted(
+            ["index.html", "equipo.html", "equipo/participantes.html", "noticias.html"]
+            + [f"noticias/n-{number}.html" for number in range(6)]
+        )
+        assert "<h1>" in (output / "html" / "equipo" / "participantes.html").read_text(encoding="utf-8")
+
+        # La variante -350x350 se descarga como el original: un solo fichero para foto
+        images = sorted(path.name for path in (output / "images").iterdir())
+        assert images == sorted(["foto.jpg", "logo.png", "image_map.json"] + [f"n-{number}.jpg" for number in range(6)])
+        assert scraper.images.lookup_url(f"{SITE}/wp-content/uploads/2020/01/foto-350x350.jpg").name == "foto.jpg"
+
+        # La página sin grabar falla (ConnectionError) y el dominio externo no se visita
+        assert scraper.failed_urls == {f"{SITE}/no-grabada"}
+        assert len(scraper.visited_urls) == 11
+        assert len(scraper.downloaded_images) == 9
+
+        report = (output / "scraping_report.txt").read_text(encoding="utf-8")
+        assert "Total páginas scrapeadas: 11" in report
+        assert "Total imágenes descargadas: 9" in report
+        assert "URLs fallidas: 1" in report
+        assert f"URLs FALLIDAS:\n{'-' * 80}\n  {SITE}/no-grabada\n" in report
+
+        # Páginas e imágenes comparten el límite por host: nunca más de per_host a la vez
+        assert requests_log["peak"] == 2
+        # Y cada petición empieza al menos delay segundos después de la anterior
+        starts = requests_log["starts"]
+        assert max(starts) - min(starts) >= 0.01 * (len(starts) - 1)
+
+    def test_max_depth(self, tmp_path, requests_log):
+        archive_dir = tmp_path / "archive"
+        record_site(HttpArchive(archive_dir))
+
+        module = load_scraper_module()
+        scraper = module.MadMusicScraper(
+            base_url=f"{SITE}/", output_dir=tmp_path / "out", workers=2, image_workers=2, per_host=2,
+            delay=0, http_mode="replay", http_archive=str(archive_dir), latency=0,
+        )
+        scraper.crawl(max_depth=1)
+
+        assert scraper.visited_urls == {SITE}
+        assert sorted(path.name for path in (tmp_path / "out" / "html").iterdir()) == ["index.html"]
+
+
+class TestMadMusicScraperImages:
+    """Descarga de imágenes: variantes, conexiones y temporales"""
+
+    UPLOADS = f"{SITE}/wp-content/uploads/2021/05"
+
+    @pytest.fixture
+    def scraper(self, tmp_path):
+        archive = HttpArchive(tmp_path / "archive")
+        # Original borrado: 404 y se descarga la variante
+        archive.add("GET", f"{self.UPLOADS}/cartel.jpg", 404, HTML, b"no existe")
+        archive.add("GET", f"{self.UPLOADS}/cartel-350x350.jpg", 200, JPEG, b"cartel pequeno")
+        module = load_scraper_module()
+        return module.MadMusicScraper(
+            base_url=f"{SITE}/", output_dir=tmp_path / "out", workers=1, image_workers=1, per_host=1,
+            delay=0, http_mode="replay", http_archive=str(tmp_path / "archive"), latency=0,
+        )
+
+    def test_missing_original_is_closed(self, scraper, monkeypatch):
+        closed = []
+        close = requests.Response.close
+
+        def tracked_close(response):
+            closed.append(response.url)
+            close(response)
+
+        monkeypatch.setattr(requests.Response, "close", tracked_close)
+        scraper.download_image(f"{self.UPLOADS}/cartel-350x350.jpg")
+
+        assert f"{self.UPLOADS}/cartel.jpg" in closed
+        assert sorted(path.name for path in scraper.images_dir.iterdir()) == ["cartel-350x350.jpg"]
+
+    def test_failed_download_removes_temp_file(self, scraper, monkeypatch):
+        def failing_add_file(*args, **kwargs):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr(scraper.images, "add_file", failing_add_file)
+        scraper.download_image(f"{self.UPLOADS}/cartel-350x350.jpg")
+
+        assert not list(scraper.images_dir.glob(".*.part"))
+        assert f"{self.UPLOADS}/cartel-350x350.jpg" not in scraper.downloaded_images
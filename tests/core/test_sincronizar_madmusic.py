@@ -0,0 +1,64 @@
+"""
+Tests para la sincronización por etapas de sincronizar_madmusic
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from core.http_replay import HttpArchive
+from core.management.commands.sincronizar_madmusic import content_hash, extract_content_from_html
+from core.models import Pagina, Proyecto
+
+
+def page_html(titulo, texto):
+    return f'<html><section id="tools"><h1>{titulo}</h1><article><p>{texto}</p></article></section></html>'.encode()
+
+
+@pytest.mark.django_db
+class TestSincronizarMadmusic:
+    """Descarga concurrente, extracción en paralelo y bulk_update por lotes"""
+
+    @pytest.fixture
+    def site(self, tmp_path, settings, monkeypatch):
+        settings.MADMUSIC_HTTP_CACHE = str(tmp_path / "cache.sqlite3")
+        archive = HttpArchive(tmp_path / "archive")
+        monkeypatch.setenv("HTTP_REPLAY_MODE", "replay")
+        monkeypatch.setenv("HTTP_REPLAY_ARCHIVE", str(tmp_path / "archive"))
+        return archive
+
+    def test_only_changed_pages_are_written(self, site):
+        proyecto = Proyecto.objects.create(slug="madmusic", titulo="Madmusic")
+        slugs = ["equipo", "historia", "objetivos", "publicaciones"]
+        for slug in slugs:
+            site.add("GET", f"https://madmusic.iccmu.es/{slug}/", 200, {}, page_html(f"Título de {slug}", slug))
+        # "historia" ya tiene exactamente el contenido del original
+        titulo, cuerpo = extract_content_from_html(page_html("Título de historia", "historia").decode())
+        for slug in slugs:
+            Pagina.objects.create(proyecto=proyecto, slug=slug, titulo=titulo if slug == "historia" else slug,
+                                  cuerpo=cuerpo if slug == "historia" else "")
+
+        out = StringIO()
+        call_command("sincronizar_madmusic", workers=4, parse_workers=2, batch_size=2, no_cache=True, stdout=out)
+
+        output = out.getvalue()
+        assert "Descargadas: 4" in output
+        assert "Actualizadas: 3" in output
+        assert "Sin cambios: 1" in output
+        assert Pagina.objects.get(slug="equipo").titulo == "Título de equipo"
+        assert Pagina.objects.get(slug="publicaciones").titulo == "Título de publicaciones"
+
+    def test_missing_page_counts_as_error(self, site):
+        proyecto = Proyecto.objects.create(slug="madmusic", titulo="Madmusic")
+        Pagina.objects.create(proyecto=proyecto, slug="no-grabada", titulo="x", cuerpo="")
+
+        out = StringIO()
+        call_command("sincronizar_madmusic", parse_workers=1, stdout=out)
+
+        assert "Error al obtener contenido" in out.getvalue()
+        assert "Errores: 1" in out.getvalue()
+
+    def test_content_hash(self):
+        assert content_hash("a", "b") == content_hash("a", "b")
+        assert content_hash("a", "b") != content_hash("ab", "")
@@ -2,14 +2,36 @@
 Tests para el middleware multi-dominio
 """
 
+import threading
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
 from django.conf import settings
-from django.test import RequestFactory
+from django.test import AsyncRequestFactory, RequestFactory
 
 import pytest
 
 from proyectos.middleware import DomainUrlConfMiddleware
 
 
+def run_async(middleware, request):
+    """Ejecutar un middleware async; devuelve la respuesta y si process_request cambió de hilo."""
+    threads = []
+    process_request = middleware.process_request
+
+    def recording_process_request(request):
+        threads.append(threading.get_ident())
+        return process_request(request)
+
+    middleware.process_request = recording_process_request
+
+    async def call():
+        loop_thread = threading.get_ident()
+        response = await middleware(request)
+        return response, any(thread != loop_thread for thread in threads)
+
+    return async_to_sync(call)()
+
+
 @pytest.mark.django_db
 class TestDomainUrlConfMiddleware:
     """Tests para DomainUrlConfMiddleware"""
@@ -67,6 +89,20 @@ class TestDomainUrlConfMiddleware:
             # Restaurar ALLOWED_HOSTS original
             settings.ALLOWED_HOSTS = original_allowed_hosts
 
+    def test_middleware_async(self):
+        """Test que el middleware funciona sin cambiar de hilo en el perfil ASGI"""
+        async def get_response(request):
+            return request.urlconf
+
+        middleware = DomainUrlConfMiddleware(get_response)
+        request = AsyncRequestFactory().get("/")
+        request.META["HTTP_HOST"] = "madmusic.iccmu.es"
+
+        assert iscoroutinefunction(middleware)
+        response, thread_hop = run_async(middleware, request)
+        assert response == "proyectos.urls_madmusic"
+        assert not thread_hop
+
     def test_middleware_strips_port(self, factory):
         """Test que el middleware maneja correctamente los puertos en el host"""
         request = factory.get("/", HTTP_HOST="fondos.iccmu.es:8000")
@@ -75,3 +111,139 @@ class TestDomainUrlConfMiddleware:
         middleware(request)
 
         assert request.urlconf == "proyectos.urls_fondos"
+
+
+@pytest.mark.django_db
+class TestWagtailSiteMiddleware:
+    """Tests para WagtailSiteMiddleware"""
+
+    @pytest.fixture
+    def local_site(self):
+        from wagtail.models import Page, Site
+
+        return Site.objects.create(hostname="127.0.0.1", port=8000, root_page=Page.get_first_root_node())
+
+    def test_sets_site_for_prefix(self, factory, local_site):
+        """Test que /madmusic/ en localhost usa el Site local"""
+        from proyectos.wagtail_site_middleware import WagtailSiteMiddleware
+
+        request = factory.get("/madmusic/equipo/", HTTP_HOST="localhost:8000")
+        WagtailSiteMiddleware(lambda req: None)(request)
+
+        assert request._wagtail_site == local_site
+
+        request = factory.get("/madmusic/equipo/", HTTP_HOST="madmusic.iccmu.es")
+        WagtailSiteMiddleware(lambda req: None)(request)
+        assert not hasattr(request, "_wagtail_site")
+
+    def test_async_uses_async_orm(self, local_site):
+        """Test que en ASGI el Site se busca con el ORM async"""
+        from proyectos.wagtail_site_middleware import WagtailSiteMiddleware
+
+        async def get_response(request):
+            return request._wagtail_site
+
+        middleware = WagtailSiteMiddleware(get_response)
+        request = AsyncRequestFactory().get("/madmusic/equipo/")
+        request.META["HTTP_HOST"] = "localhost:8000"
+
+        assert iscoroutinefunction(middleware)
+        response, thread_hop = run_async(middleware, request)
+        assert response == local_site
+        # aprocess_request no pasa por process_request
+        assert not thread_hop
+
+
+class TestStaticMirrorMiddleware:
+    """Tests para StaticMirrorMiddleware"""
+
+    @pytest.fixture
+    def mirror_root(self, tmp_path, settings):
+        settings.STATIC_MIRROR_ROOT = str(tmp_path)
+        settings.STATIC_MIRROR_SENDFILE_HEADER = None
+        page_dir = tmp_path / "madmusic.iccmu.es" / "noticias"
+        page_dir.mkdir(parents=True)
+        (page_dir / "index.html").write_text("<html>mirror</html>")
+        return tmp_path
+
+    def _middleware(self):
+        from proyectos.static_mirror_middleware import StaticMirrorMiddleware
+
+        return StaticMirrorMiddleware(lambda req: "dynamic")
+
+    def test_not_used_without_mirror_root(self, settings):
+        """Test que el middleware se desactiva sin STATIC_MIRROR_ROOT"""
+        from django.core.exceptions import MiddlewareNotUsed
+
+        settings.STATIC_MIRROR_ROOT = None
+        with pytest.raises(MiddlewareNotUsed):
+            self._middleware()
+
+    def test_serves_anonymous_get_from_mirror(self, factory, mirror_root):
+        """Test que un GET anónimo se sirve desde el mirror"""
+        request = factory.get("/noticias/", HTTP_HOST="madmusic.iccmu.es")
+
+        response = self._middleware()(request)
+
+        assert response["X-Static-Mirror"] == "hit"
+        assert b"".join(response.streaming_content) == b"<html>mirror</html>"
+
+    def test_falls_back_on_miss(self, factory, mirror_root):
+        """Test que una página fuera del mirror se renderiza dinámicamente"""
+        request = factory.get("/equipo/", HTTP_HOST="madmusic.iccmu.es")
+
+        assert self._middleware()(request) == "dynamic"
+
+    def test_skips_sessions_and_query_strings(self, factory, mirror_root, settings):
+        """Test que usuarios con sesión y peticiones con query van a Django"""
+        middleware = self._middleware()
+
+        request = factory.get("/noticias/", HTTP_HOST="madmusic.iccmu.es")
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = "abc"
+        assert middleware(request) == "dynamic"
+
+        request = factory.get("/noticias/?page=2", HTTP_HOST="madmusic.iccmu.es")
+        assert middleware(request) == "dynamic"
+
+        request = factory.post("/noticias/", HTTP_HOST="madmusic.iccmu.es")
+        assert middleware(request) == "dynamic"
+
+    def test_skips_exporter_renders(self, factory, mirror_root):
+        """Test que los renders del exportador no se sirven desde el mirror"""
+        request = factory.get("/noticias/", HTTP_HOST="madmusic.iccmu.es", HTTP_X_STATIC_EXPORT="1")
+
+        assert self._middleware()(request) == "dynamic"
+
+    def test_async_hit_and_miss_stay_on_event_loop(self, mirror_root):
+        """Test que en ASGI el mirror se consulta sin pasar a otro hilo"""
+        from proyectos.static_mirror_middleware import StaticMirrorMiddleware
+
+        async def get_response(request):
+            return "dynamic"
+
+        def request(path):
+            request = AsyncRequestFactory().get(path)
+            request.META["HTTP_HOST"] = "madmusic.iccmu.es"
+            return request
+
+        middleware = StaticMirrorMiddleware(get_response)
+        assert iscoroutinefunction(middleware)
+        response, thread_hop = run_async(middleware, request("/noticias/"))
+        assert response["X-Static-Mirror"] == "hit"
+        assert b"".join(response.streaming_content) == b"<html>mirror</html>"
+        assert not thread_hop
+
+        middleware = StaticMirrorMiddleware(get_response)
+        response, thread_hop = run_async(middleware, request("/equipo/"))
+        assert response == "dynamic"
+        assert not thread_hop
+
+    def test_x_accel_redirect(self, factory, mirror_root, settings):
+        """Test que con nginx se delega el envío mediante X-Accel-Redirect"""
+        settings.STATIC_MIRROR_SENDFILE_HEADER = "X-Accel-Redirect"
+        request = factory.get("/noticias/", HTTP_HOST="madmusic.iccmu.es")
+
+        response = self._middleware()(request)
+
+        assert response["X-Accel-Redirect"] == "/_static_mirror/madmusic.iccmu.es/noticias/index.html"
+        assert response.content == b""